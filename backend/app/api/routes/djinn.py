@@ -1,27 +1,117 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
 import uuid
-from typing import Any, Dict, List  # Added List, Dict
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import cv2
+import numpy as np
 from fastapi import (
     APIRouter,  # Moved status import here for clarity
+    File,
+    Header,
     HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
     status,
 )
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 # Import schemas and utility/inference functions
+from app.core.config import settings
+from app.db.session import get_driver
+from app.djinn import crud as djinn_crud
+from app.djinn import schemas as djinn_schemas
 from app.schemas.djinn import (
+    ChangeDetectionOptions,
+    DjinnDetectionOptions,
     DjinnDetectionResponse,
     DjinnDetectionResult,
     DjinnMapViewRequest,
+    DjinnTileDetectionRequest,
+    DjinnTileDetectionResponse,
+    DjinnVideoStreamOptions,
+    GeoLocation,
+    TilingOptions,
 )
-from app.services.djinn.inference.detection import run_yolo_detection
+from app.services.djinn.inference import detection
+from app.services.djinn.inference.backends import DEFAULT_IMGSZ
+from app.services.djinn.inference.batching import detection_batcher
+from app.services.djinn.inference.cache import detection_cache
+from app.services.djinn.inference.change import (
+    IncrementalResult,
+    change_reference_store,
+    run_incremental_detection,
+)
+from app.services.djinn.inference.dedup import (
+    combine_groups,
+    group_duplicates,
+    recent_object_index,
+)
+from app.services.djinn.inference.executor import (
+    InferenceQueueFull,
+    inference_executor,
+)
+from app.services.djinn.inference.results import DetectionBatch
+from app.services.djinn.inference.slippy_tiles import detect_viewport_tiles, tile_cache
+from app.services.djinn.inference.tiling import run_tiled_detection
+from app.services.djinn.inference.tracking import Track
+from app.services.djinn.inference.video import (
+    StreamingDetector,
+    read_video_frames,
+    track_to_dict,
+)
+from app.services.djinn.utils.georeference import GeoTransform
 from app.services.djinn.utils.image_processing import (
-    convert_pixel_to_geo,
-    decode_base64_image,
+    decode_base64_bytes,
+    decode_image_bytes,
+    decode_image_for_detection,
+    parse_bounds,
+    split_classes,
 )
+from app.services.djinn.utils.slippy import global_pixels_to_lat_lng
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _busy_exception() -> HTTPException:
+    """503 returned when the inference pool cannot accept more work."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Object detection is at capacity. Please retry shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _build_geotransform(
+    options: DjinnDetectionOptions, img_width: int, img_height: int
+) -> GeoTransform:
+    """Builds the pixel-to-geo transform from whichever georeference was sent."""
+    if options.gcps is not None:
+        return GeoTransform.from_gcps(
+            [(p.px, p.py) for p in options.gcps],
+            [(p.lat, p.lng) for p in options.gcps],
+            img_width,
+            img_height,
+        )
+    if options.geotransform is not None:
+        return GeoTransform.from_gdal(options.geotransform, img_width, img_height)
+    return GeoTransform.from_bounds(options.bounds, img_width, img_height)
+
+
 @router.post(
     "/detect_map_view",
     response_model=DjinnDetectionResponse,
@@ -37,14 +127,175 @@ async def detect_objects_in_map_view(
     performs object detection, converts pixel coordinates to geographic
     coordinates, and returns the detected objects with their locations.
     """
-    # 1. Decode Image
-    image_np = decode_base64_image(request_data.image_data)
-    if image_np is None:
+    # 1. Decode Image (CPU-bound, so it runs in the inference pool)
+    try:
+        decoded = await inference_executor.run(
+            _decode_request_image, request_data.image_data, request_data
+        )
+    except InferenceQueueFull:
+        raise _busy_exception()
+    if decoded is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or corrupt base64 image data provided.",
         )
 
+    image_np, original_size = decoded
+    return await _detect_and_format(image_np, request_data, original_size)
+
+
+@router.post(
+    "/detect_map_view/binary",
+    response_model=DjinnDetectionResponse,
+    summary="Detect Objects in Map View Image (Binary Upload)",
+    description=(
+        "Same as /detect_map_view, but the image is sent as raw bytes "
+        "(e.g. Content-Type: image/png) or as the 'image' part of a multipart "
+        "form instead of base64 JSON. Bounds go in the X-Map-Bounds header or "
+        "a 'bounds' form field; other options are query parameters."
+    ),
+    status_code=status.HTTP_200_OK,
+)
+async def detect_objects_in_map_view_binary(
+    request: Request,
+    x_map_bounds: Optional[str] = Header(
+        None,
+        description="Bounds as 'south,west,north,east' or Leaflet-style bounds JSON",
+    ),
+    min_confidence: float = Query(0.0, ge=0.0, le=1.0),
+    classes: Optional[List[str]] = Query(
+        None, description="Class names to keep (repeat or comma-separate)"
+    ),
+    include_footprints: bool = Query(False),
+    tile_size: Optional[int] = Query(
+        None, description="Enable tiled inference with this tile size"
+    ),
+    tile_overlap: float = Query(0.2),
+    tile_merge_iou: float = Query(0.5),
+    change_detection: bool = Query(
+        False, description="Only re-detect what changed since the scene's last image"
+    ),
+    scene_id: Optional[str] = Query(None, max_length=200),
+    change_threshold: int = Query(25),
+    deduplicate: bool = Query(
+        True, description="Merge detections of the same object across views"
+    ),
+) -> DjinnDetectionResponse:
+    """
+    Binary variant of `detect_objects_in_map_view`. The encoded image is
+    decoded straight from the request buffer, avoiding base64 inflation and
+    the intermediate string/bytes copies of the JSON endpoint.
+    """
+    bounds_value = x_map_bounds
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("image")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    "Multipart requests must include the image as an "
+                    "'image' file part."
+                ),
+            )
+        image_buffer = await upload.read()
+        bounds_value = form.get("bounds") or bounds_value
+    else:
+        image_buffer = await request.body()
+
+    if not image_buffer:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request contains no image data.",
+        )
+
+    try:
+        options = DjinnDetectionOptions(
+            bounds=parse_bounds(bounds_value) if bounds_value else None,
+            include_footprints=include_footprints,
+            tiling=(
+                TilingOptions(
+                    tile_size=tile_size, overlap=tile_overlap, merge_iou=tile_merge_iou
+                )
+                if tile_size is not None
+                else None
+            ),
+            change_detection=(
+                ChangeDetectionOptions(scene_id=scene_id, threshold=change_threshold)
+                if change_detection
+                else None
+            ),
+            min_confidence=min_confidence,
+            classes=split_classes(classes),
+            deduplicate=deduplicate,
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid bounds: {e}"
+        )
+
+    # Decode directly from the request buffer (CPU-bound, so in the inference pool)
+    try:
+        decoded = await inference_executor.run(
+            _decode_request_image, image_buffer, options
+        )
+    except InferenceQueueFull:
+        raise _busy_exception()
+    if decoded is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or corrupt image data provided.",
+        )
+
+    image_np, original_size = decoded
+    return await _detect_and_format(image_np, options, original_size)
+
+
+def _decode_request_image(
+    image_data: Union[bytes, str], options: DjinnDetectionOptions
+) -> Optional[Tuple[np.ndarray, Tuple[int, int]]]:
+    """
+    Decodes a request image (raw bytes or base64), at reduced resolution
+    when nothing downstream needs the full one: tiling works on
+    full-resolution tiles, and change detection compares against the
+    scene's previous image at its own resolution.
+
+    Returns:
+        A tuple of (BGR image, (original width, original height)), or None
+        if decoding fails.
+    """
+    if isinstance(image_data, str):
+        image_data = decode_base64_bytes(image_data)
+        if image_data is None:
+            return None
+    if (
+        settings.DJINN_REDUCED_DECODE
+        and options.tiling is None
+        and options.change_detection is None
+    ):
+        return decode_image_for_detection(image_data, DEFAULT_IMGSZ)
+    image_np = decode_image_bytes(image_data)
+    if image_np is None:
+        return None
+    return image_np, (image_np.shape[1], image_np.shape[0])
+
+
+async def _detect_and_format(
+    image_np: np.ndarray,
+    options: DjinnDetectionOptions,
+    original_size: Optional[Tuple[int, int]] = None,
+) -> DjinnDetectionResponse:
+    """
+    Shared detection pipeline for the map-view endpoints: cache lookup,
+    detection, filtering, georeferencing and serialization.
+
+    ``original_size`` is the (width, height) of the image as sent, when
+    ``image_np`` was decoded at a reduced resolution; detections are mapped
+    back to its pixels before georeferencing.
+    """
     # 2. Get Image Dimensions
     img_height, img_width = image_np.shape[:2]
     if img_height == 0 or img_width == 0:
@@ -53,74 +304,658 @@ async def detect_objects_in_map_view(
             detail="Decoded image has zero dimensions.",
         )
 
-    # 3. Run Detection
+    # 3. Look up cached results for these exact pixels. Bounds are applied
+    # later, so identical pixels with different bounds still hit.
+    cache_key: Optional[str] = None
+    raw_detections: Optional[DetectionBatch] = None
+    if detection_cache.enabled:
+        cache_options = options.tiling.model_dump() if options.tiling else None
+        try:
+            cache_key, raw_detections = await inference_executor.run(
+                detection_cache.lookup,
+                image_np,
+                detection.get_model_id(),
+                cache_options,
+            )
+        except InferenceQueueFull:
+            raise _busy_exception()
+
+    # 4. Run Detection on a cache miss
+    change: Optional[IncrementalResult] = None
+    scene_id = (
+        _scene_id(options, img_width, img_height)
+        if options.change_detection is not None
+        else None
+    )
+    if raw_detections is None:
+        # Both paths return a columnar DetectionBatch (boxes, confidences, class ids)
+        try:
+            if scene_id is not None:
+                # Only the parts of the scene that changed since its last image
+                change = await run_incremental_detection(
+                    image_np,
+                    scene_id,
+                    change_reference_store,
+                    inference_executor,
+                    detect_full=lambda image: _run_detection(image, options.tiling),
+                    detect_region=lambda crop: _run_region_detection(
+                        crop, options.tiling, max(img_width, img_height)
+                    ),
+                    threshold=options.change_detection.threshold,
+                    max_changed_fraction=options.change_detection.max_changed_fraction,
+                    merge_iou=options.tiling.merge_iou if options.tiling else 0.5,
+                )
+                raw_detections = change.detections
+            else:
+                raw_detections = await _run_detection(image_np, options.tiling)
+        except InferenceQueueFull:
+            raise _busy_exception()
+        except Exception as e:
+            # Nothing is cached: the next request for these pixels retries
+            logger.error(f"Error during YOLO detection: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Object detection failed.",
+            )
+
+        # Don't cache the empty results produced when the model failed to load
+        if cache_key is not None and detection.model is not None:
+            try:
+                await inference_executor.run(
+                    detection_cache.put, cache_key, raw_detections
+                )
+            except InferenceQueueFull:
+                logger.debug("Skipping detection cache write, executor is busy.")
+    elif scene_id is not None:
+        # Cached pixels still become the scene's reference for the next image
+        change = IncrementalResult(raw_detections, 0.0)
+        try:
+            await inference_executor.run(
+                change_reference_store.remember, scene_id, image_np, raw_detections
+            )
+        except InferenceQueueFull:
+            logger.debug("Skipping change reference update, executor is busy.")
+
+    # Back to the pixels of the image as sent, if it was decoded reduced
+    if original_size is not None and original_size != (img_width, img_height):
+        raw_detections = raw_detections.scaled(
+            original_size[0] / img_width, original_size[1] / img_height
+        )
+        img_width, img_height = original_size
+
+    # 5. Filter Results (vectorized over all detections at once)
+    detections = raw_detections.filter(
+        min_confidence=options.min_confidence,
+        class_names=options.classes,
+    )
+
+    # 6. Convert box centers (and optionally corners) to geographic coordinates.
+    # The transform is built once per image and applied to all boxes at once.
     try:
-        # Assuming run_yolo_detection returns a list of dicts like:
-        # [{'bbox_pixels': [x1, y1, x2, y2], 'confidence': 0.95, 'class_name': 'car'}, ...]
-        raw_detections: List[Dict[str, Any]] = run_yolo_detection(image_np)
+        geo_transform = _build_geotransform(options, img_width, img_height)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid georeference: {e}",
+        )
+    centers = detections.centers()
+    lats, lngs = geo_transform.pixel_to_geo(centers[:, 0], centers[:, 1])
+
+    # 7. Merge detections of the same object, within this view and across
+    # recent overlapping views, into one canonical object each
+    ids: Optional[List[str]] = None
+    observation_counts: Optional[np.ndarray] = None
+    if options.deduplicate and recent_object_index.enabled and len(detections):
+        detections, lats, lngs, ids, observation_counts = _deduplicate(
+            detections, lats, lngs
+        )
+
+    footprints = (
+        geo_transform.boxes_to_footprints(detections.boxes).tolist()
+        if options.include_footprints
+        else None
+    )
+
+    # 8. Serialize - per-object models are only created here
+    formatted_detections = _serialize_detections(
+        detections, lats, lngs, footprints, ids, observation_counts
+    )
+
+    # 9. Return Response
+    if change is None:
+        return DjinnDetectionResponse(detections=formatted_detections)
+    return DjinnDetectionResponse(
+        detections=formatted_detections,
+        inferred_fraction=round(change.inferred_fraction, 4),
+        changed_regions=change.changed_regions,
+    )
+
+
+async def _run_detection(
+    image_np: np.ndarray, tiling: Optional[TilingOptions]
+) -> DetectionBatch:
+    if tiling is not None:
+        # Large images are sliced into full-resolution tiles
+        return await run_tiled_detection(
+            image_np,
+            tile_size=tiling.tile_size,
+            overlap=tiling.overlap,
+            merge_iou=tiling.merge_iou,
+            executor=inference_executor,
+        )
+    # Concurrent requests are grouped into a single batched predict call
+    return await detection_batcher.submit(image_np)
+
+
+async def _run_region_detection(
+    crop: np.ndarray, tiling: Optional[TilingOptions], image_size: int
+) -> DetectionBatch:
+    """
+    Detects objects in a changed region at the same scale a full pass over
+    the image (``image_size`` on its longer side) would have used.
+    """
+    if tiling is not None:
+        return await _run_detection(crop, tiling)
+    scale = DEFAULT_IMGSZ / image_size
+    imgsz = max(32, int(np.ceil(max(crop.shape[:2]) * scale / 32.0)) * 32)
+    results = await inference_executor.run(
+        detection.run_yolo_detection_batch, [crop], imgsz
+    )
+    return results[0]
+
+
+def _scene_id(options: DjinnDetectionOptions, img_width: int, img_height: int) -> str:
+    """
+    Scene key for change-aware detection: the client's scene id, or one
+    derived from the georeference, the image size and the model.
+    """
+    if options.change_detection.scene_id:
+        return f"{detection.get_model_id()}:{options.change_detection.scene_id}"
+    georeference = json.dumps(
+        options.model_dump(include={"bounds", "geotransform", "gcps"}),
+        sort_keys=True,
+    )
+    digest = hashlib.sha1(georeference.encode("utf-8")).hexdigest()
+    return f"{detection.get_model_id()}:{digest}:{img_width}x{img_height}"
+
+
+def _deduplicate(
+    detections: DetectionBatch, lats: np.ndarray, lngs: np.ndarray
+) -> Tuple[DetectionBatch, np.ndarray, np.ndarray, List[str], np.ndarray]:
+    """
+    Collapses same-class detections within ``DJINN_DEDUP_TOLERANCE_METERS``
+    of each other, then matches the survivors against recently returned
+    objects so overlapping views share object ids.
+
+    Returns:
+        The canonical detections with their locations, ids and observation
+        counts.
+    """
+    class_names = detections.class_names()
+    labels = group_duplicates(
+        lats, lngs, class_names, settings.DJINN_DEDUP_TOLERANCE_METERS
+    )
+    representative, lats, lngs, confidences, counts = combine_groups(
+        labels, lats, lngs, detections.confidences, np.ones(len(detections))
+    )
+    detections = detections.select(representative)
+    ids, observation_counts = recent_object_index.observe(
+        [class_names[i] for i in representative.tolist()],
+        lats,
+        lngs,
+        confidences,
+        counts,
+    )
+    return detections, lats, lngs, ids, observation_counts
+
+
+def _serialize_detections(
+    detections: DetectionBatch,
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    footprints: Optional[List],
+    ids: Optional[List[str]] = None,
+    observation_counts: Optional[np.ndarray] = None,
+) -> List[DjinnDetectionResult]:
+    """Builds the response models from georeferenced detection columns."""
+    return [
+        DjinnDetectionResult(
+            id=ids[i] if ids is not None else str(uuid.uuid4()),
+            class_name=class_name,
+            confidence=confidence,
+            location=GeoLocation(lat=lat, lng=lng),
+            footprint=(
+                [GeoLocation(lat=c_lat, lng=c_lng) for c_lat, c_lng in footprints[i]]
+                if footprints is not None
+                else None
+            ),
+            observation_count=(
+                int(observation_counts[i]) if observation_counts is not None else 1
+            ),
+        )
+        for i, (class_name, confidence, lat, lng) in enumerate(
+            zip(
+                detections.class_names(),
+                detections.confidences.tolist(),
+                lats.tolist(),
+                lngs.tolist(),
+            )
+        )
+    ]
+
+
+@router.get(
+    "/detect_map_view/cache",
+    summary="Detection Cache Metrics",
+    description="Returns hit/miss counters and sizes of the map-view detection cache.",
+)
+async def get_detection_cache_stats() -> Dict[str, Any]:
+    """
+    Returns metrics for the content-addressed map-view detection cache.
+    """
+    return detection_cache.stats()
+
+
+@router.post(
+    "/detect_tiles",
+    response_model=DjinnTileDetectionResponse,
+    summary="Detect Objects in Map Tiles",
+    description=(
+        "Detects objects in the Web Mercator imagery tiles covering a viewport. "
+        "Results are cached per z/x/y tile, so panning or revisiting an area "
+        "only runs inference on tiles that have not been seen before."
+    ),
+    status_code=status.HTTP_200_OK,
+)
+async def detect_objects_in_tiles(
+    request_data: DjinnTileDetectionRequest,
+) -> DjinnTileDetectionResponse:
+    """
+    Assembles detections for a viewport from per-tile results, inferring only
+    the missing tiles, and returns them with geographic locations.
+    """
+    try:
+        tile_result = await detect_viewport_tiles(
+            request_data.bounds, request_data.zoom, executor=inference_executor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except InferenceQueueFull:
+        raise _busy_exception()
     except Exception as e:
-        # Log the exception e
-        print(f"Error during YOLO detection: {e}")
+        logger.error(f"Error during tile detection: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Object detection failed.",
         )
 
-    # 4. Process & Convert Results
-    formatted_detections: List[DjinnDetectionResult] = []
-    for detection in raw_detections:
+    detections = tile_result.detections.filter(
+        min_confidence=request_data.min_confidence,
+        class_names=request_data.classes,
+    )
+
+    # Global tile pixels map to lat/lng exactly through the Web Mercator inverse
+    tile_size = settings.DJINN_TILE_PIXEL_SIZE
+    centers = detections.centers()
+    lats, lngs = global_pixels_to_lat_lng(
+        centers[:, 0], centers[:, 1], tile_result.zoom, tile_size
+    )
+    footprints = None
+    if request_data.include_footprints:
+        x1, y1, x2, y2 = detections.boxes.T
+        corner_lats, corner_lngs = global_pixels_to_lat_lng(
+            np.stack([x1, x2, x2, x1], axis=1),
+            np.stack([y1, y1, y2, y2], axis=1),
+            tile_result.zoom,
+            tile_size,
+        )
+        footprints = np.stack([corner_lats, corner_lngs], axis=-1).tolist()
+
+    return DjinnTileDetectionResponse(
+        detections=_serialize_detections(detections, lats, lngs, footprints),
+        tiles_total=tile_result.tiles_total,
+        tiles_cached=tile_result.tiles_cached,
+        tiles_inferred=tile_result.tiles_inferred,
+        tiles_failed=tile_result.tiles_failed,
+    )
+
+
+@router.get(
+    "/detect_tiles/cache",
+    summary="Tile Detection Cache Metrics",
+    description="Returns hit/miss counters and sizes of the per-tile detection cache.",
+)
+async def get_tile_cache_stats() -> Dict[str, Any]:
+    """
+    Returns metrics for the z/x/y tile detection cache.
+    """
+    return tile_cache.stats()
+
+
+# Add other Djinn-related endpoints here as needed
+
+
+# --- Video / Frame Stream Detection ---
+
+
+async def _persist_tracks(
+    tracks: List[Track],
+    names: Dict[int, str],
+    filename: str,
+    content_type: Optional[str],
+) -> str:
+    """
+    Stores one DetectedObject per confirmed track (its best observation),
+    linked to an Image node representing the video.
+
+    Returns:
+        The ID of the created Image node.
+    """
+    driver = await get_driver()
+    # TODO: Store the video itself once object storage is implemented
+    storage_uri = f"minio:djinn-videos/{uuid.uuid4()}_{filename}"
+    image = await djinn_crud.create_image(
+        driver,
+        djinn_schemas.ImageCreate(
+            filename=filename,
+            content_type=content_type,
+            description=f"Video stream with {len(tracks)} tracked objects",
+        ),
+        storage_uri,
+    )
+    await djinn_crud.create_detected_objects(
+        driver,
+        image.id,
+        [
+            djinn_schemas.DetectedObjectCreate(
+                image_id=image.id,
+                object_class=names.get(track.class_id, f"class_{track.class_id}"),
+                confidence=float(track.best_confidence),
+                bounding_box=[
+                    (float(track.best_box[0]), float(track.best_box[1])),
+                    (float(track.best_box[2]), float(track.best_box[3])),
+                ],
+                track_id=track.track_id,
+                first_frame=track.first_frame,
+                last_frame=track.last_frame,
+                frame_count=track.hits,
+            )
+            for track in tracks
+        ],
+    )
+    return str(image.id)
+
+
+async def _frame_messages(
+    detector: StreamingDetector,
+    frames: List[Tuple[int, float, Any]],
+    encoded: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Stream messages for a batch of frames, decoded images or, with
+    ``encoded``, JPEG/PNG bytes. A busy executor is waited out by the
+    detector; a batch that fails (decoding, inference error) yields one error
+    message listing its frames instead of ending the stream, and the tracker
+    carries on with the next one.
+    """
+    try:
+        if encoded:
+            messages = await detector.process_encoded(frames)
+        else:
+            messages = await detector.process(frames)
+    except Exception as e:
+        logger.error(f"Error during stream detection: {e}", exc_info=True)
+        return [
+            {
+                "type": "error",
+                "frames": [index for index, _, _ in frames],
+                "detail": "Object detection failed; frames skipped.",
+            }
+        ]
+    return [{"type": "frame", **message} for message in messages]
+
+
+async def _stream_summary(
+    detector: StreamingDetector,
+    options: DjinnVideoStreamOptions,
+    filename: str,
+    content_type: Optional[str],
+    extra: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Ends tracking, optionally persists the tracks and builds the final message."""
+    tracks = detector.finish()
+    summary: Dict[str, Any] = {
+        "type": "summary",
+        "frames_processed": detector.frames_processed,
+        **extra,
+        "tracks": [track_to_dict(track, detector.names) for track in tracks],
+        "image_id": None,
+    }
+    if options.persist:
+        try:
+            summary["image_id"] = await _persist_tracks(
+                tracks, detector.names, filename, content_type
+            )
+        except Exception as e:
+            logger.error(f"Failed to persist tracks of {filename}: {e}", exc_info=True)
+            summary["persist_error"] = "Could not store the tracked objects."
+    return summary
+
+
+def _spool_video(upload: UploadFile) -> str:
+    """Copies an uploaded video to a temporary file OpenCV can open."""
+    suffix = os.path.splitext(upload.filename or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        upload.file.seek(0)
+        shutil.copyfileobj(upload.file, f, length=1024 * 1024)
+        return f.name
+
+
+@router.post(
+    "/detect_video",
+    summary="Detect and Track Objects in a Video",
+    response_class=StreamingResponse,
+)
+async def detect_objects_in_video(
+    video: UploadFile = File(..., description="The video file to process"),
+    frame_stride: int = Query(
+        settings.DJINN_VIDEO_FRAME_STRIDE,
+        ge=1,
+        le=1000,
+        description="Run detection on every Nth frame only",
+    ),
+    min_confidence: float = Query(0.0, ge=0.0, le=1.0),
+    classes: Optional[List[str]] = Query(None),
+    persist: bool = Query(
+        False, description="Store one DetectedObject per confirmed track"
+    ),
+):
+    """
+    Runs detection and tracking over an uploaded video and streams the
+    results as NDJSON while the video is processed.
+
+    Every line is a JSON object. Frame lines
+    (`{"type": "frame", "frame", "timestamp_ms", "detections"}`) list the
+    detections of one processed frame with their persistent `track_id`.
+    Frames whose detection failed are reported by an error line
+    (`{"type": "error", "frames", "detail"}`) and the stream goes on. The
+    last line (`{"type": "summary", ...}`) lists every confirmed track with
+    its best observation and, with `persist=true`, the ID of the Image node
+    the tracks were stored under.
+    """
+    options = DjinnVideoStreamOptions(
+        frame_stride=frame_stride,
+        min_confidence=min_confidence,
+        classes=split_classes(classes),
+        persist=persist,
+        filename=video.filename,
+    )
+    path = await asyncio.to_thread(_spool_video, video)
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        capture.release()
+        os.remove(path)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not open the uploaded file as a video.",
+        )
+
+    detector = StreamingDetector(
+        inference_executor,
+        frame_stride=options.frame_stride,
+        min_confidence=options.min_confidence,
+        classes=options.classes,
+    )
+    batch_size = settings.DJINN_BATCH_MAX_SIZE
+
+    async def stream():
+        next_index = 0
+        reading: Optional[asyncio.Task] = None
         try:
-            bbox_pixels = detection.get("bbox_pixels")
-            confidence = detection.get("confidence")
-            class_name = detection.get("class_name")
-
-            # Ensure all necessary data is present
-            if not all([bbox_pixels, isinstance(confidence, (float, int)), class_name]):
-                print(f"Skipping detection with missing/invalid data: {detection}")
-                continue  # Skip this detection if data is incomplete
-
-            # Validate bbox format if needed (e.g., length 4)
-            if len(bbox_pixels) != 4:
-                print(f"Skipping detection with invalid bbox: {bbox_pixels}")
-                continue
-
-            # Calculate center pixel coordinates
-            center_px = (bbox_pixels[0] + bbox_pixels[2]) / 2
-            center_py = (bbox_pixels[1] + bbox_pixels[3]) / 2
-
-            # Convert pixel coordinates to geographic coordinates
-            lat, lng = convert_pixel_to_geo(
-                px=center_px,
-                py=center_py,
-                image_width=img_width,
-                image_height=img_height,
-                bounds=request_data.bounds,
+            reading = asyncio.ensure_future(
+                detector.run_on_executor(
+                    read_video_frames, capture, 0, batch_size, options.frame_stride
+                )
             )
+            while True:
+                frames, next_index, finished = await reading
+                reading = None
+                # Decode the next batch while this one is being inferred
+                if not finished:
+                    reading = asyncio.ensure_future(
+                        detector.run_on_executor(
+                            read_video_frames,
+                            capture,
+                            next_index,
+                            batch_size,
+                            options.frame_stride,
+                        )
+                    )
+                for message in await _frame_messages(detector, frames):
+                    yield json.dumps(message) + "\n"
+                if finished:
+                    break
 
-            # Generate a unique ID for the detection
-            detection_id = str(uuid.uuid4())
-
-            # Create the final detection result object
-            # Note: The schema expects location as a nested model, but the prompt
-            # asked for a dict. Creating the dict as requested. If the schema
-            # requires a GeoPoint model, this should be adjusted.
-            formatted_detection = DjinnDetectionResult(
-                id=detection_id,
-                class_name=str(class_name),  # Ensure class_name is string
-                confidence=float(confidence),  # Ensure confidence is float
-                location={"lat": lat, "lng": lng},  # As per prompt requirement
+            summary = await _stream_summary(
+                detector,
+                options,
+                video.filename or "video",
+                video.content_type,
+                {"frames_read": next_index},
             )
-            formatted_detections.append(formatted_detection)
+            yield json.dumps(summary) + "\n"
+        finally:
+            # A read may still be running if the client went away mid-stream
+            if reading is not None:
+                await asyncio.gather(reading, return_exceptions=True)
+            capture.release()
+            os.remove(path)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-        except Exception as e:
-            # Log the exception e for the specific detection
-            print(f"Error processing detection {detection}: {e}")
-            # Decide whether to skip this detection or raise an error
-            # For now, we'll skip it and log
-            continue
 
-    # 5. Return Response
-    return DjinnDetectionResponse(detections=formatted_detections)
+@router.websocket("/detect_stream")
+async def detect_objects_in_stream(websocket: WebSocket):
+    """
+    Detection and tracking over frames pushed by the client.
 
+    Protocol:
+        1. Optionally send a JSON text message with `DjinnVideoStreamOptions`.
+        2. Send each frame as a binary message (an encoded JPEG/PNG image).
+        3. Send `{"type": "end"}` (or close the socket) when done.
 
-# Add other Djinn-related endpoints here as needed
+    The server answers every processed frame with a
+    `{"type": "frame", ...}` message, or a `{"type": "error", ...}` message
+    for frames whose detection failed (see `/detect_video`), and, after the
+    end message, a final `{"type": "summary", ...}`. Frames that arrive while
+    the buffer of `DJINN_STREAM_BUFFER_FRAMES` frames is full replace the
+    oldest buffered ones, so a slow model degrades to skipping frames rather
+    than falling ever further behind.
+    """
+    await websocket.accept()
+    options = DjinnVideoStreamOptions()
+    detector: Optional[StreamingDetector] = None
+    buffer: deque = deque(maxlen=max(1, settings.DJINN_STREAM_BUFFER_FRAMES))
+    frames_available = asyncio.Event()
+    counters = {"frames_received": 0, "frames_dropped": 0}
+    receiving_done = False
+    connected = True
+    start_time = time.monotonic()
+
+    async def receive() -> None:
+        nonlocal options, detector, receiving_done, connected
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    connected = False
+                    return
+                if message.get("text") is not None:
+                    payload = json.loads(message["text"])
+                    if payload.get("type") == "end":
+                        return
+                    if detector is None:
+                        options = DjinnVideoStreamOptions.model_validate(payload)
+                    continue
+                if message.get("bytes") is None:
+                    continue
+                if detector is None:
+                    detector = StreamingDetector(
+                        inference_executor,
+                        frame_stride=options.frame_stride,
+                        min_confidence=options.min_confidence,
+                        classes=split_classes(options.classes),
+                    )
+                index = counters["frames_received"]
+                counters["frames_received"] += 1
+                if index % options.frame_stride:
+                    continue
+                if len(buffer) == buffer.maxlen:
+                    counters["frames_dropped"] += 1
+                timestamp_ms = (time.monotonic() - start_time) * 1000.0
+                buffer.append((index, timestamp_ms, message["bytes"]))
+                frames_available.set()
+        finally:
+            receiving_done = True
+            frames_available.set()
+
+    async def process() -> None:
+        batch_size = settings.DJINN_BATCH_MAX_SIZE
+        while True:
+            await frames_available.wait()
+            frames_available.clear()
+            while buffer:
+                pending = [
+                    buffer.popleft() for _ in range(min(batch_size, len(buffer)))
+                ]
+                for message in await _frame_messages(detector, pending, encoded=True):
+                    if connected:
+                        await websocket.send_json(message)
+            if receiving_done:
+                return
+
+    receiver = asyncio.create_task(receive())
+    try:
+        await process()
+        await receiver
+        if detector is not None and connected:
+            summary = await _stream_summary(
+                detector,
+                options,
+                options.filename or "stream",
+                None,
+                counters,
+            )
+            await websocket.send_json(summary)
+            await websocket.close()
+        elif detector is not None and options.persist:
+            # The client went away; still keep what was tracked
+            await _stream_summary(
+                detector, options, options.filename or "stream", None, counters
+            )
+    except WebSocketDisconnect:
+        logger.info("Detection stream client disconnected.")
+    except (ValueError, ValidationError) as e:
+        await websocket.close(code=1003, reason=f"Invalid stream message: {e}")
+    finally:
+        receiver.cancel()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -28,12 +30,127 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str  # Needs to be set in environment
     MINIO_BUCKET_NAME: str = "selkie-documents"  # Example bucket name
     MINIO_USE_SSL: bool = False  # Set to True if MinIO uses HTTPS
+    MINIO_PART_SIZE_MB: int = 16  # Multipart upload part size (MinIO minimum: 5)
+    MINIO_UPLOAD_CONCURRENCY: int = 4  # Parts uploaded in parallel per file
+
+    # --- Kappa ---
+    KAPPA_INDEXED_TEXT_MAX_CHARS: int = 1_000_000  # Text kept per document for search
+    KAPPA_SEARCH_COUNT_LIMIT: int = (
+        10_000  # Search totals above this are reported as a lower bound
+    )
+    # Text extraction processes per server process; 0 = the cores divided
+    # among the server's worker processes
+    KAPPA_INGEST_PROCESSES: int = 0
+    KAPPA_INGEST_QUEUE_SIZE: int = 1000  # Documents held in memory awaiting extraction
+    KAPPA_INGEST_MAX_ATTEMPTS: int = 3  # Failed extractions are retried up to this
+    # Running extractions untouched for this long are assumed dead and re-queued
+    KAPPA_INGEST_STALE_SECONDS: float = 1800.0
+    KAPPA_CHUNK_CHARS: int = 1500  # Maximum characters per text chunk
+    KAPPA_CHUNK_OVERLAP_CHARS: int = 200  # Characters shared by consecutive chunks
+    KAPPA_CHUNK_WRITE_BATCH: int = 1000  # Chunks created per Neo4j transaction
+    # Semantic search over chunk embeddings (needs the 'semantic' extra)
+    KAPPA_EMBEDDING_MODEL: Optional[str] = (
+        "sentence-transformers/all-MiniLM-L6-v2"  # None disables
+    )
+    KAPPA_EMBEDDING_DIM: int = 384  # Must match the model
+    KAPPA_EMBEDDING_BATCH_SIZE: int = 64  # Chunks per model forward pass
+    KAPPA_VECTOR_INDEX_DIR: Optional[str] = "/tmp/selkie-kappa-vectors"  # None disables
+    KAPPA_VECTOR_INDEX_LISTS: int = (
+        4096  # IVF lists (trained after 40x this many chunks)
+    )
+    KAPPA_VECTOR_INDEX_PROBES: int = 16  # Lists scanned per query (recall vs. speed)
+    KAPPA_HYBRID_CANDIDATES: int = 100  # Documents taken from each ranking
+    KAPPA_HYBRID_CHUNKS_PER_DOCUMENT: int = 4  # Chunk over-fetch per document wanted
+    KAPPA_HYBRID_RRF_K: int = 60  # Reciprocal rank fusion constant
+    KAPPA_SEMANTIC_MIN_SIMILARITY: float = 0.2  # Less similar chunks never match
 
     # --- Google OAuth Settings ---
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
     GOOGLE_REDIRECT_URI: str  # e.g., http://localhost:8000/api/v1/auth/google/callback or your frontend callback handler
 
+    # --- Djinn Inference Settings ---
+    DJINN_INFERENCE_BACKEND: str = "ultralytics"  # ultralytics|onnxruntime|openvino
+    DJINN_MODEL_PATH: str = "yolov8n.pt"  # .pt, .onnx or OpenVINO IR dir per backend
+    # onnxruntime/openvino threads per operator (0 = DJINN_TORCH_THREADS)
+    DJINN_RUNTIME_INTRA_OP_THREADS: int = 0
+    DJINN_RUNTIME_INTER_OP_THREADS: int = 1  # onnxruntime only
+    DJINN_BATCH_MAX_SIZE: int = 8  # Max images combined into one predict call
+    DJINN_BATCH_WINDOW_MS: float = 15.0  # Max wait for a batch to fill (adds latency)
+    # Decode large map-view JPEGs at 1/2-1/8 scale when that still covers the
+    # model input
+    DJINN_REDUCED_DECODE: bool = True
+    # Decode + inference run in a dedicated thread pool, never on the event loop.
+    # Keep DJINN_INFERENCE_WORKERS * DJINN_TORCH_THREADS below the core count so
+    # the API itself stays responsive under detection load.
+    DJINN_INFERENCE_WORKERS: int = 2  # Worker threads, each with its own model copy
+    DJINN_TORCH_THREADS: int = 2  # torch/OpenCV intra-op threads per operation
+    DJINN_INFERENCE_QUEUE_SIZE: int = 32  # Waiting jobs before requests get a 503
+    # Content-addressed cache of map-view detections (keyed by image pixels)
+    DJINN_DETECTION_CACHE_SIZE: int = 512  # In-memory LRU entries (0 disables)
+    DJINN_DETECTION_CACHE_DIR: Optional[str] = None  # Set to persist entries on disk
+    DJINN_DETECTION_CACHE_DISK_SIZE: int = 10000  # Max persisted entries
+    # Slippy-map tile detection (/detect_tiles): per z/x/y tile results are cached
+    DJINN_TILE_URL_TEMPLATE: str = (
+        "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/"
+        "MapServer/tile/{z}/{y}/{x}"
+    )  # Must match the imagery layer shown in the frontend
+    DJINN_TILE_PIXEL_SIZE: int = 256  # Edge length of the source tiles
+    DJINN_TILE_MAX_PER_REQUEST: int = 64  # Larger viewports are rejected
+    DJINN_TILE_FETCH_CONCURRENCY: int = 8
+    DJINN_TILE_FETCH_TIMEOUT_SECONDS: float = 10.0
+    DJINN_TILE_EDGE_MARGIN_PX: float = 3.0  # Boxes this close to an edge may be cut
+    DJINN_TILE_CACHE_SIZE: int = 4096  # In-memory LRU tiles (0 disables)
+    DJINN_TILE_CACHE_DIR: Optional[str] = None  # Set to persist tiles on disk
+    DJINN_TILE_CACHE_DISK_SIZE: int = 200000  # Max persisted tiles
+    # Background detection jobs for uploaded images (/djinn/images/upload)
+    DJINN_JOB_WORKERS: int = 2  # Concurrent jobs per server process
+    DJINN_JOB_SPOOL_DIR: str = "/tmp/selkie-djinn-jobs"  # Uploads awaiting detection
+    DJINN_JOB_MAX_ATTEMPTS: int = 3  # Failed jobs are retried up to this many times
+    # Running jobs without a progress update for this long are re-queued on startup
+    DJINN_JOB_STALE_SECONDS: float = 600.0
+    # Change-aware re-detection of repeatedly imaged scenes
+    DJINN_CHANGE_REFERENCE_SIZE: int = (
+        64  # Scenes whose last image is kept (0 disables)
+    )
+    DJINN_CHANGE_MAX_REUSE: int = 10  # Incremental passes before a full re-detection
+    DJINN_CHANGE_MIN_ALIGN_RESPONSE: float = 0.1  # Phase correlation peak to trust
+    DJINN_CHANGE_CELL_SIZE: int = 32  # Difference mask is pooled into cells this size
+    # Geo-space deduplication of detections from overlapping views and images
+    DJINN_DEDUP_TOLERANCE_METERS: float = (
+        2.0  # Same-class objects this close merge (0 disables)
+    )
+    DJINN_DEDUP_WINDOW_SECONDS: float = (
+        900.0  # How long map-view objects are remembered
+    )
+    DJINN_DEDUP_MAX_OBJECTS: int = 100_000  # Map-view objects remembered at most
+    # Appearance embeddings of persisted detections ("find similar objects")
+    DJINN_EMBEDDING_INDEX_DIR: Optional[str] = (
+        "/tmp/selkie-djinn-embeddings"  # None disables
+    )
+    DJINN_EMBEDDING_INDEX_LISTS: int = (
+        256  # IVF lists (trained after 40x this many vectors)
+    )
+    DJINN_EMBEDDING_INDEX_PROBES: int = 8  # Lists scanned per query (recall vs. speed)
+    # Large rasters (GeoTIFF etc.) are read window by window, never decoded whole
+    DJINN_RASTER_GDAL_CACHE_MB: int = 64  # GDAL block cache per process
+    DJINN_RASTER_AUTO_TILE_PIXELS: int = 25_000_000  # Larger uploads are always tiled
+    DJINN_RASTER_AUTO_TILE_SIZE: int = 1024  # Tile size used for those
+    # Video / frame stream detection with object tracking
+    DJINN_VIDEO_FRAME_STRIDE: int = 1  # Default: run detection on every Nth frame
+    DJINN_STREAM_BUFFER_FRAMES: int = 16  # WebSocket frames buffered before dropping
+    DJINN_TRACK_IOU_THRESHOLD: float = 0.3  # Min IoU to continue a track
+    DJINN_TRACK_HIGH_CONFIDENCE: float = 0.5  # Detections that may start tracks
+    DJINN_TRACK_MAX_AGE_FRAMES: int = 30  # Unseen frames before a track ends
+    DJINN_TRACK_MIN_HITS: int = 3  # Observations before a track is kept
+    DJINN_DB_WRITE_CHUNK_SIZE: int = 1000  # DetectedObject rows per UNWIND query
+
+    # --- Server Settings (python -m app.server) ---
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 2  # Forked worker processes sharing the loaded model
+    SERVER_MEMORY_LOG_INTERVAL_SECONDS: float = 300.0  # 0 disables memory logging
+
     # Pydantic Settings Configuration
     model_config = SettingsConfigDict(
         env_file=".env",  # Load .env file if present
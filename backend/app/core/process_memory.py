@@ -0,0 +1,117 @@
+import os
+from typing import Dict, List, Optional
+
+# Set by app.server in the parent before forking, so workers can find siblings
+MASTER_PID_ENV = "SELKIE_SERVER_MASTER_PID"
+
+# smaps_rollup fields reported, in kB
+_MEMORY_FIELDS = {
+    "Rss": "rss_kb",
+    "Pss": "pss_kb",
+    "Shared_Clean": "shared_clean_kb",
+    "Shared_Dirty": "shared_dirty_kb",
+    "Private_Clean": "private_clean_kb",
+    "Private_Dirty": "private_dirty_kb",
+}
+
+
+def read_process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """
+    Reads memory usage of a process from /proc (Linux only).
+
+    RSS counts every resident page, including pages shared with other
+    processes; PSS divides shared pages between the processes sharing them,
+    so summing PSS over the server workers gives their real footprint.
+
+    Args:
+        pid: The process id.
+
+    Returns:
+        A dictionary of sizes in kB (rss_kb, pss_kb, shared/private clean and
+        dirty), or None if the process does not exist or /proc is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        lines = None
+
+    if lines is None:
+        # Older kernels: only RSS is available from /proc/<pid>/status
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return {"rss_kb": int(line.split()[1])}
+        except OSError:
+            pass
+        return None
+
+    memory: Dict[str, int] = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in _MEMORY_FIELDS:
+            memory[_MEMORY_FIELDS[parts[0].rstrip(":")]] = int(parts[1])
+    return memory
+
+
+def _child_pids(parent_pid: int) -> List[int]:
+    """Lists the direct children of a process by scanning /proc."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after ')'
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def server_memory_report() -> Dict:
+    """
+    Memory of the server processes. Under ``app.server`` this covers the
+    parent and every forked worker; under a plain Uvicorn process only the
+    current process is reported.
+
+    Returns:
+        A dictionary with 'master' (or None), 'workers' (a list of pid plus
+        memory entries, the current process flagged with 'current') and
+        'total_pss_kb'.
+    """
+    current_pid = os.getpid()
+    master_pid = os.environ.get(MASTER_PID_ENV)
+    master_pid = int(master_pid) if master_pid and master_pid.isdigit() else None
+    worker_pids = _child_pids(master_pid) if master_pid else [current_pid]
+
+    workers = []
+    for pid in worker_pids:
+        memory = read_process_memory(pid)
+        if memory is not None:
+            workers.append({"pid": pid, "current": pid == current_pid, **memory})
+
+    master = None
+    if master_pid:
+        master_memory = read_process_memory(master_pid)
+        if master_memory is not None:
+            master = {"pid": master_pid, **master_memory}
+
+    processes = workers + ([master] if master else [])
+    return {
+        "master": master,
+        "workers": workers,
+        "total_pss_kb": sum(p.get("pss_kb", 0) for p in processes),
+    }
+
+
+def format_memory(memory: Dict[str, int]) -> str:
+    """One-line human readable summary of a `read_process_memory` result."""
+    return " ".join(
+        f"{key[: -len('_kb')]}={value / 1024:.1f}MiB"
+        for key, value in memory.items()
+        if key in ("rss_kb", "pss_kb", "shared_clean_kb", "private_dirty_kb")
+    )
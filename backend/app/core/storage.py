@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import BinaryIO, Optional, Set, Tuple
+
+from fastapi import UploadFile
+from minio import Minio
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the storage URIs handed out by this module ("minio:<bucket>/<key>")
+URI_SCHEME = "minio:"
+_MIB = 1024 * 1024
+
+_client: Optional[Minio] = None
+_client_lock = threading.Lock()
+# Buckets known to exist, so each is only checked once per process
+_ready_buckets: Set[str] = set()
+
+
+def get_client() -> Minio:
+    """Shared MinIO client, created on first use (it is thread-safe)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = Minio(
+                settings.MINIO_ENDPOINT,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=settings.MINIO_USE_SSL,
+            )
+        return _client
+
+
+def _ensure_bucket(client: Minio, bucket_name: str) -> None:
+    if bucket_name in _ready_buckets:
+        return
+    if not client.bucket_exists(bucket_name):
+        logger.info(f"Creating storage bucket '{bucket_name}'")
+        client.make_bucket(bucket_name)
+    _ready_buckets.add(bucket_name)
+
+
+def parse_storage_uri(storage_uri: str) -> Tuple[str, str]:
+    """
+    Splits a ``minio:<bucket>/<object>`` URI into bucket and object name.
+
+    Raises:
+        ValueError: If ``storage_uri`` is not such a URI.
+    """
+    bucket_name, _, object_name = storage_uri.removeprefix(URI_SCHEME).partition("/")
+    if not storage_uri.startswith(URI_SCHEME) or not bucket_name or not object_name:
+        raise ValueError(f"Not a storage URI: {storage_uri!r}")
+    return bucket_name, object_name
+
+
+class _HashingReader:
+    """File wrapper that hashes and counts the bytes read through it."""
+
+    __slots__ = ("_file", "sha256", "size")
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+
+class StoredObject:
+    """Where an upload was stored, with its size and SHA-256 checksum."""
+
+    __slots__ = ("uri", "size", "sha256")
+
+    def __init__(self, uri: str, size: int, sha256: str):
+        self.uri = uri
+        self.size = size
+        self.sha256 = sha256
+
+
+def _put_stream(
+    bucket_name: str, object_name: str, stream: BinaryIO, content_type: str
+) -> StoredObject:
+    client = get_client()
+    _ensure_bucket(client, bucket_name)
+    reader = _HashingReader(stream)
+    # With an unknown length the client reads one part at a time from the
+    # stream and hands it to a pool of uploader threads, blocking while all
+    # of them are busy. Memory is therefore bounded by
+    # (MINIO_UPLOAD_CONCURRENCY + 1) parts whatever the file size, and a
+    # failed upload is aborted so no orphaned parts are left behind.
+    client.put_object(
+        bucket_name,
+        object_name,
+        reader,
+        length=-1,
+        content_type=content_type,
+        part_size=settings.MINIO_PART_SIZE_MB * _MIB,
+        num_parallel_uploads=settings.MINIO_UPLOAD_CONCURRENCY,
+    )
+    return StoredObject(
+        f"{URI_SCHEME}{bucket_name}/{object_name}",
+        reader.size,
+        reader.sha256.hexdigest(),
+    )
+
+
+async def upload_to_storage(
+    file: UploadFile, bucket_name: Optional[str] = None
+) -> StoredObject:
+    """
+    Streams an uploaded file into object storage.
+
+    The file is sent from its spooled temporary file in
+    ``MINIO_PART_SIZE_MB`` parts, up to ``MINIO_UPLOAD_CONCURRENCY`` of them
+    in flight at once, and its checksum is computed while it is read, so the
+    whole file is never held in memory. The upload runs in a worker thread.
+
+    Args:
+        file: The uploaded file; it is read from the start.
+        bucket_name: Target bucket (created if missing); defaults to
+                     ``MINIO_BUCKET_NAME``.
+
+    Returns:
+        The stored object's URI, size and SHA-256 hex digest.
+
+    Raises:
+        Exception: If the upload fails.
+    """
+    bucket_name = bucket_name or settings.MINIO_BUCKET_NAME
+    # Client-supplied names may contain path separators
+    filename = os.path.basename(file.filename or "") or "upload"
+    object_name = f"{uuid.uuid4()}_{filename}"
+    await file.seek(0)
+    stored = await asyncio.to_thread(
+        _put_stream,
+        bucket_name,
+        object_name,
+        file.file,
+        file.content_type or "application/octet-stream",
+    )
+    logger.info(f"Stored {stored.uri} ({stored.size} bytes, sha256 {stored.sha256})")
+    return stored
+
+
+async def delete_from_storage(storage_uri: str) -> None:
+    """
+    Deletes an object stored by `upload_to_storage`.
+
+    Raises:
+        ValueError: If ``storage_uri`` is not a storage URI.
+        Exception: If the deletion fails.
+    """
+    bucket_name, object_name = parse_storage_uri(storage_uri)
+    await asyncio.to_thread(get_client().remove_object, bucket_name, object_name)
+    logger.info(f"Deleted {storage_uri} from storage")
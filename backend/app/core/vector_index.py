@@ -0,0 +1,410 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bytes reserved per external id (UUIDs and "<document>:<chunk>" keys fit)
+ID_BYTES = 64
+# Rows scored per step of a flat (untrained) search, bounding its memory use
+_SEARCH_CHUNK_ROWS = 65536
+# k-means iterations when training the coarse quantizer
+_KMEANS_ITERATIONS = 15
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalizes each row, so inner products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorIndex:
+    """
+    File-backed approximate nearest-neighbour index (IVF) over cosine
+    similarity.
+
+    Vectors are appended to a float16 file in ``path`` and searched through
+    a read-only memory map, so the index costs little RAM regardless of its
+    size and is shared by every process that opens it. Until
+    ``train_size`` vectors have been added, searches scan all vectors
+    (exact). At that point a k-means coarse quantizer with ``nlist``
+    centroids is trained and every vector is assigned to its nearest
+    centroid's inverted list; searches then only score the vectors in the
+    ``nprobe`` lists closest to the query.
+
+    Ids are opaque strings of up to `ID_BYTES` bytes. Adding an id again
+    replaces its vector and removing an id tombstones it; either way the old
+    row stays in the files and is skipped by searches.
+
+    Safe to share between threads and processes (e.g. forked server
+    workers): writes hold an exclusive ``flock`` on the directory, and every
+    call first loads the rows other processes have appended since.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: int,
+        nlist: int = 256,
+        nprobe: int = 8,
+        train_size: Optional[int] = None,
+    ):
+        self.path = path
+        self.dim = dim
+        self.nlist = max(1, nlist)
+        self.nprobe = max(1, nprobe)
+        # ~40 points per centroid is enough for a stable k-means
+        self.train_size = train_size or 40 * self.nlist
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._lock_pid: Optional[int] = None
+        self._loaded = False
+        self._count = 0
+        self._vectors: Optional[np.memmap] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._deleted_seen = 0  # Tombstones applied so far
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: Dict[int, np.ndarray] = {}
+
+    # --- Files ---
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _locked(self, exclusive: bool = False) -> Iterator[None]:
+        """
+        Holds the thread lock and an advisory lock on the index directory
+        (shared for reads, exclusive for writes), then catches up with rows
+        other processes have written since the last call.
+        """
+        with self._lock:
+            # flock locks belong to the open file, which forked children
+            # inherit, so every process opens its own
+            if self._lock_file is None or self._lock_pid != os.getpid():
+                os.makedirs(self.path, exist_ok=True)
+                self._lock_file = open(self._file("lock"), "a+b")
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                self._sync()
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _sync(self) -> None:
+        """Loads rows (and a trained quantizer) that are new on disk."""
+        if not self._loaded:
+            meta_path = self._file("meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                if meta["dim"] != self.dim:
+                    raise ValueError(
+                        f"Vector index {self.path} has dimension {meta['dim']}, "
+                        f"expected {self.dim}."
+                    )
+
+        # Rows are only complete once present in all three files; a partial
+        # row is a write in progress or a crashed writer's (cut by `add`)
+        count = min(
+            self._file_rows("vectors.f16", self.dim * 2),
+            self._file_rows("ids.bin", ID_BYTES),
+            self._file_rows("lists.i32", 4),
+        )
+        first_new = self._count
+        if count > first_new:
+            raw_ids = np.fromfile(
+                self._file("ids.bin"),
+                dtype=f"S{ID_BYTES}",
+                count=count - first_new,
+                offset=first_new * ID_BYTES,
+            )
+            for offset, value in enumerate(raw_ids.tolist()):
+                object_id = value.decode("utf-8")
+                self._ids.append(object_id)
+                self._rows[object_id] = first_new + offset
+            self._count = count
+            self._remap()
+
+        # Tombstones name rows, so an id added again after removal survives
+        deleted_path = self._file("deleted.i64")
+        deleted = (
+            os.path.getsize(deleted_path) // 8 if os.path.exists(deleted_path) else 0
+        )
+        if deleted > self._deleted_seen:
+            rows = np.fromfile(
+                deleted_path,
+                dtype=np.int64,
+                count=deleted - self._deleted_seen,
+                offset=self._deleted_seen * 8,
+            )
+            for row in rows.tolist():
+                if self._rows.get(self._ids[row]) == row:
+                    del self._rows[self._ids[row]]
+            self._deleted_seen = deleted
+
+        if self._centroids is None:
+            centroids_path = self._file("centroids.npy")
+            if os.path.exists(centroids_path):
+                # Trained here before or by another process: (re)build all lists
+                self._centroids = np.load(centroids_path)
+                self.nlist = len(self._centroids)
+                assignments = np.fromfile(
+                    self._file("lists.i32"), dtype=np.int32, count=self._count
+                )
+                self._build_lists(assignments)
+        elif count > first_new:
+            assignments = np.fromfile(
+                self._file("lists.i32"),
+                dtype=np.int32,
+                count=count - first_new,
+                offset=first_new * 4,
+            )
+            self._extend_lists(np.arange(first_new, count), assignments)
+
+        if not self._loaded:
+            self._loaded = True
+            logger.info(
+                f"Vector index {self.path} opened: {self._count} vectors, "
+                f"{'trained' if self._centroids is not None else 'untrained'}"
+            )
+
+    def _truncate_partial_rows(self) -> None:
+        """Cuts rows a crashed writer left incomplete (caller holds the write lock)."""
+        for name, row_bytes in (
+            ("vectors.f16", self.dim * 2),
+            ("ids.bin", ID_BYTES),
+            ("lists.i32", 4),
+        ):
+            path = self._file(name)
+            if os.path.getsize(path) != self._count * row_bytes:
+                logger.warning(
+                    f"Vector index {self.path} has a partially written row, ignoring it"
+                )
+                with open(path, "r+b") as f:
+                    f.truncate(self._count * row_bytes)
+
+    def _file_rows(self, name: str, row_bytes: int) -> int:
+        path = self._file(name)
+        if not os.path.exists(path):
+            open(path, "wb").close()
+            return 0
+        return os.path.getsize(path) // row_bytes
+
+    def _remap(self) -> None:
+        """Maps the vector file again after it grew."""
+        self._vectors = (
+            np.memmap(
+                self._file("vectors.f16"),
+                dtype=np.float16,
+                mode="r",
+                shape=(self._count, self.dim),
+            )
+            if self._count
+            else None
+        )
+
+    def _write_meta(self) -> None:
+        meta = {
+            "dim": self.dim,
+            "count": self._count,
+            "nlist": self.nlist,
+            "trained": self._centroids is not None,
+        }
+        tmp_path = self._file("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._file("meta.json"))
+
+    def _extend_lists(self, rows: np.ndarray, assignments: np.ndarray) -> None:
+        for i in np.unique(assignments).tolist():
+            added = rows[assignments == i]
+            existing = self._lists.get(i)
+            self._lists[i] = (
+                added if existing is None else np.concatenate([existing, added])
+            )
+
+    def _build_lists(self, assignments: np.ndarray) -> None:
+        order = np.argsort(assignments, kind="stable")
+        boundaries = np.searchsorted(assignments[order], np.arange(self.nlist + 1))
+        self._lists = {
+            int(i): order[boundaries[i] : boundaries[i + 1]]
+            for i in range(self.nlist)
+            if boundaries[i + 1] > boundaries[i]
+        }
+
+    # --- Training ---
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.full(len(vectors), -1, dtype=np.int32)
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _train(self) -> None:
+        """Trains the coarse quantizer and assigns every stored vector."""
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(
+            rng.choice(self._count, min(self._count, 64 * self.nlist), replace=False)
+        )
+        sample = self._vectors[sample_rows].astype(np.float32)
+        nlist = min(self.nlist, len(sample))
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        # Spherical k-means: assign by inner product, re-normalize the means
+        for _ in range(_KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = ~np.bincount(labels, minlength=nlist).astype(bool)
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        self._centroids = centroids.astype(np.float32)
+        self.nlist = nlist
+
+        assignments = np.concatenate(
+            [
+                self._assign(
+                    self._vectors[start : start + _SEARCH_CHUNK_ROWS].astype(np.float32)
+                )
+                for start in range(0, self._count, _SEARCH_CHUNK_ROWS)
+            ]
+        )
+        assignments.tofile(self._file("lists.i32"))
+        np.save(self._file("centroids.npy"), self._centroids)
+        self._build_lists(assignments)
+        logger.info(
+            f"Vector index {self.path} trained: "
+            f"{nlist} lists over {self._count} vectors"
+        )
+
+    # --- Public API ---
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Appends vectors (normalized here) under the given ids.
+
+        Raises:
+            ValueError: On a dimension mismatch or an id longer than `ID_BYTES`.
+        """
+        vectors = normalize_rows(vectors).reshape(-1, self.dim)
+        if len(ids) != len(vectors):
+            raise ValueError("Got a different number of ids and vectors.")
+        if not len(ids):
+            return
+        encoded = np.array([i.encode("utf-8") for i in ids], dtype=f"S{ID_BYTES}")
+        if any(len(i.encode("utf-8")) > ID_BYTES for i in ids):
+            raise ValueError(f"Vector ids must be at most {ID_BYTES} bytes.")
+
+        with self._locked(exclusive=True):
+            self._truncate_partial_rows()
+            assignments = self._assign(vectors)
+            with open(self._file("vectors.f16"), "ab") as f:
+                f.write(vectors.astype(np.float16).tobytes())
+            with open(self._file("ids.bin"), "ab") as f:
+                f.write(encoded.tobytes())
+            with open(self._file("lists.i32"), "ab") as f:
+                f.write(assignments.tobytes())
+
+            first_row = self._count
+            self._count += len(ids)
+            for offset, object_id in enumerate(ids):
+                self._ids.append(object_id)
+                self._rows[object_id] = first_row + offset
+            self._remap()
+
+            if self._centroids is None:
+                if self._count >= self.train_size:
+                    self._train()
+            else:
+                self._extend_lists(np.arange(first_row, self._count), assignments)
+            self._write_meta()
+
+    def remove(self, ids: Sequence[str]) -> int:
+        """
+        Removes ids from the index; unknown ids are ignored.
+
+        Returns:
+            The number of ids removed.
+        """
+        with self._locked(exclusive=True):
+            rows = [self._rows.pop(i) for i in ids if i in self._rows]
+            if rows:
+                with open(self._file("deleted.i64"), "ab") as f:
+                    f.write(np.asarray(rows, dtype=np.int64).tobytes())
+                self._deleted_seen += len(rows)
+            return len(rows)
+
+    def get(self, object_id: str) -> Optional[np.ndarray]:
+        """The (normalized) vector stored for an id, or None."""
+        with self._locked():
+            row = self._rows.get(object_id)
+            if row is None:
+                return None
+            return self._vectors[row].astype(np.float32)
+
+    def search(
+        self, query: np.ndarray, k: int = 10, exclude: Sequence[str] = ()
+    ) -> List[Tuple[str, float]]:
+        """
+        Finds the ``k`` vectors most similar to ``query``.
+
+        Returns:
+            (id, cosine similarity) pairs, most similar first.
+        """
+        query = normalize_rows(query).reshape(self.dim)
+        with self._locked():
+            if not self._count:
+                return []
+            # Snapshot, so adds during the search do not affect it
+            vectors, ids, rows = self._vectors, self._ids, self._rows
+            if self._centroids is None:
+                candidates = None
+            else:
+                probes = np.argsort(-(self._centroids @ query))[: self.nprobe]
+                lists = [self._lists[i] for i in probes.tolist() if i in self._lists]
+                candidates = (
+                    np.sort(np.concatenate(lists)) if lists else np.empty(0, np.int64)
+                )
+
+        # Over-fetch to make up for replaced/removed rows and excluded ids
+        wanted = (k + len(exclude)) * len(vectors) // max(1, len(rows)) + 8
+        if candidates is None:
+            scores = np.concatenate(
+                [
+                    vectors[start : start + _SEARCH_CHUNK_ROWS].astype(np.float32)
+                    @ query
+                    for start in range(0, len(vectors), _SEARCH_CHUNK_ROWS)
+                ]
+            )
+            candidates = np.arange(len(vectors))
+        else:
+            scores = vectors[candidates].astype(np.float32) @ query
+        if len(scores) > wanted:
+            top = np.argpartition(-scores, wanted)[:wanted]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+
+        excluded = set(exclude)
+        results: List[Tuple[str, float]] = []
+        for index in top.tolist():
+            row = int(candidates[index])
+            object_id = ids[row]
+            if rows.get(object_id) != row or object_id in excluded:
+                continue
+            results.append((object_id, float(scores[index])))
+            if len(results) == k:
+                break
+        return results
+
+    def __len__(self) -> int:
+        with self._locked():
+            return len(self._rows)
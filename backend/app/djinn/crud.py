@@ -1,10 +1,23 @@
+import base64
+import json
 import logging
+import math
 import uuid
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
-from neo4j import AsyncDriver
+import numpy as np
+from neo4j import AsyncDriver, AsyncManagedTransaction
 
+from ..core.config import settings
+from ..schemas.djinn import TilingOptions
+from ..services.djinn.inference.dedup import (
+    METERS_PER_DEGREE,
+    combine_groups,
+    find_nearby_pairs,
+    group_duplicates,
+    to_local_meters,
+)
 from . import schemas  # Import schemas from the current djinn module
 
 logger = logging.getLogger(__name__)
@@ -12,6 +25,26 @@ logger = logging.getLogger(__name__)
 # --- Image CRUD Operations ---
 
 
+def _native(value: Any) -> Any:
+    """Converts Neo4j temporal values to their Python equivalents."""
+    return value.to_native() if hasattr(value, "to_native") else value
+
+
+def _image_from_record(record: dict) -> schemas.Image:
+    """Builds an Image schema from a flat Neo4j record."""
+    record["created_at"] = _native(record["created_at"])
+    record["updated_at"] = _native(record["updated_at"])
+    tile_size = record.pop("tile_size", None)
+    tile_overlap = record.pop("tile_overlap", None)
+    tile_merge_iou = record.pop("tile_merge_iou", None)
+    if tile_size is not None:
+        record["tiling"] = TilingOptions(
+            tile_size=tile_size, overlap=tile_overlap, merge_iou=tile_merge_iou
+        )
+    record["id"] = uuid.UUID(record["id"])
+    return schemas.Image(**record)
+
+
 async def create_image(
     driver: AsyncDriver, image_in: schemas.ImageCreate, storage_uri: str
 ) -> schemas.Image:
@@ -40,20 +73,30 @@ async def create_image(
         content_type: $content_type,
         description: $description,
         storage_uri: $storage_uri,
+        tile_size: $tile_size,
+        tile_overlap: $tile_overlap,
+        tile_merge_iou: $tile_merge_iou,
         created_at: $created_at,
         updated_at: $updated_at
         // TODO: Add source_location property if provided
     })
     RETURN img.id AS id, img.filename AS filename, img.content_type AS content_type,
            img.description AS description, img.storage_uri AS storage_uri,
+           img.tile_size AS tile_size, img.tile_overlap AS tile_overlap,
+           img.tile_merge_iou AS tile_merge_iou,
            img.created_at AS created_at, img.updated_at AS updated_at
     """
+    # Neo4j properties cannot hold nested maps, so tiling options are flattened
+    tiling = image_in.tiling
     parameters = {
         "id": str(image_id),
         "filename": image_in.filename,
         "content_type": image_in.content_type,
         "description": image_in.description,
         "storage_uri": storage_uri,
+        "tile_size": tiling.tile_size if tiling else None,
+        "tile_overlap": tiling.overlap if tiling else None,
+        "tile_merge_iou": tiling.merge_iou if tiling else None,
         "created_at": now,
         "updated_at": now,
         # TODO: Add source_location parameter if provided
@@ -63,19 +106,19 @@ async def create_image(
         f"Executing query to create image node: {query} with params: {parameters}"
     )
 
+    async def work(tx: AsyncManagedTransaction) -> Optional[Dict[str, Any]]:
+        result = await tx.run(query, parameters)
+        record = await result.single()
+        return dict(record) if record else None
+
     try:
         async with driver.session() as session:
-            result = await session.execute_write(
-                lambda tx: tx.run(query, parameters).single()
-            )
+            result = await session.execute_write(work)
 
         if result:
-            created_img_data = dict(result)
-            created_img_data["id"] = uuid.UUID(created_img_data["id"])
-            logger.info(
-                f"Successfully created image node with ID: {created_img_data['id']}"
-            )
-            return schemas.Image(**created_img_data)
+            created_image = _image_from_record(result)
+            logger.info(f"Successfully created image node with ID: {created_image.id}")
+            return created_image
         else:
             logger.error("Image node creation query did not return a result.")
             raise Exception("Failed to create image node in Neo4j.")
@@ -85,30 +128,402 @@ async def create_image(
         raise e
 
 
-# --- Detected Object CRUD Operations (Placeholders) ---
+async def delete_image(driver: AsyncDriver, image_id: uuid.UUID) -> None:
+    """
+    Deletes an Image node with its detection jobs and the detected objects that
+    were not also matched in another image.
+
+    Args:
+        driver: The asynchronous Neo4j driver instance.
+        image_id: The image to delete.
+    """
+    query = """
+    MATCH (img:Image {id: $id})
+    OPTIONAL MATCH (img)<-[:FOR_IMAGE]-(j:DetectionJob)
+    DETACH DELETE j
+    WITH DISTINCT img
+    OPTIONAL MATCH (obj:DetectedObject)-[:DETECTED_IN]->(img)
+    WHERE size([(obj)-[:DETECTED_IN]->(:Image) | 1]) = 1
+    DETACH DELETE obj
+    WITH DISTINCT img
+    DETACH DELETE img
+    """
+
+    async def work(tx: AsyncManagedTransaction) -> None:
+        await tx.run(query, id=str(image_id))
+
+    async with driver.session() as session:
+        await session.execute_write(work)
+    logger.info(f"Deleted image {image_id}")
+
+
+# --- Detected Object CRUD Operations ---
+
+
+def _detected_object_rows(
+    objects: List[schemas.DetectedObjectCreate],
+) -> List[Dict[str, Any]]:
+    """Flattens detected objects into UNWIND parameter rows."""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "object_class": obj.object_class,
+            "confidence": obj.confidence,
+            # Neo4j properties cannot hold nested lists, so the box is flattened
+            "bounding_box": (
+                [coord for point in obj.bounding_box for coord in point]
+                if obj.bounding_box
+                else None
+            ),
+            "latitude": obj.latitude,
+            "longitude": obj.longitude,
+            "track_id": obj.track_id,
+            "first_frame": obj.first_frame,
+            "last_frame": obj.last_frame,
+            "frame_count": obj.frame_count,
+            "observation_count": 1,
+        }
+        for obj in objects
+    ]
+
+
+async def _deduplicate_rows_tx(
+    tx: AsyncManagedTransaction, rows: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Merges rows that are the same physical object, so overlapping images do
+    not store the same car over and over.
+
+    Located rows of the same class within ``DJINN_DEDUP_TOLERANCE_METERS``
+    are first collapsed among themselves, then matched one-to-one (closest
+    first) against the DetectedObject nodes already stored around them,
+    found through the location point index. Rows without a location are
+    left alone.
+
+    Returns:
+        A tuple of (rows to create, updates for matched existing objects,
+        {row id: id of the object it was merged into}).
+    """
+    tolerance = settings.DJINN_DEDUP_TOLERANCE_METERS
+    located = [
+        row
+        for row in rows
+        if row["latitude"] is not None and row["longitude"] is not None
+    ]
+    if tolerance <= 0 or not located:
+        return rows, [], {}
+    unlocated = [
+        row for row in rows if row["latitude"] is None or row["longitude"] is None
+    ]
+
+    lats = np.array([row["latitude"] for row in located], dtype=np.float64)
+    lngs = np.array([row["longitude"] for row in located], dtype=np.float64)
+    classes = [row["object_class"] for row in located]
+    labels = group_duplicates(lats, lngs, classes, tolerance)
+    representative, lats, lngs, confidences, counts = combine_groups(
+        labels,
+        lats,
+        lngs,
+        np.array([row["confidence"] for row in located]),
+        np.ones(len(located)),
+    )
+    # Every row maps to its group's representative
+    representative_ids = [located[index]["id"] for index in representative.tolist()]
+    merged_into = {
+        row["id"]: representative_ids[label]
+        for row, label in zip(located, labels.tolist())
+        if row["id"] != representative_ids[label]
+    }
+    located = [
+        dict(
+            located[index],
+            latitude=lat,
+            longitude=lng,
+            confidence=confidence,
+            observation_count=count,
+        )
+        for index, lat, lng, confidence, count in zip(
+            representative.tolist(),
+            lats.tolist(),
+            lngs.tolist(),
+            confidences.tolist(),
+            counts.tolist(),
+        )
+    ]
+
+    # Stored objects near the batch, padded by the tolerance
+    pad_lat = tolerance / METERS_PER_DEGREE
+    max_abs_lat = min(float(np.abs(lats).max()) + pad_lat, 89.9)
+    pad_lng = pad_lat / math.cos(math.radians(max_abs_lat))
+    query = """
+    MATCH (o:DetectedObject)
+    WHERE point.withinBBox(o.location,
+                           point({latitude: $south, longitude: $west}),
+                           point({latitude: $north, longitude: $east}))
+      AND o.object_class IN $classes
+    RETURN o.id AS id, o.object_class AS object_class,
+           o.location.latitude AS latitude, o.location.longitude AS longitude,
+           o.confidence AS confidence,
+           coalesce(o.observation_count, 1) AS observation_count
+    """
+    result = await tx.run(
+        query,
+        south=float(lats.min()) - pad_lat,
+        west=float(lngs.min()) - pad_lng,
+        north=float(lats.max()) + pad_lat,
+        east=float(lngs.max()) + pad_lng,
+        classes=sorted(set(classes)),
+    )
+    existing = await result.data()
+    if not existing:
+        return located + unlocated, [], merged_into
+
+    # Candidate (existing, new) pairs from one grid-hashed pass over both sets
+    all_lats = np.concatenate([[o["latitude"] for o in existing], lats])
+    all_lngs = np.concatenate([[o["longitude"] for o in existing], lngs])
+    all_classes = [o["object_class"] for o in existing] + [
+        r["object_class"] for r in located
+    ]
+    x, y = to_local_meters(all_lats, all_lngs)
+    pairs = np.sort(find_nearby_pairs(x, y, tolerance), axis=1)
+    stored = len(existing)
+    pairs = pairs[(pairs[:, 0] < stored) & (pairs[:, 1] >= stored)]
+    pairs = pairs[[all_classes[a] == all_classes[b] for a, b in pairs.tolist()]]
+    if not len(pairs):
+        return located + unlocated, [], merged_into
+
+    distances = np.hypot(
+        x[pairs[:, 0]] - x[pairs[:, 1]], y[pairs[:, 0]] - y[pairs[:, 1]]
+    )
+    used_stored, used_new, matches = set(), set(), []
+    for a, b in pairs[np.argsort(distances, kind="stable")].tolist():
+        if a not in used_stored and b not in used_new:
+            used_stored.add(a)
+            used_new.add(b)
+            matches.append((a, b - stored))
+
+    stored_index = np.array([a for a, _ in matches])
+    new_index = np.array([b for _, b in matches])
+    _, merged_lats, merged_lngs, merged_confidences, merged_counts = combine_groups(
+        np.tile(np.arange(len(matches)), 2),
+        np.concatenate([all_lats[stored_index], lats[new_index]]),
+        np.concatenate([all_lngs[stored_index], lngs[new_index]]),
+        np.concatenate(
+            [[existing[a]["confidence"] for a in stored_index], confidences[new_index]]
+        ),
+        np.concatenate(
+            [
+                [existing[a]["observation_count"] for a in stored_index],
+                counts[new_index],
+            ]
+        ),
+    )
+    updates = [
+        {
+            "id": existing[a]["id"],
+            "latitude": lat,
+            "longitude": lng,
+            "confidence": confidence,
+            "observation_count": count,
+        }
+        for a, lat, lng, confidence, count in zip(
+            stored_index.tolist(),
+            merged_lats.tolist(),
+            merged_lngs.tolist(),
+            merged_confidences.tolist(),
+            merged_counts.tolist(),
+        )
+    ]
+    for a, b in matches:
+        merged_into[located[b]["id"]] = existing[a]["id"]
+    merged_into = {
+        row_id: merged_into.get(target, target)
+        for row_id, target in merged_into.items()
+    }
+    matched_new = set(new_index.tolist())
+    unmatched = [row for i, row in enumerate(located) if i not in matched_new]
+    return unmatched + unlocated, updates, merged_into
+
+
+async def _create_detected_objects_tx(
+    tx: AsyncManagedTransaction,
+    image_id: uuid.UUID,
+    rows: List[Dict[str, Any]],
+    created_at: datetime,
+    deduplicate: bool = True,
+) -> List[str]:
+    """
+    Stores the rows with their DETECTED_IN relationships, all in the
+    caller's transaction.
+
+    With ``deduplicate``, rows that are the same object as one already
+    stored (see `_deduplicate_rows_tx`) are merged into it and linked to
+    this image as well; the rest are created. Both are written with one UNWIND query per
+    chunk of ``DJINN_DB_WRITE_CHUNK_SIZE`` rows.
+
+    Returns:
+        The id of the object each row was stored as, in row order (empty if
+        the image does not exist).
+    """
+    create_query = """
+    MATCH (img:Image {id: $image_id})
+    UNWIND $rows AS row
+    CREATE (o:DetectedObject {
+        id: row.id,
+        image_id: $image_id,
+        object_class: row.object_class,
+        confidence: row.confidence,
+        bounding_box: row.bounding_box,
+        location: CASE
+            WHEN row.latitude IS NULL OR row.longitude IS NULL THEN null
+            ELSE point({latitude: row.latitude, longitude: row.longitude})
+        END,
+        track_id: row.track_id,
+        first_frame: row.first_frame,
+        last_frame: row.last_frame,
+        frame_count: row.frame_count,
+        observation_count: row.observation_count,
+        created_at: $created_at
+    })-[:DETECTED_IN]->(img)
+    RETURN count(o) AS written
+    """
+    merge_query = """
+    MATCH (img:Image {id: $image_id})
+    UNWIND $rows AS row
+    MATCH (o:DetectedObject {id: row.id})
+    SET o.location = point({latitude: row.latitude, longitude: row.longitude}),
+        o.confidence = row.confidence,
+        o.observation_count = row.observation_count,
+        o.last_seen_at = $created_at
+    MERGE (o)-[:DETECTED_IN]->(img)
+    RETURN count(o) AS written
+    """
+    row_ids = [row["id"] for row in rows]
+    updates: List[Dict[str, Any]] = []
+    merged_into: Dict[str, str] = {}
+    if deduplicate:
+        rows, updates, merged_into = await _deduplicate_rows_tx(tx, rows)
+    chunk_size = max(1, settings.DJINN_DB_WRITE_CHUNK_SIZE)
+    written = 0
+    for query, batch in ((merge_query, updates), (create_query, rows)):
+        for start in range(0, len(batch), chunk_size):
+            result = await tx.run(
+                query,
+                image_id=str(image_id),
+                rows=batch[start : start + chunk_size],
+                created_at=created_at,
+            )
+            record = await result.single()
+            written += record["written"] if record else 0
+    if not written:
+        return []
+    if updates:
+        logger.debug(
+            f"Merged {len(updates)} detections of image {image_id} into stored objects"
+        )
+    return [merged_into.get(row_id, row_id) for row_id in row_ids]
+
+
+async def create_detected_objects(
+    driver: AsyncDriver,
+    image_id: uuid.UUID,
+    objects: List[schemas.DetectedObjectCreate],
+) -> int:
+    """
+    Creates all DetectedObject nodes of an image, linked to it with
+    (:DetectedObject)-[:DETECTED_IN]->(:Image), in a single write transaction.
+    Detections of objects already stored from overlapping images are merged
+    into those objects instead.
+
+    Args:
+        driver: The asynchronous Neo4j driver instance.
+        image_id: The image the objects were detected in.
+        objects: The detected objects to store.
+
+    Returns:
+        The number of objects created or merged (0 if the image does not exist).
+
+    Raises:
+        Exception: If the database operation fails.
+    """
+    rows = _detected_object_rows(objects)
+    if not rows:
+        return 0
+    try:
+        async with driver.session() as session:
+            object_ids = await session.execute_write(
+                _create_detected_objects_tx,
+                image_id,
+                rows,
+                datetime.now(timezone.utc),
+            )
+        stored = len(set(object_ids))
+        logger.info(f"Stored {stored} detected objects for image {image_id}")
+        return stored
+    except Exception as e:
+        logger.error(
+            f"Error creating detected objects for image {image_id}: {e}", exc_info=True
+        )
+        raise e
 
 
 async def create_detected_object(
     driver: AsyncDriver, object_in: schemas.DetectedObjectCreate
 ) -> schemas.DetectedObject:
     """
-    Placeholder: Creates a DetectedObject node and links it to its source Image node.
+    Creates a single DetectedObject node and links it to its source Image node,
+    without merging it into nearby stored objects. Prefer
+    `create_detected_objects` for more than one object per image.
+
+    Raises:
+        Exception: If the image does not exist or the database operation fails.
     """
-    # TODO: Implement actual Neo4j query to create DetectedObject node
-    # and relationship (:DetectedObject)-[:DETECTED_IN]->(:Image)
-    logger.warning(
-        "Placeholder function `create_detected_object` called. Needs implementation."
+    rows = _detected_object_rows([object_in])
+    now = datetime.now(timezone.utc)
+    async with driver.session() as session:
+        object_ids = await session.execute_write(
+            _create_detected_objects_tx, object_in.image_id, rows, now, False
+        )
+    if not object_ids:
+        raise Exception(
+            f"Failed to create detected object: image {object_in.image_id} not found."
+        )
+    return schemas.DetectedObject(
+        id=uuid.UUID(rows[0]["id"]),
+        created_at=now,
+        **object_in.model_dump(),
     )
-    # Return placeholder data matching the schema
+
+
+_DETECTED_OBJECT_RETURN = """
+    RETURN o.id AS id, o.image_id AS image_id, o.object_class AS object_class,
+           o.confidence AS confidence, o.bounding_box AS bounding_box,
+           o.location.latitude AS latitude, o.location.longitude AS longitude,
+           o.track_id AS track_id, o.first_frame AS first_frame,
+           o.last_frame AS last_frame, o.frame_count AS frame_count,
+           coalesce(o.observation_count, 1) AS observation_count,
+           o.created_at AS created_at
+"""
+
+
+def _detected_object_from_record(record: Dict[str, Any]) -> schemas.DetectedObject:
+    """Builds a DetectedObject schema from a flat Neo4j record."""
+    box = record["bounding_box"]
     return schemas.DetectedObject(
-        id=uuid.uuid4(),
-        image_id=object_in.image_id,
-        object_class=object_in.object_class,
-        confidence=object_in.confidence,
-        bounding_box=object_in.bounding_box,
-        latitude=object_in.latitude,
-        longitude=object_in.longitude,
-        created_at=datetime.now(timezone.utc),
+        id=uuid.UUID(record["id"]),
+        image_id=uuid.UUID(record["image_id"]),
+        object_class=record["object_class"],
+        confidence=record["confidence"],
+        # Stored flattened as [x1, y1, x2, y2, ...]
+        bounding_box=list(zip(box[0::2], box[1::2])) if box else None,
+        latitude=record["latitude"],
+        longitude=record["longitude"],
+        track_id=record["track_id"],
+        first_frame=record["first_frame"],
+        last_frame=record["last_frame"],
+        frame_count=record["frame_count"],
+        observation_count=record["observation_count"],
+        created_at=_native(record["created_at"]),
     )
 
 
@@ -116,14 +531,562 @@ async def get_detected_objects_for_image(
     driver: AsyncDriver, image_id: uuid.UUID
 ) -> List[schemas.DetectedObject]:
     """
-    Placeholder: Retrieves all DetectedObject nodes linked to a specific Image node.
+    Retrieves all DetectedObject nodes linked to a specific Image node in a
+    single query, highest confidence first.
+    """
+    query = (
+        "MATCH (o:DetectedObject)-[:DETECTED_IN]->(img:Image {id: $image_id})"
+        + _DETECTED_OBJECT_RETURN
+        + "ORDER BY o.confidence DESC"
+    )
+
+    async def work(tx: AsyncManagedTransaction) -> List[Dict[str, Any]]:
+        result = await tx.run(query, image_id=str(image_id))
+        return await result.data()
+
+    try:
+        async with driver.session() as session:
+            records = await session.execute_read(work)
+    except Exception as e:
+        logger.error(
+            f"Error retrieving detected objects for image {image_id}: {e}",
+            exc_info=True,
+        )
+        raise e
+
+    return [_detected_object_from_record(record) for record in records]
+
+
+async def get_detected_objects_by_ids(
+    driver: AsyncDriver, object_ids: List[str]
+) -> List[schemas.DetectedObject]:
+    """
+    Retrieves the DetectedObject nodes with the given IDs. Missing IDs are
+    skipped; the order of the result is unspecified.
+    """
+    if not object_ids:
+        return []
+    query = "MATCH (o:DetectedObject) WHERE o.id IN $ids" + _DETECTED_OBJECT_RETURN
+
+    async def work(tx: AsyncManagedTransaction) -> List[Dict[str, Any]]:
+        result = await tx.run(query, ids=[str(i) for i in object_ids])
+        return await result.data()
+
+    try:
+        async with driver.session() as session:
+            records = await session.execute_read(work)
+    except Exception as e:
+        logger.error(f"Error retrieving detected objects by ID: {e}", exc_info=True)
+        raise e
+
+    return [_detected_object_from_record(record) for record in records]
+
+
+def encode_detection_cursor(created_at: datetime, object_id: uuid.UUID) -> str:
+    """Opaque keyset cursor pointing just past the given detection."""
+    payload = json.dumps([created_at.isoformat(), str(object_id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_detection_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Inverse of `encode_detection_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        created_at, object_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(uuid.UUID(object_id))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+async def query_detected_objects(
+    driver: AsyncDriver,
+    south: float,
+    west: float,
+    north: float,
+    east: float,
+    classes: Optional[List[str]] = None,
+    min_confidence: float = 0.0,
+    since: Optional[datetime] = None,
+    limit: int = 500,
+    cursor: Optional[str] = None,
+) -> Tuple[List[schemas.DetectedObject], Optional[str]]:
+    """
+    Retrieves detected objects inside a bounding box, newest first.
+
+    The bounding box is matched through the ``detected_object_location``
+    point index, and pages are keyset-paginated on (created_at, id), so
+    later pages cost the same as the first one.
+
+    Args:
+        driver: The asynchronous Neo4j driver instance.
+        south, west, north, east: The bounding box in degrees.
+        classes: Only return these object classes.
+        min_confidence: Only return objects at or above this confidence.
+        since: Only return objects detected at or after this time.
+        limit: Maximum number of objects to return.
+        cursor: ``next_cursor`` of the previous page.
+
+    Returns:
+        A tuple of (objects, cursor of the next page or None on the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+        Exception: If the database operation fails.
+    """
+    conditions = [
+        "point.withinBBox(o.location, "
+        "point({latitude: $south, longitude: $west}), "
+        "point({latitude: $north, longitude: $east}))"
+    ]
+    parameters: Dict[str, Any] = {
+        "south": south,
+        "west": west,
+        "north": north,
+        "east": east,
+        # One extra row tells whether there is a next page
+        "limit": limit + 1,
+    }
+    if classes:
+        conditions.append("o.object_class IN $classes")
+        parameters["classes"] = classes
+    if min_confidence > 0:
+        conditions.append("o.confidence >= $min_confidence")
+        parameters["min_confidence"] = min_confidence
+    if since is not None:
+        conditions.append("o.created_at >= $since")
+        parameters["since"] = since
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_detection_cursor(cursor)
+        conditions.append(
+            "(o.created_at < $cursor_created_at OR "
+            "(o.created_at = $cursor_created_at AND o.id < $cursor_id))"
+        )
+        parameters["cursor_created_at"] = cursor_created_at
+        parameters["cursor_id"] = cursor_id
+
+    query = (
+        "MATCH (o:DetectedObject) WHERE "
+        + " AND ".join(conditions)
+        + _DETECTED_OBJECT_RETURN
+        + "ORDER BY o.created_at DESC, o.id DESC LIMIT $limit"
+    )
+
+    async def work(tx: AsyncManagedTransaction) -> List[Dict[str, Any]]:
+        result = await tx.run(query, parameters)
+        return await result.data()
+
+    try:
+        async with driver.session() as session:
+            records = await session.execute_read(work)
+    except Exception as e:
+        logger.error(f"Error querying detected objects: {e}", exc_info=True)
+        raise e
+
+    objects = [_detected_object_from_record(record) for record in records[:limit]]
+    next_cursor = None
+    if len(records) > limit:
+        last = objects[-1]
+        next_cursor = encode_detection_cursor(last.created_at, last.id)
+    return objects, next_cursor
+
+
+# --- Schema Setup ---
+
+
+async def ensure_indexes(driver: AsyncDriver) -> None:
+    """
+    Creates the uniqueness constraints and indexes the Djinn queries rely on
+    (idempotent). Without them every ``MATCH (img:Image {id: ...})`` in a
+    bulk write or read scans all Image nodes.
+    """
+    statements = [
+        "CREATE CONSTRAINT image_id IF NOT EXISTS "
+        "FOR (img:Image) REQUIRE img.id IS UNIQUE",
+        "CREATE CONSTRAINT detected_object_id IF NOT EXISTS "
+        "FOR (o:DetectedObject) REQUIRE o.id IS UNIQUE",
+        "CREATE CONSTRAINT detection_job_id IF NOT EXISTS "
+        "FOR (j:DetectionJob) REQUIRE j.id IS UNIQUE",
+        "CREATE INDEX detection_job_status IF NOT EXISTS "
+        "FOR (j:DetectionJob) ON (j.status)",
+        # Viewport queries (point.withinBBox) and the `since` filter
+        "CREATE POINT INDEX detected_object_location IF NOT EXISTS "
+        "FOR (o:DetectedObject) ON (o.location)",
+        "CREATE INDEX detected_object_created_at IF NOT EXISTS "
+        "FOR (o:DetectedObject) ON (o.created_at)",
+    ]
+    async with driver.session() as session:
+        for statement in statements:
+            result = await session.run(statement)
+            await result.consume()
+    logger.info("Djinn Neo4j constraints and indexes are in place.")
+
+
+# --- Detection Job CRUD Operations ---
+
+
+class DetectionJobClaimLost(Exception):
+    """
+    Raised when a running job was taken over (re-queued as stale and claimed
+    again), so this attempt must not write its results.
+    """
+
+
+_JOB_RETURN = """
+    RETURN j.id AS id, j.image_id AS image_id, j.status AS status,
+           j.progress AS progress, j.attempts AS attempts,
+           j.detections_count AS detections_count, j.error AS error,
+           j.created_at AS created_at, j.updated_at AS updated_at,
+           j.started_at AS started_at, j.finished_at AS finished_at
+"""
+
+
+def _job_from_record(record: Dict[str, Any]) -> schemas.DetectionJob:
+    """Builds a DetectionJob schema from a flat Neo4j record."""
+    data = {key: _native(value) for key, value in record.items()}
+    data["id"] = uuid.UUID(data["id"])
+    data["image_id"] = uuid.UUID(data["image_id"])
+    return schemas.DetectionJob(**data)
+
+
+async def create_detection_job(
+    driver: AsyncDriver, image_id: uuid.UUID, spool_path: str
+) -> schemas.DetectionJob:
+    """
+    Creates a queued DetectionJob node linked to its Image node.
+
+    Args:
+        driver: The asynchronous Neo4j driver instance.
+        image_id: The image to run detection on.
+        spool_path: Local path of the uploaded image bytes awaiting detection.
+
+    Returns:
+        The created DetectionJob.
+
+    Raises:
+        Exception: If the image does not exist or the database operation fails.
+    """
+    now = datetime.now(timezone.utc)
+    query = """
+    MATCH (img:Image {id: $image_id})
+    CREATE (j:DetectionJob {
+        id: $id,
+        image_id: $image_id,
+        status: $status,
+        progress: 0.0,
+        attempts: 0,
+        spool_path: $spool_path,
+        created_at: $now,
+        updated_at: $now
+    })-[:FOR_IMAGE]->(img)
+    """ + _JOB_RETURN
+    parameters = {
+        "id": str(uuid.uuid4()),
+        "image_id": str(image_id),
+        "status": schemas.DetectionJobStatus.QUEUED.value,
+        "spool_path": spool_path,
+        "now": now,
+    }
+
+    async def work(tx: AsyncManagedTransaction) -> Optional[Dict[str, Any]]:
+        result = await tx.run(query, parameters)
+        record = await result.single()
+        return dict(record) if record else None
+
+    try:
+        async with driver.session() as session:
+            record = await session.execute_write(work)
+    except Exception as e:
+        logger.error(
+            f"Error creating detection job for image {image_id}: {e}", exc_info=True
+        )
+        raise e
+
+    if record is None:
+        raise Exception(f"Failed to create detection job: image {image_id} not found.")
+    job = _job_from_record(record)
+    logger.info(f"Queued detection job {job.id} for image {image_id}")
+    return job
+
+
+async def get_detection_job(
+    driver: AsyncDriver, job_id: uuid.UUID
+) -> Optional[schemas.DetectionJob]:
+    """Retrieves a DetectionJob by ID, or None if it does not exist."""
+    query = "MATCH (j:DetectionJob {id: $id})" + _JOB_RETURN
+
+    async def work(tx: AsyncManagedTransaction) -> Optional[Dict[str, Any]]:
+        result = await tx.run(query, id=str(job_id))
+        record = await result.single()
+        return dict(record) if record else None
+
+    async with driver.session() as session:
+        record = await session.execute_read(work)
+    return _job_from_record(record) if record else None
+
+
+async def get_detection_jobs_for_image(
+    driver: AsyncDriver, image_id: uuid.UUID
+) -> List[schemas.DetectionJob]:
+    """Retrieves all DetectionJobs of an image, newest first."""
+    query = (
+        "MATCH (j:DetectionJob {image_id: $image_id})"
+        + _JOB_RETURN
+        + "ORDER BY j.created_at DESC"
+    )
+
+    async def work(tx: AsyncManagedTransaction) -> List[Dict[str, Any]]:
+        result = await tx.run(query, image_id=str(image_id))
+        return await result.data()
+
+    async with driver.session() as session:
+        records = await session.execute_read(work)
+    return [_job_from_record(record) for record in records]
+
+
+async def claim_detection_job(
+    driver: AsyncDriver, job_id: uuid.UUID
+) -> Optional[Tuple[schemas.DetectionJob, str, Optional[TilingOptions]]]:
+    """
+    Atomically moves a queued job to running and starts a new attempt.
+
+    Several server processes may hold the same job ID in their queues (every
+    process re-queues pending jobs on startup), so only the first claim wins.
+    The attempt gets a new claim token; its progress, results and failure
+    are only written while the job still carries it.
+
+    Returns:
+        A tuple of (job, spool path, the image's tiling options, claim token),
+        or None if the job is gone or already claimed.
+    """
+    now = datetime.now(timezone.utc)
+    query = (
+        """
+    MATCH (j:DetectionJob {id: $id})-[:FOR_IMAGE]->(img:Image)
+    WHERE j.status = $queued
+    SET j.status = $running, j.attempts = j.attempts + 1, j.progress = 0.0,
+        j.claim = $claim, j.error = null, j.started_at = $now, j.updated_at = $now
     """
-    # TODO: Implement actual Neo4j query to find objects linked to the image_id
-    logger.warning(
-        f"Placeholder function `get_detected_objects_for_image` called for image {image_id}. Needs implementation."
+        + _JOB_RETURN
+        + """,
+           j.spool_path AS spool_path, j.claim AS claim, img.tile_size AS tile_size,
+           img.tile_overlap AS tile_overlap, img.tile_merge_iou AS tile_merge_iou
+    """
+    )
+    parameters = {
+        "id": str(job_id),
+        "queued": schemas.DetectionJobStatus.QUEUED.value,
+        "running": schemas.DetectionJobStatus.RUNNING.value,
+        "claim": str(uuid.uuid4()),
+        "now": now,
+    }
+
+    async def work(tx: AsyncManagedTransaction) -> Optional[Dict[str, Any]]:
+        result = await tx.run(query, parameters)
+        record = await result.single()
+        return dict(record) if record else None
+
+    async with driver.session() as session:
+        record = await session.execute_write(work)
+    if record is None:
+        return None
+
+    spool_path = record.pop("spool_path")
+    claim = record.pop("claim")
+    tile_size = record.pop("tile_size")
+    tile_overlap = record.pop("tile_overlap")
+    tile_merge_iou = record.pop("tile_merge_iou")
+    tiling = (
+        TilingOptions(
+            tile_size=tile_size, overlap=tile_overlap, merge_iou=tile_merge_iou
+        )
+        if tile_size is not None
+        else None
     )
-    # Return empty list or placeholder data
-    return []
+    return _job_from_record(record), spool_path, tiling, claim
+
+
+# Start of every query that writes for a running attempt. The SET locks the
+# job first (touching only an owned one), so the claim check cannot
+# interleave with a new claim.
+_OWNED_JOB = """
+    MATCH (j:DetectionJob {id: $id})
+    SET j.updated_at = CASE WHEN j.claim = $claim THEN $now ELSE j.updated_at END
+    WITH j
+    WHERE j.status = $running AND j.claim = $claim
+"""
+
+
+def _owned_job_parameters(job_id: uuid.UUID, claim: str) -> Dict[str, Any]:
+    return {
+        "id": str(job_id),
+        "claim": claim,
+        "running": schemas.DetectionJobStatus.RUNNING.value,
+        "now": datetime.now(timezone.utc),
+    }
+
+
+async def update_detection_job_progress(
+    driver: AsyncDriver,
+    job_id: uuid.UUID,
+    claim: str,
+    progress: Optional[float] = None,
+) -> bool:
+    """
+    Records the progress of a running job. Also serves as its heartbeat
+    (``progress`` None only refreshes ``updated_at``), so
+    `requeue_pending_detection_jobs` does not take it for a dead one.
+
+    Returns:
+        Whether the attempt still owns the job.
+    """
+    query = _OWNED_JOB + """
+    SET j.progress = coalesce($progress, j.progress)
+    RETURN count(j) AS owned
+    """
+
+    async def work(tx: AsyncManagedTransaction) -> bool:
+        result = await tx.run(
+            query,
+            _owned_job_parameters(job_id, claim),
+            progress=None if progress is None else min(max(progress, 0.0), 1.0),
+        )
+        return (await result.single())["owned"] > 0
+
+    async with driver.session() as session:
+        return await session.execute_write(work)
+
+
+async def complete_detection_job(
+    driver: AsyncDriver,
+    job_id: uuid.UUID,
+    claim: str,
+    image_id: uuid.UUID,
+    objects: List[schemas.DetectedObjectCreate],
+) -> List[str]:
+    """
+    Stores a job's detected objects and marks it completed, in one transaction,
+    so a retried job can never leave duplicate objects behind. The job is
+    locked and its claim checked before anything is written.
+
+    Returns:
+        The id of the DetectedObject each of ``objects`` was stored as (several
+        objects can share one when they were merged).
+
+    Raises:
+        DetectionJobClaimLost: If the job is no longer claimed by ``claim``;
+                               nothing is written.
+    """
+    rows = _detected_object_rows(objects)
+    own_query = _OWNED_JOB + "RETURN count(j) AS owned"
+    complete_query = _OWNED_JOB + """
+    SET j.status = $completed, j.progress = 1.0, j.detections_count = $count,
+        j.claim = null, j.spool_path = null, j.finished_at = $now
+    """
+
+    async def work(tx: AsyncManagedTransaction) -> List[str]:
+        parameters = _owned_job_parameters(job_id, claim)
+        result = await tx.run(own_query, parameters)
+        if not (await result.single())["owned"]:
+            # Raised inside the transaction, so it is rolled back
+            raise DetectionJobClaimLost(
+                f"Detection job {job_id} was claimed by another attempt"
+            )
+        object_ids = (
+            await _create_detected_objects_tx(tx, image_id, rows, parameters["now"])
+            if rows
+            else []
+        )
+        await tx.run(
+            complete_query,
+            parameters,
+            completed=schemas.DetectionJobStatus.COMPLETED.value,
+            count=len(set(object_ids)),
+        )
+        return object_ids
+
+    async with driver.session() as session:
+        return await session.execute_write(work)
+
+
+async def fail_detection_job(
+    driver: AsyncDriver, job_id: uuid.UUID, claim: str, error: str, retry: bool
+) -> bool:
+    """
+    Records a failed attempt; the job is re-queued if ``retry`` is set.
+
+    Returns:
+        Whether it was recorded; False if the job is no longer claimed by
+        ``claim`` (another attempt owns it, or it already finished).
+    """
+    query = _OWNED_JOB + """
+    SET j.status = $status, j.error = $error, j.claim = null,
+        j.finished_at = CASE WHEN $retry THEN null ELSE $now END
+    RETURN count(j) AS owned
+    """
+    status = (
+        schemas.DetectionJobStatus.QUEUED
+        if retry
+        else schemas.DetectionJobStatus.FAILED
+    )
+
+    async def work(tx: AsyncManagedTransaction) -> bool:
+        result = await tx.run(
+            query,
+            _owned_job_parameters(job_id, claim),
+            status=status.value,
+            error=error,
+            retry=retry,
+        )
+        return (await result.single())["owned"] > 0
+
+    async with driver.session() as session:
+        return await session.execute_write(work)
+
+
+async def requeue_pending_detection_jobs(
+    driver: AsyncDriver, stale_before: datetime
+) -> List[uuid.UUID]:
+    """
+    Returns queued jobs (oldest first) after resetting running jobs without
+    a heartbeat since ``stale_before``, whose process must have died. The
+    old attempt's claim is revoked.
+    """
+    reset_query = """
+    MATCH (j:DetectionJob)
+    WHERE j.status = $running AND j.updated_at < $stale_before
+    SET j.status = $queued, j.claim = null, j.updated_at = $now
+    RETURN count(j) AS reset
+    """
+    pending_query = """
+    MATCH (j:DetectionJob)
+    WHERE j.status = $queued
+    RETURN j.id AS id
+    ORDER BY j.created_at
+    """
+    running = schemas.DetectionJobStatus.RUNNING.value
+    queued = schemas.DetectionJobStatus.QUEUED.value
+
+    async def work(tx: AsyncManagedTransaction) -> Tuple[int, List[str]]:
+        result = await tx.run(
+            reset_query,
+            running=running,
+            queued=queued,
+            stale_before=stale_before,
+            now=datetime.now(timezone.utc),
+        )
+        reset = (await result.single())["reset"]
+        result = await tx.run(pending_query, queued=queued)
+        return reset, [record["id"] for record in await result.data()]
+
+    async with driver.session() as session:
+        reset, job_ids = await session.execute_write(work)
+    if reset:
+        logger.warning(f"Re-queued {reset} stale running detection jobs")
+    return [uuid.UUID(job_id) for job_id in job_ids]
 
 
 # TODO: Add functions to get Image by ID, update, delete etc. if needed.
@@ -0,0 +1,394 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List, Optional, Set
+
+import numpy as np
+from fastapi import UploadFile
+from neo4j import AsyncDriver
+
+from ..core.config import settings
+from ..schemas.djinn import TilingOptions
+from ..services.djinn.inference import detection
+from ..services.djinn.inference.batching import detection_batcher
+from ..services.djinn.inference.embeddings import (
+    detection_embedding_index,
+    embed_detections,
+)
+from ..services.djinn.inference.executor import (
+    InferenceQueueFull,
+    inference_executor,
+)
+from ..services.djinn.inference.results import DetectionBatch
+from ..services.djinn.inference.tiling import run_tiled_detection_on_source
+from ..services.djinn.utils.raster import RasterSource, open_raster
+from . import crud, schemas
+
+logger = logging.getLogger(__name__)
+
+# Wait before retrying work the inference pool rejected as full
+BUSY_RETRY_SECONDS = 1.0
+# Minimum time between progress writes for a running job
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+
+def _remove_file(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove spooled upload {path}: {e}")
+
+
+class DetectionJobQueue:
+    """
+    In-process queue that runs object detection on uploaded images.
+
+    Jobs are persisted as ``(:DetectionJob)-[:FOR_IMAGE]->(:Image)`` nodes and
+    the uploaded bytes are spooled to ``spool_dir``, so uploads return as soon
+    as the job is stored. A fixed number of worker tasks take job IDs off the
+    queue; detection itself runs on the shared inference executor (tiled
+    images) or batcher (everything else), so throughput follows the worker
+    count, not the number of concurrent uploads.
+
+    On startup, queued jobs and running jobs whose process died are picked up
+    again. Workers claim a job atomically before running it, so several server
+    processes can share one database without running a job twice. Running
+    jobs send a heartbeat every quarter of ``stale_seconds`` (also while
+    waiting for the inference pool), and their writes only apply while they
+    still hold their claim, so a slow job is neither re-queued nor able to
+    store its objects next to those of the attempt that replaced it.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        spool_dir: str,
+        max_attempts: int,
+        stale_seconds: float,
+    ):
+        self.worker_count = max(1, workers)
+        self.spool_dir = spool_dir
+        self.max_attempts = max(1, max_attempts)
+        self.stale_seconds = stale_seconds
+        self._driver: Optional[AsyncDriver] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Set[uuid.UUID] = set()
+
+    def stats(self) -> schemas.DetectionJobQueueStats:
+        """Worker and queue counts of this process."""
+        return schemas.DetectionJobQueueStats(
+            workers=len(self._workers),
+            queued=self._queue.qsize() if self._queue is not None else 0,
+            running=len(self._running),
+        )
+
+    async def spool_upload(self, upload: UploadFile) -> str:
+        """
+        Streams an uploaded file into the spool directory.
+
+        Returns:
+            The path of the spooled file.
+        """
+        extension = os.path.splitext(upload.filename or "")[1].lower()
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4()}{extension}")
+
+        def write() -> None:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            upload.file.seek(0)
+            with open(path, "wb") as f:
+                shutil.copyfileobj(upload.file, f, length=1024 * 1024)
+
+        await asyncio.to_thread(write)
+        return path
+
+    async def start(self, driver: AsyncDriver) -> None:
+        """Starts the workers and re-queues jobs left over from earlier runs."""
+        self._driver = driver
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"djinn-job-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+
+        stale_before = datetime.now(timezone.utc) - timedelta(
+            seconds=self.stale_seconds
+        )
+        try:
+            pending = await crud.requeue_pending_detection_jobs(driver, stale_before)
+        except Exception as e:
+            logger.error(f"Could not load pending detection jobs: {e}", exc_info=True)
+            pending = []
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        logger.info(
+            f"Detection job queue started (workers={self.worker_count}, "
+            f"pending={len(pending)})"
+        )
+
+    def enqueue(self, job_id: uuid.UUID) -> None:
+        """Hands a stored job to the workers."""
+        if self._queue is None:
+            # Not started (e.g. no lifespan); the job runs after the next start
+            logger.warning(f"Detection job queue not running; job {job_id} deferred")
+            return
+        self._queue.put_nowait(job_id)
+
+    async def stop(self) -> None:
+        """Cancels the workers. Interrupted jobs are put back in the queue."""
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        logger.info("Detection job queue stopped.")
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # _process records failures itself; this only guards the worker
+                logger.error(f"Detection job {job_id} crashed: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: uuid.UUID) -> None:
+        driver = self._driver
+        claimed = await crud.claim_detection_job(driver, job_id)
+        if claimed is None:
+            logger.debug(f"Detection job {job_id} already claimed or gone, skipping")
+            return
+        job, spool_path, tiling, claim = claimed
+        logger.info(
+            f"Running detection job {job_id} for image {job.image_id} "
+            f"(attempt {job.attempts}/{self.max_attempts})"
+        )
+
+        self._running.add(job_id)
+        start = time.perf_counter()
+        last_report = 0.0
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, claim))
+
+        async def report(progress: float) -> None:
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report < PROGRESS_INTERVAL_SECONDS:
+                return
+            last_report = now
+            try:
+                await crud.update_detection_job_progress(
+                    driver, job_id, claim, progress
+                )
+            except Exception as e:
+                logger.warning(f"Could not update progress of job {job_id}: {e}")
+
+        source: Optional[RasterSource] = None
+        try:
+            # Large rasters are opened lazily and read window by window
+            source = await self._run_when_free(
+                inference_executor.run, open_raster, spool_path
+            )
+            await report(0.1)
+
+            detections = (await self._detect(source, tiling, report)).filter()
+            objects = self._to_objects(job.image_id, detections, source)
+            embeddings = await self._embed(source, detections)
+            object_ids = await crud.complete_detection_job(
+                driver, job_id, claim, job.image_id, objects
+            )
+        except asyncio.CancelledError:
+            await self._record_failure(
+                job, claim, "Interrupted by server shutdown.", True
+            )
+            raise
+        except crud.DetectionJobClaimLost as e:
+            # Another attempt owns the job (and its spooled file) now
+            logger.warning(f"Dropping results of detection job {job_id}: {e}")
+            return
+        except Exception as e:
+            retry = job.attempts < self.max_attempts
+            logger.error(
+                f"Detection job {job_id} failed (attempt {job.attempts}): {e}",
+                exc_info=True,
+            )
+            if await self._record_failure(
+                job, claim, str(e) or type(e).__name__, retry
+            ):
+                if retry:
+                    self._queue.put_nowait(job_id)
+                else:
+                    _remove_file(spool_path)
+            return
+        finally:
+            heartbeat.cancel()
+            if source is not None:
+                source.close()
+            self._running.discard(job_id)
+
+        _remove_file(spool_path)
+        await self._index_embeddings(object_ids, embeddings)
+        logger.info(
+            f"Detection job {job_id} completed: {len(set(object_ids))} objects in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+    async def _heartbeat(self, job_id: uuid.UUID, claim: str) -> None:
+        """Keeps a running job from being re-queued as stale."""
+        interval = max(1.0, self.stale_seconds / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await crud.update_detection_job_progress(
+                    self._driver, job_id, claim
+                ):
+                    logger.warning(
+                        f"Detection job {job_id} lost its claim while running"
+                    )
+                    return
+            except Exception as e:
+                logger.warning(f"Could not refresh detection job {job_id}: {e}")
+
+    async def _record_failure(
+        self, job: schemas.DetectionJob, claim: str, error: str, retry: bool
+    ) -> bool:
+        """Records a failed attempt; returns whether the attempt still owned it."""
+        try:
+            recorded = await crud.fail_detection_job(
+                self._driver, job.id, claim, error, retry
+            )
+        except Exception as e:
+            logger.error(f"Could not record failure of job {job.id}: {e}")
+            return False
+        if not recorded:
+            logger.warning(
+                f"Failure of job {job.id} not recorded: claimed by another attempt"
+            )
+        return recorded
+
+    async def _run_when_free(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Awaits ``fn(*args)``, waiting out a full inference pool."""
+        while True:
+            try:
+                return await fn(*args)
+            except InferenceQueueFull:
+                await asyncio.sleep(BUSY_RETRY_SECONDS)
+
+    async def _detect(
+        self,
+        source: RasterSource,
+        tiling: Optional[TilingOptions],
+        report: Callable[[float], Any],
+    ) -> DetectionBatch:
+        if detection.model is None:
+            # Would yield empty results; fail so the job is retried instead
+            raise RuntimeError("Detection model is not loaded.")
+        if tiling is None:
+            if source.width * source.height <= settings.DJINN_RASTER_AUTO_TILE_PIXELS:
+                image_np = await self._run_when_free(
+                    inference_executor.run,
+                    source.read_window,
+                    0,
+                    0,
+                    source.width,
+                    source.height,
+                )
+                return await self._run_when_free(detection_batcher.submit, image_np)
+            # Too large to decode and downscale in one piece
+            tiling = TilingOptions(tile_size=settings.DJINN_RASTER_AUTO_TILE_SIZE)
+
+        async def on_progress(done: int, total: int) -> None:
+            await report(0.1 + 0.8 * done / total)
+
+        # Waits per batch, so a busy pool never restarts the whole run
+        return await run_tiled_detection_on_source(
+            source,
+            tiling.tile_size,
+            tiling.overlap,
+            tiling.merge_iou,
+            inference_executor,
+            on_progress,
+            busy_retry_seconds=BUSY_RETRY_SECONDS,
+        )
+
+    async def _embed(
+        self, source: RasterSource, detections: DetectionBatch
+    ) -> Optional[np.ndarray]:
+        """Appearance embeddings of the detections, computed in one batch."""
+        if detection_embedding_index is None or not len(detections):
+            return None
+        try:
+            return await self._run_when_free(
+                inference_executor.run, embed_detections, source, detections.boxes
+            )
+        except Exception as e:
+            # Similarity search is an extra; it must not fail the job
+            logger.warning(f"Could not embed detections: {e}", exc_info=True)
+            return None
+
+    @staticmethod
+    async def _index_embeddings(
+        object_ids: List[str], embeddings: Optional[np.ndarray]
+    ) -> None:
+        if embeddings is None or not object_ids:
+            return
+        # Detections merged into one object share its id; the first one is kept
+        first = {}
+        for row, object_id in enumerate(object_ids):
+            first.setdefault(object_id, row)
+        try:
+            await asyncio.to_thread(
+                detection_embedding_index.add,
+                list(first),
+                embeddings[list(first.values())],
+            )
+        except Exception as e:
+            logger.warning(f"Could not index detection embeddings: {e}", exc_info=True)
+
+    @staticmethod
+    def _to_objects(
+        image_id: uuid.UUID, detections: DetectionBatch, source: RasterSource
+    ) -> List[schemas.DetectedObjectCreate]:
+        centers = detections.centers()
+        # Georeferenced rasters (GeoTIFF tags) place every object on the map
+        geo = source.pixel_to_geo(centers[:, 0], centers[:, 1])
+        lats, lngs = (
+            (geo[0].tolist(), geo[1].tolist())
+            if geo is not None
+            else ([None] * len(detections), [None] * len(detections))
+        )
+        return [
+            schemas.DetectedObjectCreate(
+                image_id=image_id,
+                object_class=class_name,
+                confidence=confidence,
+                bounding_box=[(x1, y1), (x2, y2)],
+                latitude=lat,
+                longitude=lng,
+            )
+            for class_name, confidence, (x1, y1, x2, y2), lat, lng in zip(
+                detections.class_names(),
+                detections.confidences.tolist(),
+                detections.boxes.tolist(),
+                lats,
+                lngs,
+            )
+        ]
+
+
+# Shared job queue, started and stopped with the application lifespan
+detection_job_queue = DetectionJobQueue(
+    workers=settings.DJINN_JOB_WORKERS,
+    spool_dir=settings.DJINN_JOB_SPOOL_DIR,
+    max_attempts=settings.DJINN_JOB_MAX_ATTEMPTS,
+    stale_seconds=settings.DJINN_JOB_STALE_SECONDS,
+)
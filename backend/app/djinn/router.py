@@ -1,8 +1,19 @@
+import asyncio
 import logging
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    UploadFile,
+    status,
+)
 from neo4j import AsyncDriver  # For type hinting
 
 from ..auth.schemas import User
@@ -10,13 +21,16 @@ from ..auth.security import get_current_active_user
 
 # Adjust imports based on actual project structure
 from ..db.session import get_driver
+from ..schemas.djinn import TilingOptions
+from ..services.djinn.inference.embeddings import detection_embedding_index
+from ..services.djinn.utils.image_processing import parse_bounds, split_classes
 from . import (
     crud,  # TODO: Import CRUD functions when created
     schemas,  # Import schemas from the current djinn module
 )
+from .jobs import _remove_file, detection_job_queue
 
 # from ..core.storage import upload_to_storage # TODO: Import storage utility when created
-# from .processing import run_object_detection # TODO: Import detection logic when created
 
 logger = logging.getLogger(__name__)
 
@@ -28,34 +42,66 @@ router = APIRouter(
 
 
 @router.post(
-    "/images/upload", response_model=schemas.Image, status_code=status.HTTP_201_CREATED
+    "/images/upload",
+    response_model=schemas.ImageUploadResponse,
+    status_code=status.HTTP_202_ACCEPTED,
 )
 async def upload_image(
     file: UploadFile = File(..., description="The image file to upload"),
     description: Optional[str] = Form(
         None, description="Optional description for the image"
     ),
+    tile_size: Optional[int] = Form(
+        None,
+        description=(
+            "Enable tiled detection with this tile edge length in pixels "
+            "(for large imagery)"
+        ),
+    ),
+    tile_overlap: float = Form(
+        0.2, description="Fraction of each tile shared with its neighbours"
+    ),
+    tile_merge_iou: float = Form(
+        0.5, description="IoU threshold for merging detections across tiles"
+    ),
     # TODO: Add optional Form fields for source location (lat, lon) if available during upload
     db_driver: AsyncDriver = Depends(get_driver),
     current_user: User = Depends(get_current_active_user),
 ):
     """
     Uploads an image, stores it in object storage, creates metadata entry
-    in the graph database. Object detection will be triggered asynchronously
-    or in a subsequent step (TBD).
+    in the graph database and queues object detection as a background job.
+
+    Returns immediately with the image and its queued job; poll
+    `GET /djinn/jobs/{job_id}` for status and progress.
     """
     logger.info(
         f"Received image upload request: {file.filename} by user {current_user.email}"
     )
 
-    # --- 1. Store file in Object Storage (MinIO) ---
+    tiling: Optional[TilingOptions] = None
+    if tile_size is not None:
+        try:
+            tiling = TilingOptions(
+                tile_size=tile_size, overlap=tile_overlap, merge_iou=tile_merge_iou
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid tiling options: {e}",
+            )
+
+    # --- 1. Store file in Object Storage (MinIO) and the detection spool ---
     storage_uri = None
+    spool_path = None
     try:
         # TODO: Implement file upload logic using a storage utility
         # storage_uri = await upload_to_storage(file, bucket_name="djinn-images")
         # For now, using a placeholder
         storage_uri = f"minio:djinn-images/{uuid.uuid4()}_{file.filename}"
         logger.debug(f"Placeholder storage URI generated: {storage_uri}")
+        # The detection job reads the image from the local spool
+        spool_path = await detection_job_queue.spool_upload(file)
     except Exception as e:
         logger.error(
             f"Failed to upload image {file.filename} to storage: {e}", exc_info=True
@@ -70,48 +116,43 @@ async def upload_image(
         filename=file.filename,
         content_type=file.content_type,
         description=description,
+        tiling=tiling,
         # TODO: Add source_location if provided in request
     )
 
+    created_image = None
     try:
-        # TODO: Implement Neo4j image creation logic using CRUD functions
-        # created_image = await crud.create_image(driver=db_driver, image_in=image_data, storage_uri=storage_uri)
-
-        # Placeholder response until CRUD is implemented
-        from datetime import datetime, timezone
-
-        created_image = schemas.Image(
-            id=uuid.uuid4(),
-            filename=image_data.filename,
-            content_type=image_data.content_type,
-            description=image_data.description,
-            storage_uri=storage_uri,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
+        created_image = await crud.create_image(
+            driver=db_driver, image_in=image_data, storage_uri=storage_uri
         )
-        logger.info(f"Image metadata placeholder created for: {created_image.filename}")
+        logger.info(f"Image metadata created for: {created_image.filename}")
 
-        # --- 3. Trigger Object Detection (Placeholder/Future) ---
-        # In a real system, this might be an async task queue (Celery, RQ)
-        # or a direct call if processing time is acceptable for the request.
-        # For MVP, detection might happen on retrieval or a separate endpoint.
-        # await run_object_detection(image_id=created_image.id, storage_uri=storage_uri)
-        logger.info(
-            f"Object detection trigger placeholder for image ID: {created_image.id}"
+        # --- 3. Queue Object Detection ---
+        job = await crud.create_detection_job(
+            driver=db_driver, image_id=created_image.id, spool_path=spool_path
         )
-
-        return created_image
-
     except Exception as e:
         logger.error(
             f"Failed to create image metadata for {file.filename}: {e}", exc_info=True
         )
+        # An image without a job would never get its detections
+        if created_image is not None:
+            try:
+                await crud.delete_image(driver=db_driver, image_id=created_image.id)
+            except Exception as cleanup_error:
+                logger.error(
+                    f"Could not delete image {created_image.id}: {cleanup_error}"
+                )
         # TODO: Add cleanup logic (delete from storage)
+        _remove_file(spool_path)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Could not create image metadata in database.",
         )
 
+    detection_job_queue.enqueue(job.id)
+    return schemas.ImageUploadResponse(image=created_image, job=job)
+
 
 @router.get(
     "/images/{image_id}/detections", response_model=List[schemas.DetectedObject]
@@ -152,7 +193,217 @@ async def get_image_detections(  # Correctly indented function definition
         )
 
 
-# TODO: Implement object detection logic (processing.py)
+@router.get("/detections", response_model=schemas.DetectedObjectPage)
+async def query_detections(
+    bbox: str = Query(
+        ...,
+        description=(
+            "Viewport as 'south,west,north,east' degrees or Leaflet bounds JSON"
+        ),
+    ),
+    classes: Optional[List[str]] = Query(
+        None, description="Only these object classes (repeated or comma-separated)"
+    ),
+    min_conf: float = Query(0.0, ge=0.0, le=1.0, description="Minimum confidence"),
+    since: Optional[datetime] = Query(
+        None, description="Only objects detected at or after this time (ISO 8601)"
+    ),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum objects per page"),
+    cursor: Optional[str] = Query(
+        None, description="`next_cursor` from the previous page"
+    ),
+    db_driver: AsyncDriver = Depends(get_driver),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Retrieves the detected objects inside a map viewport, newest first,
+    one page at a time.
+    """
+    try:
+        bounds = parse_bounds(bbox)
+        south = float(bounds["_southWest"]["lat"])
+        west = float(bounds["_southWest"]["lng"])
+        north = float(bounds["_northEast"]["lat"])
+        east = float(bounds["_northEast"]["lng"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid bbox: {e}"
+        )
+    # Leaflet reports longitudes beyond +-180 when the map is panned across
+    # the antimeridian; a box wider than the world matches everything
+    if east - west >= 360.0:
+        west, east = -180.0, 180.0
+    if south > north or west > east or west < -180.0 or east > 180.0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                "Invalid bbox: expected south <= north "
+                "and -180 <= west <= east <= 180."
+            ),
+        )
+
+    try:
+        detections, next_cursor = await crud.query_detected_objects(
+            driver=db_driver,
+            south=south,
+            west=west,
+            north=north,
+            east=east,
+            classes=split_classes(classes),
+            min_confidence=min_conf,
+            since=since,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to query detections in {bbox}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not query object detections.",
+        )
+    return schemas.DetectedObjectPage(detections=detections, next_cursor=next_cursor)
+
+
+@router.get(
+    "/detections/{detection_id}/similar",
+    response_model=List[schemas.SimilarDetectedObject],
+)
+async def find_similar_detections(
+    detection_id: uuid.UUID,
+    k: int = Query(10, ge=1, le=100, description="Number of similar objects"),
+    same_class: bool = Query(
+        False, description="Only objects of the query object's class"
+    ),
+    db_driver: AsyncDriver = Depends(get_driver),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Finds the detected objects that look most like the given one, using the
+    appearance embeddings computed when detection jobs store their results.
+    """
+    if detection_embedding_index is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The detection embedding index is disabled.",
+        )
+    try:
+        vector = await asyncio.to_thread(
+            detection_embedding_index.get, str(detection_id)
+        )
+        if vector is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No appearance embedding for this detection",
+            )
+        query_objects = await crud.get_detected_objects_by_ids(
+            db_driver, [str(detection_id)]
+        )
+        if not query_objects:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Detection not found"
+            )
+        # Other classes are dropped after the search, so fetch extra candidates
+        matches = await asyncio.to_thread(
+            detection_embedding_index.search,
+            vector,
+            k * 5 if same_class else k,
+            [str(detection_id)],
+        )
+        objects = {
+            str(obj.id): obj
+            for obj in await crud.get_detected_objects_by_ids(
+                db_driver, [object_id for object_id, _ in matches]
+            )
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(
+            f"Failed to find detections similar to {detection_id}: {e}", exc_info=True
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not search for similar detections.",
+        )
+
+    object_class = query_objects[0].object_class
+    results = []
+    # Objects deleted since they were indexed have no node and are skipped
+    for object_id, similarity in matches:
+        obj = objects.get(object_id)
+        if obj is None or (same_class and obj.object_class != object_class):
+            continue
+        results.append(
+            schemas.SimilarDetectedObject(**obj.model_dump(), similarity=similarity)
+        )
+        if len(results) == k:
+            break
+    return results
+
+
+# --- Detection Jobs ---
+
+
+@router.get("/jobs/queue", response_model=schemas.DetectionJobQueueStats)
+async def get_detection_job_queue_stats(
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Reports the detection job workers of the process serving this request.
+    """
+    return detection_job_queue.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.DetectionJob)
+async def get_detection_job(
+    job_id: uuid.UUID,
+    db_driver: AsyncDriver = Depends(get_driver),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Retrieves the status and progress of a detection job.
+    """
+    try:
+        job = await crud.get_detection_job(driver=db_driver, job_id=job_id)
+    except Exception as e:
+        logger.error(f"Failed to retrieve detection job {job_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not retrieve detection job.",
+        )
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Detection job not found"
+        )
+    return job
+
+
+@router.get("/images/{image_id}/jobs", response_model=List[schemas.DetectionJob])
+async def get_image_detection_jobs(
+    image_id: uuid.UUID,
+    db_driver: AsyncDriver = Depends(get_driver),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Retrieves all detection jobs of an image, newest first.
+    """
+    try:
+        return await crud.get_detection_jobs_for_image(
+            driver=db_driver, image_id=image_id
+        )
+    except Exception as e:
+        logger.error(
+            f"Failed to retrieve detection jobs for image {image_id}: {e}",
+            exc_info=True,
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not retrieve detection jobs.",
+        )
+
+
 # TODO: Implement endpoint to get detection results for an image (already added above)
 # TODO: Implement CRUD operations (crud.py) for Image and DetectedObject (partially done)
 # TODO: Integrate Djinn router into main.py
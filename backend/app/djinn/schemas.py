@@ -1,9 +1,12 @@
 import uuid
 from datetime import datetime
+from enum import Enum
 from typing import List, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
+from ..schemas.djinn import TilingOptions
+
 # --- Image Schemas ---
 
 
@@ -13,6 +16,10 @@ class ImageBase(BaseModel):
     filename: str = Field(..., description="Original filename of the image")
     content_type: Optional[str] = Field(None, description="MIME type of the image")
     description: Optional[str] = Field(None, description="User-provided description")
+    tiling: Optional[TilingOptions] = Field(
+        None,
+        description="Tiled inference options used when running detection on this image",
+    )
     # Potential future fields: source_location (e.g., GeoJSON Point of camera)
 
 
@@ -71,6 +78,19 @@ class DetectedObjectBase(BaseModel):
         None, description="Estimated longitude of the detected object"
     )
     # How lat/lon is determined depends on implementation (e.g., from image metadata, external source, inference)
+    # Set for objects tracked across video frames (one node per track)
+    track_id: Optional[int] = Field(
+        None, description="Track ID within the source video, for tracked objects"
+    )
+    first_frame: Optional[int] = Field(
+        None, description="First video frame the tracked object was seen in"
+    )
+    last_frame: Optional[int] = Field(
+        None, description="Last video frame the tracked object was seen in"
+    )
+    frame_count: Optional[int] = Field(
+        None, description="Number of processed frames the object was detected in"
+    )
 
 
 class DetectedObjectCreate(DetectedObjectBase):
@@ -88,6 +108,13 @@ class DetectedObject(DetectedObjectBase):
         ..., description="Unique identifier for the detected object node in Neo4j"
     )
     image_id: uuid.UUID = Field(..., description="ID of the source image")
+    observation_count: int = Field(
+        1,
+        description=(
+            "Number of detections merged into this object "
+            "(overlapping images of the same spot)"
+        ),
+    )
     created_at: datetime = Field(
         ..., description="Timestamp when the detection was recorded"
     )
@@ -96,8 +123,82 @@ class DetectedObject(DetectedObjectBase):
         from_attributes = True  # Pydantic V2 setting
 
 
+class SimilarDetectedObject(DetectedObject):
+    """Schema for a detected object returned by a similarity search."""
+
+    similarity: float = Field(
+        ..., description="Cosine similarity of appearance to the query object (-1 to 1)"
+    )
+
+
+class DetectedObjectPage(BaseModel):
+    """Schema for one page of a detected object query."""
+
+    detections: List[DetectedObject]
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Pass as `cursor` to fetch the next page; null on the last page",
+    )
+
+
 class ImageDetectionResult(BaseModel):
     """Schema for returning the results of object detection on an image."""
 
     image: Image
     detected_objects: List[DetectedObject]
+
+
+# --- Detection Job Schemas ---
+
+
+class DetectionJobStatus(str, Enum):
+    """Lifecycle states of a background detection job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class DetectionJob(BaseModel):
+    """Schema representing a background object detection job for an image."""
+
+    id: uuid.UUID = Field(..., description="Unique identifier for the job node")
+    image_id: uuid.UUID = Field(..., description="ID of the image being processed")
+    status: DetectionJobStatus = Field(..., description="Current state of the job")
+    progress: float = Field(
+        0.0, ge=0.0, le=1.0, description="Fraction of the work done (0.0 to 1.0)"
+    )
+    attempts: int = Field(0, description="Number of times the job has been started")
+    detections_count: Optional[int] = Field(
+        None, description="Number of objects detected once the job has completed"
+    )
+    error: Optional[str] = Field(None, description="Last error, if the job failed")
+    created_at: datetime = Field(..., description="Timestamp when the job was queued")
+    updated_at: datetime = Field(
+        ..., description="Timestamp of the last status or progress change"
+    )
+    started_at: Optional[datetime] = Field(
+        None, description="Timestamp when the latest attempt started"
+    )
+    finished_at: Optional[datetime] = Field(
+        None, description="Timestamp when the job completed or failed"
+    )
+
+    class Config:
+        from_attributes = True  # Pydantic V2 setting
+
+
+class ImageUploadResponse(BaseModel):
+    """Schema returned by the upload endpoint: the stored image and its queued job."""
+
+    image: Image
+    job: DetectionJob
+
+
+class DetectionJobQueueStats(BaseModel):
+    """Schema describing this process's detection job workers."""
+
+    workers: int = Field(..., description="Number of job worker tasks")
+    queued: int = Field(..., description="Jobs waiting for a worker in this process")
+    running: int = Field(..., description="Jobs currently being processed")
@@ -1,18 +1,40 @@
+import base64
+import json
 import logging
 import uuid
 from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-from neo4j import AsyncDriver  # Use AsyncDriver for FastAPI
+from neo4j import (  # Use AsyncDriver for FastAPI
+    AsyncDriver,
+    AsyncManagedTransaction,
+    Record,
+)
 
 from . import schemas  # Import schemas from the current kappa module
+from .fulltext import (
+    DOCUMENT_TEXT_INDEX,
+    DOCUMENT_TEXT_PROPERTIES,
+    build_fulltext_query,
+)
 
 logger = logging.getLogger(__name__)
 
+
+def _native(value: Any) -> Any:
+    """Converts Neo4j temporal values to Python ones."""
+    return value.to_native() if hasattr(value, "to_native") else value
+
+
 # --- Document CRUD Operations ---
 
 
 async def create_document(
-    driver: AsyncDriver, document_in: schemas.DocumentCreate, storage_uri: str
+    driver: AsyncDriver,
+    document_in: schemas.DocumentCreate,
+    storage_uri: str,
+    size_bytes: Optional[int] = None,
+    sha256: Optional[str] = None,
 ) -> schemas.Document:
     """
     Creates a Document node in Neo4j with its metadata.
@@ -21,6 +43,8 @@ async def create_document(
         driver: The asynchronous Neo4j driver instance.
         document_in: Pydantic schema containing document metadata.
         storage_uri: The URI/identifier for the document in object storage.
+        size_bytes: Size of the stored file in bytes.
+        sha256: SHA-256 hex digest of the stored file.
 
     Returns:
         The created Document object including database-generated fields.
@@ -38,11 +62,18 @@ async def create_document(
         content_type: $content_type,
         description: $description,
         storage_uri: $storage_uri,
+        size_bytes: $size_bytes,
+        sha256: $sha256,
+        ingest_status: $ingest_status,
+        ingest_attempts: 0,
+        ingest_updated_at: $created_at,
         created_at: $created_at,
         updated_at: $updated_at
     })
     RETURN d.id AS id, d.filename AS filename, d.content_type AS content_type,
            d.description AS description, d.storage_uri AS storage_uri,
+           d.size_bytes AS size_bytes, d.sha256 AS sha256,
+           d.ingest_status AS ingest_status,
            d.created_at AS created_at, d.updated_at AS updated_at
     """
     parameters = {
@@ -51,6 +82,9 @@ async def create_document(
         "content_type": document_in.content_type,
         "description": document_in.description,
         "storage_uri": storage_uri,
+        "size_bytes": size_bytes,
+        "sha256": sha256,
+        "ingest_status": schemas.IngestStatus.QUEUED.value,
         "created_at": now,
         "updated_at": now,
     }
@@ -59,12 +93,14 @@ async def create_document(
         f"Executing query to create document node: {query} with params: {parameters}"
     )
 
+    async def work(tx: AsyncManagedTransaction) -> Optional[Record]:
+        result = await tx.run(query, parameters)
+        return await result.single()
+
     try:
         # Neo4j recommends using managed transactions (execute_write)
         async with driver.session() as session:
-            result = await session.execute_write(
-                lambda tx: tx.run(query, parameters).single()
-            )
+            result = await session.execute_write(work)
 
         if result:
             # Manually construct the Pydantic model from the result record
@@ -88,71 +124,647 @@ async def create_document(
         raise e
 
 
+_SEARCH_RETURN = """
+    RETURN d.id AS id, d.filename AS filename, d.content_type AS content_type,
+           d.description AS description, d.storage_uri AS storage_uri,
+           d.size_bytes AS size_bytes, d.sha256 AS sha256,
+           d.ingest_status AS ingest_status,
+           d.created_at AS created_at, d.updated_at AS updated_at, score
+"""
+
+
+def encode_search_cursor(sort: str, key: Any, ids: List[str], position: int = 0) -> str:
+    """
+    Opaque keyset cursor pointing just past a search result.
+
+    Args:
+        sort: The sort order the cursor belongs to.
+        key: Sort key of the last result (score or created_at).
+        ids: IDs of the results returned with exactly that key, which the
+             next page must skip (ties).
+        position: Number of results returned before the cursor.
+    """
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    payload = json.dumps([sort, key, ids, position])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_search_cursor(cursor: str, sort: str) -> Tuple[Any, List[str], int]:
+    """
+    Inverse of `encode_search_cursor`.
+
+    Returns:
+        A tuple of (sort key, tied IDs, position).
+
+    Raises:
+        ValueError: If the cursor is malformed or from another sort order.
+    """
+    try:
+        cursor_sort, key, ids, position = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        if cursor_sort != sort:
+            raise ValueError(f"cursor is for sort '{cursor_sort}', not '{sort}'")
+        key = datetime.fromisoformat(key) if sort == "newest" else float(key)
+        position = int(position)
+        if position < 0:
+            raise ValueError("negative position")
+        return key, [str(uuid.UUID(i)) for i in ids], position
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def _relevance_page_query(options: str) -> str:
+    return (
+        f"CALL db.index.fulltext.queryNodes('{DOCUMENT_TEXT_INDEX}', $query, "
+        f"{options}) YIELD node AS d, score "
+        "WHERE $after IS NULL OR score < $after "
+        "OR (score = $after AND NOT d.id IN $after_ids)"
+        + _SEARCH_RETURN
+        + "LIMIT $limit"
+    )
+
+
 async def search_documents(
-    driver: AsyncDriver, query: str, limit: int = 10, skip: int = 0
-) -> list[schemas.Document]:
+    driver: AsyncDriver,
+    query: str,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort: str = "relevance",
+) -> Tuple[List[schemas.DocumentSearchHit], Optional[str]]:
     """
-    Searches for Document nodes in Neo4j based on a simple keyword match
-    against filename or description (case-insensitive).
-    NOTE: This is a very basic search. Full-text indexing would be needed for real-world use.
+    Searches Document nodes through the ``document_text`` full-text index
+    (filename, description and extracted text), one page at a time.
+
+    The query supports phrases, prefix and fuzzy terms (see
+    `build_fulltext_query`). Pages are keyset-paginated instead of using
+    SKIP: the cursor holds the last result's sort key (score or created_at)
+    and the IDs returned with exactly that key, and the next page starts
+    right after it.
+
+    - ``relevance``: most relevant first. The full-text procedure yields
+      hits in descending score order, and Lucene is asked for the top
+      ``position + limit + 1`` hits only (``position`` being the number of
+      results on earlier pages, ties included), so page N costs a top-k
+      collection of N pages, not of every match. If documents that rank
+      above the cursor were added since, that window can come up short; a
+      short page is then re-read without the bound, which on the real last
+      page costs about the same.
+    - ``newest``: most recently created first, ties broken by ID. The
+      full-text index cannot order by date, so every page collects and
+      sorts all matches: O(matches) per page, however early the page.
+      The keyset only keeps pages consistent while documents are added.
 
     Args:
         driver: The asynchronous Neo4j driver instance.
-        query: The search term.
+        query: The user's search string.
         limit: Maximum number of results to return.
-        skip: Number of results to skip (for pagination).
+        cursor: ``next_cursor`` of the previous page, if any.
+        sort: ``relevance`` or ``newest``.
 
     Returns:
-        A list of matching Document objects.
+        A tuple of (matching documents with their scores, cursor of the
+        next page or None on the last page).
 
     Raises:
+        ValueError: If the cursor is invalid.
         Exception: If the database operation fails.
     """
-    # Basic case-insensitive search on filename and description
-    # WARNING: This query will be slow on large datasets without indexes!
-    # Consider creating indexes on :Document(filename) and :Document(description)
-    # For real search, use Neo4j's full-text search capabilities.
-    search_query = """
-    MATCH (d:Document)
-    WHERE toLower(d.filename) CONTAINS toLower($query) OR
-          (d.description IS NOT NULL AND toLower(d.description) CONTAINS toLower($query))
-    RETURN d.id AS id, d.filename AS filename, d.content_type AS content_type,
-           d.description AS description, d.storage_uri AS storage_uri,
-           d.created_at AS created_at, d.updated_at AS updated_at
-    ORDER BY d.created_at DESC
-    SKIP $skip
-    LIMIT $limit
-    """
-    parameters = {"query": query, "skip": skip, "limit": limit}
+    if sort not in ("relevance", "newest"):
+        raise ValueError(f"Unknown sort order '{sort}'.")
+    after, after_ids, position = (
+        decode_search_cursor(cursor, sort) if cursor else (None, [], 0)
+    )
+    lucene_query = build_fulltext_query(query)
+    if not lucene_query:
+        logger.info(f"Search query '{query}' has no searchable terms")
+        return [], None
+
+    parameters = {
+        "query": lucene_query,
+        "after": after,
+        "after_ids": after_ids,
+        # One extra row tells whether there is a next page
+        "limit": limit + 1,
+        # Hits Lucene collects: everything already returned, and this page
+        "bound": position + limit + 1,
+    }
+    if sort == "relevance":
+        search_query = _relevance_page_query("{limit: $bound}")
+        # Without the bound, for re-reading a short page
+        unbounded_query = _relevance_page_query("{}")
+    else:
+        search_query = (
+            f"CALL db.index.fulltext.queryNodes('{DOCUMENT_TEXT_INDEX}', $query) "
+            "YIELD node AS d, score "
+            "WHERE $after IS NULL OR d.created_at < $after "
+            "OR (d.created_at = $after AND d.id < $after_ids[0])"
+            + _SEARCH_RETURN
+            + "ORDER BY d.created_at DESC, d.id DESC LIMIT $limit"
+        )
 
     logger.debug(
         f"Executing query to search documents: {search_query} with params: {parameters}"
     )
 
-    documents = []
+    async def work(tx: AsyncManagedTransaction) -> List[Dict[str, Any]]:
+        result = await tx.run(search_query, parameters)
+        records = await result.data()
+        if sort == "relevance" and after is not None and len(records) <= limit:
+            # Short page: the end of the results, or hits added above the
+            # cursor pushed some out of the bounded window
+            result = await tx.run(unbounded_query, parameters)
+            records = await result.data()
+        return records
+
     try:
         async with driver.session() as session:
-            result = await session.execute_read(
-                lambda tx: tx.run(search_query, parameters).data()
+            records = await session.execute_read(work)
+    except Exception as e:
+        logger.error(
+            f"Error searching documents in Neo4j for query '{query}': {e}",
+            exc_info=True,
+        )
+        raise e
+
+    documents = []
+    for record in records[:limit]:
+        doc_data = dict(record)
+        doc_data["id"] = uuid.UUID(doc_data["id"])
+        doc_data["created_at"] = _native(doc_data["created_at"])
+        doc_data["updated_at"] = _native(doc_data["updated_at"])
+        documents.append(schemas.DocumentSearchHit(**doc_data))
+
+    next_cursor = None
+    if len(records) > limit:
+        last = documents[-1]
+        if sort == "relevance":
+            # Equal scores come in no particular order, so every result
+            # returned with the last score is skipped on the next page,
+            # including those of earlier pages in a run of equal scores
+            tied = [str(d.id) for d in documents if d.score == last.score]
+            if last.score == after:
+                tied = after_ids + tied
+            next_cursor = encode_search_cursor(sort, last.score, tied, position + limit)
+        else:
+            next_cursor = encode_search_cursor(
+                sort, last.created_at, [str(last.id)], position + limit
             )
 
-        for record in result:
-            doc_data = dict(record)
-            doc_data["id"] = uuid.UUID(doc_data["id"])
-            documents.append(schemas.Document(**doc_data))
+    logger.info(
+        f"Found {len(documents)} documents matching query '{query}' (limit {limit})"
+    )
+    return documents, next_cursor
 
-        logger.info(
-            f"Found {len(documents)} documents matching query '{query}' (limit {limit}, skip {skip})"
-        )
-        return documents
 
+async def get_documents_with_snippets(
+    driver: AsyncDriver, rows: List[Tuple[str, Optional[str]]]
+) -> Dict[str, Tuple[schemas.Document, Optional[str]]]:
+    """
+    Retrieves documents together with the text of one of their chunks each.
+
+    Args:
+        driver: The asynchronous Neo4j driver instance.
+        rows: ``(document id, chunk id or None)`` pairs.
+
+    Returns:
+        ``document id -> (document, chunk text or None)`` for the documents
+        that exist.
+    """
+    if not rows:
+        return {}
+    query = """
+    UNWIND $rows AS row
+    MATCH (d:Document {id: row.document_id})
+    OPTIONAL MATCH (c:Chunk {id: row.chunk_id})
+    RETURN d.id AS id, d.filename AS filename, d.content_type AS content_type,
+           d.description AS description, d.storage_uri AS storage_uri,
+           d.size_bytes AS size_bytes, d.sha256 AS sha256,
+           d.ingest_status AS ingest_status,
+           d.created_at AS created_at, d.updated_at AS updated_at,
+           c.text AS snippet
+    """
+    parameters = {
+        "rows": [
+            {"document_id": document_id, "chunk_id": chunk_id}
+            for document_id, chunk_id in rows
+        ]
+    }
+
+    async def work(tx: AsyncManagedTransaction) -> List[Dict[str, Any]]:
+        result = await tx.run(query, parameters)
+        return await result.data()
+
+    async with driver.session() as session:
+        records = await session.execute_read(work)
+
+    documents = {}
+    for record in records:
+        doc_data = {key: _native(value) for key, value in record.items()}
+        snippet = doc_data.pop("snippet")
+        document_id = doc_data["id"]
+        doc_data["id"] = uuid.UUID(document_id)
+        documents[document_id] = (schemas.Document(**doc_data), snippet)
+    return documents
+
+
+async def count_search_results(
+    driver: AsyncDriver, query: str, max_count: int
+) -> Tuple[int, bool]:
+    """
+    Counts the documents matching a search, up to ``max_count``. Lucene
+    stops collecting hits at the cap, so counting stays cheap for very
+    broad queries.
+
+    Returns:
+        A tuple of (count, whether it is exact). When not exact, the count
+        is ``max_count`` and the real total is larger.
+    """
+    lucene_query = build_fulltext_query(query)
+    if not lucene_query:
+        return 0, True
+    count_query = (
+        f"CALL db.index.fulltext.queryNodes('{DOCUMENT_TEXT_INDEX}', $query, "
+        "{limit: $limit}) YIELD node RETURN count(node) AS total"
+    )
+
+    async def work(tx: AsyncManagedTransaction) -> int:
+        result = await tx.run(count_query, query=lucene_query, limit=max_count + 1)
+        record = await result.single()
+        return record["total"] if record else 0
+
+    try:
+        async with driver.session() as session:
+            total = await session.execute_read(work)
     except Exception as e:
         logger.error(
-            f"Error searching documents in Neo4j for query '{query}': {e}",
-            exc_info=True,
+            f"Error counting search results for query '{query}': {e}", exc_info=True
         )
         raise e
+    if total > max_count:
+        return max_count, False
+    return total, True
+
+
+# --- Schema Setup ---
+
+
+async def ensure_indexes(driver: AsyncDriver) -> None:
+    """
+    Creates the constraints and indexes the Kappa queries rely on
+    (idempotent). Neo4j keeps the full-text index up to date as
+    Document nodes are created or changed.
+    """
+    properties = ", ".join(f"d.{name}" for name in DOCUMENT_TEXT_PROPERTIES)
+    statements = [
+        "CREATE CONSTRAINT document_id IF NOT EXISTS "
+        "FOR (d:Document) REQUIRE d.id IS UNIQUE",
+        f"CREATE FULLTEXT INDEX {DOCUMENT_TEXT_INDEX} IF NOT EXISTS "
+        f"FOR (d:Document) ON EACH [{properties}]",
+        "CREATE INDEX document_ingest_status IF NOT EXISTS "
+        "FOR (d:Document) ON (d.ingest_status)",
+        "CREATE CONSTRAINT chunk_id IF NOT EXISTS "
+        "FOR (c:Chunk) REQUIRE c.id IS UNIQUE",
+        "CREATE INDEX chunk_document_id IF NOT EXISTS "
+        "FOR (c:Chunk) ON (c.document_id)",
+    ]
+    async with driver.session() as session:
+        for statement in statements:
+            result = await session.run(statement)
+            await result.consume()
+    logger.info("Kappa Neo4j constraints and indexes are in place.")
+
+
+# --- Ingest CRUD Operations ---
+
+
+class IngestClaimLost(Exception):
+    """
+    Raised when a document's running ingest was taken over (re-queued as
+    stale and claimed again), so this attempt must not write its results.
+    """
+
+
+_INGEST_RETURN = """
+    RETURN d.id AS document_id, d.ingest_status AS status,
+           d.ingest_attempts AS attempts, d.chunk_count AS chunk_count,
+           d.ingest_error AS error, d.ingest_updated_at AS updated_at,
+           d.ingest_finished_at AS finished_at
+"""
+
+
+def _ingest_from_record(record: Dict[str, Any]) -> schemas.DocumentIngest:
+    """Builds a DocumentIngest schema from a flat Neo4j record."""
+    data = {key: _native(value) for key, value in record.items()}
+    data["document_id"] = uuid.UUID(data["document_id"])
+    data["attempts"] = data["attempts"] or 0
+    return schemas.DocumentIngest(**data)
+
+
+async def get_document_ingest(
+    driver: AsyncDriver, document_id: uuid.UUID
+) -> Optional[schemas.DocumentIngest]:
+    """Retrieves the extraction status of a document, or None if it does not exist."""
+    query = (
+        "MATCH (d:Document {id: $id}) WHERE d.ingest_status IS NOT NULL"
+        + _INGEST_RETURN
+    )
+
+    async def work(tx: AsyncManagedTransaction) -> Optional[Dict[str, Any]]:
+        result = await tx.run(query, id=str(document_id))
+        record = await result.single()
+        return dict(record) if record else None
+
+    async with driver.session() as session:
+        record = await session.execute_read(work)
+    return _ingest_from_record(record) if record else None
+
+
+async def claim_document_ingest(
+    driver: AsyncDriver, document_id: uuid.UUID
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomically moves a queued document to running and starts a new attempt.
+
+    Several server processes may hold the same document ID in their queues,
+    so only the first claim wins. The attempt gets a new claim token; the
+    writes of an attempt only apply while the document still carries it.
+
+    Returns:
+        The document's ``storage_uri``, ``content_type``, ``filename``,
+        ``attempts`` and ``claim`` token, or None if it is gone or already
+        claimed.
+    """
+    query = """
+    MATCH (d:Document {id: $id})
+    WHERE d.ingest_status = $queued
+    SET d.ingest_status = $running,
+        d.ingest_attempts = coalesce(d.ingest_attempts, 0) + 1,
+        d.ingest_claim = $claim,
+        d.ingest_error = null, d.ingest_updated_at = $now
+    RETURN d.storage_uri AS storage_uri, d.content_type AS content_type,
+           d.filename AS filename, d.ingest_attempts AS attempts,
+           d.ingest_claim AS claim
+    """
+
+    async def work(tx: AsyncManagedTransaction) -> Optional[Dict[str, Any]]:
+        result = await tx.run(
+            query,
+            id=str(document_id),
+            queued=schemas.IngestStatus.QUEUED.value,
+            running=schemas.IngestStatus.RUNNING.value,
+            claim=str(uuid.uuid4()),
+            now=datetime.now(timezone.utc),
+        )
+        record = await result.single()
+        return dict(record) if record else None
+
+    async with driver.session() as session:
+        return await session.execute_write(work)
+
+
+# Start of every query that writes for a running attempt. The SET locks the
+# document first (touching only an owned one), so the claim check cannot
+# interleave with a new claim.
+_OWNED_INGEST = """
+    MATCH (d:Document {id: $id})
+    SET d.ingest_updated_at = CASE WHEN d.ingest_claim = $claim
+                                   THEN $now ELSE d.ingest_updated_at END
+    WITH d
+    WHERE d.ingest_status = $running AND d.ingest_claim = $claim
+"""
+
+
+def _owned_parameters(document_id: uuid.UUID, claim: str) -> Dict[str, Any]:
+    return {
+        "id": str(document_id),
+        "claim": claim,
+        "running": schemas.IngestStatus.RUNNING.value,
+        "now": datetime.now(timezone.utc),
+    }
+
+
+async def touch_document_ingest(
+    driver: AsyncDriver, document_id: uuid.UUID, claim: str
+) -> bool:
+    """
+    Heartbeat of a running attempt: refreshes ``ingest_updated_at`` so
+    `reset_stale_ingests` does not take a long extraction for a dead one.
+
+    Returns:
+        Whether the attempt still owns the document.
+    """
+    query = _OWNED_INGEST + "RETURN count(d) AS owned"
+
+    async def work(tx: AsyncManagedTransaction) -> bool:
+        result = await tx.run(query, _owned_parameters(document_id, claim))
+        return (await result.single())["owned"] > 0
+
+    async with driver.session() as session:
+        return await session.execute_write(work)
+
+
+async def complete_document_ingest(
+    driver: AsyncDriver,
+    document_id: uuid.UUID,
+    claim: str,
+    text: str,
+    chunks: List[Tuple[int, str]],
+    batch_size: int = 1000,
+) -> Optional[int]:
+    """
+    Stores a document's extracted text and chunks and marks it completed.
+
+    Chunks are created as ``(:Chunk)-[:PART_OF]->(:Document)`` with one
+    UNWIND statement per ``batch_size`` chunks, each in its own transaction
+    so that very long documents never build one huge transaction. Chunks of
+    an earlier attempt are deleted first, so retries leave no duplicates.
+    Chunk ids are ``"<document id>:<chunk index>"``.
+
+    Every transaction first checks that the attempt still holds ``claim``,
+    so an attempt that was re-queued as stale while it ran (and claimed
+    again) cannot write over, or next to, the chunks of the new one.
+
+    Args:
+        driver: The asynchronous Neo4j driver instance.
+        document_id: The document the chunks belong to.
+        claim: Claim token of the attempt, from `claim_document_ingest`.
+        text: Text stored on the document for its full-text index.
+        chunks: ``(start offset, text)`` pairs, in document order.
+        batch_size: Chunks written per transaction.
+
+    Returns:
+        The number of chunks the document had before, if it was ingested
+        already.
+
+    Raises:
+        IngestClaimLost: If the document is no longer claimed by ``claim``.
+    """
+    delete_query = _OWNED_INGEST + """
+    OPTIONAL MATCH (c:Chunk {document_id: $id})
+    DETACH DELETE c
+    RETURN count(DISTINCT d) AS owned
+    """
+    create_query = _OWNED_INGEST + """
+    UNWIND $chunks AS chunk
+    CREATE (c:Chunk {
+        id: $id + ":" + toString(chunk.index),
+        document_id: $id,
+        index: chunk.index,
+        start: chunk.start,
+        text: chunk.text
+    })-[:PART_OF]->(d)
+    RETURN count(d) AS owned
+    """
+    complete_query = _OWNED_INGEST + """
+    WITH d, d.chunk_count AS previous_count
+    SET d.text = $text, d.chunk_count = $count, d.ingest_status = $completed,
+        d.ingest_claim = null, d.ingest_error = null,
+        d.ingest_finished_at = $now, d.updated_at = $now
+    RETURN previous_count
+    """
+    batch_size = max(1, batch_size)
+
+    def check_owned(owned: int) -> None:
+        if not owned:
+            raise IngestClaimLost(
+                f"Ingest of document {document_id} was claimed by another attempt"
+            )
+
+    async def delete(tx: AsyncManagedTransaction) -> None:
+        result = await tx.run(delete_query, _owned_parameters(document_id, claim))
+        check_owned((await result.single())["owned"])
+
+    async with driver.session() as session:
+        await session.execute_write(delete)
+        for offset in range(0, len(chunks), batch_size):
+            rows = [
+                {"index": index, "start": start, "text": chunk_text}
+                for index, (start, chunk_text) in enumerate(
+                    chunks[offset : offset + batch_size], start=offset
+                )
+            ]
+
+            async def create(tx: AsyncManagedTransaction) -> None:
+                result = await tx.run(
+                    create_query, _owned_parameters(document_id, claim), chunks=rows
+                )
+                check_owned((await result.single())["owned"])
+
+            await session.execute_write(create)
+
+        async def complete(tx: AsyncManagedTransaction) -> Optional[int]:
+            result = await tx.run(
+                complete_query,
+                _owned_parameters(document_id, claim),
+                text=text,
+                count=len(chunks),
+                completed=schemas.IngestStatus.COMPLETED.value,
+            )
+            record = await result.single()
+            check_owned(record is not None)
+            return record["previous_count"]
+
+        previous_count = await session.execute_write(complete)
+    logger.info(f"Stored {len(chunks)} chunks of document {document_id}")
+    return previous_count
+
+
+async def fail_document_ingest(
+    driver: AsyncDriver,
+    document_id: uuid.UUID,
+    claim: str,
+    error: str,
+    status: schemas.IngestStatus,
+) -> bool:
+    """
+    Records a failed attempt: ``status`` is QUEUED to retry it, FAILED to
+    give up or SKIPPED if the document has no extractable text.
+
+    Returns:
+        Whether it was recorded; False if the document is no longer claimed
+        by ``claim`` (another attempt owns it now).
+    """
+    query = _OWNED_INGEST + """
+    SET d.ingest_status = $status, d.ingest_error = $error,
+        d.ingest_claim = null,
+        d.ingest_finished_at = CASE WHEN $retry THEN null ELSE $now END
+    RETURN count(d) AS owned
+    """
+
+    async def work(tx: AsyncManagedTransaction) -> bool:
+        result = await tx.run(
+            query,
+            _owned_parameters(document_id, claim),
+            status=status.value,
+            error=error,
+            retry=status == schemas.IngestStatus.QUEUED,
+        )
+        return (await result.single())["owned"] > 0
+
+    async with driver.session() as session:
+        return await session.execute_write(work)
+
+
+async def reset_stale_ingests(driver: AsyncDriver, stale_before: datetime) -> int:
+    """
+    Re-queues documents left running since before ``stale_before``, whose
+    process must have died (running attempts refresh ``ingest_updated_at``
+    with `touch_document_ingest`). The old attempt's claim is revoked.
+
+    Returns:
+        The number of documents re-queued.
+    """
+    query = """
+    MATCH (d:Document)
+    WHERE d.ingest_status = $running AND d.ingest_updated_at < $stale_before
+    SET d.ingest_status = $queued, d.ingest_claim = null,
+        d.ingest_updated_at = $now
+    RETURN count(d) AS reset
+    """
+
+    async def work(tx: AsyncManagedTransaction) -> int:
+        result = await tx.run(
+            query,
+            running=schemas.IngestStatus.RUNNING.value,
+            queued=schemas.IngestStatus.QUEUED.value,
+            stale_before=stale_before,
+            now=datetime.now(timezone.utc),
+        )
+        return (await result.single())["reset"]
+
+    async with driver.session() as session:
+        reset = await session.execute_write(work)
+    if reset:
+        logger.warning(f"Re-queued {reset} stale running document ingests")
+    return reset
+
+
+async def get_queued_document_ids(
+    driver: AsyncDriver, limit: int, exclude: Optional[List[str]] = None
+) -> List[uuid.UUID]:
+    """IDs of up to ``limit`` documents waiting for extraction, oldest first."""
+    query = """
+    MATCH (d:Document)
+    WHERE d.ingest_status = $queued AND NOT d.id IN $exclude
+    RETURN d.id AS id
+    ORDER BY d.created_at
+    LIMIT $limit
+    """
+
+    async def work(tx: AsyncManagedTransaction) -> List[str]:
+        result = await tx.run(
+            query,
+            queued=schemas.IngestStatus.QUEUED.value,
+            exclude=exclude or [],
+            limit=limit,
+        )
+        return [record["id"] for record in await result.data()]
+
+    async with driver.session() as session:
+        document_ids = await session.execute_read(work)
+    return [uuid.UUID(document_id) for document_id in document_ids]
 
 
-# TODO: Implement count_search_results function for pagination metadata
 # TODO: Consider adding functions to get a single document by ID, update, delete etc.
@@ -0,0 +1,246 @@
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+from xml.etree import ElementTree
+
+logger = logging.getLogger(__name__)
+
+# Non-text/* content types that are plain text
+TEXT_CONTENT_TYPES = ("application/json", "application/xml", "application/csv")
+PDF_CONTENT_TYPES = ("application/pdf",)
+DOCX_CONTENT_TYPES = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+)
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# Used when the client sent no (or a generic) content type
+_EXTENSION_CONTENT_TYPES = {
+    ".pdf": PDF_CONTENT_TYPES[0],
+    ".docx": DOCX_CONTENT_TYPES[0],
+    ".html": HTML_CONTENT_TYPES[0],
+    ".htm": HTML_CONTENT_TYPES[0],
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".csv": "application/csv",
+    ".json": "application/json",
+    ".xml": "application/xml",
+}
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Runs of spaces/tabs, and of three or more line breaks
+_SPACES = re.compile(r"[^\S\n]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+# Where a chunk may end, best first: paragraph, sentence, word
+_BREAKS = (re.compile(r"\n\n"), re.compile(r"[.!?]\s"), re.compile(r"\s"))
+
+
+class UnsupportedDocumentError(Exception):
+    """Raised for documents whose type has no text to extract."""
+
+
+def resolve_content_type(content_type: Optional[str], filename: Optional[str]) -> str:
+    """Media type of a document, falling back to its file extension."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type and media_type != "application/octet-stream":
+        return media_type
+    extension = os.path.splitext(filename or "")[1].lower()
+    return _EXTENSION_CONTENT_TYPES.get(extension, media_type)
+
+
+# --- Extractors ---
+
+
+def _pdf_text(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise UnsupportedDocumentError(
+            "PDF extraction needs pypdf (install the 'documents' extra)."
+        ) from e
+    reader = PdfReader(path)
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _docx_text(path: str) -> str:
+    """Paragraph text of a DOCX file, read straight from its XML part."""
+    paragraphs: List[str] = []
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        parts: List[str] = []
+        # Streamed, so large documents are never parsed into one tree
+        for _, element in ElementTree.iterparse(xml):
+            tag = element.tag
+            if tag == f"{_WORD_NAMESPACE}t":
+                parts.append(element.text or "")
+            elif tag == f"{_WORD_NAMESPACE}tab":
+                parts.append("\t")
+            elif tag in (f"{_WORD_NAMESPACE}br", f"{_WORD_NAMESPACE}cr"):
+                parts.append("\n")
+            elif tag == f"{_WORD_NAMESPACE}p":
+                paragraphs.append("".join(parts))
+                parts = []
+                element.clear()
+    return "\n\n".join(paragraphs)
+
+
+class _HTMLTextParser(HTMLParser):
+    """Collects the visible text of an HTML page."""
+
+    _SKIPPED = {"script", "style", "noscript", "template", "head"}
+    _BLOCKS = {
+        "p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+        "section", "article", "blockquote", "pre", "table", "ul", "ol",
+    }  # fmt: skip
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIPPED:
+            self._skip_depth += 1
+        elif tag in self._BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIPPED:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self._BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _read_decoded(path: str, content_type: Optional[str]) -> str:
+    charset = "utf-8"
+    for parameter in (content_type or "").split(";")[1:]:
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            charset = value.strip().strip('"')
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return data.decode(charset, errors="replace")
+    except LookupError:  # Unknown charset
+        return data.decode("utf-8", errors="replace")
+
+
+def _html_text(path: str, content_type: Optional[str]) -> str:
+    parser = _HTMLTextParser()
+    parser.feed(_read_decoded(path, content_type))
+    parser.close()
+    return "".join(parser.parts)
+
+
+def extract_text(
+    path: str, content_type: Optional[str], filename: Optional[str]
+) -> str:
+    """
+    Extracts the text of a PDF, DOCX, HTML or plain-text file.
+
+    Args:
+        path: Local path of the file.
+        content_type: Content type sent with the upload (charset honoured).
+        filename: Original filename, used when the content type is missing.
+
+    Returns:
+        The text with whitespace normalized: single spaces within lines and
+        paragraphs separated by one blank line.
+
+    Raises:
+        UnsupportedDocumentError: If the type has no extractable text.
+    """
+    media_type = resolve_content_type(content_type, filename)
+    if media_type in PDF_CONTENT_TYPES:
+        text = _pdf_text(path)
+    elif media_type in DOCX_CONTENT_TYPES:
+        text = _docx_text(path)
+    elif media_type in HTML_CONTENT_TYPES:
+        text = _html_text(path, content_type)
+    elif media_type.startswith("text/") or media_type in TEXT_CONTENT_TYPES:
+        text = _read_decoded(path, content_type)
+    else:
+        raise UnsupportedDocumentError(
+            f"No text extractor for content type '{media_type or 'unknown'}'."
+        )
+    text = _SPACES.sub(" ", text.replace("\r\n", "\n").replace("\r", "\n"))
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+# --- Chunking ---
+
+
+def chunk_text(text: str, size: int, overlap: int) -> List[Tuple[int, str]]:
+    """
+    Splits text into chunks of at most ``size`` characters, each starting
+    ``overlap`` characters before the previous one ended so that passages
+    across a boundary appear whole in one chunk.
+
+    Chunks end at a paragraph break, sentence end or space in their last
+    quarter when there is one, so words are not cut in half.
+
+    Returns:
+        ``(start offset, chunk text)`` pairs, in order.
+    """
+    size = max(1, size)
+    overlap = min(max(0, overlap), size // 2)
+    chunks: List[Tuple[int, str]] = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            window_start = start + size * 3 // 4
+            for pattern in _BREAKS:
+                breaks = [m.end() for m in pattern.finditer(text, window_start, end)]
+                if breaks:
+                    end = breaks[-1]
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append((start, chunk))
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        # Begin the overlap at a word boundary
+        space = text.find(" ", next_start, end)
+        start = space + 1 if 0 <= space < end - 1 else next_start
+    return chunks
+
+
+def extract_chunks(
+    storage_uri: str,
+    content_type: Optional[str],
+    filename: Optional[str],
+    chunk_chars: int,
+    overlap_chars: int,
+    max_text_chars: int,
+) -> Tuple[str, List[Tuple[int, str]]]:
+    """
+    Downloads a stored document, extracts its text and splits it into chunks.
+
+    Runs in the ingest process pool, so the CPU-heavy parsing never holds the
+    server's GIL; the file is streamed to a temporary file, not into memory.
+
+    Returns:
+        The start of the text (``max_text_chars``, for the document's
+        full-text index) and the ``(start offset, text)`` chunks of all of it.
+
+    Raises:
+        UnsupportedDocumentError: If the type has no extractable text.
+    """
+    # Imported here: only the worker processes need a storage client
+    from ..core.storage import get_client, parse_storage_uri
+
+    bucket_name, object_name = parse_storage_uri(storage_uri)
+    extension = os.path.splitext(filename or "")[1]
+    with tempfile.TemporaryDirectory(prefix="kappa-ingest-") as directory:
+        path = os.path.join(directory, f"document{extension}")
+        get_client().fget_object(bucket_name, object_name, path)
+        text = extract_text(path, content_type, filename)
+    return text[:max_text_chars], chunk_text(text, chunk_chars, overlap_chars)
@@ -0,0 +1,84 @@
+import logging
+import re
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Name of the Neo4j full-text index over Document nodes
+DOCUMENT_TEXT_INDEX = "document_text"
+# Document properties covered by the index
+DOCUMENT_TEXT_PROPERTIES = ("filename", "description", "text")
+
+# Characters with a meaning in Lucene query syntax
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+# A user query token: optional "-", then a quoted phrase or a bare word
+_TOKEN = re.compile(r'(-?)(?:"([^"]*)"?|(\S+))')
+# Words without any of these produce no index terms
+_WORD_CHARACTER = re.compile(r"\w")
+# Trailing fuzzy operator on a bare word, with an optional edit distance
+_FUZZY = re.compile(r"^(.+?)~([0-2])?$")
+
+
+def _escape(term: str) -> str:
+    return _LUCENE_SPECIAL.sub(r"\\\1", term)
+
+
+def _word_clause(word: str) -> str:
+    """Lucene clause for one bare word, honouring prefix/fuzzy operators."""
+    if not _WORD_CHARACTER.search(word):
+        return ""  # Punctuation only; the analyzer would drop it anyway
+    fuzzy = _FUZZY.match(word)
+    if fuzzy:
+        term = _escape(fuzzy.group(1).strip("*~"))
+        return f"{term}~{fuzzy.group(2) or 2}" if term else ""
+    if word.endswith("*"):
+        term = _escape(word.rstrip("*"))
+        return f"{term}*" if term else ""
+    return _escape(word)
+
+
+def build_fulltext_query(query: str) -> str:
+    """
+    Translates a user search string into a Lucene query for the document
+    full-text index. Everything the user types is escaped, so arbitrary
+    input can never produce a query syntax error; only these operators are
+    recognized:
+
+    - ``"exact phrase"``: the words in this order.
+    - ``term*``: prefix match (``repo*`` finds "report").
+    - ``term~`` / ``term~1``: fuzzy match within 2 (or 1) edits.
+    - ``-term`` / ``-"phrase"``: exclude documents containing it.
+
+    All other words must occur (AND); a typed ``NOT`` works like ``-`` and
+    ``AND``/``OR`` are ignored. Words are lowercased, as the index analyzer
+    does.
+
+    Returns:
+        The Lucene query, or an empty string if ``query`` has no searchable
+        terms.
+    """
+    required: List[str] = []
+    excluded: List[str] = []
+    negate_next = False
+    for match in _TOKEN.finditer(query):
+        negate, phrase, word = match.groups()
+        # Boolean operators typed out: AND is implied, OR is not supported
+        # (all words must match) and NOT works like "-"
+        if word in ("AND", "OR", "&&", "||"):
+            continue
+        if word == "NOT":
+            negate_next = True
+            continue
+        negate, negate_next = negate or negate_next, False
+        if phrase is not None:
+            words = [w for w in phrase.lower().split() if _WORD_CHARACTER.search(w)]
+            clause = f'"{" ".join(_escape(w) for w in words)}"' if words else ""
+        else:
+            clause = _word_clause(word.lower())
+        if clause:
+            (excluded if negate else required).append(clause)
+
+    # Lucene cannot answer a query made only of exclusions
+    if not required:
+        return ""
+    return " AND ".join(required + [f"NOT {clause}" for clause in excluded])
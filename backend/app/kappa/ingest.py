@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
+
+from neo4j import AsyncDriver
+
+from ..core.config import settings
+from ..core.process_memory import MASTER_PID_ENV
+from . import crud, schemas, semantic
+from .extraction import UnsupportedDocumentError, extract_chunks
+
+logger = logging.getLogger(__name__)
+
+
+def _default_process_count() -> int:
+    """One extraction process per core, shared out among the server workers."""
+    # Every worker forked by app.server starts its own queue and pool
+    server_processes = settings.SERVER_WORKERS if os.environ.get(MASTER_PID_ENV) else 1
+    return max(1, (os.cpu_count() or 1) // max(1, server_processes))
+
+
+class DocumentIngestQueue:
+    """
+    In-process queue that extracts and chunks the text of uploaded documents.
+
+    Each document's state is persisted on its ``Document`` node
+    (``ingest_status``), so uploads return as soon as the file is stored.
+    Extraction runs in a pool of ``processes`` worker processes fed by as
+    many worker tasks, so a large batch keeps every core busy while the
+    event loop (and the GIL of the API process) stays free. With
+    ``processes`` 0, the cores are divided among the server's worker
+    processes, each of which runs its own queue.
+
+    At most ``max_queue`` document IDs are held in memory. Documents that do
+    not fit stay queued in the database and are loaded again once the queue
+    has drained. On startup, queued documents and running ones whose process
+    died are picked up again; claims are atomic, so several server processes
+    can share one database without extracting a document twice. Running
+    attempts send a heartbeat every quarter of ``stale_seconds``, and their
+    writes only apply while they still hold their claim, so a slow attempt
+    is neither re-queued nor able to clash with the one that replaced it.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        max_queue: int,
+        max_attempts: int,
+        stale_seconds: float,
+    ):
+        self.process_count = max(1, processes or _default_process_count())
+        self.max_queue = max(1, max_queue)
+        self.max_attempts = max(1, max_attempts)
+        self.stale_seconds = stale_seconds
+        self._driver: Optional[AsyncDriver] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        self._queued: Set[uuid.UUID] = set()
+        self._running: Set[uuid.UUID] = set()
+        # Set when documents were left in the database for lack of room
+        self._backlog = False
+        self._refill_lock = asyncio.Lock()
+
+    def stats(self) -> schemas.IngestQueueStats:
+        """Worker and queue counts of this process."""
+        return schemas.IngestQueueStats(
+            workers=self.process_count if self._pool is not None else 0,
+            queued=len(self._queued),
+            running=len(self._running),
+            backlog=self._backlog,
+        )
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Fresh interpreters: forking a process running an event loop and
+        # driver threads is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self.process_count,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    async def start(self, driver: AsyncDriver) -> None:
+        """Starts the workers and re-queues documents left over from earlier runs."""
+        self._driver = driver
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._pool = self._new_pool()
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"kappa-ingest-worker-{i}")
+            for i in range(self.process_count)
+        ]
+
+        stale_before = datetime.now(timezone.utc) - timedelta(
+            seconds=self.stale_seconds
+        )
+        try:
+            await crud.reset_stale_ingests(driver, stale_before)
+        except Exception as e:
+            logger.error(f"Could not reset stale document ingests: {e}", exc_info=True)
+        self._backlog = True
+        await self._refill()
+        logger.info(
+            f"Document ingest queue started (processes={self.process_count}, "
+            f"pending={len(self._queued)}, backlog={self._backlog})"
+        )
+
+    def enqueue(self, document_id: uuid.UUID) -> None:
+        """Hands a stored document to the workers."""
+        if self._queue is None:
+            # Not started (e.g. no lifespan); picked up after the next start
+            logger.warning(
+                f"Document ingest queue not running; document {document_id} deferred"
+            )
+            return
+        if document_id in self._queued:
+            return
+        try:
+            self._queue.put_nowait(document_id)
+        except asyncio.QueueFull:
+            # Still queued in the database; loaded once the queue drains
+            self._backlog = True
+            return
+        self._queued.add(document_id)
+
+    async def stop(self) -> None:
+        """Cancels the workers and shuts the process pool down."""
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._queued.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        logger.info("Document ingest queue stopped.")
+
+    async def _refill(self) -> None:
+        """Loads documents left queued in the database into the free slots."""
+        async with self._refill_lock:
+            if not self._backlog or self._queue is None:
+                return
+            free = self.max_queue - self._queue.qsize()
+            if free <= 0:
+                return
+            try:
+                document_ids = await crud.get_queued_document_ids(
+                    self._driver,
+                    free,
+                    exclude=[str(i) for i in self._queued | self._running],
+                )
+            except Exception as e:
+                logger.error(f"Could not load queued documents: {e}", exc_info=True)
+                return
+            # A full page means more may be waiting
+            self._backlog = len(document_ids) >= free
+            for document_id in document_ids:
+                self.enqueue(document_id)
+
+    async def _work(self) -> None:
+        while True:
+            document_id = await self._queue.get()
+            self._queued.discard(document_id)
+            try:
+                await self._process(document_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # _process records failures itself; this only guards the worker
+                logger.error(
+                    f"Ingest of document {document_id} crashed: {e}", exc_info=True
+                )
+            finally:
+                self._queue.task_done()
+            if self._backlog and self._queue.empty():
+                await self._refill()
+
+    async def _process(self, document_id: uuid.UUID) -> None:
+        driver = self._driver
+        claimed = await crud.claim_document_ingest(driver, document_id)
+        if claimed is None:
+            logger.debug(f"Document {document_id} already claimed or gone, skipping")
+            return
+        attempts, claim = claimed["attempts"], claimed["claim"]
+        logger.info(
+            f"Extracting text of document {document_id} ({claimed['filename']}, "
+            f"attempt {attempts}/{self.max_attempts})"
+        )
+
+        self._running.add(document_id)
+        start = time.perf_counter()
+        heartbeat = asyncio.create_task(self._heartbeat(document_id, claim))
+        try:
+            pool = self._pool
+            try:
+                text, chunks = await asyncio.get_running_loop().run_in_executor(
+                    pool,
+                    extract_chunks,
+                    claimed["storage_uri"],
+                    claimed["content_type"],
+                    claimed["filename"],
+                    settings.KAPPA_CHUNK_CHARS,
+                    settings.KAPPA_CHUNK_OVERLAP_CHARS,
+                    settings.KAPPA_INDEXED_TEXT_MAX_CHARS,
+                )
+            except BrokenProcessPool:
+                # A worker process died (e.g. out of memory); later documents
+                # need a working pool, this one is retried
+                if self._pool is pool:
+                    self._pool = self._new_pool()
+                raise
+            previous_count = await crud.complete_document_ingest(
+                driver,
+                document_id,
+                claim,
+                text,
+                chunks,
+                batch_size=settings.KAPPA_CHUNK_WRITE_BATCH,
+            )
+        except asyncio.CancelledError:
+            await self._record_failure(
+                document_id,
+                claim,
+                "Interrupted by server shutdown.",
+                schemas.IngestStatus.QUEUED,
+            )
+            raise
+        except crud.IngestClaimLost as e:
+            # Another attempt owns the document now; its results count
+            logger.warning(f"Dropping results of document {document_id}: {e}")
+            return
+        except UnsupportedDocumentError as e:
+            logger.info(f"Skipping text extraction of document {document_id}: {e}")
+            await self._record_failure(
+                document_id, claim, str(e), schemas.IngestStatus.SKIPPED
+            )
+            return
+        except Exception as e:
+            retry = attempts < self.max_attempts
+            logger.error(
+                f"Ingest of document {document_id} failed (attempt {attempts}): {e}",
+                exc_info=True,
+            )
+            recorded = await self._record_failure(
+                document_id,
+                claim,
+                str(e) or type(e).__name__,
+                schemas.IngestStatus.QUEUED if retry else schemas.IngestStatus.FAILED,
+            )
+            if retry and recorded:
+                self.enqueue(document_id)
+            return
+        finally:
+            heartbeat.cancel()
+            self._running.discard(document_id)
+
+        # Keyword search already covers the document; vectors follow
+        await semantic.index_document_chunks(document_id, chunks, previous_count)
+        logger.info(
+            f"Document {document_id} ingested: {len(chunks)} chunks in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+    async def _heartbeat(self, document_id: uuid.UUID, claim: str) -> None:
+        """Keeps a running attempt from being re-queued as stale."""
+        interval = max(1.0, self.stale_seconds / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await crud.touch_document_ingest(
+                    self._driver, document_id, claim
+                ):
+                    logger.warning(
+                        f"Ingest of document {document_id} lost its claim while running"
+                    )
+                    return
+            except Exception as e:
+                logger.warning(f"Could not refresh ingest of {document_id}: {e}")
+
+    async def _record_failure(
+        self,
+        document_id: uuid.UUID,
+        claim: str,
+        error: str,
+        status: schemas.IngestStatus,
+    ) -> bool:
+        """Records a failed attempt; returns whether the attempt still owned it."""
+        try:
+            recorded = await crud.fail_document_ingest(
+                self._driver, document_id, claim, error, status
+            )
+        except Exception as e:
+            logger.error(f"Could not record ingest failure of {document_id}: {e}")
+            return False
+        if not recorded:
+            logger.warning(
+                f"Ingest failure of {document_id} not recorded: "
+                "claimed by another attempt"
+            )
+        return recorded
+
+
+# Shared ingest queue, started and stopped with the application lifespan
+document_ingest_queue = DocumentIngestQueue(
+    processes=settings.KAPPA_INGEST_PROCESSES,
+    max_queue=settings.KAPPA_INGEST_QUEUE_SIZE,
+    max_attempts=settings.KAPPA_INGEST_MAX_ATTEMPTS,
+    stale_seconds=settings.KAPPA_INGEST_STALE_SECONDS,
+)
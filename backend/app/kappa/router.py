@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import uuid
 from typing import Optional
@@ -10,6 +11,8 @@ from ..auth.schemas import User  # Assuming User schema is defined in auth.schem
 # Assuming authentication dependency is available
 # Adjust import based on actual implementation in auth.security
 from ..auth.security import get_current_active_user  # Placeholder
+from ..core.config import settings
+from ..core.storage import delete_from_storage, upload_to_storage
 
 # Assuming Neo4j driver/session management is available via db.session
 # Adjust imports based on actual implementation
@@ -19,9 +22,9 @@ from ..db.session import (
 from . import (
     crud,  # Import CRUD functions
     schemas,  # Import schemas from the current kappa module
+    semantic,
 )
-
-# from ..core.storage import upload_to_storage # TODO: Import storage utility when created
+from .ingest import document_ingest_queue
 
 logger = logging.getLogger(__name__)
 
@@ -48,22 +51,17 @@ async def upload_document(
     ),  # Ensure user is authenticated
 ):
     """
-    Uploads a text document, stores it in object storage,
-    and creates metadata entry in the graph database.
+    Uploads a document, stores it in object storage, creates its metadata
+    entry in the graph database and queues it for text extraction (PDF, DOCX,
+    HTML or plain text); poll `GET /kappa/documents/{id}/ingest` for progress.
     """
     logger.info(
         f"Received document upload request: {file.filename} by user {current_user.email}"
     )
 
     # --- 1. Store file in Object Storage (MinIO) ---
-    storage_uri = None
     try:
-        # TODO: Implement file upload logic using a storage utility
-        # storage_uri = await upload_to_storage(file, bucket_name="kappa-documents")
-        # For now, using a placeholder
-        storage_uri = f"minio:kappa-documents/{uuid.uuid4()}_{file.filename}"
-        logger.debug(f"Placeholder storage URI generated: {storage_uri}")
-        # Ensure to handle potential exceptions during upload
+        stored = await upload_to_storage(file, bucket_name="kappa-documents")
     except Exception as e:
         logger.error(
             f"Failed to upload document {file.filename} to storage: {e}", exc_info=True
@@ -87,24 +85,73 @@ async def upload_document(
         created_document = await crud.create_document(
             driver=db_driver,
             document_in=document_data,
-            storage_uri=storage_uri,
+            storage_uri=stored.uri,
+            size_bytes=stored.size,
+            sha256=stored.sha256,
             # TODO: Pass owner_id=current_user.id if linking users
         )
         logger.info(
             f"Document metadata created for: {created_document.filename} with ID: {created_document.id}"
         )
-        return created_document
     except Exception as e:
         logger.error(
             f"Failed to create document metadata for {file.filename}: {e}",
             exc_info=True,
         )
-        # TODO: Add cleanup logic here - e.g., delete the file from storage if DB operation fails
+        try:
+            await delete_from_storage(stored.uri)
+        except Exception as cleanup_error:
+            logger.warning(
+                f"Could not delete orphaned object {stored.uri}: {cleanup_error}"
+            )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Could not create document metadata in database.",
         )
 
+    # --- 3. Extract and chunk the text in the background ---
+    document_ingest_queue.enqueue(created_document.id)
+    return created_document
+
+
+@router.get("/documents/{document_id}/ingest", response_model=schemas.DocumentIngest)
+async def get_document_ingest(
+    document_id: uuid.UUID,
+    db_driver: AsyncDriver = Depends(get_driver),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Retrieves the status of a document's text extraction and chunking.
+    """
+    try:
+        ingest = await crud.get_document_ingest(
+            driver=db_driver, document_id=document_id
+        )
+    except Exception as e:
+        logger.error(
+            f"Failed to retrieve ingest status of document {document_id}: {e}",
+            exc_info=True,
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not retrieve ingest status.",
+        )
+    if ingest is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+    return ingest
+
+
+@router.get("/ingest/queue", response_model=schemas.IngestQueueStats)
+async def get_ingest_queue_stats(
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Reports the text extraction workers of the process serving this request.
+    """
+    return document_ingest_queue.stats()
+
 
 @router.post("/documents/search", response_model=schemas.DocumentSearchResult)
 async def search_documents(
@@ -115,29 +162,68 @@ async def search_documents(
     ),  # Ensure user is authenticated
 ):
     """
-    Searches for documents based on a keyword query.
-    Currently returns placeholder data.
+    Searches documents by keywords (full-text index), meaning (chunk
+    embeddings) or both, fused by reciprocal rank fusion (`mode`).
     """
     logger.info(
         f"Received search request: '{search_input.query}' by user {current_user.email}"
     )
 
-    try:
-        # Call CRUD function to search documents in Neo4j
-        # TODO: Add limit/skip parameters to SearchQuery schema and pass them here for pagination
-        search_results = await crud.search_documents(
-            driver=db_driver, query=search_input.query
+    # Relevance modes only matter when sorting by relevance
+    ranked = search_input.sort == "relevance" and search_input.mode != "keyword"
+    if (
+        ranked
+        and search_input.mode == "semantic"
+        and semantic.chunk_vector_index is None
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Semantic search is disabled.",
         )
-        # TODO: Implement and call crud.count_search_results for accurate total_count
-        total_count = len(search_results)  # Placeholder count
+    use_semantic = ranked and semantic.chunk_vector_index is not None
+
+    try:
+        if use_semantic:
+            search_results, next_cursor, total_count, total_exact = (
+                await semantic.hybrid_search(
+                    driver=db_driver,
+                    query=search_input.query,
+                    mode=search_input.mode,
+                    limit=search_input.limit,
+                    cursor=search_input.cursor,
+                )
+            )
+        else:
+            # The page and the total are independent queries, so run them concurrently
+            (search_results, next_cursor), (total_count, total_exact) = (
+                await asyncio.gather(
+                    crud.search_documents(
+                        driver=db_driver,
+                        query=search_input.query,
+                        limit=search_input.limit,
+                        cursor=search_input.cursor,
+                        sort=search_input.sort,
+                    ),
+                    crud.count_search_results(
+                        driver=db_driver,
+                        query=search_input.query,
+                        max_count=settings.KAPPA_SEARCH_COUNT_LIMIT,
+                    ),
+                )
+            )
 
         logger.debug(
             f"Search returned {len(search_results)} documents for query: '{search_input.query}'"
         )
         return schemas.DocumentSearchResult(
-            results=search_results, total_count=total_count
+            results=search_results,
+            total_count=total_count,
+            total_count_exact=total_exact,
+            next_cursor=next_cursor,
         )
 
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(
             f"Failed to search documents for query '{search_input.query}': {e}",
@@ -151,5 +237,4 @@ async def search_documents(
 
 # TODO: Implement basic keyword search endpoint (/documents/search)
 # TODO: Implement CRUD operations (crud.py) for Kappa entities
-# TODO: Implement Object Storage interaction logic (e.g., in core/storage.py)
 # TODO: Integrate Kappa router into main.py
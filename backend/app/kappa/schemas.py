@@ -1,12 +1,23 @@
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from enum import Enum
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
 # --- Document Schemas ---
 
 
+class IngestStatus(str, Enum):
+    """Lifecycle states of a document in the text extraction pipeline."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    SKIPPED = "skipped"  # The document type has no extractable text
+    FAILED = "failed"
+
+
 class DocumentBase(BaseModel):
     """Base schema for document metadata."""
 
@@ -35,12 +46,21 @@ class Document(DocumentBase):
         ...,
         description="URI or identifier for the document in Object Storage (e.g., MinIO path/key)",
     )
+    size_bytes: Optional[int] = Field(
+        None, description="Size of the stored file in bytes"
+    )
+    sha256: Optional[str] = Field(
+        None, description="SHA-256 hex digest of the stored file"
+    )
     created_at: datetime = Field(
         ..., description="Timestamp when the document was ingested"
     )
     updated_at: datetime = Field(
         ..., description="Timestamp when the document metadata was last updated"
     )
+    ingest_status: Optional[IngestStatus] = Field(
+        None, description="State of the document's text extraction"
+    )
     # Optional: Add owner_id: Optional[uuid.UUID] if linking to users
 
     class Config:
@@ -53,16 +73,103 @@ class Document(DocumentBase):
 class SearchQuery(BaseModel):
     """Schema for submitting a search query."""
 
-    query: str = Field(..., description="The keyword or phrase to search for")
-    # Potential future fields: filters (date range, type), limit, offset
+    query: str = Field(
+        ...,
+        description=(
+            'Words to search for. Supports "exact phrases", prefix* and fuzzy~ '
+            "terms, and -excluded words"
+        ),
+    )
+    sort: Literal["relevance", "newest"] = Field(
+        "relevance",
+        description=(
+            "Most relevant or most recently ingested first. Sorting by newest "
+            "reads every match on each page, so it is slower for broad queries"
+        ),
+    )
+    mode: Literal["keyword", "semantic", "hybrid"] = Field(
+        "hybrid",
+        description=(
+            "How relevance is judged: full-text keyword matching, meaning "
+            "(embedding similarity of the text chunks) or both, fused. Hybrid "
+            "falls back to keyword if semantic search is disabled. Ignored "
+            "when sorting by newest"
+        ),
+    )
+    limit: int = Field(10, ge=1, le=100, description="Maximum results per page")
+    cursor: Optional[str] = Field(
+        None, description="`next_cursor` from the previous page"
+    )
+    # Potential future fields: filters (date range, type)
+
+
+class DocumentSearchHit(Document):
+    """Schema for a document returned by a search, with its relevance."""
+
+    score: float = Field(
+        ...,
+        description=(
+            "Relevance score (higher is more relevant): the full-text score in "
+            "keyword mode, the reciprocal rank fusion score otherwise"
+        ),
+    )
+    snippet: Optional[str] = Field(
+        None, description="Passage closest in meaning to the query (semantic modes)"
+    )
 
 
 class DocumentSearchResult(BaseModel):
     """Schema for returning search results."""
 
-    results: List[Document] = Field(
-        ..., description="List of documents matching the search query"
+    results: List[DocumentSearchHit] = Field(
+        ..., description="Documents matching the search query, most relevant first"
     )
     total_count: int = Field(
         ..., description="Total number of matching documents found"
     )
+    total_count_exact: bool = Field(
+        True,
+        description=(
+            "False if counting stopped at the limit and total_count is a lower bound"
+        ),
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Pass as `cursor` to fetch the next page; null on the last page",
+    )
+
+
+# --- Ingest Schemas ---
+
+
+class DocumentIngest(BaseModel):
+    """Schema describing the text extraction of one document."""
+
+    document_id: uuid.UUID = Field(..., description="ID of the document")
+    status: IngestStatus = Field(..., description="Current state of the extraction")
+    attempts: int = Field(0, description="Number of times extraction has started")
+    chunk_count: Optional[int] = Field(
+        None, description="Number of text chunks stored once extraction completed"
+    )
+    error: Optional[str] = Field(
+        None, description="Last error, if extraction failed or was skipped"
+    )
+    updated_at: datetime = Field(..., description="Timestamp of the last status change")
+    finished_at: Optional[datetime] = Field(
+        None, description="Timestamp when extraction completed, failed or was skipped"
+    )
+
+
+class IngestQueueStats(BaseModel):
+    """Schema describing this process's document ingest workers."""
+
+    workers: int = Field(..., description="Number of extraction worker processes")
+    queued: int = Field(
+        ..., description="Documents waiting for a worker in this process"
+    )
+    running: int = Field(..., description="Documents currently being extracted")
+    backlog: bool = Field(
+        ...,
+        description="True if more documents are queued in the database than fit "
+        "in the in-memory queue",
+    )
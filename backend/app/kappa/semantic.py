@@ -0,0 +1,259 @@
+import asyncio
+import importlib.util
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from neo4j import AsyncDriver
+
+from ..core.config import settings
+from ..core.vector_index import VectorIndex, normalize_rows
+from . import crud, schemas
+
+logger = logging.getLogger(__name__)
+
+_model: Any = None
+_model_lock = threading.Lock()
+# Document embedding runs one batch at a time, so ingest bursts cannot starve
+# query embedding (which runs in the default thread pool)
+_embedding_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="kappa-embedding"
+)
+
+
+def _load_model() -> Any:
+    """The sentence embedding model, loaded on first use (CPU only)."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            # Imported here: sentence-transformers is an optional dependency
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(settings.KAPPA_EMBEDDING_MODEL, device="cpu")
+            dim = model.get_sentence_embedding_dimension()
+            if dim != settings.KAPPA_EMBEDDING_DIM:
+                raise ValueError(
+                    f"Embedding model {settings.KAPPA_EMBEDDING_MODEL} has dimension "
+                    f"{dim}, but KAPPA_EMBEDDING_DIM is {settings.KAPPA_EMBEDDING_DIM}."
+                )
+            _model = model
+            logger.info(f"Loaded embedding model {settings.KAPPA_EMBEDDING_MODEL}")
+        return _model
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    """
+    Embeds texts in batches of ``KAPPA_EMBEDDING_BATCH_SIZE``.
+
+    Returns:
+        (N, ``KAPPA_EMBEDDING_DIM``) float32 array of unit-length embeddings.
+    """
+    if not texts:
+        return np.empty((0, settings.KAPPA_EMBEDDING_DIM), dtype=np.float32)
+    embeddings = _load_model().encode(
+        list(texts),
+        batch_size=settings.KAPPA_EMBEDDING_BATCH_SIZE,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return normalize_rows(embeddings)
+
+
+def _semantic_search_enabled() -> bool:
+    if not (settings.KAPPA_VECTOR_INDEX_DIR and settings.KAPPA_EMBEDDING_MODEL):
+        return False
+    if importlib.util.find_spec("sentence_transformers") is None:
+        logger.info(
+            "Kappa semantic search disabled: sentence-transformers is not "
+            "installed (install the 'semantic' extra)."
+        )
+        return False
+    return True
+
+
+# Index of chunk embeddings (ids "<document id>:<chunk index>"), opened on
+# first use; None when semantic search is disabled. Every server process
+# indexes the documents it ingests into the same files; `VectorIndex` locks
+# them across processes and picks up the others' rows before each search.
+chunk_vector_index: Optional[VectorIndex] = (
+    VectorIndex(
+        settings.KAPPA_VECTOR_INDEX_DIR,
+        dim=settings.KAPPA_EMBEDDING_DIM,
+        nlist=settings.KAPPA_VECTOR_INDEX_LISTS,
+        nprobe=settings.KAPPA_VECTOR_INDEX_PROBES,
+    )
+    if _semantic_search_enabled()
+    else None
+)
+
+
+def _chunk_id(document_id: str, index: int) -> str:
+    return f"{document_id}:{index}"
+
+
+# --- Indexing ---
+
+
+def _index_chunks(
+    document_id: str, texts: List[str], previous_count: Optional[int]
+) -> None:
+    ids = [_chunk_id(document_id, index) for index in range(len(texts))]
+    for start in range(0, len(texts), settings.KAPPA_EMBEDDING_BATCH_SIZE * 16):
+        end = start + settings.KAPPA_EMBEDDING_BATCH_SIZE * 16
+        # Added per slice, so a long document's vectors are never all in memory
+        chunk_vector_index.add(ids[start:end], embed_texts(texts[start:end]))
+    # Chunks of an earlier, longer version of the document
+    if previous_count and previous_count > len(texts):
+        chunk_vector_index.remove(
+            [_chunk_id(document_id, i) for i in range(len(texts), previous_count)]
+        )
+
+
+async def index_document_chunks(
+    document_id: uuid.UUID,
+    chunks: List[Tuple[int, str]],
+    previous_count: Optional[int] = None,
+) -> None:
+    """
+    Embeds a document's chunks and adds them to `chunk_vector_index`,
+    replacing the vectors of an earlier ingest of the document.
+
+    Failures are logged, not raised: keyword search works without vectors.
+
+    Args:
+        document_id: The document the chunks belong to.
+        chunks: ``(start offset, text)`` pairs as stored by the ingest.
+        previous_count: Number of chunks the document had before, if any.
+    """
+    if chunk_vector_index is None:
+        return
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            _embedding_executor,
+            _index_chunks,
+            str(document_id),
+            [text for _, text in chunks],
+            previous_count,
+        )
+    except Exception as e:
+        logger.warning(
+            f"Could not index chunk embeddings of document {document_id}: {e}",
+            exc_info=True,
+        )
+
+
+# --- Search ---
+
+
+async def _semantic_candidates(
+    query: str, count: int
+) -> Tuple[List[Tuple[str, str]], bool]:
+    """
+    Documents whose chunks are nearest to the query, ignoring chunks less
+    similar than ``KAPPA_SEMANTIC_MIN_SIMILARITY``.
+
+    Returns:
+        ``(document id, best chunk id)`` pairs, best first, and whether the
+        list was cut off at ``count``.
+    """
+    query_vector = (await asyncio.to_thread(embed_texts, [query]))[0]
+    # Several chunks of one document are often among the nearest
+    wanted = count * settings.KAPPA_HYBRID_CHUNKS_PER_DOCUMENT
+    nearest = await asyncio.to_thread(chunk_vector_index.search, query_vector, wanted)
+    best_chunks: Dict[str, str] = {}
+    for chunk_id, similarity in nearest:
+        if similarity < settings.KAPPA_SEMANTIC_MIN_SIMILARITY:
+            break  # Nearest first, so the rest are unrelated too
+        best_chunks.setdefault(chunk_id.rsplit(":", 1)[0], chunk_id)
+        if len(best_chunks) == count:
+            break
+    truncated = len(best_chunks) == count or (
+        len(nearest) == wanted
+        and nearest[-1][1] >= settings.KAPPA_SEMANTIC_MIN_SIMILARITY
+    )
+    return list(best_chunks.items()), truncated
+
+
+async def hybrid_search(
+    driver: AsyncDriver,
+    query: str,
+    mode: str,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+) -> Tuple[List[schemas.DocumentSearchHit], Optional[str], int, bool]:
+    """
+    Ranks documents by meaning ("semantic") or by meaning and keywords
+    ("hybrid").
+
+    The ``KAPPA_HYBRID_CANDIDATES`` best documents of the vector index
+    (by their best chunk) and, in hybrid mode, of the full-text index are
+    merged by reciprocal rank fusion: each document scores
+    ``sum(1 / (KAPPA_HYBRID_RRF_K + rank))`` over the lists it appears in,
+    which needs no calibration between BM25 and cosine scores. Pages are
+    slices of that fused list.
+
+    Args:
+        driver: The asynchronous Neo4j driver instance.
+        query: The user's search string.
+        mode: "semantic" or "hybrid".
+        limit: Maximum number of results per page.
+        cursor: ``next_cursor`` of the previous page.
+
+    Returns:
+        A tuple of (hits, next cursor or None, total candidates, whether the
+        total is exact).
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    offset = int(crud.decode_search_cursor(cursor, mode)[0]) if cursor else 0
+    if offset < 0:
+        raise ValueError("Invalid cursor: negative offset")
+    candidates = settings.KAPPA_HYBRID_CANDIDATES
+
+    keyword_hits: List[schemas.DocumentSearchHit] = []
+    keyword_truncated = False
+    if mode == "hybrid":
+        (keyword_hits, keyword_next), (semantic, semantic_truncated) = (
+            await asyncio.gather(
+                crud.search_documents(driver, query, limit=candidates),
+                _semantic_candidates(query, candidates),
+            )
+        )
+        keyword_truncated = keyword_next is not None
+    else:
+        semantic, semantic_truncated = await _semantic_candidates(query, candidates)
+
+    rrf_k = settings.KAPPA_HYBRID_RRF_K
+    scores: Dict[str, float] = {}
+    best_chunks: Dict[str, str] = {}
+    for rank, hit in enumerate(keyword_hits, start=1):
+        scores[str(hit.id)] = 1.0 / (rrf_k + rank)
+    for rank, (document_id, chunk_id) in enumerate(semantic, start=1):
+        scores[document_id] = scores.get(document_id, 0.0) + 1.0 / (rrf_k + rank)
+        best_chunks[document_id] = chunk_id
+    fused = sorted(scores, key=lambda document_id: (-scores[document_id], document_id))
+
+    page = fused[offset : offset + limit]
+    documents = await crud.get_documents_with_snippets(
+        driver, [(document_id, best_chunks.get(document_id)) for document_id in page]
+    )
+    hits = [
+        schemas.DocumentSearchHit(
+            **documents[document_id][0].model_dump(),
+            score=scores[document_id],
+            snippet=documents[document_id][1],
+        )
+        for document_id in page
+        # Documents deleted since they were indexed
+        if document_id in documents
+    ]
+    next_cursor = (
+        crud.encode_search_cursor(mode, offset + limit, [])
+        if offset + limit < len(fused)
+        else None
+    )
+    return hits, next_cursor, len(fused), not (keyword_truncated or semantic_truncated)
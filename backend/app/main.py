@@ -8,16 +8,24 @@ from fastapi import (
 )
 from pydantic import BaseModel
 
+from .api.routes import djinn as djinn_map_view_router
 from .auth import router as auth_router  # Import the auth router
 from .auth import schemas as auth_schemas  # Import auth schemas
 from .auth.security import get_current_user_from_cookie  # Import the dependency
+from .core.process_memory import server_memory_report
 from .db.session import (
     close_driver,  # Import driver lifecycle functions
     get_driver,
 )
+from .djinn import crud as djinn_crud
 from .djinn import router as djinn_router
+from .djinn.jobs import detection_job_queue
 from .ghost import router as ghost_router
+from .kappa import crud as kappa_crud
 from .kappa import router as kappa_router
+from .kappa.ingest import document_ingest_queue
+from .services.djinn.inference.batching import detection_batcher
+from .services.djinn.inference.executor import inference_executor
 from .tesseract import router as tesseract_router
 from .users import router as users_router  # Import the users router
 
@@ -29,9 +37,26 @@ logging.basicConfig(level=logging.DEBUG)  # Set level to DEBUG
 async def lifespan(app: FastAPI):
     # Startup: Initialize Neo4j driver
     logging.info("Application startup: Initializing Neo4j driver...")
-    await get_driver()
+    driver = await get_driver()
+    try:
+        await djinn_crud.ensure_indexes(driver)
+    except Exception as e:
+        logging.error(f"Could not create Djinn indexes: {e}")
+    try:
+        await kappa_crud.ensure_indexes(driver)
+    except Exception as e:
+        logging.error(f"Could not create Kappa indexes: {e}")
+    # Pick up Djinn detection jobs left over from previous runs
+    await detection_job_queue.start(driver)
+    # ...and Kappa documents still awaiting text extraction
+    await document_ingest_queue.start(driver)
     yield
-    # Shutdown: Close Neo4j driver
+    # Shutdown: Stop the Djinn job and Kappa ingest workers, inference
+    # batcher/pool and close Neo4j driver
+    await detection_job_queue.stop()
+    await document_ingest_queue.stop()
+    await detection_batcher.stop()
+    inference_executor.shutdown()
     logging.info("Application shutdown: Closing Neo4j driver...")
     await close_driver()
 
@@ -52,6 +77,16 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/health/memory", tags=["Health Check"])
+async def memory_health_check():
+    """
+    Reports RSS/PSS of the server processes. Under `python -m app.server`
+    this includes the pre-forking parent and all workers, which shows how
+    much of the model memory is shared between them.
+    """
+    return server_memory_report()
+
+
 # --- Map Data Schemas (Temporary Location) ---
 class MapMarkerData(BaseModel):
     id: str
@@ -143,6 +178,7 @@ app.include_router(auth_router.router)  # Include the authentication router
 # TODO: Add routers for Kappa, etc. later
 app.include_router(kappa_router.router)
 app.include_router(djinn_router.router)
+app.include_router(djinn_map_view_router.router, prefix="/api/djinn", tags=["Djinn"])
 app.include_router(ghost_router.router)
 app.include_router(tesseract_router.router)
 app.include_router(users_router.router)  # Include the users router
@@ -1,6 +1,6 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class MapViewDetectionRequest(BaseModel):
@@ -35,3 +35,285 @@ class MapViewDetectionResponse(BaseModel):
     detections: List[DetectionResult] = Field(
         default_factory=list, description="List of detected objects."
     )
+
+
+# --- Schemas used by /api/djinn/detect_map_view ---
+
+
+class GeoLocation(BaseModel):
+    """A geographic point in decimal degrees."""
+
+    lat: float = Field(..., description="Latitude in decimal degrees.")
+    lng: float = Field(..., description="Longitude in decimal degrees.")
+
+
+class GroundControlPoint(BaseModel):
+    """A pixel position in the image with its known geographic location."""
+
+    px: float = Field(..., description="Pixel x-coordinate (column).")
+    py: float = Field(..., description="Pixel y-coordinate (row).")
+    lat: float = Field(..., description="Latitude in decimal degrees.")
+    lng: float = Field(..., description="Longitude in decimal degrees.")
+
+
+class TilingOptions(BaseModel):
+    """
+    Options for sliced (tiled) inference on large images. The image is split
+    into overlapping tiles that are run through the model at full resolution,
+    and duplicate detections across tile borders are merged.
+    """
+
+    tile_size: int = Field(
+        640, ge=64, le=4096, description="Edge length of each square tile in pixels."
+    )
+    overlap: float = Field(
+        0.2,
+        ge=0.0,
+        lt=0.9,
+        description="Fraction of each tile shared with its neighbours.",
+    )
+    merge_iou: float = Field(
+        0.5,
+        gt=0.0,
+        le=1.0,
+        description=(
+            "IoU above which overlapping same-class boxes from different tiles "
+            "are merged."
+        ),
+    )
+
+
+class ChangeDetectionOptions(BaseModel):
+    """
+    Options for change-aware detection of an area that is imaged repeatedly.
+    The image is aligned to the previous image of the same scene and the
+    model only runs on the regions that changed; detections elsewhere are
+    carried over from the previous pass.
+    """
+
+    scene_id: Optional[str] = Field(
+        None,
+        max_length=200,
+        description=(
+            "Identifies the scene. Defaults to one derived from the georeference "
+            "and image size."
+        ),
+    )
+    threshold: int = Field(
+        25,
+        ge=1,
+        le=255,
+        description="Gray-level difference above which a pixel counts as changed.",
+    )
+    max_changed_fraction: float = Field(
+        0.5,
+        gt=0.0,
+        le=1.0,
+        description=(
+            "If more of the image changed than this, it is re-detected in full."
+        ),
+    )
+
+
+class DjinnDetectionOptions(BaseModel):
+    """
+    Georeferencing and inference options shared by the map-view detection
+    endpoints (base64 JSON and binary upload).
+    """
+
+    bounds: Optional[Dict[str, Dict[str, float]]] = Field(
+        None,
+        description=(
+            "Leaflet-style bounds of the image: {'_southWest': {'lat', 'lng'}, "
+            "'_northEast': {'lat', 'lng'}}."
+        ),
+    )
+    geotransform: Optional[List[float]] = Field(
+        None,
+        min_length=6,
+        max_length=6,
+        description=(
+            "GDAL-style affine geotransform (x0, dx_px, dx_py, y0, dy_px, dy_py) in "
+            "lat/lng; used instead of bounds."
+        ),
+    )
+    gcps: Optional[List[GroundControlPoint]] = Field(
+        None,
+        min_length=3,
+        description=(
+            "Ground control points (3 for affine, 4+ for a homography); used instead "
+            "of bounds."
+        ),
+    )
+    include_footprints: bool = Field(
+        False, description="Also return the geographic corners of each bounding box."
+    )
+    tiling: Optional[TilingOptions] = Field(
+        None,
+        description=(
+            "Enable tiled inference for large images. Omit to run on the whole image."
+        ),
+    )
+    change_detection: Optional[ChangeDetectionOptions] = Field(
+        None,
+        description=(
+            "Only re-run detection where the scene changed since its previous image."
+        ),
+    )
+    min_confidence: float = Field(
+        0.0, ge=0.0, le=1.0, description="Drop detections below this confidence."
+    )
+    classes: Optional[List[str]] = Field(
+        None,
+        description="Only return detections of these class names (case-insensitive).",
+    )
+    deduplicate: bool = Field(
+        True,
+        description=(
+            "Merge detections that are the same object seen in overlapping views "
+            "(same class, within a few metres)."
+        ),
+    )
+
+    @model_validator(mode="after")
+    def check_georeference(self) -> "DjinnDetectionOptions":
+        if self.bounds is None and self.geotransform is None and self.gcps is None:
+            raise ValueError("One of 'bounds', 'geotransform' or 'gcps' is required.")
+        return self
+
+
+class DjinnMapViewRequest(DjinnDetectionOptions):
+    """
+    Request model for detecting objects in a captured map view.
+    """
+
+    image_data: str = Field(
+        ...,
+        description=(
+            "Base64 encoded image data string, optionally with a data URI prefix."
+        ),
+    )
+
+
+class DjinnDetectionResult(BaseModel):
+    """
+    A single object detected in a map view, located geographically.
+    """
+
+    id: str = Field(..., description="Unique identifier for this detection.")
+    class_name: str = Field(..., description="Classification label (e.g., 'car').")
+    confidence: float = Field(..., description="Model confidence score (0.0 to 1.0).")
+    location: GeoLocation = Field(
+        ..., description="Geographic location of the bounding box center."
+    )
+    footprint: Optional[List[GeoLocation]] = Field(
+        None,
+        description=(
+            "Geographic corners of the bounding box (top-left, top-right, "
+            "bottom-right, bottom-left), if requested."
+        ),
+    )
+    observation_count: int = Field(
+        1,
+        description=(
+            "Number of detections (across this and recent overlapping views) merged "
+            "into this object."
+        ),
+    )
+
+
+class DjinnDetectionResponse(BaseModel):
+    """
+    Response model for /detect_map_view.
+    """
+
+    detections: List[DjinnDetectionResult] = Field(
+        default_factory=list, description="List of detected objects."
+    )
+    inferred_fraction: Optional[float] = Field(
+        None,
+        description=(
+            "Fraction of the image's pixels run through the model (change-aware "
+            "detection only)."
+        ),
+    )
+    changed_regions: Optional[int] = Field(
+        None,
+        description=(
+            "Number of changed regions that were re-detected "
+            "(change-aware detection only)."
+        ),
+    )
+
+
+# --- Schemas used by /api/djinn/detect_tiles ---
+
+
+class DjinnTileDetectionRequest(BaseModel):
+    """
+    Request model for tile-based detection of a map viewport. The server
+    detects on the Web Mercator (z/x/y) imagery tiles covering the bounds and
+    caches results per tile, so panning only infers newly visible tiles.
+    """
+
+    bounds: Dict[str, Dict[str, float]] = Field(
+        ...,
+        description=(
+            "Leaflet-style viewport bounds: {'_southWest': {'lat', 'lng'}, "
+            "'_northEast': {'lat', 'lng'}}."
+        ),
+    )
+    zoom: int = Field(..., ge=0, le=22, description="Tile zoom level to detect at.")
+    include_footprints: bool = Field(
+        False, description="Also return the geographic corners of each bounding box."
+    )
+    min_confidence: float = Field(
+        0.0, ge=0.0, le=1.0, description="Drop detections below this confidence."
+    )
+    classes: Optional[List[str]] = Field(
+        None,
+        description="Only return detections of these class names (case-insensitive).",
+    )
+
+
+class DjinnTileDetectionResponse(DjinnDetectionResponse):
+    """
+    Response model for /detect_tiles.
+    """
+
+    tiles_total: int = Field(..., description="Tiles covering the viewport.")
+    tiles_cached: int = Field(..., description="Tiles answered from the cache.")
+    tiles_inferred: int = Field(..., description="Tiles run through the model.")
+    tiles_failed: int = Field(
+        0, description="Tiles whose imagery could not be fetched (not cached)."
+    )
+
+
+# --- Schemas used by /api/djinn/detect_video and /api/djinn/detect_stream ---
+
+
+class DjinnVideoStreamOptions(BaseModel):
+    """
+    Options for streaming video detection. Sent as the first (JSON text)
+    message on the /detect_stream WebSocket.
+    """
+
+    frame_stride: int = Field(
+        1, ge=1, le=1000, description="Run detection on every Nth frame only."
+    )
+    min_confidence: float = Field(
+        0.0, ge=0.0, le=1.0, description="Drop detections below this confidence."
+    )
+    classes: Optional[List[str]] = Field(
+        None,
+        description="Only track detections of these class names (case-insensitive).",
+    )
+    persist: bool = Field(
+        False,
+        description=(
+            "Store one DetectedObject per confirmed track when the stream ends."
+        ),
+    )
+    filename: Optional[str] = Field(
+        None, description="Name recorded for the stream when persisting."
+    )
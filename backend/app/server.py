@@ -0,0 +1,236 @@
+"""
+Pre-forking server entry point.
+
+Running ``uvicorn app.main:app --workers N`` starts N independent processes
+that each import the app and load their own copy of the YOLO weights. This
+entry point instead imports the app (and so loads the models) once in a
+parent process, warms the model up, freezes the garbage collector and only
+then forks the workers, which share the loaded weights copy-on-write and
+accept connections from one shared listening socket.
+
+Usage:
+    python -m app.server [--workers N] [--host HOST] [--port PORT]
+
+The parent restarts workers that exit unexpectedly, forwards SIGINT/SIGTERM
+to them on shutdown and periodically logs per-worker RSS/PSS (see
+``SERVER_MEMORY_LOG_INTERVAL_SECONDS`` and ``GET /health/memory``).
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Any, Dict
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from app.core.config import settings
+from app.core.process_memory import (
+    MASTER_PID_ENV,
+    format_memory,
+    read_process_memory,
+)
+
+logger = logging.getLogger("app.server")
+
+# How long workers get to finish in-flight requests on shutdown
+GRACEFUL_TIMEOUT_SECONDS = 30.0
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    """Creates the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _preload(app_path: str) -> Any:
+    """
+    Imports the ASGI app in the parent and prepares the loaded models to be
+    shared with forked workers.
+    """
+    asgi_app = import_from_string(app_path)
+
+    # Imported after the app so a custom app path controls the load order
+    from app.services.djinn.inference import detection
+
+    detection.prepare_model_for_sharing()
+
+    # Move everything allocated so far out of the collector's generations.
+    # Collections in the workers then never touch (and so never copy) the
+    # preloaded objects' pages.
+    gc.collect()
+    gc.freeze()
+    return asgi_app
+
+
+def _run_worker(asgi_app: Any, sock: socket.socket, log_level: str) -> None:
+    """Body of a forked worker process; never returns."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    exit_code = 0
+    try:
+        config = uvicorn.Config(asgi_app, log_level=log_level, lifespan="on")
+        uvicorn.Server(config).run(sockets=[sock])
+    except Exception as e:
+        logger.error(f"Worker {os.getpid()} crashed: {e}", exc_info=True)
+        exit_code = 1
+    finally:
+        # Never fall back into the parent's supervisor loop
+        os._exit(exit_code)
+
+
+def _log_memory(workers: Dict[int, int]) -> None:
+    """Logs RSS/PSS of the parent and every worker."""
+    master_memory = read_process_memory(os.getpid())
+    if master_memory is None:
+        return
+    total_rss = total_pss = 0
+    for pid in sorted(workers):
+        memory = read_process_memory(pid)
+        if memory is None:
+            continue
+        total_rss += memory.get("rss_kb", 0)
+        total_pss += memory.get("pss_kb", 0)
+        logger.info(f"Worker {pid} memory: {format_memory(memory)}")
+    logger.info(
+        f"Server memory: master {format_memory(master_memory)}; "
+        f"workers total rss={total_rss / 1024:.1f}MiB pss={total_pss / 1024:.1f}MiB"
+    )
+
+
+class PreforkSupervisor:
+    """Forks, watches and stops the worker processes."""
+
+    def __init__(
+        self, asgi_app: Any, sock: socket.socket, workers: int, log_level: str
+    ):
+        self.asgi_app = asgi_app
+        self.sock = sock
+        self.worker_count = workers
+        self.log_level = log_level
+        self.workers: Dict[int, int] = {}  # pid -> worker slot
+        self._stopping = False
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(self.asgi_app, self.sock, self.log_level)
+        self.workers[pid] = slot
+        logger.info(f"Started worker {slot} (pid {pid})")
+
+    def _handle_signal(self, signum: int, frame: Any) -> None:
+        logger.info(f"Received {signal.Signals(signum).name}, stopping workers...")
+        self._stopping = True
+
+    def _reap(self) -> None:
+        """Collects exited workers and restarts them unless shutting down."""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            slot = self.workers.pop(pid, None)
+            if slot is None:
+                continue
+            if not self._stopping:
+                logger.warning(
+                    f"Worker {slot} (pid {pid}) exited with status "
+                    f"{os.waitstatus_to_exitcode(status)}, restarting"
+                )
+                self._spawn(slot)
+
+    def _stop_workers(self) -> None:
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT_SECONDS
+        while self.workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            logger.warning(f"Worker pid {pid} did not stop in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.workers.clear()
+
+    def run(self, memory_log_interval: float) -> None:
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+
+        for slot in range(self.worker_count):
+            self._spawn(slot)
+
+        # Report once workers have started up and touched their memory
+        next_memory_log = time.monotonic() + min(10.0, memory_log_interval or 10.0)
+        while not self._stopping:
+            self._reap()
+            if memory_log_interval > 0 and time.monotonic() >= next_memory_log:
+                _log_memory(self.workers)
+                next_memory_log = time.monotonic() + memory_log_interval
+            time.sleep(0.5)
+
+        self._stop_workers()
+        logger.info("All workers stopped.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run the API with pre-forked workers sharing loaded models."
+    )
+    parser.add_argument("--app", default="app.main:app", help="ASGI app import path")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=args.log_level.upper(),
+        format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s",
+    )
+    if not hasattr(os, "fork"):
+        sys.exit("app.server requires a platform with os.fork; use uvicorn instead.")
+
+    # Workers read this to report their siblings' memory (GET /health/memory)
+    os.environ[MASTER_PID_ENV] = str(os.getpid())
+    # Read while preloading, e.g. to share the cores out among the workers
+    settings.SERVER_WORKERS = max(1, args.workers)
+
+    logger.info(f"Preloading {args.app} in the parent process...")
+    asgi_app = _preload(args.app)
+    master_memory = read_process_memory(os.getpid())
+    if master_memory is not None:
+        logger.info(f"Preloaded parent memory: {format_memory(master_memory)}")
+
+    sock = _bind_socket(args.host, args.port)
+    logger.info(
+        f"Listening on {args.host}:{args.port} with {args.workers} forked workers"
+    )
+    try:
+        PreforkSupervisor(asgi_app, sock, settings.SERVER_WORKERS, args.log_level).run(
+            settings.SERVER_MEMORY_LOG_INTERVAL_SECONDS
+        )
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,595 @@
+# backend/app/services/djinn/inference/backends.py
+
+import ast
+import copy
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .results import DetectionBatch, non_max_suppression
+
+logger = logging.getLogger(__name__)
+
+# Post-processing defaults, matching the Ultralytics predictor
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+DEFAULT_IMGSZ = 640
+
+BACKEND_NAMES = ("ultralytics", "onnxruntime", "openvino")
+
+
+class InferenceBackend:
+    """
+    A loaded detection model behind `run_yolo_detection`.
+
+    Subclasses run a batch of BGR images and return one `DetectionBatch` per
+    image in original image pixel coordinates.
+
+    Attributes:
+        name: Backend identifier (one of ``BACKEND_NAMES``).
+        model_path: Path of the loaded weights/model file.
+    """
+
+    name = ""
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+
+    @property
+    def names(self) -> Dict[int, str]:
+        """The model's class id to class name mapping."""
+        raise NotImplementedError
+
+    def predict(
+        self, images: List[np.ndarray], imgsz: Optional[int] = None
+    ) -> List[DetectionBatch]:
+        """
+        Runs detection on a batch of images.
+
+        Args:
+            images: A list of NumPy arrays (BGR).
+            imgsz: Optional model input size; defaults to the model's own.
+
+        Returns:
+            One `DetectionBatch` per input image, in the same order.
+        """
+        raise NotImplementedError
+
+    def worker_copy(self, share_weights: bool) -> "InferenceBackend":
+        """
+        Returns the instance an inference worker thread should use.
+
+        Args:
+            share_weights: Reuse this instance's loaded weights instead of
+                           loading a separate copy.
+        """
+        return self
+
+    def prepare_for_fork(self) -> None:
+        """Makes the loaded model safe to share with forked worker processes."""
+
+
+# --- Pre/post-processing (shared by all backends) ---
+
+# Letterbox buffers kept per thread, so preprocessing does not allocate a
+# new canvas and tensor for every request
+_buffers = threading.local()
+_MAX_BUFFERS_PER_THREAD = 4
+
+
+class PreprocessMeta:
+    """
+    How one image was letterboxed into the model input, so boxes in model
+    input pixels can be mapped back exactly to the original image.
+
+    Attributes:
+        gain: Scale factor from original to model input pixels.
+        pad: (pad_x, pad_y) offset of the image on the canvas.
+        shape: (height, width) of the original image.
+    """
+
+    __slots__ = ("gain", "pad", "shape")
+
+    def __init__(self, gain: float, pad: Tuple[int, int], shape: Tuple[int, int]):
+        self.gain = gain
+        self.pad = pad
+        self.shape = shape
+
+    def to_original(self, boxes: np.ndarray) -> np.ndarray:
+        """Maps (N, 4) model input boxes to original pixels, clipped, in place."""
+        pad_x, pad_y = self.pad
+        height, width = self.shape
+        boxes -= np.array([pad_x, pad_y, pad_x, pad_y], dtype=boxes.dtype)
+        boxes /= self.gain
+        np.clip(boxes[:, 0::2], 0, width, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, height, out=boxes[:, 1::2])
+        return boxes
+
+
+def _reusable_buffer(name: str, shape: Tuple[int, ...], dtype: Any) -> np.ndarray:
+    """A per-thread array of the given shape, reused across calls."""
+    cache = getattr(_buffers, "arrays", None)
+    if cache is None:
+        cache = _buffers.arrays = {}
+    key = (name, shape)
+    buffer = cache.pop(key, None)
+    if buffer is None:
+        buffer = np.empty(shape, dtype=dtype)
+        # A few shapes (square and common aspect ratios) cover most traffic
+        while len(cache) >= _MAX_BUFFERS_PER_THREAD:
+            cache.pop(next(iter(cache)))
+    cache[key] = buffer  # Most recently used last
+    return buffer
+
+
+def letterbox(
+    image: np.ndarray,
+    shape: Tuple[int, int],
+    scale_to: Optional[int] = None,
+    out: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    Resizes an image to fit a (height, width) canvas, keeping its aspect
+    ratio, and pads the rest with gray (114), like the Ultralytics
+    preprocessing.
+
+    Args:
+        image: The BGR image.
+        shape: (height, width) of the model input.
+        scale_to: Scale the longer image side to this size (default: fit
+                  ``shape``).
+        out: Optional (height, width, 3) uint8 buffer to write into.
+
+    Returns:
+        A tuple of (padded image, scale factor, (pad_x, pad_y)).
+    """
+    height, width = image.shape[:2]
+    gain = (
+        scale_to / max(height, width)
+        if scale_to
+        else min(shape[0] / height, shape[1] / width)
+    )
+    new_w, new_h = int(round(width * gain)), int(round(height * gain))
+    pad_x, pad_y = (shape[1] - new_w) / 2, (shape[0] - new_h) / 2
+    left, top = int(round(pad_x - 0.1)), int(round(pad_y - 0.1))
+
+    if out is None:
+        out = np.empty((shape[0], shape[1], 3), dtype=np.uint8)
+    # Only the padding is filled; the image is resized straight into the canvas
+    out[:top] = 114
+    out[top + new_h :] = 114
+    out[top : top + new_h, :left] = 114
+    out[top : top + new_h, left + new_w :] = 114
+    target = out[top : top + new_h, left : left + new_w]
+    if (new_w, new_h) == (width, height):
+        target[...] = image
+    else:
+        resized = cv2.resize(
+            image, (new_w, new_h), dst=target, interpolation=cv2.INTER_LINEAR
+        )
+        if resized is not target and not np.shares_memory(resized, target):
+            target[...] = resized
+    return out, gain, (left, top)
+
+
+def preprocess_batch(
+    images: List[np.ndarray],
+    imgsz: int,
+    rect: bool = False,
+    reuse_buffers: bool = False,
+) -> Tuple[np.ndarray, List[PreprocessMeta]]:
+    """
+    Letterboxes BGR images into one normalized (B, 3, H, W) float32 RGB
+    tensor.
+
+    Args:
+        images: The BGR images.
+        imgsz: Model input size (the longer side for ``rect``).
+        rect: Pad only up to the next multiple of the model stride (32)
+              instead of a full ``imgsz`` square, as Ultralytics does for
+              PyTorch models. Needs a model exported with dynamic shapes.
+        reuse_buffers: Write into this thread's cached buffers instead of
+                       new arrays. The returned tensor is then only valid
+                       until the thread's next call.
+
+    Returns:
+        A tuple of (tensor, per-image `PreprocessMeta`).
+    """
+    shape = (imgsz, imgsz)
+    if rect:
+        # Smallest stride-aligned canvas that fits every scaled image
+        scaled = [
+            (h * imgsz / max(h, w), w * imgsz / max(h, w))
+            for h, w in (image.shape[:2] for image in images)
+        ]
+        shape = (
+            int(np.ceil(max(h for h, _ in scaled) / 32.0)) * 32,
+            int(np.ceil(max(w for _, w in scaled) / 32.0)) * 32,
+        )
+
+    canvas_shape = (len(images), shape[0], shape[1], 3)
+    tensor_shape = (len(images), 3, shape[0], shape[1])
+    if reuse_buffers:
+        canvas = _reusable_buffer("canvas", canvas_shape, np.uint8)
+        tensor = _reusable_buffer("tensor", tensor_shape, np.float32)
+    else:
+        canvas = np.empty(canvas_shape, dtype=np.uint8)
+        tensor = np.empty(tensor_shape, dtype=np.float32)
+
+    scale = np.float32(1.0 / 255.0)
+    meta = []
+    for i, image in enumerate(images):
+        _, gain, pad = letterbox(
+            image, shape, scale_to=imgsz if rect else None, out=canvas[i]
+        )
+        meta.append(PreprocessMeta(gain, pad, image.shape[:2]))
+        # BGR -> RGB planes (NHWC -> NCHW), uint8 -> [0, 1], written in place;
+        # contiguous planes convert much faster than a strided transpose
+        blue, green, red = cv2.split(canvas[i])
+        for channel, plane in enumerate((red, green, blue)):
+            np.multiply(plane, scale, out=tensor[i, channel], casting="unsafe")
+    return tensor, meta
+
+
+def postprocess_output(
+    output: np.ndarray,
+    meta: List[PreprocessMeta],
+    names: Dict[int, str],
+    conf_threshold: float = CONF_THRESHOLD,
+    iou_threshold: float = IOU_THRESHOLD,
+    max_detections: int = MAX_DETECTIONS,
+) -> List[DetectionBatch]:
+    """
+    Decodes raw YOLOv8 detection head output into per-image detections.
+
+    Args:
+        output: (B, 4 + num_classes, num_anchors) array of [cx, cy, w, h,
+                class scores...] in model input pixels.
+        meta: Per-image `PreprocessMeta` from `preprocess_batch`.
+        names: The model's class id to class name mapping.
+
+    Returns:
+        One `DetectionBatch` per image in original image pixel coordinates.
+    """
+    batches = []
+    for prediction, image_meta in zip(output, meta):
+        prediction = prediction.T  # (num_anchors, 4 + num_classes)
+        scores = prediction[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences > conf_threshold
+        if not keep.any():
+            batches.append(DetectionBatch.empty(names))
+            continue
+
+        cx, cy, w, h = prediction[keep, :4].T
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        confidences, class_ids = confidences[keep], class_ids[keep]
+
+        order = _nms(boxes, confidences, class_ids, iou_threshold)[:max_detections]
+        # Undo the letterbox: remove padding, rescale, clip to the image
+        boxes = image_meta.to_original(boxes[order])
+        batches.append(
+            DetectionBatch(boxes, confidences[order], class_ids[order], names)
+        )
+    return batches
+
+
+def _nms(
+    boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, iou_threshold: float
+) -> np.ndarray:
+    """
+    Class-aware NMS on raw model candidates (often thousands per image), using
+    OpenCV's native implementation where available.
+    """
+    if hasattr(cv2.dnn, "NMSBoxesBatched"):
+        xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+        keep = cv2.dnn.NMSBoxesBatched(
+            xywh.tolist(), scores.tolist(), class_ids.tolist(), 0.0, iou_threshold
+        )
+        keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+        return keep[np.argsort(-scores[keep], kind="stable")]
+    return non_max_suppression(boxes, scores, class_ids, iou_threshold)
+
+
+class UltralyticsBackend(InferenceBackend):
+    """The stock Ultralytics/PyTorch path (any format ``YOLO()`` can load)."""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path: str):
+        from ultralytics import YOLO
+
+        super().__init__(model_path)
+        self.model = YOLO(model_path)
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self.model.names
+
+    def predict(
+        self, images: List[np.ndarray], imgsz: Optional[int] = None
+    ) -> List[DetectionBatch]:
+        import torch
+
+        if not images:
+            return []
+        # The model gets a ready, normalized tensor: letterboxing (rect, like
+        # Ultralytics' own) reuses this thread's buffers, and the boxes are
+        # mapped back with the recorded scale/padding
+        tensor, meta = preprocess_batch(
+            images, imgsz or DEFAULT_IMGSZ, rect=True, reuse_buffers=True
+        )
+        # Run prediction (verbose=False reduces console output)
+        results = self.model.predict(torch.from_numpy(tensor), verbose=False)
+        return [
+            self._parse_result(result, image_meta)
+            for result, image_meta in zip(results, meta)
+        ]
+
+    def _parse_result(self, result, meta: PreprocessMeta) -> DetectionBatch:
+        """Converts a single Ultralytics ``Results`` object into a columnar batch."""
+        # Check if results are valid and contain boxes
+        if not result or not result.boxes or result.boxes.data is None:
+            logger.info("No detections found or results format unexpected.")
+            return DetectionBatch.empty(self.names)
+
+        # result.boxes.data is an (N, 6) tensor of [x1, y1, x2, y2, conf, cls]
+        # in model input pixels; copy it to the CPU once for all boxes
+        data = result.boxes.data.cpu().numpy()
+        meta.to_original(data[:, :4])
+        return DetectionBatch.from_array(data, self.names)
+
+    def worker_copy(self, share_weights: bool) -> "UltralyticsBackend":
+        # Ultralytics predictors keep per-call state and are not thread-safe
+        if not share_weights:
+            return UltralyticsBackend(self.model_path)
+        # Shallow copy: same nn.Module (weights), separate predictor state
+        clone = copy.copy(self)
+        clone.model = copy.copy(self.model)
+        clone.model.predictor = None
+        return clone
+
+    def prepare_for_fork(self) -> None:
+        """
+        Runs one warm-up prediction so that the in-place work Ultralytics does
+        on first use (Conv+BN fusion, memory-format conversion) happens once,
+        before any worker exists. The warm-up uses a single torch thread so no
+        OpenMP thread pool is started in a process that is about to fork.
+        """
+        import torch
+
+        previous_threads = torch.get_num_threads()
+        torch.set_num_threads(1)
+        try:
+            self.model.predict(
+                np.zeros((64, 64, 3), dtype=np.uint8), imgsz=64, verbose=False
+            )
+        finally:
+            torch.set_num_threads(previous_threads)
+        self.model.predictor = None  # Drop the warm-up predictor (and its buffers)
+
+
+def _parse_names(value: Any) -> Dict[int, str]:
+    """Parses Ultralytics export metadata names ("{0: 'person', ...}")."""
+    if isinstance(value, str):
+        value = ast.literal_eval(value)
+    return {int(k): str(v) for k, v in dict(value or {}).items()}
+
+
+# --- Exported model backends ---
+
+
+class _ExportedModelBackend(InferenceBackend):
+    """
+    Shared pre/post-processing for models exported by Ultralytics
+    (``yolo export format=onnx|openvino``). Subclasses only run the raw
+    network. Runtime sessions are created lazily on first use, so a
+    pre-forking parent never starts runtime thread pools before forking.
+    """
+
+    def __init__(self, model_path: str):
+        super().__init__(model_path)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._names: Dict[int, str] = {}
+        # Fixed input geometry of the exported graph, None where dynamic
+        self._fixed_batch: Optional[int] = None
+        self._fixed_imgsz: Optional[int] = None
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self) -> None:
+        raise NotImplementedError
+
+    def _run(self, tensor: np.ndarray) -> np.ndarray:
+        """Runs the network on a (B, 3, H, W) tensor, returning the raw output."""
+        raise NotImplementedError
+
+    @property
+    def names(self) -> Dict[int, str]:
+        self._ensure_loaded()
+        return self._names
+
+    def predict(
+        self, images: List[np.ndarray], imgsz: Optional[int] = None
+    ) -> List[DetectionBatch]:
+        self._ensure_loaded()
+        if not images:
+            return []
+        imgsz = self._fixed_imgsz or imgsz or DEFAULT_IMGSZ
+        step = self._fixed_batch or len(images)
+
+        results: List[DetectionBatch] = []
+        for start in range(0, len(images), step):
+            chunk = images[start : start + step]
+            tensor, meta = preprocess_batch(
+                chunk, imgsz, rect=self._fixed_imgsz is None, reuse_buffers=True
+            )
+            if self._fixed_batch and len(chunk) < self._fixed_batch:
+                padding = np.zeros(
+                    (self._fixed_batch - len(chunk),) + tensor.shape[1:], tensor.dtype
+                )
+                tensor = np.concatenate([tensor, padding])
+            output = self._run(tensor)[: len(chunk)]
+            results.extend(postprocess_output(output, meta, self._names))
+        return results
+
+    def _set_input_shape(self, shape: List[Any]) -> None:
+        """Records fixed batch/size dimensions from the graph input shape."""
+        if len(shape) == 4:
+            self._fixed_batch = shape[0] if isinstance(shape[0], int) else None
+            self._fixed_imgsz = shape[2] if isinstance(shape[2], int) else None
+
+
+class OnnxRuntimeBackend(_ExportedModelBackend):
+    """
+    ONNX Runtime CPU backend for ``.onnx`` exports, including INT8 models
+    produced by `quantization.quantize_onnx_model`.
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path: str, intra_op_threads: int, inter_op_threads: int):
+        super().__init__(model_path)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+
+    def _load(self) -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError(
+                "The onnxruntime backend requires the 'onnx' extra "
+                "(poetry install -E onnx)."
+            )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self._set_input_shape(model_input.shape)
+        metadata = self._session.get_modelmeta().custom_metadata_map
+        self._names = _parse_names(metadata.get("names"))
+        logger.info(
+            f"Loaded ONNX model {self.model_path} (intra_op_threads="
+            f"{self.intra_op_threads}, inter_op_threads={self.inter_op_threads})"
+        )
+
+    def _run(self, tensor: np.ndarray) -> np.ndarray:
+        # InferenceSession.run is thread-safe, so workers share one session
+        return self._session.run(None, {self._input_name: tensor})[0]
+
+
+class OpenVINOBackend(_ExportedModelBackend):
+    """
+    OpenVINO CPU backend for OpenVINO IR exports (a ``*_openvino_model``
+    directory or its ``.xml`` file).
+    """
+
+    name = "openvino"
+
+    def __init__(self, model_path: str, threads: int):
+        super().__init__(model_path)
+        self.threads = threads
+        self._compiled = None
+        self._requests = threading.local()
+
+    def _load(self) -> None:
+        try:
+            import openvino as ov
+        except ImportError:
+            raise RuntimeError(
+                "The openvino backend requires the 'openvino' extra "
+                "(poetry install -E openvino)."
+            )
+
+        xml_path = self.model_path
+        if os.path.isdir(xml_path):
+            xml_files = [f for f in os.listdir(xml_path) if f.endswith(".xml")]
+            if not xml_files:
+                raise FileNotFoundError(f"No OpenVINO .xml model in {xml_path}")
+            xml_path = os.path.join(xml_path, xml_files[0])
+
+        core = ov.Core()
+        network = core.read_model(xml_path)
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if self.threads > 0:
+            config["INFERENCE_NUM_THREADS"] = self.threads
+        self._compiled = core.compile_model(network, "CPU", config)
+        partial_shape = network.inputs[0].get_partial_shape()
+        self._set_input_shape(
+            [dim.get_length() if dim.is_static else None for dim in partial_shape]
+        )
+        self._names = self._read_names(os.path.dirname(xml_path), network)
+        logger.info(f"Loaded OpenVINO model {xml_path} (threads={self.threads})")
+
+    @staticmethod
+    def _read_names(model_dir: str, network: Any) -> Dict[int, str]:
+        """Class names from the export's metadata.yaml, else the IR rt_info."""
+        metadata_path = os.path.join(model_dir, "metadata.yaml")
+        if os.path.exists(metadata_path):
+            import yaml
+
+            with open(metadata_path) as f:
+                return _parse_names((yaml.safe_load(f) or {}).get("names"))
+        try:
+            return _parse_names(network.get_rt_info(["model_info", "names"]).value)
+        except Exception:
+            return {}
+
+    def _run(self, tensor: np.ndarray) -> np.ndarray:
+        # Infer requests are not thread-safe; each worker thread keeps its own
+        request = getattr(self._requests, "request", None)
+        if request is None:
+            request = self._requests.request = self._compiled.create_infer_request()
+        request.infer({0: tensor})
+        return request.get_output_tensor(0).data.copy()
+
+
+def load_backend(
+    backend: str,
+    model_path: str,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 1,
+) -> InferenceBackend:
+    """
+    Creates an inference backend.
+
+    Args:
+        backend: One of ``BACKEND_NAMES``.
+        model_path: Weights for the backend (``.pt`` for ultralytics, ``.onnx``
+                    for onnxruntime, an IR directory or ``.xml`` for openvino).
+        intra_op_threads: Threads used within one operator (0 = runtime default).
+        inter_op_threads: Threads used across independent operators
+                          (onnxruntime only).
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    if backend == "ultralytics":
+        return UltralyticsBackend(model_path)
+    if backend == "onnxruntime":
+        return OnnxRuntimeBackend(model_path, intra_op_threads, inter_op_threads)
+    if backend == "openvino":
+        return OpenVINOBackend(model_path, intra_op_threads)
+    raise ValueError(
+        f"Unknown inference backend '{backend}'. Expected one of {BACKEND_NAMES}."
+    )
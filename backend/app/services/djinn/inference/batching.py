@@ -0,0 +1,171 @@
+# backend/app/services/djinn/inference/batching.py
+
+import asyncio
+import logging
+from typing import Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+from .detection import run_yolo_detection_batch
+from .executor import InferenceExecutor, InferenceQueueFull, inference_executor
+from .results import DetectionBatch
+
+logger = logging.getLogger(__name__)
+
+BatchPredictFn = Callable[[List[np.ndarray]], List[DetectionBatch]]
+
+
+class InferenceBatcher:
+    """
+    Collects concurrent detection requests into micro-batches.
+
+    Callers `await submit(image)`; the batcher waits up to ``max_wait_ms`` for
+    more requests to arrive (or until ``max_batch_size`` images are queued),
+    runs one batched predict call for all of them on the inference executor,
+    and resolves each caller's future with its own detections.
+
+    Up to ``executor.max_workers`` batches run concurrently. While all workers
+    are busy, new requests keep queueing (bounded by ``max_queue``) and are
+    picked up as larger batches once a worker frees up.
+    """
+
+    def __init__(
+        self,
+        predict_batch: BatchPredictFn,
+        max_batch_size: int,
+        max_wait_ms: float,
+        executor: InferenceExecutor,
+        max_queue: int,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000.0
+        self.executor = executor
+        self.max_queue = max(1, max_queue)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        """Lazily creates the queue and collector task on the running loop."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.executor.max_workers)
+            self._worker = asyncio.create_task(self._collect_batches())
+            logger.info(
+                f"Inference batcher started (max_batch_size={self.max_batch_size}, "
+                f"max_wait_ms={self.max_wait_seconds * 1000:.1f})"
+            )
+        return self._queue
+
+    async def submit(self, image_np: np.ndarray) -> DetectionBatch:
+        """
+        Queues an image for detection and waits for its results.
+
+        Args:
+            image_np: A NumPy array representing the input image (BGR).
+
+        Returns:
+            The `DetectionBatch` for this image.
+
+        Raises:
+            InferenceQueueFull: If too many images are already waiting.
+        """
+        queue = self._ensure_worker()
+        if queue.qsize() >= self.max_queue:
+            raise InferenceQueueFull(
+                f"Detection batch queue is full ({queue.qsize()} images waiting)."
+            )
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await queue.put((image_np, future))
+        return await future
+
+    async def stop(self) -> None:
+        """Cancels the collector task. Pending callers receive a cancellation."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        # Let batches that are already running on the executor finish
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+            self._queue = None
+        logger.info("Inference batcher stopped.")
+
+    async def _collect_batches(self) -> None:
+        """Main loop: wait for a free worker, gather a batch, then dispatch it."""
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        slots = self._slots
+        while True:
+            await slots.acquire()
+            try:
+                batch: List[Tuple[np.ndarray, asyncio.Future]] = [await queue.get()]
+            except asyncio.CancelledError:
+                slots.release()
+                raise
+            deadline = loop.time() + self.max_wait_seconds
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task) -> None:
+        self._batch_tasks.discard(task)
+        self._slots.release()
+
+    async def _run_batch(self, batch: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        """Runs one batched predict on the executor and fans out the results."""
+        # Callers that gave up (e.g. client disconnected) are dropped from the batch
+        batch = [(image, future) for image, future in batch if not future.done()]
+        if not batch:
+            return
+
+        images = [image for image, _ in batch]
+        logger.debug(f"Running batched detection on {len(images)} image(s)")
+        try:
+            results = await self.executor.run(self.predict_batch, images)
+        except Exception as e:
+            logger.error(f"Batched detection failed: {e}", exc_info=True)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), detections in zip(batch, results):
+            if not future.done():
+                future.set_result(detections)
+
+
+# Shared batcher used by the Djinn API routes
+detection_batcher = InferenceBatcher(
+    predict_batch=run_yolo_detection_batch,
+    max_batch_size=settings.DJINN_BATCH_MAX_SIZE,
+    max_wait_ms=settings.DJINN_BATCH_WINDOW_MS,
+    executor=inference_executor,
+    max_queue=settings.DJINN_INFERENCE_QUEUE_SIZE,
+)
@@ -0,0 +1,544 @@
+# backend/app/services/djinn/inference/benchmark.py
+
+"""
+Micro-benchmarks of the Djinn detection path, stage by stage, with a
+regression check against a saved baseline.
+
+The stages timed separately are the ones a request to `run_yolo_detection`
+or `/detect_map_view` goes through:
+
+- ``decode``: JPEG bytes to a BGR array (`decode_image_bytes`).
+- ``preprocess``: letterboxing a batch into the model input tensor.
+- ``predict``: the model forward pass alone, on a ready tensor.
+- ``postprocess``: decoding raw head output (score filter, NMS, un-letterbox)
+  with a controlled number of candidate boxes per image.
+- ``geo``: converting detection centers to lat/lng (`GeoTransform`).
+- ``detect``: the whole ``backend.predict`` call, as the request path runs it.
+
+All inputs are synthetic (seeded), so runs on the same machine are
+comparable and no sample data is needed.
+
+Usage:
+    # Sweep and save the results
+    python -m app.services.djinn.inference.benchmark run --output bench.json
+
+    # Same, then fail (exit 1) if p50/p95 regressed against a baseline
+    python -m app.services.djinn.inference.benchmark run \\
+        --output bench.json --baseline baseline.json --max-regression 0.15
+
+    # Compare two saved result files
+    python -m app.services.djinn.inference.benchmark compare baseline.json bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.djinn.utils.georeference import GeoTransform
+from app.services.djinn.utils.image_processing import decode_image_bytes
+
+from .backends import (
+    DEFAULT_IMGSZ,
+    InferenceBackend,
+    UltralyticsBackend,
+    _ExportedModelBackend,
+    load_backend,
+    postprocess_output,
+    preprocess_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+# Version of the result file layout, checked by the comparison
+RESULT_FORMAT = 1
+STAGES = ("decode", "preprocess", "predict", "postprocess", "geo", "detect")
+# Synthetic model head: COCO-sized class count and a 640px anchor grid
+SYNTHETIC_CLASSES = 80
+# Leaflet-style bounds of the synthetic imagery (a ~1 km area)
+SYNTHETIC_BOUNDS = {
+    "_southWest": {"lat": 51.5000, "lng": -0.1300},
+    "_northEast": {"lat": 51.5090, "lng": -0.1160},
+}
+
+# One timed case: (stage, parameters) -> statistics
+Case = Dict[str, Any]
+
+
+# --- Synthetic inputs ---
+
+
+def synthetic_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """
+    A BGR image with gradients, shapes and sensor-like noise, so JPEG
+    encoding and decoding cost about what real imagery costs (pure noise or
+    flat images are far from it in both directions).
+    """
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = np.stack(
+        [
+            96 + 64 * np.sin(xs / 97.0),
+            96 + 64 * np.cos(ys / 61.0),
+            96 + 48 * np.sin((xs + ys) / 143.0),
+        ],
+        axis=2,
+    )
+    for _ in range(max(8, width * height // 20000)):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = int(rng.integers(8, 120)), int(rng.integers(8, 120))
+        color = rng.integers(0, 256, 3).tolist()
+        if rng.random() < 0.5:
+            cv2.rectangle(image, (x, y), (x + w, y + h), color, -1)
+        else:
+            cv2.ellipse(image, (x, y), (w // 2, h // 2), 0, 0, 360, color, -1)
+    image += rng.normal(0, 6, image.shape).astype(np.float32)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def synthetic_head_output(
+    batch: int, imgsz: int, candidates: int, seed: int = 0
+) -> np.ndarray:
+    """
+    Raw YOLOv8 head output (B, 4 + classes, anchors) for an ``imgsz`` input
+    in which ``candidates`` anchors per image score above the confidence
+    threshold, i.e. reach NMS.
+    """
+    rng = np.random.default_rng(seed)
+    anchors = sum((imgsz // stride) ** 2 for stride in (8, 16, 32))
+    candidates = min(candidates, anchors)
+    output = np.empty((batch, 4 + SYNTHETIC_CLASSES, anchors), dtype=np.float32)
+    output[:, 0:2] = rng.uniform(0, imgsz, (batch, 2, anchors))
+    output[:, 2:4] = rng.uniform(8, imgsz / 8, (batch, 2, anchors))
+    output[:, 4:] = rng.uniform(0, 0.2, (batch, SYNTHETIC_CLASSES, anchors))
+    for i in range(batch):
+        chosen = rng.choice(anchors, candidates, replace=False)
+        classes = rng.integers(0, SYNTHETIC_CLASSES, candidates)
+        output[i, 4 + classes, chosen] = rng.uniform(0.3, 1.0, candidates)
+    return output
+
+
+# --- Timing ---
+
+
+def time_case(
+    fn: Callable[[], Any], iterations: int, warmup: int, min_time: float
+) -> Dict[str, float]:
+    """
+    Times ``fn`` after ``warmup`` untimed calls, for at least ``iterations``
+    calls and ``min_time`` seconds.
+
+    Returns:
+        Latency statistics in milliseconds.
+    """
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < iterations or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies = np.asarray(latencies)
+    return {
+        "iterations": len(latencies),
+        "mean_ms": float(latencies.mean()),
+        "min_ms": float(latencies.min()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def case_key(case: Case) -> str:
+    """Identifies a case across runs, e.g. "predict batch=4 imgsz=640 threads=2"."""
+    params = " ".join(
+        f"{name}={value}" for name, value in sorted(case["params"].items())
+    )
+    return f"{case['stage']} {params}".strip()
+
+
+def _set_threads(threads: int) -> None:
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def _forward_fn(backend: InferenceBackend) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    The bare model forward pass of a backend: (B, 3, H, W) float32 tensor in,
+    raw (B, 4 + classes, anchors) head output out.
+    """
+    if isinstance(backend, _ExportedModelBackend):
+        backend._ensure_loaded()
+        return backend._run
+    if isinstance(backend, UltralyticsBackend):
+        import torch
+
+        # Run one prediction so Ultralytics fuses and prepares the module
+        backend.predict([np.zeros((64, 64, 3), dtype=np.uint8)], 64)
+        module = backend.model.model.eval()
+        parameter = next(module.parameters())
+
+        def forward(tensor: np.ndarray) -> np.ndarray:
+            with torch.inference_mode():
+                inputs = torch.from_numpy(tensor).to(parameter.device, parameter.dtype)
+                output = module(inputs)
+            output = output[0] if isinstance(output, (list, tuple)) else output
+            return output.float().cpu().numpy()
+
+        return forward
+    raise ValueError(f"Cannot time the forward pass of backend '{backend.name}'.")
+
+
+# --- Benchmark ---
+
+
+def run_benchmark(
+    backend_name: str,
+    model_path: str,
+    sizes: List[Tuple[int, int]],
+    batch_sizes: List[int],
+    thread_counts: List[int],
+    densities: List[int],
+    imgsz: int = DEFAULT_IMGSZ,
+    stages: Tuple[str, ...] = STAGES,
+    iterations: int = 20,
+    warmup: int = 3,
+    min_time: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    Sweeps the stages over image sizes, batch sizes, thread counts and
+    detection densities.
+
+    Args:
+        backend_name: Inference backend for the model stages.
+        model_path: Model for ``backend_name``.
+        sizes: (width, height) of the synthetic images.
+        batch_sizes: Images per model call.
+        thread_counts: Intra-op threads (torch, OpenCV and the runtimes).
+        densities: Candidate boxes per image reaching NMS / converted to geo.
+        imgsz: Model input size.
+        stages: Subset of `STAGES` to run.
+        iterations: Minimum timed calls per case.
+        warmup: Untimed calls per case.
+        min_time: Minimum timed seconds per case.
+
+    Returns:
+        A JSON-serializable result with the environment and one entry per case.
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages {sorted(unknown)}. Expected {STAGES}.")
+    images = {
+        (width, height): synthetic_image(width, height, seed=i)
+        for i, (width, height) in enumerate(sizes)
+    }
+    results: List[Case] = []
+
+    def record(stage: str, params: Dict[str, Any], fn: Callable[[], Any]) -> None:
+        stats = time_case(fn, iterations, warmup, min_time)
+        case = {"stage": stage, "params": params, **stats}
+        results.append(case)
+        logger.info(
+            f"{case_key(case)}: p50 {stats['p50_ms']:.2f} ms, "
+            f"p95 {stats['p95_ms']:.2f} ms"
+        )
+
+    # Stages that do not depend on the model run single-threaded, so they
+    # measure the code rather than the thread pool
+    _set_threads(1)
+    if "decode" in stages:
+        for (width, height), image in images.items():
+            _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            data = encoded.tobytes()
+            record(
+                "decode",
+                {"width": width, "height": height},
+                lambda data=data: decode_image_bytes(data),
+            )
+    if "preprocess" in stages:
+        for (width, height), image in images.items():
+            for batch in batch_sizes:
+                record(
+                    "preprocess",
+                    {"width": width, "height": height, "batch": batch, "imgsz": imgsz},
+                    lambda chunk=[image] * batch: preprocess_batch(chunk, imgsz),
+                )
+    if "postprocess" in stages:
+        names = {i: str(i) for i in range(SYNTHETIC_CLASSES)}
+        for batch in batch_sizes:
+            # Letterbox metadata of the largest size, scaled to a square input
+            _, meta = preprocess_batch([images[sizes[-1]]] * batch, imgsz)
+            for density in densities:
+                output = synthetic_head_output(batch, imgsz, density)
+                record(
+                    "postprocess",
+                    {"batch": batch, "density": density, "imgsz": imgsz},
+                    lambda output=output, meta=meta: postprocess_output(
+                        output, meta, names
+                    ),
+                )
+    if "geo" in stages:
+        width, height = sizes[-1]
+        transform = GeoTransform.from_bounds(SYNTHETIC_BOUNDS, width, height)
+        rng = np.random.default_rng(0)
+        for density in densities:
+            px = rng.uniform(0, width, density)
+            py = rng.uniform(0, height, density)
+            record(
+                "geo",
+                {"density": density},
+                lambda px=px, py=py: transform.pixel_to_geo(px, py),
+            )
+
+    if {"predict", "detect"} & set(stages):
+        for threads in thread_counts:
+            _set_threads(threads)
+            backend = load_backend(backend_name, model_path, intra_op_threads=threads)
+            if "predict" in stages:
+                forward = _forward_fn(backend)
+                for batch in batch_sizes:
+                    tensor, _ = preprocess_batch([images[sizes[0]]] * batch, imgsz)
+                    record(
+                        "predict",
+                        {"batch": batch, "imgsz": imgsz, "threads": threads},
+                        lambda tensor=tensor: forward(tensor),
+                    )
+            if "detect" in stages:
+                for (width, height), image in images.items():
+                    for batch in batch_sizes:
+                        record(
+                            "detect",
+                            {
+                                "width": width,
+                                "height": height,
+                                "batch": batch,
+                                "threads": threads,
+                            },
+                            lambda chunk=[image] * batch: backend.predict(chunk, imgsz),
+                        )
+            del backend
+
+    return {
+        "format": RESULT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": _environment(backend_name, model_path),
+        "results": results,
+    }
+
+
+def _environment(backend_name: str, model_path: str) -> Dict[str, Any]:
+    """Versions and hardware that results are only comparable within."""
+    environment = {
+        "backend": backend_name,
+        "model": model_path,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+    for module in ("torch", "ultralytics", "onnxruntime", "openvino"):
+        imported = sys.modules.get(module)
+        if imported is not None:
+            environment[module] = getattr(imported, "__version__", "unknown")
+    return environment
+
+
+# --- Comparison ---
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    max_regression: float = 0.10,
+    min_delta_ms: float = 0.05,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Compares the p50 and p95 latency of every case in both results.
+
+    A case regresses when a percentile grew by more than ``max_regression``
+    (a fraction of the baseline) and by more than ``min_delta_ms``, which
+    keeps sub-millisecond timer noise from failing the check.
+
+    Returns:
+        A tuple of (one row per case, whether any case regressed). Cases
+        missing from either side are reported but never regress.
+    """
+    for name, result in (("baseline", baseline), ("current", current)):
+        if result.get("format") != RESULT_FORMAT:
+            raise ValueError(f"The {name} results have an unsupported format.")
+    baseline_cases = {case_key(case): case for case in baseline["results"]}
+    current_cases = {case_key(case): case for case in current["results"]}
+
+    rows, regressed = [], False
+    for key in sorted(baseline_cases.keys() | current_cases.keys()):
+        old, new = baseline_cases.get(key), current_cases.get(key)
+        row: Dict[str, Any] = {"case": key, "status": "ok"}
+        if old is None or new is None:
+            row["status"] = "new" if old is None else "missing"
+            rows.append(row)
+            continue
+        for percentile in ("p50_ms", "p95_ms"):
+            change = new[percentile] / max(old[percentile], 1e-9) - 1.0
+            row[percentile] = (old[percentile], new[percentile], change)
+            if (
+                change > max_regression
+                and new[percentile] - old[percentile] > min_delta_ms
+            ):
+                row["status"] = "REGRESSED"
+        regressed |= row["status"] == "REGRESSED"
+        rows.append(row)
+    return rows, regressed
+
+
+def print_comparison(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'case':<58} {'p50 ms':>17} {'p95 ms':>17}  status")
+    for row in rows:
+        cells = []
+        for percentile in ("p50_ms", "p95_ms"):
+            if percentile in row:
+                old, new, change = row[percentile]
+                cells.append(f"{new:8.2f} {change:+7.1%}")
+            else:
+                cells.append(f"{'-':>16}")
+        print(f"{row['case'][:58]:<58} {cells[0]:>17} {cells[1]:>17}  {row['status']}")
+
+
+def _load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _size_list(value: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for part in value.split(","):
+        width, _, height = part.strip().lower().partition("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Djinn detection path stage by stage."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmark sweep")
+    run.add_argument("--backend", default=settings.DJINN_INFERENCE_BACKEND)
+    run.add_argument("--model", default=settings.DJINN_MODEL_PATH)
+    run.add_argument(
+        "--sizes",
+        type=_size_list,
+        default=[(640, 480), (1280, 720), (1920, 1080)],
+        help="Image sizes as WxH,WxH (default: 640x480,1280x720,1920x1080)",
+    )
+    run.add_argument("--batch-sizes", type=_int_list, default=[1, 4])
+    run.add_argument(
+        "--threads",
+        type=_int_list,
+        default=[1, settings.DJINN_TORCH_THREADS],
+        help="Intra-op thread counts (default: 1,DJINN_TORCH_THREADS)",
+    )
+    run.add_argument(
+        "--densities",
+        type=_int_list,
+        default=[10, 100, 1000],
+        help="Candidate boxes per image for postprocess/geo (default: 10,100,1000)",
+    )
+    run.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+    run.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help="Comma-separated subset of the stages (default: all)",
+    )
+    run.add_argument("--iterations", type=int, default=20)
+    run.add_argument("--warmup", type=int, default=3)
+    run.add_argument("--min-time", type=float, default=0.5)
+    run.add_argument("--output", help="Write the results (JSON) to this file")
+    run.add_argument("--baseline", help="Compare against these saved results")
+
+    compare = commands.add_parser("compare", help="Compare two saved results")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+
+    for command in (run, compare):
+        command.add_argument(
+            "--max-regression",
+            type=float,
+            default=0.10,
+            help="Allowed p50/p95 growth as a fraction (default: %(default)s)",
+        )
+        command.add_argument(
+            "--min-delta-ms",
+            type=float,
+            default=0.05,
+            help="Ignore growth smaller than this (default: %(default)s)",
+        )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "run":
+        current = run_benchmark(
+            args.backend,
+            args.model,
+            sizes=args.sizes,
+            batch_sizes=args.batch_sizes,
+            thread_counts=args.threads,
+            densities=args.densities,
+            imgsz=args.imgsz,
+            stages=tuple(stage for stage in args.stages.split(",") if stage),
+            iterations=args.iterations,
+            warmup=args.warmup,
+            min_time=args.min_time,
+        )
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+        else:
+            json.dump(current, sys.stdout, indent=2)
+            print()
+        if not args.baseline:
+            return
+        baseline = _load_results(args.baseline)
+    else:
+        baseline = _load_results(args.baseline)
+        current = _load_results(args.current)
+
+    if baseline.get("environment") != current.get("environment"):
+        logger.warning(
+            "Baseline and current results come from different environments; "
+            "latencies may not be comparable."
+        )
+    rows, regressed = compare_results(
+        baseline, current, args.max_regression, args.min_delta_ms
+    )
+    print_comparison(rows)
+    if regressed:
+        print(
+            f"\nLatency regressed by more than {args.max_regression:.0%} "
+            "against the baseline."
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# backend/app/services/djinn/inference/cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+from .results import DetectionBatch
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionCache:
+    """
+    Content-addressed cache of pixel-space detection results.
+
+    Entries are keyed by a hash of the decoded image pixels plus the model
+    identity and inference options, so re-submitting the same view (a refresh,
+    a toggled layer, another analyst on the same AOI) skips inference. Results
+    are stored before georeferencing, so identical pixels with different
+    bounds still hit.
+
+    The in-memory cache is an LRU bounded to ``max_entries``. When
+    ``persist_dir`` is set, entries are also written there as ``.npz`` files
+    (bounded to ``max_disk_entries``, oldest removed first) and survive
+    restarts.
+
+    All methods are thread-safe; hashing and disk I/O are meant to run on the
+    inference executor, not the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        persist_dir: Optional[str] = None,
+        max_disk_entries: int = 0,
+    ):
+        self.max_entries = max(0, max_entries)
+        self.persist_dir = persist_dir
+        self.max_disk_entries = max(0, max_disk_entries)
+        self._entries: "OrderedDict[str, DetectionBatch]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_files: "OrderedDict[str, None]" = OrderedDict()
+
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            # Oldest first, so trimming removes the least recently written entries
+            files = sorted(
+                (
+                    entry
+                    for entry in os.scandir(self.persist_dir)
+                    if entry.name.endswith(".npz")
+                ),
+                key=lambda entry: entry.stat().st_mtime,
+            )
+            for entry in files:
+                self._disk_files[entry.name[: -len(".npz")]] = None
+            logger.info(
+                f"Detection cache using {self.persist_dir} "
+                f"({len(self._disk_files)} persisted entries)"
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or bool(self.persist_dir)
+
+    @staticmethod
+    def make_key(
+        image_np: np.ndarray, model_id: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Builds the cache key for an image.
+
+        Args:
+            image_np: The decoded image pixels.
+            model_id: Identifies the model/weights that produce the results.
+            options: Inference options that change the raw detections (e.g.
+                     tiling). Post-filters such as min_confidence must not be
+                     included, they are applied after the lookup.
+
+        Returns:
+            A hex digest string.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{image_np.shape}|{image_np.dtype}|{model_id}|".encode())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        digest.update(np.ascontiguousarray(image_np).data)
+        return digest.hexdigest()
+
+    def lookup(
+        self,
+        image_np: np.ndarray,
+        model_id: str,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, Optional[DetectionBatch]]:
+        """
+        Hashes an image and looks up its cached detections.
+
+        Returns:
+            A tuple of (key, detections), where detections is None on a miss.
+            The key should be passed to `put` once the detections are computed.
+        """
+        key = self.make_key(image_np, model_id, options)
+        return key, self.get(key)
+
+    def get(self, key: str) -> Optional[DetectionBatch]:
+        """Returns cached detections for ``key``, or None on a miss."""
+        with self._lock:
+            batch = self._entries.get(key)
+            if batch is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return batch
+            on_disk = key in self._disk_files
+
+        batch = self._load(key) if on_disk else None
+        with self._lock:
+            if batch is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._insert(key, batch)
+        return batch
+
+    def put(self, key: str, batch: DetectionBatch) -> None:
+        """Stores detections for ``key`` in memory and, if enabled, on disk."""
+        with self._lock:
+            self._insert(key, batch)
+            write_to_disk = bool(self.persist_dir) and key not in self._disk_files
+        if write_to_disk:
+            self._save(key, batch)
+
+    def clear(self) -> None:
+        """Drops all in-memory entries and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._disk_hits = self._misses = self._evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics for monitoring."""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_entries": len(self._disk_files),
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": (
+                    (self._hits + self._disk_hits) / lookups if lookups else 0.0
+                ),
+            }
+
+    # --- Internal helpers ---
+
+    def _insert(self, key: str, batch: DetectionBatch) -> None:
+        """Adds an entry to the in-memory LRU. Caller must hold the lock."""
+        if self.max_entries == 0:
+            return
+        self._entries[key] = batch
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.persist_dir, f"{key}.npz")
+
+    def _load(self, key: str) -> Optional[DetectionBatch]:
+        try:
+            with np.load(self._path(key), allow_pickle=False) as data:
+                names = {int(k): v for k, v in json.loads(str(data["names"])).items()}
+                return DetectionBatch(
+                    data["boxes"], data["confidences"], data["class_ids"], names
+                )
+        except Exception as e:
+            logger.warning(f"Could not read cached detections {key}: {e}")
+            with self._lock:
+                self._disk_files.pop(key, None)
+            return None
+
+    def _save(self, key: str, batch: DetectionBatch) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    boxes=batch.boxes,
+                    confidences=batch.confidences,
+                    class_ids=batch.class_ids,
+                    names=np.array(json.dumps(batch.names)),
+                )
+            os.replace(tmp_path, path)  # Atomic, readers never see partial files
+        except Exception as e:
+            logger.warning(f"Could not persist cached detections {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk_files[key] = None
+            stale = []
+            while (
+                self.max_disk_entries and len(self._disk_files) > self.max_disk_entries
+            ):
+                stale.append(self._disk_files.popitem(last=False)[0])
+        for old_key in stale:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+
+# Shared cache used by /detect_map_view
+detection_cache = DetectionCache(
+    max_entries=settings.DJINN_DETECTION_CACHE_SIZE,
+    persist_dir=settings.DJINN_DETECTION_CACHE_DIR,
+    max_disk_entries=settings.DJINN_DETECTION_CACHE_DISK_SIZE,
+)
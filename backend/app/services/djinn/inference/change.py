@@ -0,0 +1,395 @@
+# backend/app/services/djinn/inference/change.py
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+from .executor import InferenceExecutor
+from .results import DetectionBatch, non_max_suppression
+from .tiling import TileWindow
+
+logger = logging.getLogger(__name__)
+
+# Longest side of the downscaled images used for alignment
+ALIGN_MAX_SIDE = 512
+# Fraction of a cell's pixels that must differ for the cell to count as changed
+CELL_CHANGED_FRACTION = 0.02
+# Changed regions are split until at least this fraction of their cells changed
+REGION_MIN_FILL = 0.5
+
+
+class ChangeReference:
+    """The last image seen of a scene and the raw detections that go with it."""
+
+    __slots__ = ("gray", "detections", "reuse_count")
+
+    def __init__(self, gray: np.ndarray, detections: DetectionBatch, reuse_count: int):
+        self.gray = gray
+        self.detections = detections
+        self.reuse_count = reuse_count  # Incremental passes since the last full one
+
+
+class ChangeReferenceStore:
+    """
+    Thread-safe LRU of `ChangeReference` per scene (area of interest).
+
+    Only a grayscale copy of each image is kept, which is all the alignment
+    and difference steps need.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[str, ChangeReference]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scene_id: str) -> Optional[ChangeReference]:
+        with self._lock:
+            reference = self._entries.get(scene_id)
+            if reference is not None:
+                self._entries.move_to_end(scene_id)
+            return reference
+
+    def put(self, scene_id: str, reference: ChangeReference) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[scene_id] = reference
+            self._entries.move_to_end(scene_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def remember(
+        self, scene_id: str, image_np: np.ndarray, detections: DetectionBatch
+    ) -> None:
+        """Stores ``image_np`` as the new full-detection reference of a scene."""
+        self.put(scene_id, ChangeReference(to_gray(image_np), detections, 0))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class IncrementalResult:
+    """
+    Outcome of a change-aware detection pass.
+
+    Attributes:
+        detections: Raw detections for the whole new image.
+        inferred_fraction: Fraction of the image's pixels run through the model.
+        changed_regions: Number of regions that were re-detected (0 when the
+                         whole image was inferred or nothing changed).
+        reused: Number of detections carried over from the previous image.
+    """
+
+    __slots__ = ("detections", "inferred_fraction", "changed_regions", "reused")
+
+    def __init__(
+        self,
+        detections: DetectionBatch,
+        inferred_fraction: float,
+        changed_regions: int = 0,
+        reused: int = 0,
+    ):
+        self.detections = detections
+        self.inferred_fraction = inferred_fraction
+        self.changed_regions = changed_regions
+        self.reused = reused
+
+
+def to_gray(image_np: np.ndarray) -> np.ndarray:
+    if image_np.ndim == 2:
+        return np.ascontiguousarray(image_np)
+    return cv2.cvtColor(image_np, cv2.COLOR_BGR2GRAY)
+
+
+def align_images(
+    previous_gray: np.ndarray, current_gray: np.ndarray
+) -> Optional[Tuple[float, float]]:
+    """
+    Estimates the translation between two images of the same area with
+    phase correlation on downscaled copies.
+
+    Returns:
+        (dx, dy) in full-resolution pixels such that content at (x, y) in the
+        previous image appears at (x + dx, y + dy) in the current one, or None
+        if the images do not correlate well enough to be aligned.
+    """
+    height, width = current_gray.shape[:2]
+    scale = min(1.0, ALIGN_MAX_SIDE / max(height, width))
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    previous_small = cv2.resize(previous_gray, size, interpolation=cv2.INTER_AREA)
+    current_small = cv2.resize(current_gray, size, interpolation=cv2.INTER_AREA)
+
+    window = cv2.createHanningWindow(size, cv2.CV_32F)
+    (dx, dy), response = cv2.phaseCorrelate(
+        previous_small.astype(np.float32), current_small.astype(np.float32), window
+    )
+    if response < settings.DJINN_CHANGE_MIN_ALIGN_RESPONSE:
+        logger.debug(f"Change detection: alignment failed (response={response:.3f})")
+        return None
+    return dx / scale, dy / scale
+
+
+def find_changed_regions(
+    previous_gray: np.ndarray,
+    current_gray: np.ndarray,
+    shift: Tuple[float, float],
+    threshold: int,
+    cell_size: int,
+) -> List[TileWindow]:
+    """
+    Finds the parts of ``current_gray`` that differ from the aligned previous
+    image.
+
+    The absolute difference of the (blurred, to ignore noise and compression
+    artifacts) images is thresholded and pooled into ``cell_size`` cells in
+    one vectorized reshape. Changed cells are grown by one cell for context,
+    and each connected group of cells is covered by one or more rectangles.
+    Pixels the shifted previous image does not cover count as changed.
+
+    Returns:
+        (x0, y0, x1, y1) pixel windows of the changed regions.
+    """
+    height, width = current_gray.shape[:2]
+    dx, dy = shift
+    matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+    warped = cv2.warpAffine(previous_gray, matrix, (width, height))
+    covered = cv2.warpAffine(np.full_like(previous_gray, 255), matrix, (width, height))
+
+    previous_blur = cv2.GaussianBlur(warped, (5, 5), 0)
+    current_blur = cv2.GaussianBlur(current_gray, (5, 5), 0)
+    changed = (cv2.absdiff(previous_blur, current_blur) > threshold) | (covered < 255)
+
+    rows, cols = -(-height // cell_size), -(-width // cell_size)
+    padded = np.zeros((rows * cell_size, cols * cell_size), dtype=np.float32)
+    padded[:height, :width] = changed
+    cells = padded.reshape(rows, cell_size, cols, cell_size).mean(axis=(1, 3))
+    cells = (cells > CELL_CHANGED_FRACTION).astype(np.uint8)
+    if not cells.any():
+        return []
+    cells = cv2.dilate(cells, np.ones((3, 3), np.uint8))
+
+    count, labels = cv2.connectedComponents(cells, connectivity=8)
+    regions = []
+    for label in range(1, count):
+        for cx0, cy0, cx1, cy1 in _cover_cells(labels == label):
+            regions.append(
+                (
+                    cx0 * cell_size,
+                    cy0 * cell_size,
+                    min(cx1 * cell_size, width),
+                    min(cy1 * cell_size, height),
+                )
+            )
+    return regions
+
+
+def _cover_cells(mask: np.ndarray) -> List[TileWindow]:
+    """
+    Covers the True cells of ``mask`` with rectangles that are each at least
+    ``REGION_MIN_FILL`` full.
+
+    A sparse rectangle (e.g. around an L-shaped or ring-shaped change, like
+    the uncovered border after a shift) is split along its longer axis at the
+    row or column with the fewest changed cells, so splits avoid cutting
+    through the changes themselves.
+    """
+    regions: List[TileWindow] = []
+    pending = [(0, 0, mask.shape[1], mask.shape[0])]
+    while pending:
+        x0, y0, x1, y1 = pending.pop()
+        window = mask[y0:y1, x0:x1]
+        cols = np.flatnonzero(window.any(axis=0))
+        rows = np.flatnonzero(window.any(axis=1))
+        if not len(cols):
+            continue
+        # Shrink to the changed cells
+        x0, x1 = x0 + int(cols[0]), x0 + int(cols[-1]) + 1
+        y0, y1 = y0 + int(rows[0]), y0 + int(rows[-1]) + 1
+        window = mask[y0:y1, x0:x1]
+        if window.mean() >= REGION_MIN_FILL or window.size == 1:
+            regions.append((x0, y0, x1, y1))
+            continue
+        if x1 - x0 >= y1 - y0:
+            counts = window.sum(axis=0)[1:-1]
+            split = x0 + 1 + int(np.argmin(counts)) if len(counts) else x0 + 1
+            pending += [(x0, y0, split, y1), (split, y0, x1, y1)]
+        else:
+            counts = window.sum(axis=1)[1:-1]
+            split = y0 + 1 + int(np.argmin(counts)) if len(counts) else y0 + 1
+            pending += [(x0, y0, x1, split), (x0, split, x1, y1)]
+    return regions
+
+
+def _covered_fraction(regions: List[TileWindow], width: int, height: int) -> float:
+    """Fraction of the image covered by the (possibly overlapping) regions."""
+    mask = np.zeros((height, width), dtype=bool)
+    for x0, y0, x1, y1 in regions:
+        mask[y0:y1, x0:x1] = True
+    return float(mask.mean())
+
+
+def _plan_changes(
+    previous_gray: np.ndarray, image_np: np.ndarray, threshold: int
+) -> Tuple[np.ndarray, Optional[Tuple[float, float]], List[TileWindow]]:
+    """Gray conversion, alignment and change regions; runs on the executor."""
+    gray = to_gray(image_np)
+    shift = align_images(previous_gray, gray)
+    if shift is None:
+        return gray, None, []
+    regions = find_changed_regions(
+        previous_gray, gray, shift, threshold, settings.DJINN_CHANGE_CELL_SIZE
+    )
+    return gray, shift, regions
+
+
+def merge_with_previous(
+    previous: DetectionBatch,
+    shift: Tuple[float, float],
+    regions: List[TileWindow],
+    fresh: DetectionBatch,
+    width: int,
+    height: int,
+    merge_iou: float,
+) -> Tuple[DetectionBatch, int]:
+    """
+    Combines the previous image's detections (shifted into the new image)
+    outside the changed regions with the detections re-run inside them.
+
+    Returns:
+        The merged detections and how many previous detections were kept.
+    """
+    shifted = previous.offset(*shift)
+    centers = shifted.centers()
+    cx, cy = centers[:, 0], centers[:, 1]
+    keep = (cx >= 0) & (cx < width) & (cy >= 0) & (cy < height)
+    if regions:
+        x0, y0, x1, y1 = np.asarray(regions, dtype=np.float32).T
+        in_region = (
+            (cx[:, None] >= x0[None, :])
+            & (cx[:, None] < x1[None, :])
+            & (cy[:, None] >= y0[None, :])
+            & (cy[:, None] < y1[None, :])
+        ).any(axis=1)
+        keep &= ~in_region
+    reused = shifted.select(keep)
+
+    merged = DetectionBatch.concatenate(
+        [reused, fresh], names=fresh.names or previous.names
+    )
+    if len(fresh) and len(reused):
+        # Objects straddling a region border are found on both sides
+        merged = merged.select(
+            non_max_suppression(
+                merged.boxes, merged.confidences, merged.class_ids, merge_iou
+            )
+        )
+    return merged, len(reused)
+
+
+async def run_incremental_detection(
+    image_np: np.ndarray,
+    scene_id: str,
+    store: ChangeReferenceStore,
+    executor: InferenceExecutor,
+    detect_full: Callable[[np.ndarray], Awaitable[DetectionBatch]],
+    detect_region: Callable[[np.ndarray], Awaitable[DetectionBatch]],
+    threshold: int,
+    max_changed_fraction: float,
+    merge_iou: float = 0.5,
+) -> IncrementalResult:
+    """
+    Detects objects in a new image of a scene, re-running the model only
+    where the image changed since the previous one.
+
+    The new image is aligned to the scene's previous image (phase
+    correlation), the changed regions are found with a thresholded
+    difference, and only those regions are sent through ``detect_region``;
+    the previous detections are reused everywhere else. The whole image goes
+    through ``detect_full`` when there is no usable previous image, the
+    alignment fails, more than ``max_changed_fraction`` of the image changed,
+    or the scene has been updated incrementally ``DJINN_CHANGE_MAX_REUSE``
+    times in a row (so drift cannot accumulate).
+
+    Args:
+        image_np: The new BGR image.
+        scene_id: Identifies the area of interest (same bounds, same size).
+        store: Where previous images and detections are kept.
+        executor: Runs the CPU-bound alignment and difference steps.
+        detect_full: Runs detection on a whole image.
+        detect_region: Runs detection on a region crop (crop coordinates).
+        threshold: Gray-level difference (0-255) above which a pixel changed.
+        max_changed_fraction: Above this, the whole image is re-detected.
+        merge_iou: IoU for removing duplicates along region borders.
+    """
+    height, width = image_np.shape[:2]
+    reference = store.get(scene_id)
+
+    async def full_pass(gray: Optional[np.ndarray], reason: str) -> IncrementalResult:
+        logger.debug(f"Change detection for scene {scene_id}: full pass ({reason})")
+        detections = await detect_full(image_np)
+        if gray is None:
+            gray = await executor.run(to_gray, image_np)
+        store.put(scene_id, ChangeReference(gray, detections, 0))
+        return IncrementalResult(detections, 1.0)
+
+    if reference is None:
+        return await full_pass(None, "no previous image")
+    if reference.gray.shape != (height, width):
+        return await full_pass(None, "image size changed")
+    if reference.reuse_count >= settings.DJINN_CHANGE_MAX_REUSE:
+        return await full_pass(None, "reuse limit reached")
+
+    gray, shift, regions = await executor.run(
+        _plan_changes, reference.gray, image_np, threshold
+    )
+    if shift is None:
+        return await full_pass(gray, "alignment failed")
+    inferred_fraction = _covered_fraction(regions, width, height)
+    if inferred_fraction > max_changed_fraction:
+        return await full_pass(gray, f"{inferred_fraction:.0%} changed")
+
+    # One region per inference worker at a time: a scene with many small
+    # changes must not flood the executor queue (and fail with a full queue)
+    slots = asyncio.Semaphore(executor.max_workers)
+
+    async def detect_in(region: TileWindow) -> DetectionBatch:
+        x0, y0, x1, y1 = region
+        async with slots:
+            return await detect_region(image_np[y0:y1, x0:x1])
+
+    tasks = [asyncio.ensure_future(detect_in(region)) for region in regions]
+    try:
+        region_detections = await asyncio.gather(*tasks)
+    finally:
+        # After a failure, don't leave the remaining regions running unawaited
+        for task in tasks:
+            task.cancel()
+    fresh = DetectionBatch.concatenate(
+        [
+            detections.offset(x0, y0)
+            for detections, (x0, y0, _, _) in zip(region_detections, regions)
+            if len(detections)
+        ],
+        names=reference.detections.names,
+    )
+    detections, reused = merge_with_previous(
+        reference.detections, shift, regions, fresh, width, height, merge_iou
+    )
+    store.put(scene_id, ChangeReference(gray, detections, reference.reuse_count + 1))
+    logger.debug(
+        f"Change detection for scene {scene_id}: shift=({shift[0]:.1f}, "
+        f"{shift[1]:.1f}), {len(regions)} regions, {inferred_fraction:.1%} "
+        f"inferred, {reused} detections reused"
+    )
+    return IncrementalResult(detections, inferred_fraction, len(regions), reused)
+
+
+# Shared store of previous scene images, used by the map-view endpoints
+change_reference_store = ChangeReferenceStore(settings.DJINN_CHANGE_REFERENCE_SIZE)
@@ -0,0 +1,312 @@
+# backend/app/services/djinn/inference/compare_backends.py
+
+"""
+Compares inference backends on a sample set: latency and mAP against the
+PyTorch (Ultralytics) baseline.
+
+Usage:
+    python -m app.services.djinn.inference.compare_backends \\
+        --images /data/samples \\
+        --candidate onnxruntime:yolov8n.onnx \\
+        --candidate onnxruntime:yolov8n-int8.onnx \\
+        --candidate openvino:yolov8n_openvino_model
+
+With ``--labels DIR`` (YOLO-format ``.txt`` files named like the images),
+mAP is computed against ground truth for every backend, the baseline
+included. Without labels, the baseline's own detections serve as the
+reference, so the candidates' mAP measures agreement with PyTorch.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+from .backends import InferenceBackend, load_backend
+from .quantization import list_images
+from .results import DetectionBatch, box_iou
+
+logger = logging.getLogger(__name__)
+
+# COCO-style IoU thresholds 0.50:0.05:0.95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+# Reference boxes per image: ((N, 4) boxes, (N,) class ids)
+Reference = Tuple[np.ndarray, np.ndarray]
+
+
+def _average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """COCO 101-point interpolated average precision."""
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+    points = np.linspace(0, 1, 101)
+    return float(np.mean(np.interp(points, recall, precision)))
+
+
+def mean_average_precision(
+    predictions: List[DetectionBatch], references: List[Reference]
+) -> Dict[str, float]:
+    """
+    Computes mAP@0.5 and mAP@0.5:0.95 over a sample set.
+
+    Args:
+        predictions: Detections per image.
+        references: Reference (ground truth) boxes and class ids per image.
+
+    Returns:
+        A dictionary with 'map50' and 'map50_95'.
+    """
+    # correct[k, t]: prediction k matched a reference box at IoU threshold t
+    correct_rows, confidences, pred_classes = [], [], []
+    ref_classes = np.concatenate([classes for _, classes in references] or [[]])
+
+    for batch, (ref_boxes, ref_class_ids) in zip(predictions, references):
+        if not len(batch):
+            continue
+        correct = np.zeros((len(batch), len(IOU_THRESHOLDS)), dtype=bool)
+        if len(ref_boxes):
+            iou = box_iou(batch.boxes.astype(np.float64), ref_boxes)
+            iou[batch.class_ids[:, None] != ref_class_ids[None, :]] = 0.0
+            order = np.argsort(-batch.confidences, kind="stable")
+            for t, threshold in enumerate(IOU_THRESHOLDS):
+                matched = np.zeros(len(ref_boxes), dtype=bool)
+                for k in order:
+                    candidates = np.where(~matched & (iou[k] >= threshold))[0]
+                    if len(candidates):
+                        best = candidates[np.argmax(iou[k, candidates])]
+                        matched[best] = True
+                        correct[k, t] = True
+        correct_rows.append(correct)
+        confidences.append(batch.confidences)
+        pred_classes.append(batch.class_ids)
+
+    if not correct_rows:
+        return {"map50": 0.0, "map50_95": 0.0}
+    correct = np.concatenate(correct_rows)
+    confidences = np.concatenate(confidences)
+    pred_classes = np.concatenate(pred_classes)
+
+    ap = []  # Per class, per threshold
+    for class_id in np.unique(ref_classes):
+        mask = pred_classes == class_id
+        reference_count = int(np.sum(ref_classes == class_id))
+        if not mask.any():
+            ap.append(np.zeros(len(IOU_THRESHOLDS)))
+            continue
+        order = np.argsort(-confidences[mask], kind="stable")
+        true_positives = np.cumsum(correct[mask][order], axis=0)
+        false_positives = np.cumsum(~correct[mask][order], axis=0)
+        recall = true_positives / reference_count
+        precision = true_positives / (true_positives + false_positives)
+        ap.append(
+            [
+                _average_precision(recall[:, t], precision[:, t])
+                for t in range(len(IOU_THRESHOLDS))
+            ]
+        )
+
+    if not ap:
+        return {"map50": 0.0, "map50_95": 0.0}
+    ap = np.asarray(ap)
+    return {"map50": float(ap[:, 0].mean()), "map50_95": float(ap.mean())}
+
+
+def load_yolo_labels(path: str, img_width: int, img_height: int) -> Reference:
+    """Reads a YOLO-format label file (class cx cy w h, normalized)."""
+    if not os.path.exists(path):
+        return np.empty((0, 4)), np.empty(0, dtype=np.int32)
+    rows = np.loadtxt(path, ndmin=2)
+    if rows.size == 0:
+        return np.empty((0, 4)), np.empty(0, dtype=np.int32)
+    cx, cy = rows[:, 1] * img_width, rows[:, 2] * img_height
+    w, h = rows[:, 3] * img_width, rows[:, 4] * img_height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return boxes, rows[:, 0].astype(np.int32)
+
+
+def benchmark_backend(
+    backend: InferenceBackend,
+    images: List[np.ndarray],
+    imgsz: Optional[int],
+    warmup: int,
+) -> Tuple[List[DetectionBatch], Dict[str, float]]:
+    """
+    Runs every image through ``backend`` one at a time (the request path),
+    after ``warmup`` untimed runs.
+
+    Returns:
+        A tuple of (detections per image, latency statistics in ms).
+    """
+    for image in images[:warmup]:
+        backend.predict([image], imgsz)
+
+    detections, latencies = [], []
+    for image in images:
+        start = time.perf_counter()
+        detections.extend(backend.predict([image], imgsz))
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+    latencies = np.asarray(latencies)
+    return detections, {
+        "latency_mean_ms": float(latencies.mean()),
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "images_per_second": float(1000.0 / latencies.mean()),
+    }
+
+
+def compare_backends(
+    image_dir: str,
+    baseline: str,
+    candidates: List[str],
+    labels_dir: Optional[str] = None,
+    imgsz: Optional[int] = None,
+    limit: Optional[int] = None,
+    warmup: int = 3,
+    threads: int = 0,
+) -> List[Dict]:
+    """
+    Benchmarks the baseline and candidate backends on the same images.
+
+    Args:
+        image_dir: Directory of sample images.
+        baseline: "backend:model_path" of the reference (usually ultralytics).
+        candidates: "backend:model_path" entries to compare.
+        labels_dir: Optional YOLO-format ground truth labels.
+        imgsz: Model input size (None = each model's default).
+        limit: Use at most this many images.
+        warmup: Untimed runs per backend before measuring.
+        threads: Intra-op threads for every backend, PyTorch included
+                 (0 = each runtime's default).
+
+    Returns:
+        One result dictionary per backend, baseline first.
+    """
+    paths = list_images(image_dir, limit)
+    images = [cv2.imread(path, cv2.IMREAD_COLOR) for path in paths]
+    paths = [path for path, image in zip(paths, images) if image is not None]
+    images = [image for image in images if image is not None]
+    if not images:
+        raise ValueError(f"No readable images in {image_dir}")
+
+    references: Optional[List[Reference]] = None
+    if labels_dir:
+        references = [
+            load_yolo_labels(
+                os.path.join(
+                    labels_dir, os.path.splitext(os.path.basename(path))[0] + ".txt"
+                ),
+                image.shape[1],
+                image.shape[0],
+            )
+            for path, image in zip(paths, images)
+        ]
+
+    if threads:
+        import torch
+
+        # Same thread budget for the PyTorch baseline as for the runtimes
+        torch.set_num_threads(threads)
+
+    results = []
+    for spec in [baseline] + candidates:
+        backend_name, _, model_path = spec.partition(":")
+        backend = load_backend(
+            backend_name,
+            model_path,
+            intra_op_threads=threads,
+        )
+        logger.info(f"Benchmarking {spec} on {len(images)} images...")
+        detections, stats = benchmark_backend(backend, images, imgsz, warmup)
+
+        if references is None:
+            # The baseline's detections are the reference for the candidates
+            references = [
+                (batch.boxes.astype(np.float64), batch.class_ids)
+                for batch in detections
+            ]
+        accuracy = mean_average_precision(detections, references)
+
+        result = {
+            "backend": backend_name,
+            "model": model_path,
+            "images": len(images),
+            "detections": int(sum(len(batch) for batch in detections)),
+            **stats,
+            **accuracy,
+        }
+        if results:
+            result["speedup"] = results[0]["latency_mean_ms"] / stats["latency_mean_ms"]
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare Djinn inference backends (latency and mAP)."
+    )
+    parser.add_argument("--images", required=True, help="Directory of sample images")
+    parser.add_argument("--labels", help="YOLO-format ground truth directory")
+    parser.add_argument(
+        "--baseline",
+        default="ultralytics:yolov8n.pt",
+        help="backend:model_path of the reference (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--candidate",
+        action="append",
+        default=[],
+        help="backend:model_path to compare (repeatable)",
+    )
+    parser.add_argument("--imgsz", type=int)
+    parser.add_argument("--limit", type=int, help="Use at most this many images")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=settings.DJINN_TORCH_THREADS,
+        help="Intra-op threads per backend (default: DJINN_TORCH_THREADS)",
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    results = compare_backends(
+        args.images,
+        args.baseline,
+        args.candidate,
+        labels_dir=args.labels,
+        imgsz=args.imgsz,
+        limit=args.limit,
+        warmup=args.warmup,
+        threads=args.threads,
+    )
+
+    reference = "ground truth" if args.labels else "baseline detections"
+    print(f"\nmAP against {reference}, latency per image (batch 1):")
+    print(
+        f"{'backend':<12} {'model':<36} {'mean ms':>8} {'p95 ms':>8} "
+        f"{'speedup':>8} {'mAP50':>7} {'mAP50-95':>9}"
+    )
+    for result in results:
+        print(
+            f"{result['backend']:<12} {result['model'][-36:]:<36} "
+            f"{result['latency_mean_ms']:>8.1f} {result['latency_p95_ms']:>8.1f} "
+            f"{result.get('speedup', 1.0):>7.2f}x {result['map50']:>7.3f} "
+            f"{result['map50_95']:>9.3f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# backend/app/services/djinn/inference/dedup.py
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+from .tiling import union_find_groups
+
+logger = logging.getLogger(__name__)
+
+# Metres per degree of latitude (and of longitude at the equator)
+METERS_PER_DEGREE = 111_320.0
+# Offsets to the grid cells that can hold a neighbour, each pair visited once
+_HALF_NEIGHBOURHOOD = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+# Keeps the two cell indices apart in a single int64 grid key
+_CELL_KEY_BASE = np.int64(1 << 31)
+
+
+def to_local_meters(
+    lats: np.ndarray, lngs: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Equirectangular projection to metres. Accurate for the distances of a
+    few metres that deduplication compares; not meant for long distances.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    x = lngs * np.cos(np.radians(lats)) * METERS_PER_DEGREE
+    y = lats * METERS_PER_DEGREE
+    return x, y
+
+
+def find_nearby_pairs(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Index pairs of points closer than ``tolerance`` (same units as x, y).
+
+    Points are hashed into a grid of ``tolerance``-sized cells, so only
+    points in the same or a neighbouring cell are compared and the work
+    grows with the number of points, not its square. All steps are
+    vectorized over the points.
+
+    Returns:
+        (M, 2) int64 array of pairs (i, j) with i != j, each pair once.
+    """
+    count = len(x)
+    if count < 2 or tolerance <= 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    cell_x = np.floor(x / tolerance).astype(np.int64)
+    cell_y = np.floor(y / tolerance).astype(np.int64)
+    keys = cell_x * _CELL_KEY_BASE + cell_y
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    points = np.arange(count)
+
+    candidates = []
+    for dx, dy in _HALF_NEIGHBOURHOOD:
+        target = (cell_x + dx) * _CELL_KEY_BASE + (cell_y + dy)
+        start = np.searchsorted(sorted_keys, target, side="left")
+        counts = np.searchsorted(sorted_keys, target, side="right") - start
+        total = int(counts.sum())
+        if not total:
+            continue
+        # Expand each point's [start, start + count) range of the sorted keys
+        first = np.repeat(points, counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(start, counts) + within]
+        if (dx, dy) == (0, 0):
+            keep = first < second
+            first, second = first[keep], second[keep]
+        candidates.append(np.stack([first, second], axis=1))
+    if not candidates:
+        return np.empty((0, 2), dtype=np.int64)
+
+    pairs = np.concatenate(candidates)
+    distances = np.hypot(
+        x[pairs[:, 0]] - x[pairs[:, 1]], y[pairs[:, 0]] - y[pairs[:, 1]]
+    )
+    return pairs[distances <= tolerance]
+
+
+def group_duplicates(
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    class_names: Sequence[str],
+    tolerance_m: float,
+) -> np.ndarray:
+    """
+    Groups observations of the same class within ``tolerance_m`` metres of
+    each other (transitively).
+
+    Returns:
+        (N,) array of group labels, numbered 0..G-1 in order of first item.
+    """
+    count = len(class_names)
+    x, y = to_local_meters(lats, lngs)
+    pairs = find_nearby_pairs(x, y, tolerance_m)
+    if len(pairs):
+        _, class_codes = np.unique(
+            np.asarray(class_names, dtype=object), return_inverse=True
+        )
+        pairs = pairs[class_codes[pairs[:, 0]] == class_codes[pairs[:, 1]]]
+    return union_find_groups(count, pairs)
+
+
+def combine_groups(
+    labels: np.ndarray,
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    confidences: np.ndarray,
+    counts: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reduces grouped observations to one canonical object per group.
+
+    The location is the mean weighted by confidence and observation count,
+    the confidence is the group's highest, and the counts are summed.
+
+    Returns:
+        (representative index, lat, lng, confidence, observation count) per
+        group; the representative is the group's most confident member.
+    """
+    group_count = int(labels.max()) + 1 if len(labels) else 0
+    confidences = np.asarray(confidences, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.float64)
+    weights = np.maximum(confidences, 1e-6) * counts
+    total = np.bincount(labels, weights, group_count)
+    lat = np.bincount(labels, weights * lats, group_count) / total
+    lng = np.bincount(labels, weights * lngs, group_count) / total
+    observations = np.bincount(labels, counts, group_count).astype(np.int64)
+
+    # Most confident member of each group: sort by (group, -confidence)
+    order = np.lexsort((-confidences, labels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    representative = order[first]
+    return representative, lat, lng, confidences[representative], observations
+
+
+class _RecentObject:
+    """An object in the `RecentObjectIndex`."""
+
+    __slots__ = ("class_name", "lat", "lng", "confidence", "count", "last_seen", "cell")
+
+    def __init__(
+        self,
+        class_name: str,
+        lat: float,
+        lng: float,
+        confidence: float,
+        count: int,
+        last_seen: float,
+    ):
+        self.class_name = class_name
+        self.lat = lat
+        self.lng = lng
+        self.confidence = confidence
+        self.count = count
+        self.last_seen = last_seen
+        self.cell: Tuple[int, int] = (0, 0)
+
+    def merge(self, lat: float, lng: float, confidence: float, count: int) -> None:
+        """Folds another observation in, weighted by confidence and count."""
+        old_weight = max(self.confidence, 1e-6) * self.count
+        new_weight = max(confidence, 1e-6) * count
+        share = new_weight / (old_weight + new_weight)
+        self.lat += (lat - self.lat) * share
+        self.lng += (lng - self.lng) * share
+        self.confidence = max(self.confidence, confidence)
+        self.count += count
+
+
+class RecentObjectIndex:
+    """
+    Grid-hashed index of objects detected recently by the map-view
+    endpoints, so overlapping views report the same object under the same
+    id instead of adding a new one each time.
+
+    An observation within ``tolerance_m`` of a known object of the same class
+    is merged into it (location averaged by confidence, confidence maxed,
+    observation count incremented). Within a batch, each known object takes
+    at most one observation, closest pairs first, and observations of the
+    same batch are never merged with each other. Objects not seen for
+    ``ttl_seconds`` are forgotten, and at most ``max_objects`` are kept (least
+    recently seen are dropped first). Thread-safe.
+    """
+
+    def __init__(self, tolerance_m: float, ttl_seconds: float, max_objects: int):
+        self.tolerance_m = tolerance_m
+        self.ttl_seconds = ttl_seconds
+        self.max_objects = max(0, max_objects)
+        # Least recently seen first
+        self._objects: "OrderedDict[str, _RecentObject]" = OrderedDict()
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.tolerance_m > 0 and self.max_objects > 0
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        x, y = to_local_meters(lat, lng)
+        return (
+            int(np.floor(x / self.tolerance_m)),
+            int(np.floor(y / self.tolerance_m)),
+        )
+
+    def _remove(self, object_id: str) -> _RecentObject:
+        obj = self._objects.pop(object_id)
+        ids = self._cells.get(obj.cell)
+        if ids is not None:
+            ids.discard(object_id)
+            if not ids:
+                del self._cells[obj.cell]
+        return obj
+
+    def _insert(self, object_id: str, obj: _RecentObject) -> None:
+        obj.cell = self._cell(obj.lat, obj.lng)
+        self._objects[object_id] = obj
+        self._cells.setdefault(obj.cell, set()).add(object_id)
+
+    def _evict(self, now: float) -> None:
+        while self._objects:
+            object_id, obj = next(iter(self._objects.items()))
+            expired = now - obj.last_seen > self.ttl_seconds
+            if not expired and len(self._objects) <= self.max_objects:
+                break
+            self._remove(object_id)
+
+    def _candidates(
+        self, class_name: str, x: float, y: float
+    ) -> List[Tuple[float, str]]:
+        """``(distance, id)`` of known ``class_name`` objects within the tolerance."""
+        cell_x = int(np.floor(x / self.tolerance_m))
+        cell_y = int(np.floor(y / self.tolerance_m))
+        candidates = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for object_id in self._cells.get((cell_x + dx, cell_y + dy), ()):
+                    obj = self._objects[object_id]
+                    if obj.class_name != class_name:
+                        continue
+                    obj_x, obj_y = to_local_meters(obj.lat, obj.lng)
+                    distance = float(np.hypot(obj_x - x, obj_y - y))
+                    if distance <= self.tolerance_m:
+                        candidates.append((distance, object_id))
+        return candidates
+
+    def _match(
+        self, class_names: Sequence[str], xs: np.ndarray, ys: np.ndarray
+    ) -> List[Optional[str]]:
+        """
+        One-to-one assignment of observations to known objects, greedily by
+        distance: the closest (observation, object) pair is matched first and
+        neither takes part in another pair.
+        """
+        pairs = [
+            (distance, i, object_id)
+            for i, class_name in enumerate(class_names)
+            for distance, object_id in self._candidates(
+                class_name, float(xs[i]), float(ys[i])
+            )
+        ]
+        pairs.sort()
+        matches: List[Optional[str]] = [None] * len(class_names)
+        taken: Set[str] = set()
+        for _, i, object_id in pairs:
+            if matches[i] is None and object_id not in taken:
+                matches[i] = object_id
+                taken.add(object_id)
+        return matches
+
+    def observe(
+        self,
+        class_names: Sequence[str],
+        lats: np.ndarray,
+        lngs: np.ndarray,
+        confidences: np.ndarray,
+        counts: np.ndarray,
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Merges one batch of (already deduplicated) observations into the
+        index.
+
+        Returns:
+            The object id and the total observation count of each input.
+        """
+        xs, ys = to_local_meters(lats, lngs)
+        now = time.monotonic()
+        ids: List[str] = []
+        totals = np.zeros(len(class_names), dtype=np.int64)
+        with self._lock:
+            self._evict(now)
+            # Matched against the objects known before this batch only, so
+            # two observations of one frame never become one object
+            matches = self._match(class_names, xs, ys)
+            for i, class_name in enumerate(class_names):
+                lat, lng = float(lats[i]), float(lngs[i])
+                confidence, count = float(confidences[i]), int(counts[i])
+                object_id = matches[i]
+                if object_id is None:
+                    object_id = str(uuid.uuid4())
+                    obj = _RecentObject(class_name, lat, lng, confidence, count, now)
+                else:
+                    # Re-inserted, as the merged location may move it to another cell
+                    obj = self._remove(object_id)
+                    obj.merge(lat, lng, confidence, count)
+                    obj.last_seen = now
+                self._insert(object_id, obj)
+                ids.append(object_id)
+                totals[i] = obj.count
+            self._evict(now)
+        return ids, totals
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+
+# Shared index of recent map-view detections
+recent_object_index = RecentObjectIndex(
+    tolerance_m=settings.DJINN_DEDUP_TOLERANCE_METERS,
+    ttl_seconds=settings.DJINN_DEDUP_WINDOW_SECONDS,
+    max_objects=settings.DJINN_DEDUP_MAX_OBJECTS,
+)
@@ -1,10 +1,16 @@
 # backend/app/services/djinn/inference/detection.py
 
 import logging
-from typing import Dict, List
+import os
+import threading
+from typing import List, Optional
 
 import numpy as np
-from ultralytics import YOLO
+
+from app.core.config import settings
+
+from .backends import InferenceBackend, load_backend
+from .results import DetectionBatch
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,73 +18,138 @@ logger = logging.getLogger(__name__)
 
 # --- Model Loading ---
 # Load the model once when the module is imported to avoid reloading on every call.
-MODEL_PATH = "yolov8n.pt"  # You can change this to yolov8s.pt, yolov8m.pt, etc.
-model: YOLO | None = None
+# DJINN_INFERENCE_BACKEND selects the runtime: "ultralytics" (PyTorch, any
+# YOLO() weights such as yolov8n.pt/yolov8s.pt), "onnxruntime" (.onnx export,
+# optionally INT8) or "openvino" (OpenVINO IR export).
+BACKEND = settings.DJINN_INFERENCE_BACKEND
+MODEL_PATH = settings.DJINN_MODEL_PATH
+
+
+def _load_model() -> InferenceBackend | None:
+    """Loads the configured backend from MODEL_PATH, returning None on failure."""
+    try:
+        loaded = load_backend(
+            BACKEND,
+            MODEL_PATH,
+            intra_op_threads=settings.DJINN_RUNTIME_INTRA_OP_THREADS
+            or settings.DJINN_TORCH_THREADS,
+            inter_op_threads=settings.DJINN_RUNTIME_INTER_OP_THREADS,
+        )
+        logger.info(f"Successfully loaded {BACKEND} model from {MODEL_PATH}")
+        return loaded
+    except Exception as e:
+        logger.error(
+            f"Error loading {BACKEND} model from {MODEL_PATH}: {e}", exc_info=True
+        )
+        return None  # Ensure model is None if loading fails
+
 
-try:
-    model = YOLO(MODEL_PATH)
-    logger.info(f"Successfully loaded YOLO model from {MODEL_PATH}")
-except Exception as e:
-    logger.error(f"Error loading YOLO model from {MODEL_PATH}: {e}", exc_info=True)
-    model = None  # Ensure model is None if loading fails
+model: InferenceBackend | None = _load_model()
 
 
-# --- Inference Function ---
-def run_yolo_detection(image_np: np.ndarray) -> List[Dict]:
+def get_model_id() -> str:
     """
-    Performs object detection on a given image using the pre-loaded YOLOv8 model.
+    Identifies the configured backend and weights (path, size and
+    modification time) so that cached results are invalidated when either
+    changes.
+    """
+    try:
+        stat = os.stat(MODEL_PATH)
+        return f"{BACKEND}:{MODEL_PATH}:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        return f"{BACKEND}:{MODEL_PATH}"
+
+
+# Per-thread model instances (Ultralytics predictors are not thread-safe)
+_worker_state = threading.local()
+
+# Set by `prepare_model_for_sharing`: worker threads then get lightweight
+# copies that share the module-level model's weights instead of loading their
+# own.
+_share_weights = False
+
+
+def prepare_model_for_sharing() -> None:
+    """
+    Prepares the module-level model to be shared by all inference threads
+    and by forked server workers (see ``app.server``). Afterwards the weights
+    are only read, so forked processes keep sharing their pages copy-on-write.
+    """
+    global _share_weights
+    if model is None:
+        logger.warning("Detection model is not loaded, nothing to share.")
+        return
+    model.prepare_for_fork()
+    _share_weights = True
+    logger.info(f"{BACKEND} model from {MODEL_PATH} prepared for shared use")
+
+
+def get_worker_model() -> InferenceBackend | None:
+    """
+    Returns the model to use from the calling thread.
+
+    The main thread uses the module-level model; any other thread (e.g. an
+    `InferenceExecutor` worker) gets its own instance from
+    `InferenceBackend.worker_copy` - sharing the module-level weights after
+    `prepare_model_for_sharing`, otherwise a separately loaded copy where the
+    backend needs one.
+    """
+    if threading.current_thread() is threading.main_thread() or model is None:
+        return model
+    if getattr(_worker_state, "model", None) is None:
+        _worker_state.model = model.worker_copy(share_weights=_share_weights)
+    return _worker_state.model
+
+
+# --- Inference Functions ---
+def run_yolo_detection_batch(
+    images: List[np.ndarray], imgsz: Optional[int] = None
+) -> List[DetectionBatch]:
+    """
+    Performs object detection on several images with a single batched
+    call to the configured backend.
 
     Args:
-        image_np: A NumPy array representing the input image (BGR format expected by OpenCV).
+        images: A list of NumPy arrays (BGR format expected by OpenCV).
+        imgsz: Optional model input size; defaults to the model's own (640).
 
     Returns:
-        A list of dictionaries, where each dictionary represents a detected object
-        with keys: 'bbox_pixels', 'confidence', 'class_id', 'class_name'.
-        Returns an empty list if the model failed to load or no objects are detected.
+        A list with one `DetectionBatch` per input image, in the same order.
+        Every batch is empty if the model failed to load.
+
+    Raises:
+        Exception: If the prediction fails. Callers must not treat (or cache)
+                   a failed prediction as an image without objects.
     """
-    if model is None:
-        logger.error("YOLO model is not loaded. Cannot perform detection.")
+    worker_model = get_worker_model()
+    if worker_model is None:
+        logger.error("Detection model is not loaded. Cannot perform detection.")
+        return [DetectionBatch.empty() for _ in images]
+
+    if not images:
         return []
 
-    detections: List[Dict] = []
-    try:
-        # Run prediction (verbose=False reduces console output)
-        results = model.predict(image_np, verbose=False)
-
-        # Check if results are valid and contain boxes
-        if results and results[0].boxes and results[0].boxes.data is not None:
-            # Process results - results[0].boxes.data contains [x1, y1, x2, y2, conf, cls]
-            for box_data in results[0].boxes.data:
-                # Ensure tensor is on CPU and convert to numpy for easier handling
-                box_data_cpu = box_data.cpu().numpy()
-
-                x1, y1, x2, y2, conf, cls = box_data_cpu
-
-                # Get class name using the model's names dictionary
-                class_name = (
-                    model.names[int(cls)] if model.names else f"class_{int(cls)}"
-                )
-
-                detection = {
-                    "bbox_pixels": [
-                        float(x1),
-                        float(y1),
-                        float(x2),
-                        float(y2),
-                    ],  # Ensure coords are floats
-                    "confidence": float(conf),
-                    "class_id": int(cls),
-                    "class_name": class_name,
-                }
-                detections.append(detection)
-        else:
-            logger.info("No detections found or results format unexpected.")
+    return worker_model.predict(images, imgsz)
 
-    except Exception as e:
-        logger.error(f"Error during YOLO detection: {e}", exc_info=True)
-        return []  # Return empty list on error during prediction/processing
 
-    return detections
+def run_yolo_detection(image_np: np.ndarray) -> DetectionBatch:
+    """
+    Performs object detection on a given image using the pre-loaded YOLOv8 model.
+
+    Args:
+        image_np: A NumPy array representing the input image (BGR format
+            expected by OpenCV).
+
+    Returns:
+        A `DetectionBatch` with the boxes, confidences and class ids of all
+        detected objects. Use `DetectionBatch.to_dicts` for per-object
+        dictionaries. The batch is empty if the model failed to load or no
+        objects are detected.
+
+    Raises:
+        Exception: If the prediction fails.
+    """
+    return run_yolo_detection_batch([image_np])[0]
 
 
 # Example usage (optional, for testing within the module)
@@ -97,8 +168,8 @@ if __name__ == "__main__":
             logger.info("Running detection on a dummy image...")
             detected_objects = run_yolo_detection(dummy_image)
             logger.info(f"Detected objects: {len(detected_objects)}")
-            if detected_objects:
-                logger.info(f"First detection: {detected_objects[0]}")
+            if len(detected_objects):
+                logger.info(f"First detection: {detected_objects.to_dicts()[0]}")
         else:
             logger.warning("Model not loaded, skipping dummy image test.")
     except ImportError:
@@ -0,0 +1,119 @@
+# backend/app/services/djinn/inference/embeddings.py
+
+import logging
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.vector_index import VectorIndex, normalize_rows
+from app.services.djinn.utils.raster import RasterSource
+
+logger = logging.getLogger(__name__)
+
+# Crops are resized to this square before describing them
+CROP_SIZE = 32
+# Hue x saturation x value bins of the color histogram
+COLOR_BINS = (8, 4, 4)
+# Gradient orientation histograms over a GRID x GRID layout of cells
+GRID = 4
+ORIENTATION_BINS = 8
+EMBEDDING_DIM = int(np.prod(COLOR_BINS)) + GRID * GRID * ORIENTATION_BINS
+# Context added around each box before cropping (fraction of its size)
+CROP_CONTEXT = 0.1
+
+
+def crop_detections(source: RasterSource, boxes: np.ndarray) -> List[np.ndarray]:
+    """
+    Reads the pixels of each box (with a little context) from a raster.
+    Only the boxes' windows are read, so this works on rasters of any size.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    pad = (boxes[:, 2:] - boxes[:, :2]) * CROP_CONTEXT
+    x0 = np.clip(np.floor(boxes[:, 0] - pad[:, 0]), 0, source.width - 1)
+    y0 = np.clip(np.floor(boxes[:, 1] - pad[:, 1]), 0, source.height - 1)
+    x1 = np.clip(np.ceil(boxes[:, 2] + pad[:, 0]), x0 + 1, source.width)
+    y1 = np.clip(np.ceil(boxes[:, 3] + pad[:, 1]), y0 + 1, source.height)
+    return [
+        source.read_window(*window)
+        for window in np.stack([x0, y0, x1, y1], axis=1).astype(np.int64).tolist()
+    ]
+
+
+def embed_crops(crops: List[np.ndarray]) -> np.ndarray:
+    """
+    Computes compact appearance embeddings for a batch of BGR crops.
+
+    Each crop is resized to `CROP_SIZE` and described by an HSV color
+    histogram plus a grid of gradient orientation histograms (a small
+    HOG), both square-rooted (Hellinger) and L2-normalized. After the
+    resize every step runs vectorized over the whole batch.
+
+    Returns:
+        (N, `EMBEDDING_DIM`) float32 array of unit-length embeddings.
+    """
+    if not crops:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    count, size = len(crops), CROP_SIZE
+    batch = np.stack(
+        [cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA) for crop in crops]
+    )
+
+    # Color: the batch is stacked vertically so OpenCV converts it in one call
+    hsv = cv2.cvtColor(batch.reshape(count * size, size, 3), cv2.COLOR_BGR2HSV)
+    hsv = hsv.reshape(count, size * size, 3).astype(np.int64)
+    h_bins, s_bins, v_bins = COLOR_BINS
+    color_bin = (
+        (hsv[..., 0] * h_bins // 180) * s_bins * v_bins
+        + (hsv[..., 1] * s_bins // 256) * v_bins
+        + hsv[..., 2] * v_bins // 256
+    )
+    color_size = h_bins * s_bins * v_bins
+    color = np.bincount(
+        (np.arange(count)[:, None] * color_size + color_bin).ravel(),
+        minlength=count * color_size,
+    ).reshape(count, color_size)
+
+    # Shape: unsigned gradient orientations, weighted by magnitude, per cell
+    gray = batch.astype(np.float32) @ np.float32([0.114, 0.587, 0.299])
+    gx = np.zeros_like(gray)
+    gy = np.zeros_like(gray)
+    gx[:, :, 1:-1] = gray[:, :, 2:] - gray[:, :, :-2]
+    gy[:, 1:-1, :] = gray[:, 2:, :] - gray[:, :-2, :]
+    magnitude = np.hypot(gx, gy)
+    orientation = (np.arctan2(gy, gx) % np.pi) * (ORIENTATION_BINS / np.pi)
+    orientation_bin = np.minimum(orientation.astype(np.int64), ORIENTATION_BINS - 1)
+    cell = size // GRID
+    cell_index = (np.arange(size) // cell)[:, None] * GRID + (np.arange(size) // cell)
+    shape_bin = cell_index[None] * ORIENTATION_BINS + orientation_bin
+    shape_size = GRID * GRID * ORIENTATION_BINS
+    shape = np.bincount(
+        (np.arange(count)[:, None, None] * shape_size + shape_bin).ravel(),
+        weights=magnitude.ravel(),
+        minlength=count * shape_size,
+    ).reshape(count, shape_size)
+
+    # Each part gets equal weight before the final normalization
+    color = normalize_rows(np.sqrt(color))
+    shape = normalize_rows(np.sqrt(shape))
+    return normalize_rows(np.concatenate([color, shape], axis=1))
+
+
+def embed_detections(source: RasterSource, boxes: np.ndarray) -> np.ndarray:
+    """Crops and embeds detections; runs on the inference executor."""
+    return embed_crops(crop_detections(source, boxes))
+
+
+# Embedding index of persisted detections, opened on first use; every server
+# process writes to (and reads) the same files
+detection_embedding_index: Optional[VectorIndex] = (
+    VectorIndex(
+        settings.DJINN_EMBEDDING_INDEX_DIR,
+        dim=EMBEDDING_DIM,
+        nlist=settings.DJINN_EMBEDDING_INDEX_LISTS,
+        nprobe=settings.DJINN_EMBEDDING_INDEX_PROBES,
+    )
+    if settings.DJINN_EMBEDDING_INDEX_DIR
+    else None
+)
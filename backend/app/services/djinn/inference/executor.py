@@ -0,0 +1,113 @@
+# backend/app/services/djinn/inference/executor.py
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference executor cannot accept more work."""
+
+
+def _configure_worker_thread(torch_threads: int) -> None:
+    """
+    Thread pool initializer: applies the torch/OpenCV thread budget and
+    preloads this worker's own copy of the YOLO model.
+    """
+    try:
+        import cv2
+        import torch
+
+        # Both settings are process-wide; applying them repeatedly is harmless.
+        torch.set_num_threads(torch_threads)
+        cv2.setNumThreads(torch_threads)
+    except Exception as e:
+        logger.warning(f"Could not apply inference thread budget: {e}")
+
+    # Imported here to avoid a circular import at module load
+    from .detection import get_worker_model
+
+    get_worker_model()
+    logger.info(
+        f"Inference worker {threading.current_thread().name} ready "
+        f"(torch_threads={torch_threads})"
+    )
+
+
+class InferenceExecutor:
+    """
+    A bounded thread pool dedicated to CPU-bound Djinn work (image decoding,
+    YOLO inference), so that it never runs on the asyncio event loop.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    may wait; further submissions fail fast with `InferenceQueueFull` instead
+    of piling up behind a detection burst.
+    """
+
+    def __init__(self, max_workers: int, torch_threads: int, max_queue: int):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.max_workers = max_workers
+        self.torch_threads = max(1, torch_threads)
+        self.max_queue = max(0, max_queue)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs currently running or waiting in the pool."""
+        return self._pending
+
+    def _ensure_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="djinn-inference",
+                initializer=_configure_worker_thread,
+                initargs=(self.torch_threads,),
+            )
+            logger.info(
+                f"Inference executor started (workers={self.max_workers}, "
+                f"torch_threads={self.torch_threads}, max_queue={self.max_queue})"
+            )
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs ``fn(*args)`` in the inference pool and awaits its result.
+
+        Raises:
+            InferenceQueueFull: If the pool and its queue are already full.
+        """
+        if self._pending >= self.max_workers + self.max_queue:
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self._pending} jobs pending)."
+            )
+
+        pool = self._ensure_pool()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        """Stops the worker threads, waiting for running jobs to finish."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            logger.info("Inference executor shut down.")
+
+
+# Shared executor used by the Djinn API routes and the inference batcher
+inference_executor = InferenceExecutor(
+    max_workers=settings.DJINN_INFERENCE_WORKERS,
+    torch_threads=settings.DJINN_TORCH_THREADS,
+    max_queue=settings.DJINN_INFERENCE_QUEUE_SIZE,
+)
@@ -0,0 +1,223 @@
+# backend/app/services/djinn/inference/quantization.py
+
+"""
+Export and INT8 quantization of Djinn detection models for the CPU backends.
+
+Usage:
+    # 1. Export the PyTorch weights to ONNX (dynamic batch/size)
+    python -m app.services.djinn.inference.quantization export yolov8n.pt
+
+    # 2. Quantize with a calibration set of our own imagery
+    python -m app.services.djinn.inference.quantization quantize \\
+        yolov8n.onnx yolov8n-int8.onnx --calibration-dir /data/calibration
+
+Then set DJINN_INFERENCE_BACKEND=onnxruntime and
+DJINN_MODEL_PATH=yolov8n-int8.onnx.
+"""
+
+import argparse
+import logging
+import os
+from typing import Iterator, List, Optional
+
+import cv2
+
+from .backends import preprocess_batch
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp")
+
+
+def list_images(directory: str, limit: Optional[int] = None) -> List[str]:
+    """Image files in ``directory`` (sorted, optionally only the first ``limit``)."""
+    paths = sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
+
+
+def export_model(weights: str, export_format: str = "onnx", imgsz: int = 640) -> str:
+    """
+    Exports Ultralytics weights for the onnxruntime or openvino backend.
+
+    ONNX exports use dynamic batch and image size, so the batcher and tiled
+    inference can feed any number of tiles at any input size.
+
+    Returns:
+        The path of the exported model (file or directory).
+    """
+    from ultralytics import YOLO
+
+    exported = YOLO(weights).export(
+        format=export_format,
+        imgsz=imgsz,
+        dynamic=export_format == "onnx",
+        simplify=export_format == "onnx",
+    )
+    logger.info(f"Exported {weights} to {exported}")
+    return str(exported)
+
+
+def _calibration_reader_class():
+    """Builds the CalibrationDataReader subclass (onnxruntime is optional)."""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ImageCalibrationReader(CalibrationDataReader):
+        """
+        Feeds calibration images to `quantize_static`, preprocessed exactly
+        like the onnxruntime backend does at inference time.
+        """
+
+        def __init__(self, image_paths: List[str], input_name: str, imgsz: int):
+            self.image_paths = image_paths
+            self.input_name = input_name
+            self.imgsz = imgsz
+            self._iterator: Optional[Iterator] = None
+
+        def _batches(self) -> Iterator:
+            for path in self.image_paths:
+                image = cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is None:
+                    logger.warning(f"Skipping unreadable calibration image {path}")
+                    continue
+                tensor, _ = preprocess_batch([image], self.imgsz)
+                yield {self.input_name: tensor}
+
+        def get_next(self):
+            if self._iterator is None:
+                self._iterator = self._batches()
+            return next(self._iterator, None)
+
+        def rewind(self) -> None:
+            self._iterator = None
+
+    return ImageCalibrationReader
+
+
+def quantize_onnx_model(
+    model_path: str,
+    output_path: str,
+    calibration_dir: str,
+    imgsz: int = 640,
+    max_images: int = 200,
+    per_channel: bool = True,
+) -> str:
+    """
+    Statically quantizes an ONNX detection model to INT8 (QDQ format).
+
+    Activation ranges are calibrated on real imagery, so results stay close
+    to the FP32 model on our data. The detection head's final concat/decode
+    is kept in FP32, since quantizing box coordinates and class scores
+    together costs most of the accuracy.
+
+    Args:
+        model_path: The FP32 ONNX model (see `export_model`).
+        output_path: Where to write the INT8 model.
+        calibration_dir: Directory of representative images.
+        imgsz: Model input size used for calibration.
+        max_images: Maximum number of calibration images to use.
+        per_channel: Quantize weights per output channel (more accurate).
+
+    Returns:
+        ``output_path``.
+
+    Raises:
+        ValueError: If the calibration directory contains no images.
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    image_paths = list_images(calibration_dir, max_images)
+    if not image_paths:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+
+    # Shape inference and graph cleanup make quantization much more complete
+    prepared_path = f"{output_path}.prep.onnx"
+    quant_pre_process(model_path, prepared_path, skip_symbolic_shape=True)
+
+    graph = onnx.load(prepared_path).graph
+    input_name = graph.input[0].name
+    # Keep the nodes after the last convolution (box decoding, class
+    # sigmoid and output concat) in floating point
+    last_conv = max(i for i, node in enumerate(graph.node) if node.op_type == "Conv")
+    excluded = [node.name for node in graph.node[last_conv + 1 :]]
+
+    reader = _calibration_reader_class()(image_paths, input_name, imgsz)
+    logger.info(
+        f"Quantizing {model_path} with {len(image_paths)} calibration images "
+        f"({len(excluded)} head nodes kept in FP32)"
+    )
+    try:
+        quantize_static(
+            prepared_path,
+            output_path,
+            reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=excluded,
+        )
+    finally:
+        if os.path.exists(prepared_path):
+            os.remove(prepared_path)
+
+    # Keep the export metadata (class names) on the quantized model
+    source_meta = onnx.load(model_path, load_external_data=False).metadata_props
+    quantized = onnx.load(output_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source_meta)
+    onnx.save(quantized, output_path)
+
+    logger.info(f"Wrote INT8 model to {output_path}")
+    return output_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export and quantize Djinn detection models."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export .pt weights")
+    export_parser.add_argument("weights")
+    export_parser.add_argument("--format", default="onnx", choices=["onnx", "openvino"])
+    export_parser.add_argument("--imgsz", type=int, default=640)
+
+    quantize_parser = commands.add_parser(
+        "quantize", help="INT8-quantize an ONNX model"
+    )
+    quantize_parser.add_argument("model")
+    quantize_parser.add_argument("output")
+    quantize_parser.add_argument("--calibration-dir", required=True)
+    quantize_parser.add_argument("--imgsz", type=int, default=640)
+    quantize_parser.add_argument("--max-images", type=int, default=200)
+    quantize_parser.add_argument("--per-tensor", action="store_true")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "export":
+        export_model(args.weights, args.format, args.imgsz)
+    else:
+        quantize_onnx_model(
+            args.model,
+            args.output,
+            args.calibration_dir,
+            imgsz=args.imgsz,
+            max_images=args.max_images,
+            per_channel=not args.per_tensor,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# backend/app/services/djinn/inference/results.py
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+class DetectionBatch:
+    """
+    Columnar (struct-of-arrays) detections for a single image.
+
+    Boxes, confidences and class ids are kept as parallel NumPy arrays so that
+    filtering, offsetting and geo-conversion run vectorized over all objects.
+    Per-object Python dictionaries are only built by `to_dicts` at
+    serialization time.
+
+    Attributes:
+        boxes: (N, 4) float32 array of [x1, y1, x2, y2] pixel coordinates.
+        confidences: (N,) float32 array of confidence scores.
+        class_ids: (N,) int32 array of model class ids.
+        names: The model's class id to class name mapping.
+    """
+
+    __slots__ = ("boxes", "confidences", "class_ids", "names")
+
+    def __init__(
+        self,
+        boxes: np.ndarray,
+        confidences: np.ndarray,
+        class_ids: np.ndarray,
+        names: Dict[int, str],
+    ):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int32).reshape(-1)
+        self.names = names
+        if not (len(self.boxes) == len(self.confidences) == len(self.class_ids)):
+            raise ValueError("Detection columns must all have the same length.")
+
+    @classmethod
+    def empty(cls, names: Optional[Dict[int, str]] = None) -> "DetectionBatch":
+        """Creates a batch with no detections."""
+        return cls(
+            np.empty((0, 4), np.float32),
+            np.empty(0, np.float32),
+            np.empty(0, np.int32),
+            names or {},
+        )
+
+    @classmethod
+    def from_array(cls, data: np.ndarray, names: Dict[int, str]) -> "DetectionBatch":
+        """
+        Creates a batch from an (N, 6) array of [x1, y1, x2, y2, conf, cls]
+        rows, the layout of Ultralytics ``boxes.data``.
+        """
+        data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+        return cls(data[:, :4], data[:, 4], data[:, 5].astype(np.int32), names)
+
+    @classmethod
+    def concatenate(
+        cls, batches: Sequence["DetectionBatch"], names: Optional[Dict[int, str]] = None
+    ) -> "DetectionBatch":
+        """Joins several batches into one (names are taken from the first batch)."""
+        if not batches:
+            return cls.empty(names)
+        return cls(
+            np.concatenate([b.boxes for b in batches]),
+            np.concatenate([b.confidences for b in batches]),
+            np.concatenate([b.class_ids for b in batches]),
+            names if names is not None else batches[0].names,
+        )
+
+    def __len__(self) -> int:
+        return len(self.confidences)
+
+    def select(self, index: np.ndarray) -> "DetectionBatch":
+        """Returns the detections picked by a boolean mask or index array."""
+        return DetectionBatch(
+            self.boxes[index],
+            self.confidences[index],
+            self.class_ids[index],
+            self.names,
+        )
+
+    def offset(self, dx: float, dy: float) -> "DetectionBatch":
+        """Returns a copy with all boxes translated by (dx, dy) pixels."""
+        shift = np.array([dx, dy, dx, dy], dtype=np.float32)
+        return DetectionBatch(
+            self.boxes + shift, self.confidences, self.class_ids, self.names
+        )
+
+    def scaled(
+        self, factor: float, factor_y: Optional[float] = None
+    ) -> "DetectionBatch":
+        """
+        Returns a copy with all box coordinates multiplied by ``factor``
+        (x coordinates only, if ``factor_y`` is given for y).
+        """
+        fy = factor if factor_y is None else factor_y
+        return DetectionBatch(
+            self.boxes * np.array([factor, fy, factor, fy], dtype=np.float32),
+            self.confidences,
+            self.class_ids,
+            self.names,
+        )
+
+    def centers(self) -> np.ndarray:
+        """(N, 2) array of box centers as (x, y) pixel coordinates."""
+        return (self.boxes[:, :2] + self.boxes[:, 2:]) * 0.5
+
+    def class_ids_for(self, class_names: Iterable[str]) -> np.ndarray:
+        """Maps class names (case-insensitive) to the model's class ids."""
+        wanted = {name.lower() for name in class_names}
+        return np.array(
+            [cid for cid, name in self.names.items() if name.lower() in wanted],
+            dtype=np.int32,
+        )
+
+    def filter(
+        self,
+        min_confidence: float = 0.0,
+        class_names: Optional[Iterable[str]] = None,
+    ) -> "DetectionBatch":
+        """
+        Vectorized validity, confidence and class filter.
+
+        Drops rows with non-finite values, degenerate boxes (x2 <= x1 or
+        y2 <= y1) or confidence below ``min_confidence``, and, when
+        ``class_names`` is given, rows of any other class.
+        """
+        mask = np.isfinite(self.boxes).all(axis=1) & np.isfinite(self.confidences)
+        mask &= (self.boxes[:, 2] > self.boxes[:, 0]) & (
+            self.boxes[:, 3] > self.boxes[:, 1]
+        )
+        mask &= self.confidences >= min_confidence
+        if class_names is not None:
+            mask &= np.isin(self.class_ids, self.class_ids_for(class_names))
+        if mask.all():
+            return self
+        return self.select(mask)
+
+    def class_names(self) -> List[str]:
+        """Class name for every detection, in row order."""
+        return [self.names.get(int(cid), f"class_{int(cid)}") for cid in self.class_ids]
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        Serializes the batch to per-object dictionaries with keys:
+        'bbox_pixels', 'confidence', 'class_id', 'class_name'.
+        """
+        return [
+            {
+                "bbox_pixels": box,
+                "confidence": conf,
+                "class_id": cid,
+                "class_name": name,
+            }
+            for box, conf, cid, name in zip(
+                self.boxes.tolist(),
+                self.confidences.tolist(),
+                self.class_ids.tolist(),
+                self.class_names(),
+            )
+        ]
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """(N, M) IoU matrix between two sets of [x1, y1, x2, y2] boxes."""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def non_max_suppression(
+    boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, iou_threshold: float
+) -> np.ndarray:
+    """
+    Class-aware greedy non-maximum suppression.
+
+    Args:
+        boxes: (N, 4) array of [x1, y1, x2, y2] boxes.
+        scores: (N,) array of confidence scores.
+        class_ids: (N,) array of class ids; boxes only suppress their own class.
+        iou_threshold: Boxes overlapping a higher scoring box by more than this
+                       IoU are dropped.
+
+    Returns:
+        Indices of the boxes to keep, ordered by descending score.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Offset each class into its own coordinate range so a single pass never
+    # compares boxes of different classes.
+    offsets = class_ids.astype(np.float64)[:, None] * (float(boxes.max()) + 1.0)
+    shifted = boxes.astype(np.float64) + offsets
+    x1, y1, x2, y2 = shifted.T
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    order = np.argsort(-scores, kind="stable")
+    keep: List[int] = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        inter_w = np.clip(
+            np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None
+        )
+        inter_h = np.clip(
+            np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None
+        )
+        inter = inter_w * inter_h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
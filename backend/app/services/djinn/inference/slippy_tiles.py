@@ -0,0 +1,239 @@
+# backend/app/services/djinn/inference/slippy_tiles.py
+
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.djinn.utils.slippy import fetch_tile_image, tiles_for_bounds
+
+from . import detection
+from .cache import DetectionCache
+from .executor import InferenceExecutor
+from .results import DetectionBatch
+from .tiling import merge_edge_fragments
+
+logger = logging.getLogger(__name__)
+
+# Per-tile detections in tile pixel coordinates, keyed by model + imagery + z/x/y
+tile_cache = DetectionCache(
+    max_entries=settings.DJINN_TILE_CACHE_SIZE,
+    persist_dir=settings.DJINN_TILE_CACHE_DIR,
+    max_disk_entries=settings.DJINN_TILE_CACHE_DISK_SIZE,
+)
+
+# Tiles currently being fetched/inferred, so concurrent viewport requests over
+# the same area wait for the running work instead of repeating it.
+_inflight: Dict[str, "asyncio.Future[Optional[DetectionBatch]]"] = {}
+
+
+class TileDetections:
+    """
+    Detections assembled for a viewport, in global Web Mercator pixel
+    coordinates (``tile_index * DJINN_TILE_PIXEL_SIZE + pixel offset``) at
+    ``zoom``, plus how many tiles were served from cache.
+    """
+
+    def __init__(
+        self,
+        detections: DetectionBatch,
+        zoom: int,
+        tiles_total: int,
+        tiles_cached: int,
+        tiles_inferred: int,
+        tiles_failed: int,
+    ):
+        self.detections = detections
+        self.zoom = zoom
+        self.tiles_total = tiles_total
+        self.tiles_cached = tiles_cached
+        self.tiles_inferred = tiles_inferred
+        self.tiles_failed = tiles_failed
+
+
+def tile_cache_key(zoom: int, x: int, y: int, model_id: str) -> str:
+    """
+    Cache key of one tile. Includes the imagery URL template so switching the
+    imagery source does not serve detections made on other pixels.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(
+        f"{model_id}|{settings.DJINN_TILE_URL_TEMPLATE}|{zoom}/{x}/{y}".encode()
+    )
+    return digest.hexdigest()
+
+
+def _fetch_tile(zoom: int, x: int, y: int) -> Optional[np.ndarray]:
+    """Fetches a tile and normalizes it to DJINN_TILE_PIXEL_SIZE pixels."""
+    image_np = fetch_tile_image(zoom, x, y)
+    tile_size = settings.DJINN_TILE_PIXEL_SIZE
+    if image_np is not None and image_np.shape[:2] != (tile_size, tile_size):
+        image_np = cv2.resize(
+            image_np, (tile_size, tile_size), interpolation=cv2.INTER_AREA
+        )
+    return image_np
+
+
+async def _compute_tiles(
+    zoom: int,
+    coords: List[Tuple[int, int]],
+    futures: List["asyncio.Future[Optional[DetectionBatch]]"],
+    keys: List[str],
+    executor: InferenceExecutor,
+) -> None:
+    """
+    Fetches and runs detection on missing tiles, resolving one future per
+    tile (None when the tile could not be fetched) and filling the cache.
+    """
+    try:
+        fetch_slots = asyncio.Semaphore(settings.DJINN_TILE_FETCH_CONCURRENCY)
+
+        async def fetch(x: int, y: int) -> Optional[np.ndarray]:
+            async with fetch_slots:
+                return await asyncio.to_thread(_fetch_tile, zoom, x, y)
+
+        images = await asyncio.gather(*(fetch(x, y) for x, y in coords))
+        fetched = [i for i, image_np in enumerate(images) if image_np is not None]
+
+        # Tiles are already model-sized, so run them in batches without resizing
+        tile_size = settings.DJINN_TILE_PIXEL_SIZE
+        imgsz = max(32, int(np.ceil(tile_size / 32.0)) * 32)
+        batch_size = settings.DJINN_BATCH_MAX_SIZE
+        chunks = [
+            fetched[i : i + batch_size] for i in range(0, len(fetched), batch_size)
+        ]
+        chunk_results = await asyncio.gather(
+            *(
+                executor.run(
+                    detection.run_yolo_detection_batch,
+                    [images[i] for i in chunk],
+                    imgsz,
+                )
+                for chunk in chunks
+            )
+        )
+
+        results: List[Optional[DetectionBatch]] = [None] * len(coords)
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for i, tile_detections in zip(chunk, chunk_result):
+                results[i] = tile_detections
+
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+        # Don't cache the empty results produced when the model failed to load
+        if detection.model is not None:
+            for key, result in zip(keys, results):
+                if result is not None:
+                    await asyncio.to_thread(tile_cache.put, key, result)
+    except BaseException as e:
+        for future in futures:
+            if not future.done():
+                future.set_exception(e)
+        raise
+    finally:
+        for key in keys:
+            _inflight.pop(key, None)
+
+
+async def detect_viewport_tiles(
+    bounds: Dict, zoom: int, executor: InferenceExecutor
+) -> TileDetections:
+    """
+    Detects objects in all slippy-map tiles covering ``bounds`` at ``zoom``.
+
+    Tiles seen before are served from the tile cache; only missing tiles are
+    fetched from DJINN_TILE_URL_TEMPLATE and run through the model (batched).
+    The per-tile results are placed in global pixel coordinates and objects
+    cut by tile borders are merged back together.
+
+    Args:
+        bounds: Leaflet-style bounds of the viewport.
+        zoom: The tile zoom level to detect at.
+        executor: The inference executor to run batches on.
+
+    Raises:
+        ValueError: If the bounds are invalid or cover too many tiles.
+        InferenceQueueFull: If the inference pool is saturated.
+    """
+    coords = tiles_for_bounds(bounds, zoom)
+    if len(coords) > settings.DJINN_TILE_MAX_PER_REQUEST:
+        raise ValueError(
+            f"Viewport covers {len(coords)} tiles at zoom {zoom}; the maximum is "
+            f"{settings.DJINN_TILE_MAX_PER_REQUEST}. Zoom in or use a lower zoom level."
+        )
+
+    model_id = detection.get_model_id()
+    keys = [tile_cache_key(zoom, x, y, model_id) for x, y in coords]
+    cached = await asyncio.to_thread(lambda: [tile_cache.get(key) for key in keys])
+
+    # Start work for tiles that are neither cached nor already in flight
+    loop = asyncio.get_running_loop()
+    pending: Dict[int, "asyncio.Future[Optional[DetectionBatch]]"] = {}
+    missing: List[int] = []
+    for i, key in enumerate(keys):
+        if cached[i] is not None:
+            continue
+        if key in _inflight:
+            pending[i] = _inflight[key]
+        else:
+            pending[i] = _inflight[key] = loop.create_future()
+            missing.append(i)
+
+    compute_task = None
+    if missing:
+        logger.info(
+            f"Tile detection at zoom {zoom}: {len(coords)} tiles, "
+            f"{len(coords) - len(pending)} cached, {len(missing)} to infer"
+        )
+        # A separate task, so the work completes (and is cached) even if this
+        # request is cancelled
+        compute_task = asyncio.ensure_future(
+            _compute_tiles(
+                zoom,
+                [coords[i] for i in missing],
+                [pending[i] for i in missing],
+                [keys[i] for i in missing],
+                executor,
+            )
+        )
+
+    # Shielded: cancelling an awaiting request must not cancel the task or the
+    # shared futures that other viewers of the same tiles are waiting on
+    if compute_task is not None:
+        await asyncio.shield(compute_task)
+    results = list(cached)
+    for i, future in pending.items():
+        results[i] = await asyncio.shield(future)
+
+    # Assemble in global pixel coordinates
+    tile_size = settings.DJINN_TILE_PIXEL_SIZE
+    placed: List[DetectionBatch] = []
+    tile_index: List[np.ndarray] = []
+    for (x, y), tile_detections in zip(coords, results):
+        if tile_detections is not None and len(tile_detections):
+            placed.append(tile_detections.offset(x * tile_size, y * tile_size))
+            tile_index.append(np.tile([x, y], (len(tile_detections), 1)))
+
+    detections = DetectionBatch.concatenate(placed)
+    if len(detections):
+        detections = merge_edge_fragments(
+            detections,
+            np.concatenate(tile_index),
+            tile_size,
+            margin=settings.DJINN_TILE_EDGE_MARGIN_PX,
+        )
+
+    tiles_failed = sum(1 for result in results if result is None)
+    return TileDetections(
+        detections,
+        zoom=zoom,
+        tiles_total=len(coords),
+        tiles_cached=len(coords) - len(pending),
+        tiles_inferred=len(pending) - tiles_failed,
+        tiles_failed=tiles_failed,
+    )
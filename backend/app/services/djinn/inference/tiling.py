@@ -0,0 +1,366 @@
+# backend/app/services/djinn/inference/tiling.py
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.djinn.utils.raster import ArrayRasterSource, RasterSource
+
+from . import detection
+from .executor import InferenceExecutor, InferenceQueueFull
+from .results import DetectionBatch, non_max_suppression
+
+logger = logging.getLogger(__name__)
+
+# (x0, y0, x1, y1) pixel window of a tile within the full image
+TileWindow = Tuple[int, int, int, int]
+
+
+def _tile_starts(length: int, tile_size: int, stride: int) -> List[int]:
+    """Start offsets along one axis so that the last tile ends at ``length``."""
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+def compute_tile_windows(
+    img_height: int, img_width: int, tile_size: int, overlap: float
+) -> List[TileWindow]:
+    """
+    Splits an image into overlapping, equally sized tiles.
+
+    Args:
+        img_height: Image height in pixels.
+        img_width: Image width in pixels.
+        tile_size: Edge length of each (square) tile in pixels.
+        overlap: Fraction of ``tile_size`` shared by neighbouring tiles (0 to <1).
+
+    Returns:
+        A list of (x0, y0, x1, y1) windows covering the whole image. Tiles are
+        clipped to the image, so images smaller than a tile yield one window.
+    """
+    if tile_size <= 0:
+        raise ValueError("Tile size must be positive.")
+    if not 0.0 <= overlap < 1.0:
+        raise ValueError("Tile overlap must be in the range [0, 1).")
+
+    stride = max(1, int(round(tile_size * (1.0 - overlap))))
+    windows: List[TileWindow] = []
+    for y0 in _tile_starts(img_height, tile_size, stride):
+        for x0 in _tile_starts(img_width, tile_size, stride):
+            windows.append(
+                (
+                    x0,
+                    y0,
+                    min(x0 + tile_size, img_width),
+                    min(y0 + tile_size, img_height),
+                )
+            )
+    return windows
+
+
+def merge_tile_detections(
+    tile_detections: List[DetectionBatch], windows: List[TileWindow], merge_iou: float
+) -> DetectionBatch:
+    """
+    Maps per-tile detections back to full-image coordinates and removes the
+    duplicates produced by overlapping tiles.
+
+    Args:
+        tile_detections: Detections for each tile, in tile coordinates.
+        windows: The tile windows, in the same order as ``tile_detections``.
+        merge_iou: IoU threshold for cross-tile non-maximum suppression.
+
+    Returns:
+        A `DetectionBatch` in full-image pixel coordinates.
+    """
+    merged = DetectionBatch.concatenate(
+        [
+            detections.offset(x0, y0)
+            for detections, (x0, y0, _, _) in zip(tile_detections, windows)
+            if len(detections)
+        ],
+        names=tile_detections[0].names if tile_detections else None,
+    )
+
+    if len(windows) <= 1 or not len(merged):
+        return merged
+
+    keep = non_max_suppression(
+        merged.boxes, merged.confidences, merged.class_ids, merge_iou
+    )
+    return merged.select(keep)
+
+
+def _detect_windows(
+    source: RasterSource,
+    windows: List[TileWindow],
+    imgsz: int,
+    downsample: int,
+) -> List[DetectionBatch]:
+    """
+    Reads a batch of tiles from ``source`` and detects objects in them.
+    Runs in an inference worker, so only this batch's pixels are in memory.
+    """
+    crops = [source.read_window(*window, downsample=downsample) for window in windows]
+    results = detection.run_yolo_detection_batch(crops, imgsz)
+    if downsample > 1:
+        results = [batch.scaled(downsample) for batch in results]
+    return results
+
+
+async def run_tiled_detection(
+    image_np: np.ndarray,
+    tile_size: int,
+    overlap: float,
+    merge_iou: float,
+    executor: InferenceExecutor,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+) -> DetectionBatch:
+    """
+    Runs detection on overlapping tiles of a decoded image.
+
+    Tiles are plain NumPy views of ``image_np`` (no copies); see
+    `run_tiled_detection_on_source` for the details and for rasters that
+    are too large to decode.
+    """
+    return await run_tiled_detection_on_source(
+        ArrayRasterSource(image_np),
+        tile_size=tile_size,
+        overlap=overlap,
+        merge_iou=merge_iou,
+        executor=executor,
+        on_progress=on_progress,
+    )
+
+
+async def run_tiled_detection_on_source(
+    source: RasterSource,
+    tile_size: int,
+    overlap: float,
+    merge_iou: float,
+    executor: InferenceExecutor,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    downsample: int = 1,
+    busy_retry_seconds: Optional[float] = None,
+) -> DetectionBatch:
+    """
+    Runs detection on overlapping tiles of a raster, reading each tile only
+    when its batch is about to be inferred.
+
+    Tiles are grouped into batches of ``DJINN_BATCH_MAX_SIZE`` and spread
+    across the executor's workers; at most one batch per worker is in flight
+    at a time and each batch reads its own windows, so peak memory is bounded
+    by the tile size, not by the size of the raster.
+
+    Args:
+        source: The raster to run detection on.
+        tile_size: Edge length of each tile in (downsampled) pixels. Also
+                   used as the model input size so tiles are not downscaled.
+        overlap: Fraction of each tile shared with its neighbours.
+        merge_iou: IoU threshold for merging duplicates across tiles.
+        executor: The inference executor to run batches on.
+        on_progress: Optional coroutine called with (tiles done, tiles total)
+                     after every batch.
+        downsample: Detect on the raster reduced by this factor (read from
+                    its overviews where available), for objects that are
+                    large at full resolution.
+        busy_retry_seconds: When set, a batch the executor rejects as full is
+                            retried after this many seconds, so background
+                            runs wait for capacity instead of failing. When
+                            unset, the run fails with `InferenceQueueFull`.
+
+    Returns:
+        A `DetectionBatch` in full-resolution pixel coordinates.
+
+    Raises:
+        InferenceQueueFull: If the executor is full and
+                            ``busy_retry_seconds`` is not set.
+    """
+    downsample = max(1, downsample)
+    windows = compute_tile_windows(
+        source.height, source.width, tile_size * downsample, overlap
+    )
+    # YOLO input sizes must be a multiple of the model stride (32)
+    imgsz = max(32, int(np.ceil(tile_size / 32.0)) * 32)
+    batch_size = settings.DJINN_BATCH_MAX_SIZE
+
+    logger.info(
+        f"Tiled detection on {source.width}x{source.height} raster: "
+        f"{len(windows)} tiles (tile_size={tile_size}, overlap={overlap}, "
+        f"merge_iou={merge_iou}, downsample={downsample})"
+    )
+
+    slots = asyncio.Semaphore(executor.max_workers)
+    tiles_done = 0
+
+    async def run_batch(batch_windows: List[TileWindow]) -> List[DetectionBatch]:
+        nonlocal tiles_done
+        async with slots:
+            while True:
+                try:
+                    result = await executor.run(
+                        _detect_windows, source, batch_windows, imgsz, downsample
+                    )
+                    break
+                except InferenceQueueFull:
+                    if busy_retry_seconds is None:
+                        raise
+                    # Only this batch waits; finished batches are kept
+                    await asyncio.sleep(busy_retry_seconds)
+        tiles_done += len(batch_windows)
+        if on_progress is not None:
+            await on_progress(tiles_done, len(windows))
+        return result
+
+    batches = [windows[i : i + batch_size] for i in range(0, len(windows), batch_size)]
+    tasks = [asyncio.ensure_future(run_batch(b)) for b in batches]
+    try:
+        batch_results = await asyncio.gather(*tasks)
+    finally:
+        # After a failure, don't leave the remaining batches running unawaited
+        for task in tasks:
+            task.cancel()
+
+    tile_detections = [dets for result in batch_results for dets in result]
+    return merge_tile_detections(tile_detections, windows, merge_iou)
+
+
+def union_find_groups(count: int, pairs: np.ndarray) -> np.ndarray:
+    """
+    Connected components over ``count`` items linked by index pairs.
+
+    Args:
+        count: Number of items.
+        pairs: (M, 2) array of linked item indices.
+
+    Returns:
+        (count,) array of group labels, numbered 0..G-1 in order of first item.
+    """
+    parent = np.arange(count)
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]  # Path halving
+            i = parent[i]
+        return i
+
+    for a, b in np.asarray(pairs, dtype=np.int64).reshape(-1, 2):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    roots = np.array([find(i) for i in range(count)], dtype=np.int64)
+    _, labels = np.unique(roots, return_inverse=True)
+    return labels.reshape(-1)
+
+
+def merge_edge_fragments(
+    detections: DetectionBatch,
+    tile_index: np.ndarray,
+    tile_size: int,
+    margin: float,
+    min_overlap: float = 0.5,
+) -> DetectionBatch:
+    """
+    Joins objects that were cut in two by the border between adjacent,
+    non-overlapping tiles.
+
+    Two same-class boxes from horizontally (or vertically) neighbouring tiles
+    are linked when both touch the shared edge (within ``margin`` pixels) and
+    their extents along that edge overlap by at least ``min_overlap`` of the
+    shorter one. Linked boxes (transitively, so objects spanning a tile corner
+    are handled too) are replaced by their union box with the highest
+    confidence of the group.
+
+    Args:
+        detections: Detections in global pixel coordinates.
+        tile_index: (N, 2) integer (tile_x, tile_y) of the tile each detection
+                    came from.
+        tile_size: Tile edge length in pixels.
+        margin: Distance from a tile edge within which a box counts as cut.
+        min_overlap: Required overlap along the shared edge (0 to 1).
+
+    Returns:
+        A `DetectionBatch` with the fragments merged.
+    """
+    if len(detections) < 2:
+        return detections
+
+    boxes = detections.boxes.astype(np.float64)
+    x1, y1, x2, y2 = boxes.T
+    tx, ty = np.asarray(tile_index, dtype=np.int64).reshape(-1, 2).T
+    class_ids = detections.class_ids
+
+    def edge_pairs(
+        near_end: np.ndarray,
+        near_start: np.ndarray,
+        step: Tuple[int, int],
+        lo: np.ndarray,
+        hi: np.ndarray,
+    ) -> List[np.ndarray]:
+        """
+        (i, j) pairs of fragments i touching the far edge of their tile and
+        j touching the near edge of the next tile along ``step``, of the
+        same class and overlapping along the edge. Only boxes touching an
+        edge are considered, grouped by (tile, class), so the work grows
+        with the number of cut boxes, not with N * N.
+        """
+        starts: Dict[Tuple[int, int, int], List[int]] = {}
+        for j in np.flatnonzero(near_start).tolist():
+            starts.setdefault((tx[j], ty[j], class_ids[j]), []).append(j)
+        found = []
+        for i in np.flatnonzero(near_end).tolist():
+            candidates = starts.get((tx[i] + step[0], ty[i] + step[1], class_ids[i]))
+            if not candidates:
+                continue
+            j = np.asarray(candidates, dtype=np.int64)
+            inter = np.minimum(hi[i], hi[j]) - np.maximum(lo[i], lo[j])
+            shorter = np.minimum(hi[i] - lo[i], hi[j] - lo[j])
+            j = j[inter / np.maximum(shorter, 1e-9) >= min_overlap]
+            if len(j):
+                found.append(np.stack([np.full(len(j), i), j], axis=1))
+        return found
+
+    # i is the left (or top) fragment, j the right (or bottom) one
+    horizontal = edge_pairs(
+        x2 >= (tx + 1) * tile_size - margin,
+        x1 <= tx * tile_size + margin,
+        (1, 0),
+        y1,
+        y2,
+    )
+    vertical = edge_pairs(
+        y2 >= (ty + 1) * tile_size - margin,
+        y1 <= ty * tile_size + margin,
+        (0, 1),
+        x1,
+        x2,
+    )
+    if not horizontal and not vertical:
+        return detections
+    pairs = np.concatenate(horizontal + vertical)
+
+    labels = union_find_groups(len(detections), pairs)
+    group_count = int(labels.max()) + 1
+    merged_boxes = np.empty((group_count, 4), dtype=np.float64)
+    merged_boxes[:, :2] = np.inf
+    merged_boxes[:, 2:] = -np.inf
+    np.minimum.at(merged_boxes[:, 0], labels, x1)
+    np.minimum.at(merged_boxes[:, 1], labels, y1)
+    np.maximum.at(merged_boxes[:, 2], labels, x2)
+    np.maximum.at(merged_boxes[:, 3], labels, y2)
+    confidences = np.zeros(group_count, dtype=np.float32)
+    np.maximum.at(confidences, labels, detections.confidences)
+    class_ids = np.zeros(group_count, dtype=np.int32)
+    class_ids[labels] = detections.class_ids
+
+    logger.debug(
+        f"Merged {len(detections)} tile detections into {group_count} across tile edges"
+    )
+    return DetectionBatch(merged_boxes, confidences, class_ids, detections.names)
@@ -0,0 +1,200 @@
+# backend/app/services/djinn/inference/tracking.py
+
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from .results import DetectionBatch, box_iou
+
+logger = logging.getLogger(__name__)
+
+
+class Track:
+    """
+    One object followed across video frames.
+
+    Besides the latest box, a track keeps its highest-confidence observation,
+    which is what gets persisted once the track ends.
+    """
+
+    __slots__ = (
+        "track_id",
+        "class_id",
+        "box",
+        "velocity",
+        "confidence",
+        "best_box",
+        "best_confidence",
+        "best_frame",
+        "first_frame",
+        "last_frame",
+        "hits",
+    )
+
+    def __init__(
+        self,
+        track_id: int,
+        box: np.ndarray,
+        confidence: float,
+        class_id: int,
+        frame_index: int,
+    ):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.box = box.astype(np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)  # Box change per frame
+        self.confidence = confidence
+        self.best_box = self.box
+        self.best_confidence = confidence
+        self.best_frame = frame_index
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.hits = 1
+
+    def predict(self, frame_index: int) -> np.ndarray:
+        """Box expected at ``frame_index`` under constant velocity."""
+        return self.box + self.velocity * (frame_index - self.last_frame)
+
+    def update(self, box: np.ndarray, confidence: float, frame_index: int) -> None:
+        elapsed = max(1, frame_index - self.last_frame)
+        # Smoothed so a single jittery box does not throw the prediction off
+        self.velocity = 0.5 * self.velocity + 0.5 * (box - self.box) / elapsed
+        self.box = box.astype(np.float32)
+        self.confidence = confidence
+        self.last_frame = frame_index
+        self.hits += 1
+        if confidence > self.best_confidence:
+            self.best_box = self.box
+            self.best_confidence = confidence
+            self.best_frame = frame_index
+
+
+def _greedy_match(iou: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """Pairs rows and columns by descending IoU, each used at most once."""
+    pairs = np.argwhere(iou >= threshold)
+    if not len(pairs):
+        return []
+    order = np.argsort(-iou[pairs[:, 0], pairs[:, 1]], kind="stable")
+    used_rows, used_cols, matches = set(), set(), []
+    for row, col in pairs[order].tolist():
+        if row not in used_rows and col not in used_cols:
+            used_rows.add(row)
+            used_cols.add(col)
+            matches.append((row, col))
+    return matches
+
+
+class IoUTracker:
+    """
+    Lightweight multi-object tracker for per-frame detections.
+
+    Follows ByteTrack's two-stage association: detections at or above
+    ``high_confidence`` are matched to the (velocity-predicted) tracks first,
+    then the remaining tracks get a second chance against the low-confidence
+    detections, which keeps objects tracked through partial occlusion and
+    motion blur. Matching is by IoU within the same class. Only unmatched
+    high-confidence detections start new tracks.
+
+    A track is confirmed after ``min_hits`` observations and ends once it
+    has not been seen for ``max_age`` frames. Frame indices are those of the
+    source video, so skipped frames simply widen the gap between updates.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        high_confidence: float = 0.5,
+        max_age: int = 30,
+        min_hits: int = 3,
+    ):
+        self.iou_threshold = iou_threshold
+        self.high_confidence = high_confidence
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.tracks: List[Track] = []
+        self.finished: List[Track] = []
+        self._next_id = 1
+
+    def _associate(
+        self,
+        tracks: List[Track],
+        detections: DetectionBatch,
+        candidates: np.ndarray,
+        frame_index: int,
+    ) -> List[Tuple[int, int]]:
+        """Matches ``tracks`` to the detection rows in ``candidates``."""
+        if not tracks or not len(candidates):
+            return []
+        predicted = np.stack([track.predict(frame_index) for track in tracks])
+        iou = box_iou(predicted, detections.boxes[candidates])
+        track_classes = np.array([track.class_id for track in tracks])
+        iou[track_classes[:, None] != detections.class_ids[candidates][None, :]] = 0.0
+        return [
+            (t, int(candidates[d])) for t, d in _greedy_match(iou, self.iou_threshold)
+        ]
+
+    def update(self, detections: DetectionBatch, frame_index: int) -> np.ndarray:
+        """
+        Associates one frame's detections with the tracks.
+
+        Args:
+            detections: The frame's detections.
+            frame_index: Index of the frame in the source video; must increase.
+
+        Returns:
+            (N,) int64 array of track ids, one per detection row, -1 for
+            low-confidence detections that matched no track.
+        """
+        track_ids = np.full(len(detections), -1, dtype=np.int64)
+        high = np.flatnonzero(detections.confidences >= self.high_confidence)
+        low = np.flatnonzero(detections.confidences < self.high_confidence)
+
+        def apply(matches: List[Tuple[int, int]], tracks: List[Track]) -> set:
+            for t, d in matches:
+                track = tracks[t]
+                track.update(
+                    detections.boxes[d], float(detections.confidences[d]), frame_index
+                )
+                track_ids[d] = track.track_id
+            return {t for t, _ in matches}
+
+        matched = apply(
+            self._associate(self.tracks, detections, high, frame_index), self.tracks
+        )
+        remaining = [t for i, t in enumerate(self.tracks) if i not in matched]
+        apply(self._associate(remaining, detections, low, frame_index), remaining)
+
+        for d in high[track_ids[high] < 0]:
+            track = Track(
+                self._next_id,
+                detections.boxes[d],
+                float(detections.confidences[d]),
+                int(detections.class_ids[d]),
+                frame_index,
+            )
+            self._next_id += 1
+            self.tracks.append(track)
+            track_ids[d] = track.track_id
+
+        # Retire tracks that have not been seen for too long
+        alive = []
+        for track in self.tracks:
+            if frame_index - track.last_frame > self.max_age:
+                if track.hits >= self.min_hits:
+                    self.finished.append(track)
+            else:
+                alive.append(track)
+        self.tracks = alive
+        return track_ids
+
+    def pop_finished(self) -> List[Track]:
+        """Confirmed tracks that ended since the last call."""
+        finished, self.finished = self.finished, []
+        return finished
+
+    def flush(self) -> List[Track]:
+        """Ends all tracks; returns every confirmed track not yet popped."""
+        confirmed = [track for track in self.tracks if track.hits >= self.min_hits]
+        self.tracks = []
+        return self.pop_finished() + confirmed
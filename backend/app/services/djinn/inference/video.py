@@ -0,0 +1,199 @@
+# backend/app/services/djinn/inference/video.py
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+from . import detection
+from .executor import InferenceExecutor, InferenceQueueFull
+from .results import DetectionBatch
+from .tracking import IoUTracker, Track
+
+logger = logging.getLogger(__name__)
+
+# Wait before retrying a batch the inference pool rejected as full
+BUSY_RETRY_SECONDS = 0.2
+
+# (frame index in the source, timestamp in ms, decoded BGR frame)
+Frame = Tuple[int, float, np.ndarray]
+
+
+def read_video_frames(
+    capture: cv2.VideoCapture, start_index: int, count: int, frame_stride: int
+) -> Tuple[List[Frame], int, bool]:
+    """
+    Reads the next ``count`` sampled frames from an open capture.
+
+    Only every ``frame_stride``-th frame is decoded; the frames in between
+    are skipped with ``grab()``, which demuxes without decoding.
+
+    Args:
+        capture: An opened `cv2.VideoCapture`.
+        start_index: Index of the next frame the capture will return.
+        count: Maximum number of sampled frames to return.
+        frame_stride: Sample one frame out of this many.
+
+    Returns:
+        A tuple of (frames, index of the next unread frame, end of video reached).
+    """
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    frames: List[Frame] = []
+    index = start_index
+    while len(frames) < count:
+        if index % frame_stride:
+            if not capture.grab():
+                return frames, index, True
+            index += 1
+            continue
+        ok, frame = capture.read()
+        if not ok:
+            return frames, index, True
+        timestamp_ms = index * 1000.0 / fps if fps > 0 else 0.0
+        frames.append((index, timestamp_ms, frame))
+        index += 1
+    return frames, index, False
+
+
+def decode_frames(buffers: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+    """Decodes encoded (JPEG/PNG) frames; unreadable frames become None."""
+    return [
+        cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+        for buffer in buffers
+    ]
+
+
+def track_to_dict(track: Track, names: Dict[int, str]) -> Dict[str, Any]:
+    """Serializes a finished track (its best observation) for clients."""
+    return {
+        "track_id": track.track_id,
+        "class_name": names.get(track.class_id, f"class_{track.class_id}"),
+        "confidence": round(float(track.best_confidence), 4),
+        "bbox": [round(float(v), 1) for v in track.best_box],
+        "best_frame": track.best_frame,
+        "first_frame": track.first_frame,
+        "last_frame": track.last_frame,
+        "hits": track.hits,
+    }
+
+
+class StreamingDetector:
+    """
+    Batched detection and tracking over a stream of video frames.
+
+    Frames are sent to the inference executor in batches (one predict call
+    per batch), then fed to an `IoUTracker` in frame order. Each processed
+    frame yields a message with its tracked detections, so callers can
+    stream results while the rest of the video is still being read.
+    """
+
+    def __init__(
+        self,
+        executor: InferenceExecutor,
+        frame_stride: int = 1,
+        min_confidence: float = 0.0,
+        classes: Optional[List[str]] = None,
+    ):
+        self.executor = executor
+        self.frame_stride = max(1, frame_stride)
+        self.min_confidence = min_confidence
+        self.classes = classes
+        # A track must survive at least one skipped stretch of frames
+        self.tracker = IoUTracker(
+            iou_threshold=settings.DJINN_TRACK_IOU_THRESHOLD,
+            high_confidence=settings.DJINN_TRACK_HIGH_CONFIDENCE,
+            max_age=max(settings.DJINN_TRACK_MAX_AGE_FRAMES, 2 * self.frame_stride),
+            min_hits=settings.DJINN_TRACK_MIN_HITS,
+        )
+        self.names: Dict[int, str] = {}
+        self.frames_processed = 0
+
+    async def run_on_executor(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs CPU-bound stream work (decoding, inference) on the executor,
+        waiting out a full queue instead of failing the stream.
+        """
+        while True:
+            try:
+                return await self.executor.run(fn, *args)
+            except InferenceQueueFull:
+                await asyncio.sleep(BUSY_RETRY_SECONDS)
+
+    async def process(self, frames: Sequence[Frame]) -> List[Dict[str, Any]]:
+        """
+        Detects and tracks objects in a batch of frames (in frame order).
+
+        Returns:
+            One message per frame: {'frame', 'timestamp_ms', 'detections'},
+            each detection with 'track_id', 'class_name', 'confidence' and
+            'bbox' ([x1, y1, x2, y2] pixels).
+        """
+        if not frames:
+            return []
+        images = [image for _, _, image in frames]
+        batches: List[DetectionBatch] = await self.run_on_executor(
+            detection.run_yolo_detection_batch, images, None
+        )
+
+        messages = []
+        for (index, timestamp_ms, _), batch in zip(frames, batches):
+            if batch.names:
+                self.names = batch.names
+            batch = batch.filter(
+                min_confidence=self.min_confidence, class_names=self.classes
+            )
+            track_ids = self.tracker.update(batch, index)
+            tracked = track_ids >= 0
+            messages.append(
+                {
+                    "frame": index,
+                    "timestamp_ms": round(timestamp_ms, 1),
+                    "detections": [
+                        {
+                            "track_id": track_id,
+                            "class_name": class_name,
+                            "confidence": round(confidence, 4),
+                            "bbox": [round(v, 1) for v in box],
+                        }
+                        for track_id, class_name, confidence, box in zip(
+                            track_ids[tracked].tolist(),
+                            batch.select(tracked).class_names(),
+                            batch.confidences[tracked].tolist(),
+                            batch.boxes[tracked].tolist(),
+                        )
+                    ],
+                }
+            )
+        self.frames_processed += len(frames)
+        return messages
+
+    async def process_encoded(
+        self, frames: Sequence[Tuple[int, float, bytes]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Decodes a batch of encoded (JPEG/PNG) frames, then detects and tracks
+        objects in them like `process`. Unreadable frames are skipped.
+        """
+        images = await self.run_on_executor(
+            decode_frames, [data for _, _, data in frames]
+        )
+        return await self.process(
+            [
+                (index, timestamp_ms, image)
+                for (index, timestamp_ms, _), image in zip(frames, images)
+                if image is not None
+            ]
+        )
+
+    def finish(self) -> List[Track]:
+        """Ends tracking and returns every confirmed track."""
+        tracks = self.tracker.flush()
+        logger.info(
+            f"Video stream finished: {self.frames_processed} frames processed, "
+            f"{len(tracks)} confirmed tracks"
+        )
+        return tracks
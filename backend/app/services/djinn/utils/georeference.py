@@ -0,0 +1,183 @@
+import logging
+from typing import Dict, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class GeoTransform:
+    """
+    Maps image pixel coordinates to geographic coordinates (lat, lng).
+
+    The mapping is a 3x3 projective matrix ``M`` applied to homogeneous pixel
+    coordinates: ``[lng * w, lat * w, w] = M @ [px, py, 1]``. Axis-aligned
+    bounds and GDAL affine geotransforms are special cases (last row
+    ``[0, 0, 1]``); ground control points produce a full homography.
+
+    Build one instance per image and reuse it for every detection - all
+    transform methods accept whole NumPy arrays of coordinates.
+    """
+
+    def __init__(self, matrix: np.ndarray, img_width: int, img_height: int):
+        if img_width <= 0 or img_height <= 0:
+            raise ValueError("Image width and height must be positive.")
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.shape != (3, 3):
+            raise ValueError("Geotransform matrix must be 3x3.")
+        self.matrix = matrix
+        self.img_width = img_width
+        self.img_height = img_height
+
+    @classmethod
+    def from_bounds(
+        cls, bounds: Dict, img_width: int, img_height: int
+    ) -> "GeoTransform":
+        """
+        Creates a linear transform from Leaflet-style bounds, where the image
+        top-left corner is the north-west corner of the bounds.
+
+        Args:
+            bounds: A dictionary with keys
+                    '_southWest': {'lat': float, 'lng': float} and
+                    '_northEast': {'lat': float, 'lng': float}.
+            img_width: The total width of the image in pixels.
+            img_height: The total height of the image in pixels.
+
+        Raises:
+            ValueError: If the bounds dictionary is missing required keys or
+                        if image dimensions are non-positive.
+        """
+        if img_width <= 0 or img_height <= 0:
+            raise ValueError("Image width and height must be positive.")
+        try:
+            lat_min = float(bounds["_southWest"]["lat"])
+            lng_min = float(bounds["_southWest"]["lng"])
+            lat_max = float(bounds["_northEast"]["lat"])
+            lng_max = float(bounds["_northEast"]["lng"])
+        except KeyError as e:
+            raise ValueError(f"Bounds dictionary is missing required key: {e}")
+        except (TypeError, ValueError):
+            raise ValueError("Bounds dictionary has an invalid structure.")
+
+        # Longitude increases from left (lng_min) to right (lng_max);
+        # latitude decreases from top (lat_max) to bottom (lat_min).
+        return cls.from_gdal(
+            (
+                lng_min,
+                (lng_max - lng_min) / img_width,
+                0.0,
+                lat_max,
+                0.0,
+                -(lat_max - lat_min) / img_height,
+            ),
+            img_width,
+            img_height,
+        )
+
+    @classmethod
+    def from_gdal(
+        cls, geotransform: Sequence[float], img_width: int, img_height: int
+    ) -> "GeoTransform":
+        """
+        Creates an affine transform from a GDAL-style geotransform
+        ``(x0, dx_px, dx_py, y0, dy_px, dy_py)`` in a lat/lng (EPSG:4326) CRS,
+        where ``lng = x0 + px*dx_px + py*dx_py`` and
+        ``lat = y0 + px*dy_px + py*dy_py``.
+        """
+        if len(geotransform) != 6:
+            raise ValueError("A GDAL geotransform must have exactly 6 coefficients.")
+        x0, dx_px, dx_py, y0, dy_px, dy_py = (float(v) for v in geotransform)
+        matrix = np.array(
+            [[dx_px, dx_py, x0], [dy_px, dy_py, y0], [0.0, 0.0, 1.0]],
+            dtype=np.float64,
+        )
+        return cls(matrix, img_width, img_height)
+
+    @classmethod
+    def from_gcps(
+        cls,
+        pixel_points: np.ndarray,
+        geo_points: np.ndarray,
+        img_width: int,
+        img_height: int,
+    ) -> "GeoTransform":
+        """
+        Fits a transform to ground control points.
+
+        Three points give an exact affine transform; four or more are fitted
+        with a least-squares homography, which also captures perspective in
+        oblique imagery.
+
+        Args:
+            pixel_points: (N, 2) array of (px, py) pixel coordinates.
+            geo_points: (N, 2) array of matching (lat, lng) coordinates.
+            img_width: The total width of the image in pixels.
+            img_height: The total height of the image in pixels.
+
+        Raises:
+            ValueError: If fewer than three points are given or the fit fails.
+        """
+        src = np.asarray(pixel_points, dtype=np.float64).reshape(-1, 2)
+        # Work in (lng, lat) so that x/y line up with px/py
+        dst = np.asarray(geo_points, dtype=np.float64).reshape(-1, 2)[:, ::-1]
+        if len(src) != len(dst):
+            raise ValueError("Pixel and geographic point counts differ.")
+        if len(src) < 3:
+            raise ValueError("At least three ground control points are required.")
+
+        if len(src) == 3:
+            affine = cv2.getAffineTransform(
+                src.astype(np.float32), dst.astype(np.float32)
+            )
+            matrix = np.vstack([affine.astype(np.float64), [0.0, 0.0, 1.0]])
+        else:
+            matrix, _ = cv2.findHomography(src, dst, 0)
+            if matrix is None:
+                raise ValueError("Could not fit a homography to the control points.")
+        return cls(matrix, img_width, img_height)
+
+    def pixel_to_geo(
+        self, px: np.ndarray, py: np.ndarray, clip: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transforms arrays of pixel coordinates to geographic coordinates.
+
+        Args:
+            px: Array of x-coordinates (horizontal position).
+            py: Array of y-coordinates (vertical position), same shape as ``px``.
+            clip: Clamp coordinates to the image extent first.
+
+        Returns:
+            A tuple of (latitude, longitude) arrays with the shape of ``px``.
+        """
+        px = np.asarray(px, dtype=np.float64)
+        py = np.asarray(py, dtype=np.float64)
+        if clip:
+            px = np.clip(px, 0, self.img_width)
+            py = np.clip(py, 0, self.img_height)
+
+        m = self.matrix
+        x = m[0, 0] * px + m[0, 1] * py + m[0, 2]
+        y = m[1, 0] * px + m[1, 1] * py + m[1, 2]
+        w = m[2, 0] * px + m[2, 1] * py + m[2, 2]
+        return y / w, x / w
+
+    def boxes_to_footprints(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        Transforms all four corners of many pixel bounding boxes at once.
+
+        Args:
+            boxes: (N, 4) array of [x1, y1, x2, y2] pixel boxes.
+
+        Returns:
+            (N, 4, 2) array of (lat, lng) corners per box, ordered top-left,
+            top-right, bottom-right, bottom-left.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        x1, y1, x2, y2 = boxes.T
+        corner_x = np.stack([x1, x2, x2, x1], axis=1)
+        corner_y = np.stack([y1, y1, y2, y2], axis=1)
+        lat, lng = self.pixel_to_geo(corner_x, corner_y)
+        return np.stack([lat, lng], axis=-1)
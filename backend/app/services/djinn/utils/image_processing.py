@@ -1,52 +1,227 @@
 import base64
+import json
 import logging
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
+from .georeference import GeoTransform
+
 logger = logging.getLogger(__name__)
 
+# JPEG decode flags per DCT scale denominator; libjpeg skips the
+# high-frequency coefficients instead of decoding and then resizing
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
 
-def decode_base64_image(image_data: str) -> Optional[np.ndarray]:
+
+def decode_image_bytes(image_buffer: bytes) -> Optional[np.ndarray]:
     """
-    Decodes a base64 encoded image string into an OpenCV NumPy array (BGR format).
+    Decodes an encoded image (PNG, JPEG, ...) into an OpenCV NumPy array (BGR).
+
+    The buffer is wrapped with ``np.frombuffer`` rather than copied, so raw
+    request bodies can be decoded without intermediate copies.
 
     Args:
-        image_data: The base64 encoded image string, potentially with a
-                    data URI prefix (e.g., "data:image/png;base64,").
+        image_buffer: The encoded image bytes (any buffer-protocol object).
 
     Returns:
         A NumPy array representing the decoded image in BGR format,
         or None if decoding fails.
     """
     try:
-        # Remove potential data URI prefix
-        if "," in image_data:
-            header, encoded_data = image_data.split(",", 1)
-        else:
-            encoded_data = image_data
-
-        # Decode base64
-        image_bytes = base64.b64decode(encoded_data)
-
-        # Convert bytes to NumPy array using OpenCV
-        image_np = np.frombuffer(image_bytes, np.uint8)
+        image_np = np.frombuffer(image_buffer, np.uint8)
         image_cv = cv2.imdecode(image_np, cv2.IMREAD_COLOR)
-
         if image_cv is None:
             logger.error("Failed to decode image data with OpenCV.")
+        return image_cv
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during image decoding: {e}")
+        return None
+
+
+def jpeg_size(image_buffer: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Reads the (width, height) of a JPEG from its frame header without
+    decoding it, or returns None if the buffer is not a JPEG.
+    """
+    data = memoryview(image_buffer)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    offset = 2
+    while offset + 9 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # Fill byte
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # No length field
+            offset += 2
+            continue
+        length = (data[offset + 2] << 8) | data[offset + 3]
+        if marker in _JPEG_SOF_MARKERS:
+            height = (data[offset + 5] << 8) | data[offset + 6]
+            width = (data[offset + 7] << 8) | data[offset + 8]
+            return (width, height) if width and height else None
+        if marker == 0xDA:  # Start of scan before any frame header
             return None
+        offset += 2 + length
+    return None
 
-        return image_cv
-    except base64.binascii.Error as e:
+
+def decode_image_for_detection(
+    image_buffer: bytes, target_size: int
+) -> Optional[Tuple[np.ndarray, Tuple[int, int]]]:
+    """
+    Decodes an encoded image for detection at the smallest resolution the
+    model can still use.
+
+    Detection letterboxes every image down to ``target_size`` pixels on the
+    longer side, so a large JPEG is decoded at 1/2, 1/4 or 1/8 scale
+    (``IMREAD_REDUCED_COLOR_*``) when that still leaves at least
+    ``target_size`` pixels - faster, and without allocating the
+    full-resolution array. Other formats are decoded normally.
+
+    Args:
+        image_buffer: The encoded image bytes (any buffer-protocol object).
+        target_size: The model input size.
+
+    Returns:
+        A tuple of (BGR image, (original width, original height)), or None
+        if decoding fails. Boxes found in the image map back to original
+        pixels by the ratio of the two sizes.
+    """
+    size = jpeg_size(image_buffer)
+    if size is not None:
+        # Largest reduction that still covers the model input
+        for factor, flag in _REDUCED_DECODE_FLAGS:
+            if max(size) // factor >= target_size:
+                break
+        else:
+            size = None
+    if size is None:
+        image = decode_image_bytes(image_buffer)
+        return None if image is None else (image, (image.shape[1], image.shape[0]))
+
+    try:
+        image = cv2.imdecode(np.frombuffer(image_buffer, np.uint8), flag)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during image decoding: {e}")
+        return None
+    if image is None:
+        logger.error("Failed to decode image data with OpenCV.")
+        return None
+    # libjpeg rounds scaled sizes up; EXIF orientation may swap the axes
+    width, height = size
+    reduced = (-(-width // factor), -(-height // factor))
+    decoded = (image.shape[1], image.shape[0])
+    if decoded == reduced:
+        return image, (width, height)
+    if decoded == reduced[::-1]:
+        return image, (height, width)
+    logger.warning(
+        f"Reduced JPEG decode gave {decoded}, expected {reduced}; decoding fully"
+    )
+    image = decode_image_bytes(image_buffer)
+    return None if image is None else (image, (image.shape[1], image.shape[0]))
+
+
+def decode_base64_bytes(image_data: str) -> Optional[bytes]:
+    """
+    Decodes a base64 encoded image string, with or without a data URI
+    prefix (e.g., "data:image/png;base64,"), to the encoded image bytes.
+
+    Returns:
+        The bytes, or None if the data is not valid base64.
+    """
+    # Remove potential data URI prefix
+    if "," in image_data:
+        _, image_data = image_data.split(",", 1)
+    try:
+        return base64.b64decode(image_data)
+    except (base64.binascii.Error, ValueError) as e:
         logger.error(f"Invalid base64 data: {e}")
         return None
+
+
+def decode_base64_image(image_data: str) -> Optional[np.ndarray]:
+    """
+    Decodes a base64 encoded image string into an OpenCV NumPy array (BGR format).
+
+    Args:
+        image_data: The base64 encoded image string, potentially with a
+                    data URI prefix (e.g., "data:image/png;base64,").
+
+    Returns:
+        A NumPy array representing the decoded image in BGR format,
+        or None if decoding fails.
+    """
+    try:
+        image_bytes = decode_base64_bytes(image_data)
+        if image_bytes is None:
+            return None
+
+        # Convert bytes to NumPy array using OpenCV
+        return decode_image_bytes(image_bytes)
     except Exception as e:
         logger.error(f"An unexpected error occurred during image decoding: {e}")
         return None
 
 
+def parse_bounds(value: str) -> Dict:
+    """
+    Parses bounds sent as a header or form field.
+
+    Args:
+        value: Either Leaflet-style bounds JSON
+               ('{"_southWest": {...}, "_northEast": {...}}') or four
+               comma-separated numbers 'south,west,north,east'.
+
+    Returns:
+        A Leaflet-style bounds dictionary with '_southWest' and '_northEast'.
+
+    Raises:
+        ValueError: If the value matches neither format.
+    """
+    value = value.strip()
+    if value.startswith("{"):
+        try:
+            bounds = json.loads(value)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Bounds JSON is malformed: {e}")
+        if not isinstance(bounds, dict):
+            raise ValueError("Bounds JSON must be an object.")
+        return bounds
+
+    parts = [part.strip() for part in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("Expected bounds as 'south,west,north,east'.")
+    try:
+        south, west, north, east = (float(part) for part in parts)
+    except ValueError:
+        raise ValueError("Bounds values must be numbers.")
+    return {
+        "_southWest": {"lat": south, "lng": west},
+        "_northEast": {"lat": north, "lng": east},
+    }
+
+
+def split_classes(classes: Optional[List[str]]) -> Optional[List[str]]:
+    """Accepts both repeated (?classes=a&classes=b) and comma-separated values."""
+    if classes is None:
+        return None
+    return [
+        name.strip() for value in classes for name in value.split(",") if name.strip()
+    ]
+
+
 def convert_pixel_to_geo(
     px: float, py: float, img_width: int, img_height: int, bounds: Dict
 ) -> Tuple[float, float]:
@@ -70,32 +245,11 @@ def convert_pixel_to_geo(
     Raises:
         ValueError: If the bounds dictionary is missing required keys or
                     if image dimensions are non-positive.
-    """
-    if img_width <= 0 or img_height <= 0:
-        raise ValueError("Image width and height must be positive.")
 
-    try:
-        lat_min = bounds["_southWest"]["lat"]
-        lng_min = bounds["_southWest"]["lng"]
-        lat_max = bounds["_northEast"]["lat"]
-        lng_max = bounds["_northEast"]["lng"]
-    except KeyError as e:
-        raise ValueError(f"Bounds dictionary is missing required key: {e}")
-    except TypeError:
-        raise ValueError("Bounds dictionary has an invalid structure.")
-
-    # Ensure coordinates are within image bounds (optional, but good practice)
-    px = max(0, min(px, img_width))
-    py = max(0, min(py, img_height))
-
-    geo_width = lng_max - lng_min
-    geo_height = lat_max - lat_min
-
-    # Perform linear interpolation
-    # Longitude increases from left (lng_min) to right (lng_max)
-    lng = lng_min + (px / img_width) * geo_width
-
-    # Latitude decreases from top (lat_max) to bottom (lat_min) in image coordinates
-    lat = lat_max - (py / img_height) * geo_height
-
-    return lat, lng
+    Note:
+        This is a single-point convenience wrapper. When converting many points
+        for the same image, build a `GeoTransform` once and transform arrays.
+    """
+    transform = GeoTransform.from_bounds(bounds, img_width, img_height)
+    lat, lng = transform.pixel_to_geo(px, py)
+    return float(lat), float(lng)
@@ -0,0 +1,268 @@
+"""
+Lazy, windowed access to imagery of any size.
+
+Detection on large rasters (multi-gigabyte GeoTIFFs, mosaics) must never
+decode the whole file into one array. A `RasterSource` exposes the raster's
+size and georeferencing up front and reads only the pixel windows asked for,
+so memory use is bounded by the window size instead of the image size:
+
+- GeoTIFF / COG / JPEG2000 and other GDAL formats are read through
+  rasterio (optional dependency, ``poetry install -E raster``), one window
+  at a time, using the file's overviews for downsampled reads and its
+  geotransform/CRS for georeferencing.
+- ``.npy`` arrays are memory-mapped.
+- Anything else (or everything, without rasterio) is decoded with OpenCV,
+  which is fine for ordinary photos and screenshots.
+"""
+
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+from .georeference import GeoTransform
+
+logger = logging.getLogger(__name__)
+
+# Formats opened through rasterio (when installed) instead of OpenCV
+RASTER_EXTENSIONS = (".tif", ".tiff", ".jp2", ".img", ".vrt", ".ntf", ".nitf")
+
+
+class RasterSource:
+    """
+    Base class of the raster readers.
+
+    Attributes:
+        width: Raster width in pixels.
+        height: Raster height in pixels.
+    """
+
+    width: int
+    height: int
+
+    def read_window(
+        self, x0: int, y0: int, x1: int, y1: int, downsample: int = 1
+    ) -> np.ndarray:
+        """
+        Reads the pixel window [x0, x1) x [y0, y1) as a BGR uint8 image.
+
+        Args:
+            x0, y0, x1, y1: The window in full-resolution pixel coordinates.
+            downsample: Read the window reduced by this factor (using the
+                        raster's overviews where available).
+        """
+        raise NotImplementedError
+
+    def overview_factors(self) -> List[int]:
+        """Decimation factors of the raster's internal overviews (pyramid)."""
+        return []
+
+    def pixel_to_geo(
+        self, px: np.ndarray, py: np.ndarray
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Converts full-resolution pixel coordinates to (lat, lng) arrays, or
+        returns None if the raster carries no georeferencing.
+        """
+        return None
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "RasterSource":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ArrayRasterSource(RasterSource):
+    """
+    A raster already held in (or memory-mapped into) a NumPy array.
+
+    Windows are returned as views, so reading them copies nothing; for a
+    memory-mapped array only the pages of the window are ever loaded.
+    """
+
+    def __init__(self, image: np.ndarray, geo_transform: Optional[GeoTransform] = None):
+        self.image = image
+        self.height, self.width = image.shape[:2]
+        self.geo_transform = geo_transform
+
+    def read_window(
+        self, x0: int, y0: int, x1: int, y1: int, downsample: int = 1
+    ) -> np.ndarray:
+        window = self.image[y0:y1, x0:x1]
+        # Channel conversions only ever touch the window, never the full array
+        if window.ndim == 2:
+            window = cv2.cvtColor(np.asarray(window), cv2.COLOR_GRAY2BGR)
+        elif window.shape[2] > 3:
+            window = window[:, :, :3]
+        if downsample <= 1:
+            return window
+        size = (
+            max(1, -(-(x1 - x0) // downsample)),
+            max(1, -(-(y1 - y0) // downsample)),
+        )
+        return cv2.resize(np.asarray(window), size, interpolation=cv2.INTER_AREA)
+
+    def pixel_to_geo(
+        self, px: np.ndarray, py: np.ndarray
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if self.geo_transform is None:
+            return None
+        return self.geo_transform.pixel_to_geo(px, py)
+
+
+class RasterioRasterSource(RasterSource):
+    """
+    Windowed reader for GDAL-supported rasters.
+
+    rasterio dataset handles must not be shared between threads, so every
+    inference worker thread opens its own handle on first use.
+    """
+
+    def __init__(self, path: str):
+        # GDAL's block cache is the only other place decoded pixels pile up
+        os.environ.setdefault("GDAL_CACHEMAX", str(settings.DJINN_RASTER_GDAL_CACHE_MB))
+
+        self.path = path
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+        dataset = self._dataset()
+        self.width = dataset.width
+        self.height = dataset.height
+        self.dtype = np.dtype(dataset.dtypes[0])
+        # Bands 1-3 are taken as RGB; single-band rasters are grayscale
+        self.bands = [1, 2, 3] if dataset.count >= 3 else [1]
+        self.crs = dataset.crs
+        self.transform = dataset.transform
+        self._value_range: Optional[Tuple[float, float]] = None
+
+    def _dataset(self):
+        dataset = getattr(self._local, "dataset", None)
+        if dataset is None:
+            import rasterio
+
+            dataset = rasterio.open(self.path)
+            self._local.dataset = dataset
+            with self._lock:
+                self._handles.append(dataset)
+        return dataset
+
+    def overview_factors(self) -> List[int]:
+        return list(self._dataset().overviews(1))
+
+    def _scale_range(self) -> Tuple[float, float]:
+        """
+        Value range mapped to 0-255 for non-8-bit rasters, estimated once
+        from a small (overview-backed) read so every window is scaled alike.
+        """
+        if self._value_range is None:
+            from rasterio.enums import Resampling
+
+            scale = max(1.0, max(self.width, self.height) / 1024.0)
+            sample = self._dataset().read(
+                self.bands,
+                out_shape=(
+                    len(self.bands),
+                    max(1, int(self.height / scale)),
+                    max(1, int(self.width / scale)),
+                ),
+                resampling=Resampling.average,
+            )
+            low, high = np.percentile(sample, [2, 98])
+            self._value_range = (float(low), float(max(high, low + 1)))
+        return self._value_range
+
+    def read_window(
+        self, x0: int, y0: int, x1: int, y1: int, downsample: int = 1
+    ) -> np.ndarray:
+        from rasterio.enums import Resampling
+        from rasterio.windows import Window
+
+        width, height = x1 - x0, y1 - y0
+        out_shape = (
+            len(self.bands),
+            max(1, -(-height // downsample)),
+            max(1, -(-width // downsample)),
+        )
+        data = self._dataset().read(
+            self.bands,
+            window=Window(x0, y0, width, height),
+            out_shape=out_shape,
+            resampling=Resampling.average if downsample > 1 else Resampling.nearest,
+        )
+
+        if self.dtype != np.uint8:
+            low, high = self._scale_range()
+            data = np.clip((data - low) * (255.0 / (high - low)), 0, 255)
+            data = data.astype(np.uint8)
+        if len(self.bands) == 1:
+            return cv2.cvtColor(data[0], cv2.COLOR_GRAY2BGR)
+        # (bands, h, w) RGB -> contiguous (h, w, 3) BGR
+        return np.ascontiguousarray(data[::-1].transpose(1, 2, 0))
+
+    def pixel_to_geo(
+        self, px: np.ndarray, py: np.ndarray
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if self.crs is None or self.transform.is_identity:
+            return None
+        t = self.transform
+        px = np.asarray(px, dtype=np.float64)
+        py = np.asarray(py, dtype=np.float64)
+        xs = t.a * px + t.b * py + t.c
+        ys = t.d * px + t.e * py + t.f
+        if self.crs.to_epsg() == 4326:
+            return ys, xs
+        from rasterio.warp import transform
+
+        lngs, lats = transform(self.crs, "EPSG:4326", xs.ravel(), ys.ravel())
+        return (
+            np.asarray(lats).reshape(px.shape),
+            np.asarray(lngs).reshape(px.shape),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            for dataset in self._handles:
+                dataset.close()
+            self._handles = []
+        self._local = threading.local()
+
+
+def open_raster(path: str) -> RasterSource:
+    """
+    Opens an image file with the most memory-efficient reader available.
+
+    Raises:
+        ValueError: If the file cannot be read as an image.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        return ArrayRasterSource(np.load(path, mmap_mode="r"))
+
+    if extension in RASTER_EXTENSIONS:
+        try:
+            import rasterio  # noqa: F401
+        except ImportError:
+            logger.warning(
+                f"rasterio is not installed; decoding all of {path} into memory"
+            )
+        else:
+            try:
+                return RasterioRasterSource(path)
+            except Exception as e:
+                logger.warning(f"rasterio could not open {path} ({e}), using OpenCV")
+
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not read {path} as an image.")
+    return ArrayRasterSource(image)
@@ -0,0 +1,103 @@
+import logging
+import math
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+from .image_processing import decode_image_bytes
+
+logger = logging.getLogger(__name__)
+
+# Web Mercator (EPSG:3857) is only defined up to ~85.0511 degrees latitude
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def lat_lng_to_tile(lat: float, lng: float, zoom: int) -> Tuple[float, float]:
+    """
+    Converts a geographic coordinate to fractional slippy-map tile coordinates.
+
+    Args:
+        lat: Latitude in decimal degrees.
+        lng: Longitude in decimal degrees.
+        zoom: The tile zoom level.
+
+    Returns:
+        A tuple of (x, y) tile coordinates; the integer parts are the z/x/y
+        tile indices and the fractions the position inside the tile.
+    """
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    n = 2.0**zoom
+    x = (lng + 180.0) / 360.0 * n
+    lat_rad = math.radians(lat)
+    y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tiles_for_bounds(bounds: Dict, zoom: int) -> List[Tuple[int, int]]:
+    """
+    Lists the (x, y) indices of all tiles intersecting Leaflet-style bounds.
+
+    Raises:
+        ValueError: If the bounds dictionary is missing required keys.
+    """
+    try:
+        south = float(bounds["_southWest"]["lat"])
+        west = float(bounds["_southWest"]["lng"])
+        north = float(bounds["_northEast"]["lat"])
+        east = float(bounds["_northEast"]["lng"])
+    except KeyError as e:
+        raise ValueError(f"Bounds dictionary is missing required key: {e}")
+    except (TypeError, ValueError):
+        raise ValueError("Bounds dictionary has an invalid structure.")
+
+    max_index = 2**zoom - 1
+    x_min, y_min = lat_lng_to_tile(north, west, zoom)
+    x_max, y_max = lat_lng_to_tile(south, east, zoom)
+    x_range = range(max(0, int(x_min)), min(max_index, int(x_max)) + 1)
+    y_range = range(max(0, int(y_min)), min(max_index, int(y_max)) + 1)
+    return [(x, y) for y in y_range for x in x_range]
+
+
+def global_pixels_to_lat_lng(
+    gx: np.ndarray, gy: np.ndarray, zoom: int, tile_size: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts global Web Mercator pixel coordinates (tile index * tile_size +
+    pixel offset) to geographic coordinates, vectorized and exact (unlike a
+    linear interpolation between viewport bounds).
+
+    Returns:
+        A tuple of (latitude, longitude) arrays.
+    """
+    world_size = tile_size * 2.0**zoom
+    gx = np.asarray(gx, dtype=np.float64)
+    gy = np.asarray(gy, dtype=np.float64)
+    lng = gx / world_size * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * gy / world_size))))
+    return lat, lng
+
+
+def fetch_tile_image(zoom: int, x: int, y: int) -> Optional[np.ndarray]:
+    """
+    Downloads and decodes one imagery tile from DJINN_TILE_URL_TEMPLATE.
+
+    This performs blocking network I/O; call it from a worker thread.
+
+    Returns:
+        The tile as a BGR NumPy array, or None if it could not be fetched.
+    """
+    url = settings.DJINN_TILE_URL_TEMPLATE.format(z=zoom, x=x, y=y)
+    request = urllib.request.Request(
+        url, headers={"User-Agent": f"{settings.PROJECT_NAME} Djinn"}
+    )
+    try:
+        with urllib.request.urlopen(  # nosec B310 - URL comes from settings
+            request, timeout=settings.DJINN_TILE_FETCH_TIMEOUT_SECONDS
+        ) as response:
+            return decode_image_bytes(response.read())
+    except Exception as e:
+        logger.warning(f"Failed to fetch imagery tile {zoom}/{x}/{y}: {e}")
+        return None
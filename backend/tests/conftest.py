@@ -0,0 +1,12 @@
+import os
+
+# Settings without defaults are normally supplied by the deployment's .env;
+# the unit tests never reach the services they configure.
+for name in (
+    "NEO4J_PASSWORD",
+    "MINIO_SECRET_KEY",
+    "GOOGLE_CLIENT_ID",
+    "GOOGLE_CLIENT_SECRET",
+    "GOOGLE_REDIRECT_URI",
+):
+    os.environ.setdefault(name, "test")
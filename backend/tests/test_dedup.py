@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+from app.services.djinn.inference import dedup
+from app.services.djinn.inference.dedup import (
+    METERS_PER_DEGREE,
+    RecentObjectIndex,
+    combine_groups,
+    find_nearby_pairs,
+    group_duplicates,
+)
+
+LAT, LNG = 48.85, 2.35
+# Degrees of latitude per metre
+METRE = 1.0 / METERS_PER_DEGREE
+
+
+def _brute_force_pairs(x, y, tolerance):
+    return {
+        (i, j)
+        for i in range(len(x))
+        for j in range(i + 1, len(x))
+        if np.hypot(x[i] - x[j], y[i] - y[j]) <= tolerance
+    }
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 2.0, 7.5])
+def test_nearby_pairs_match_brute_force(tolerance):
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-40, 40, (2, 300))
+    pairs = find_nearby_pairs(x, y, tolerance)
+    found = {(min(i, j), max(i, j)) for i, j in pairs.tolist()}
+    assert len(found) == len(pairs)
+    assert found == _brute_force_pairs(x, y, tolerance)
+
+
+def test_nearby_pairs_of_too_few_points_or_no_tolerance():
+    assert find_nearby_pairs(np.array([1.0]), np.array([1.0]), 5.0).shape == (0, 2)
+    x = y = np.zeros(3)
+    assert find_nearby_pairs(x, y, 0.0).shape == (0, 2)
+
+
+def test_duplicates_are_grouped_by_class_and_distance():
+    lats = LAT + np.array([0.0, 1.0, 0.5, 50.0]) * METRE
+    labels = group_duplicates(lats, np.full(4, LNG), ["car", "car", "truck", "car"], 3)
+    assert labels.tolist() == [0, 0, 1, 2]
+
+
+def test_duplicates_are_grouped_transitively():
+    # Each car is 2 m from the next, so the chain is one group at 3 m
+    lats = LAT + np.arange(5) * 2.0 * METRE
+    labels = group_duplicates(lats, np.full(5, LNG), ["car"] * 5, 3)
+    assert labels.tolist() == [0] * 5
+
+
+def test_groups_combine_to_a_weighted_location():
+    labels = np.array([0, 0, 1])
+    lats = np.array([10.0, 20.0, 5.0])
+    lngs = np.array([1.0, 4.0, 7.0])
+    representative, lat, lng, confidence, count = combine_groups(
+        labels, lats, lngs, np.array([0.2, 0.6, 0.5]), np.array([1, 1, 3])
+    )
+    assert representative.tolist() == [1, 2]
+    assert lat.tolist() == pytest.approx([17.5, 5.0])
+    assert lng.tolist() == pytest.approx([3.25, 7.0])
+    assert confidence.tolist() == pytest.approx([0.6, 0.5])
+    assert count.tolist() == [2, 3]
+
+
+def _observe(index, class_names, offsets_m, confidence=0.8):
+    count = len(class_names)
+    return index.observe(
+        class_names,
+        LAT + np.asarray(offsets_m, dtype=np.float64) * METRE,
+        np.full(count, LNG),
+        np.full(count, confidence),
+        np.ones(count, dtype=np.int64),
+    )
+
+
+def test_object_seen_again_keeps_its_id():
+    index = RecentObjectIndex(tolerance_m=3, ttl_seconds=60, max_objects=100)
+    (first,), _ = _observe(index, ["car"], [0.0])
+    (second,), totals = _observe(index, ["car"], [1.5])
+    assert second == first
+    assert totals.tolist() == [2]
+    assert len(index) == 1
+
+
+def test_objects_of_another_class_or_too_far_are_new():
+    index = RecentObjectIndex(tolerance_m=3, ttl_seconds=60, max_objects=100)
+    (car,), _ = _observe(index, ["car"], [0.0])
+    ids, totals = _observe(index, ["truck", "car"], [0.0, 10.0])
+    assert car not in ids
+    assert totals.tolist() == [1, 1]
+    assert len(index) == 3
+
+
+def test_observations_of_one_batch_are_never_merged():
+    index = RecentObjectIndex(tolerance_m=3, ttl_seconds=60, max_objects=100)
+    ids, _ = _observe(index, ["car", "car"], [0.0, 1.0])
+    assert len(set(ids)) == 2
+
+
+def test_closest_observation_takes_a_known_object():
+    index = RecentObjectIndex(tolerance_m=3, ttl_seconds=60, max_objects=100)
+    (known,), _ = _observe(index, ["car"], [0.0])
+    # Both are within the tolerance; only the closer one is the same car
+    ids, totals = _observe(index, ["car", "car"], [2.0, 0.5])
+    assert ids[1] == known and ids[0] != known
+    assert totals.tolist() == [1, 2]
+
+
+def test_merged_location_moves_the_object_across_cells():
+    index = RecentObjectIndex(tolerance_m=3, ttl_seconds=60, max_objects=100)
+    (known,), _ = _observe(index, ["car"], [0.0])
+    # Each sighting is 2.5 m ahead of the averaged location; together they
+    # move it more than a grid cell, where it must still be found
+    location = 0.0
+    for count in range(1, 10):
+        (seen,), _ = _observe(index, ["car"], [location + 2.5])
+        assert seen == known
+        location += 2.5 / (count + 1)
+    assert location > 3.0
+
+
+def test_objects_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: now[0])
+    index = RecentObjectIndex(tolerance_m=3, ttl_seconds=60, max_objects=100)
+    (first,), _ = _observe(index, ["car"], [0.0])
+    now[0] += 30
+    assert _observe(index, ["car"], [0.0])[0] == [first]
+    now[0] += 61
+    assert _observe(index, ["car"], [0.0])[0] != [first]
+    assert len(index) == 1
+
+
+def test_least_recently_seen_objects_are_dropped_first():
+    index = RecentObjectIndex(tolerance_m=3, ttl_seconds=60, max_objects=2)
+    (a,), _ = _observe(index, ["car"], [0.0])
+    (b,), _ = _observe(index, ["car"], [100.0])
+    _observe(index, ["car"], [0.0])  # a is seen again, b is now the oldest
+    _observe(index, ["car"], [200.0])
+    assert len(index) == 2
+    assert _observe(index, ["car"], [0.0])[0] == [a]
+    assert _observe(index, ["car"], [100.0])[0] != [b]
+
+
+@pytest.mark.parametrize("tolerance_m, max_objects", [(0, 10), (3, 0)])
+def test_index_without_tolerance_or_room_is_disabled(tolerance_m, max_objects):
+    index = RecentObjectIndex(tolerance_m, ttl_seconds=60, max_objects=max_objects)
+    assert not index.enabled
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from app.kappa.extraction import chunk_text
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+
+
+def _sample_text(words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(4, 15))
+        words -= length
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length)) + "."
+        sentences.append(sentence)
+        if rng.random() < 0.2:
+            sentences.append("\n\n")
+    return " ".join(sentences).replace(" \n\n ", "\n\n")
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text("", 100, 10) == []
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("Just a few words.", 100, 10) == [(0, "Just a few words.")]
+
+
+@pytest.mark.parametrize("size, overlap", [(50, 0), (80, 20), (200, 50), (500, 120)])
+def test_chunks_fit_and_point_into_the_text(size, overlap):
+    text = _sample_text(2000)
+    chunks = chunk_text(text, size, overlap)
+    assert len(chunks) > 1
+    for start, chunk in chunks:
+        assert 0 < len(chunk) <= size
+        assert chunk in text[start : start + size]
+
+
+@pytest.mark.parametrize("size, overlap", [(50, 0), (80, 20), (200, 50)])
+def test_chunks_cover_every_word(size, overlap):
+    text = _sample_text(1000, seed=1)
+    chunks = chunk_text(text, size, overlap)
+    covered = [False] * len(text)
+    for start, chunk in chunks:
+        offset = text.index(chunk, start)
+        covered[offset : offset + len(chunk)] = [True] * len(chunk)
+    assert all(covered[i] for i, char in enumerate(text) if not char.isspace())
+
+
+def test_chunks_end_at_a_paragraph_break_in_their_last_quarter():
+    first = "one two three four five six seven eight nine ten eleven."
+    text = first + "\n\n" + "twelve thirteen fourteen fifteen sixteen seventeen."
+    start, chunk = chunk_text(text, 64, 0)[0]
+    assert (start, chunk) == (0, first)
+
+
+def test_chunks_end_at_a_sentence_before_a_word():
+    text = "First sentence is here. Second one keeps on going past the limit"
+    assert chunk_text(text, 30, 0)[0] == (0, "First sentence is here.")
+
+
+def test_words_are_not_cut():
+    text = _sample_text(500, seed=2)
+    for start, chunk in chunk_text(text, 60, 15):
+        end = text.index(chunk, start) + len(chunk)
+        assert start == 0 or text[start - 1].isspace()
+        assert end == len(text) or not text[end].isalnum()
+
+
+def test_consecutive_chunks_overlap():
+    text = _sample_text(500, seed=3)
+    chunks = chunk_text(text, 100, 30)
+    for (start, chunk), (next_start, _) in zip(chunks, chunks[1:]):
+        end = text.index(chunk, start) + len(chunk)
+        assert start < next_start < end
+        # Up to the overlap, less what it takes to start on a word
+        assert end - next_start <= 30
+
+
+def test_no_overlap_means_no_shared_text():
+    text = _sample_text(500, seed=4)
+    chunks = chunk_text(text, 100, 0)
+    for (start, chunk), (next_start, _) in zip(chunks, chunks[1:]):
+        assert next_start >= text.index(chunk, start) + len(chunk)
+
+
+def test_overlap_is_capped_at_half_the_size():
+    text = "x" * 100
+    chunks = chunk_text(text, 10, 50)
+    # Capped at 5, so each chunk starts 5 characters after the previous one
+    assert [start for start, _ in chunks] == list(range(0, 95, 5))
+
+
+def test_text_without_spaces_is_cut_at_the_size():
+    assert chunk_text("x" * 25, 10, 3) == [
+        (0, "x" * 10),
+        (7, "x" * 10),
+        (14, "x" * 10),
+        (21, "x" * 4),
+    ]
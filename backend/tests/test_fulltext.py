@@ -0,0 +1,64 @@
+import pytest
+
+from app.kappa.fulltext import build_fulltext_query
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("Report", "report"),
+        ("annual report", "annual AND report"),
+        # Lucene operators typed as text are escaped, never interpreted
+        ("a+b", r"a\+b"),
+        ("(x) [y]", r"\(x\) AND \[y\]"),
+        ("a:b/c", r"a\:b\/c"),
+        ("c&&d", r"c\&\&d"),
+        ("x~5", r"x\~5"),
+    ],
+)
+def test_words_are_required_and_escaped(query, expected):
+    assert build_fulltext_query(query) == expected
+
+
+def test_phrase_keeps_word_order():
+    assert build_fulltext_query('"Exact Phrase" x') == '"exact phrase" AND x'
+
+
+def test_unterminated_phrase_is_closed():
+    assert build_fulltext_query('"unterminated phrase') == '"unterminated phrase"'
+
+
+def test_phrase_words_are_escaped():
+    assert build_fulltext_query('"c++ code"') == r'"c\+\+ code"'
+
+
+def test_prefix_and_fuzzy_operators():
+    assert build_fulltext_query("repo*") == "repo*"
+    assert build_fulltext_query("colour~") == "colour~2"
+    assert build_fulltext_query("colour~1") == "colour~1"
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("-draft report", "report AND NOT draft"),
+        ("NOT draft report", "report AND NOT draft"),
+        ('report -"first draft"', 'report AND NOT "first draft"'),
+        ('report NOT "first draft"', 'report AND NOT "first draft"'),
+    ],
+)
+def test_exclusions(query, expected):
+    assert build_fulltext_query(query) == expected
+
+
+def test_trailing_not_is_ignored():
+    assert build_fulltext_query("report NOT") == "report"
+
+
+def test_boolean_words_are_ignored():
+    assert build_fulltext_query("cats AND dogs OR birds") == "cats AND dogs AND birds"
+
+
+@pytest.mark.parametrize("query", ["", "   ", "AND OR", "***", "-only", "NOT only"])
+def test_queries_without_required_terms_are_empty(query):
+    assert build_fulltext_query(query) == ""
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from app.services.djinn.utils.georeference import GeoTransform
+
+BOUNDS = {
+    "_southWest": {"lat": 48.0, "lng": 2.0},
+    "_northEast": {"lat": 49.0, "lng": 4.0},
+}
+# OpenCV fits control points in float32: about 0.2 m at these latitudes
+GCP_TOLERANCE = 1e-5
+
+
+def _geo(transform: GeoTransform, points) -> np.ndarray:
+    """(N, 2) array of (lat, lng) for (px, py) points."""
+    points = np.asarray(points, dtype=np.float64)
+    lat, lng = transform.pixel_to_geo(points[:, 0], points[:, 1])
+    return np.stack([lat, lng], axis=1)
+
+
+def test_bounds_map_image_corners_to_map_corners():
+    transform = GeoTransform.from_bounds(BOUNDS, 200, 100)
+    assert_allclose(
+        _geo(transform, [(0, 0), (200, 0), (200, 100), (0, 100), (100, 50)]),
+        [[49.0, 2.0], [49.0, 4.0], [48.0, 4.0], [48.0, 2.0], [48.5, 3.0]],
+    )
+
+
+def test_bounds_missing_a_corner_are_rejected():
+    with pytest.raises(ValueError):
+        GeoTransform.from_bounds({"_southWest": {"lat": 48.0, "lng": 2.0}}, 10, 10)
+
+
+def test_gdal_geotransform_coefficients():
+    transform = GeoTransform.from_gdal((2.0, 0.01, 0.001, 49.0, 0.002, -0.01), 10, 10)
+    assert_allclose(
+        _geo(transform, [(3, 4)]),
+        [[49.0 + 3 * 0.002 - 4 * 0.01, 2.0 + 3 * 0.01 + 4 * 0.001]],
+    )
+
+
+def test_pixels_are_clipped_to_the_image_unless_asked_not_to():
+    transform = GeoTransform.from_bounds(BOUNDS, 200, 100)
+    assert_allclose(_geo(transform, [(-50, 500)]), [[48.0, 2.0]])
+    lat, lng = transform.pixel_to_geo(np.array([-50.0]), np.array([500.0]), False)
+    assert_allclose([lat[0], lng[0]], [44.0, 1.5])
+
+
+def test_three_control_points_fit_an_exact_affine():
+    pixels = [(0, 0), (1000, 0), (0, 800)]
+    geo = [(49.0, 2.0), (48.99, 2.02), (48.98, 1.995)]
+    transform = GeoTransform.from_gcps(pixels, geo, 1000, 800)
+    assert transform.matrix[2].tolist() == [0.0, 0.0, 1.0]
+    assert_allclose(_geo(transform, pixels), geo, atol=GCP_TOLERANCE)
+    # An affine maps the image to a parallelogram
+    corner = np.add(geo[1], geo[2]) - geo[0]
+    assert_allclose(_geo(transform, [(1000, 800)]), [corner], atol=GCP_TOLERANCE)
+
+
+def test_four_control_points_of_an_affine_fit_no_perspective():
+    pixels = [(0, 0), (1000, 0), (0, 800), (1000, 800)]
+    geo = [(49.0, 2.0), (48.99, 2.02), (48.98, 1.995), (48.97, 2.015)]
+    transform = GeoTransform.from_gcps(pixels, geo, 1000, 800)
+    matrix = transform.matrix / transform.matrix[2, 2]
+    assert_allclose(matrix[2], [0.0, 0.0, 1.0], atol=1e-7)
+    assert_allclose(
+        _geo(transform, [(500, 400)]), [[48.985, 2.0075]], atol=GCP_TOLERANCE
+    )
+
+
+def test_oblique_control_points_fit_a_homography():
+    # The far (top) edge of an oblique photo covers more ground than the near one
+    pixels = [(0, 0), (1000, 0), (1000, 800), (0, 800)]
+    geo = [(49.01, 1.99), (49.01, 2.03), (49.0, 2.015), (49.0, 2.005)]
+    transform = GeoTransform.from_gcps(pixels, geo, 1000, 800)
+    assert np.abs(transform.matrix[2, :2]).max() > 1e-4
+    assert_allclose(_geo(transform, pixels), geo, atol=GCP_TOLERANCE)
+
+    # No affine fit through three of the corners also hits the fourth
+    affine = GeoTransform.from_gcps(pixels[:3], geo[:3], 1000, 800)
+    assert np.abs(_geo(affine, pixels[3:]) - geo[3]).max() > 1e-3
+
+
+def test_extra_control_points_are_fitted_by_least_squares():
+    truth = GeoTransform.from_bounds(BOUNDS, 1000, 800)
+    pixels = [(0, 0), (1000, 0), (1000, 800), (0, 800), (500, 400)]
+    geo = _geo(truth, pixels) + [[1e-4, 0], [0, 0], [0, 0], [0, 0], [-1e-4, 0]]
+    fitted = GeoTransform.from_gcps(pixels, geo, 1000, 800)
+    # The noisy points are not hit exactly, but the fit stays close to the truth
+    assert np.abs(_geo(fitted, pixels) - geo).max() > GCP_TOLERANCE
+    assert_allclose(_geo(fitted, [(250, 600)]), _geo(truth, [(250, 600)]), atol=2e-4)
+
+
+@pytest.mark.parametrize(
+    "pixels, geo",
+    [
+        ([(0, 0), (1, 1)], [(49.0, 2.0), (48.0, 3.0)]),
+        ([(0, 0), (1, 1), (0, 1)], [(49.0, 2.0), (48.0, 3.0)]),
+    ],
+)
+def test_too_few_or_mismatched_control_points_are_rejected(pixels, geo):
+    with pytest.raises(ValueError):
+        GeoTransform.from_gcps(pixels, geo, 10, 10)
+
+
+def test_footprints_follow_the_corner_order():
+    transform = GeoTransform.from_bounds(BOUNDS, 200, 100)
+    footprints = transform.boxes_to_footprints(np.array([[0, 0, 100, 50]]))
+    assert footprints.shape == (1, 4, 2)
+    assert_allclose(footprints[0], [[49.0, 2.0], [49.0, 3.0], [48.5, 3.0], [48.5, 2.0]])
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from app.services.djinn.inference.results import box_iou, non_max_suppression
+
+
+def _nms(boxes, scores, class_ids, iou_threshold=0.5):
+    return non_max_suppression(
+        np.array(boxes, dtype=np.float32),
+        np.array(scores, dtype=np.float32),
+        np.array(class_ids, dtype=np.int32),
+        iou_threshold,
+    ).tolist()
+
+
+def test_no_boxes_keeps_nothing():
+    kept = non_max_suppression(
+        np.empty((0, 4)), np.empty(0), np.empty(0, np.int32), 0.5
+    )
+    assert kept.tolist() == []
+
+
+def test_overlapping_boxes_keep_the_highest_score():
+    boxes = [[0, 0, 10, 10], [1, 1, 11, 11], [0, 0, 10, 9]]
+    assert _nms(boxes, [0.6, 0.9, 0.7], [0, 0, 0]) == [1]
+
+
+def test_kept_boxes_are_ordered_by_score():
+    boxes = [[0, 0, 10, 10], [20, 20, 30, 30], [40, 40, 50, 50]]
+    assert _nms(boxes, [0.2, 0.9, 0.5], [0, 0, 0]) == [1, 2, 0]
+
+
+def test_boxes_only_suppress_their_own_class():
+    boxes = [[0, 0, 10, 10], [0, 0, 10, 10], [0, 0, 10, 10]]
+    assert _nms(boxes, [0.9, 0.8, 0.7], [0, 1, 0]) == [0, 1]
+
+
+def test_far_apart_classes_do_not_suppress_each_other():
+    # Class offsets must not push one class's boxes onto another's
+    boxes = [[0, 0, 10, 10], [500, 500, 510, 510]]
+    assert _nms(boxes, [0.9, 0.8], [1, 0]) == [0, 1]
+
+
+def test_iou_threshold_is_exclusive():
+    # IoU of these two boxes is exactly 1/3
+    boxes = [[0, 0, 10, 10], [5, 0, 15, 10]]
+    assert _nms(boxes, [0.9, 0.8], [0, 0], iou_threshold=0.5) == [0, 1]
+    assert _nms(boxes, [0.9, 0.8], [0, 0], iou_threshold=0.3) == [0]
+
+
+def test_suppressed_boxes_do_not_suppress_others():
+    # b overlaps both a and c, but a and c barely overlap; once a removes b,
+    # c must survive
+    boxes = [[0, 0, 10, 10], [4, 0, 14, 10], [8, 0, 18, 10]]
+    assert _nms(boxes, [0.9, 0.8, 0.7], [0, 0, 0], iou_threshold=0.4) == [0, 2]
+
+
+def test_iou_matrix_has_one_row_per_box_of_the_first_set():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float64)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 110, 110]])
+    iou = box_iou(a, b)
+    assert iou.shape == (2, 3)
+    assert iou[0].tolist() == pytest.approx([1.0, 1 / 3, 0.0])
+    assert iou[1].tolist() == pytest.approx([0.0, 0.0, 0.0])
+
+
+def test_iou_of_a_contained_box_is_its_area_fraction():
+    iou = box_iou(np.array([[0, 0, 10, 10]]), np.array([[0, 0, 5, 5]]))
+    assert iou[0, 0] == pytest.approx(0.25)
+
+
+def test_iou_of_touching_and_degenerate_boxes_is_zero():
+    iou = box_iou(
+        np.array([[0, 0, 10, 10], [3, 3, 3, 3]]),
+        np.array([[10, 0, 20, 10], [3, 3, 3, 3]]),
+    )
+    assert iou.tolist() == [[0.0, 0.0], [0.0, 0.0]]
+
+
+def test_iou_with_an_empty_set():
+    assert box_iou(np.empty((0, 4)), np.array([[0, 0, 1, 1]])).shape == (0, 1)
+    assert box_iou(np.array([[0, 0, 1, 1]]), np.empty((0, 4))).shape == (1, 0)
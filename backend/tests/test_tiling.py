@@ -0,0 +1,227 @@
+import numpy as np
+import pytest
+
+from app.services.djinn.inference.results import DetectionBatch
+from app.services.djinn.inference.tiling import (
+    compute_tile_windows,
+    merge_edge_fragments,
+    merge_tile_detections,
+    union_find_groups,
+)
+
+NAMES = {0: "car", 1: "truck"}
+TILE = 256
+
+
+def _batch(rows) -> DetectionBatch:
+    """Batch from [x1, y1, x2, y2, confidence, class_id] rows."""
+    return DetectionBatch.from_array(np.array(rows, dtype=np.float32), NAMES)
+
+
+def test_image_smaller_than_a_tile_is_one_clipped_window():
+    assert compute_tile_windows(300, 500, 640, 0.2) == [(0, 0, 500, 300)]
+
+
+def test_image_of_exactly_one_tile_is_one_window():
+    assert compute_tile_windows(640, 640, 640, 0.5) == [(0, 0, 640, 640)]
+
+
+def test_last_partial_tile_is_shifted_back_to_full_size():
+    windows = compute_tile_windows(400, 1000, 400, 0.0)
+    assert windows == [(0, 0, 400, 400), (400, 0, 800, 400), (600, 0, 1000, 400)]
+
+
+@pytest.mark.parametrize(
+    "height, width, tile_size, overlap",
+    [(1000, 1000, 256, 0.0), (1080, 1920, 640, 0.2), (777, 333, 100, 0.5)],
+)
+def test_windows_are_full_size_and_cover_the_image(height, width, tile_size, overlap):
+    windows = compute_tile_windows(height, width, tile_size, overlap)
+    covered = np.zeros((height, width), dtype=bool)
+    for x0, y0, x1, y1 in windows:
+        assert (x1 - x0, y1 - y0) == (tile_size, tile_size)
+        assert 0 <= x0 and 0 <= y0 and x1 <= width and y1 <= height
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+
+
+def test_neighbouring_tiles_share_the_overlap():
+    windows = compute_tile_windows(100, 1000, 100, 0.25)
+    starts = [x0 for x0, _, _, _ in windows]
+    assert starts[:3] == [0, 75, 150]
+    assert starts[-1] == 900
+
+
+def test_overlap_close_to_a_whole_tile_still_advances():
+    # The stride rounds to 0 pixels but is kept at 1
+    windows = compute_tile_windows(4, 10, 4, 0.95)
+    assert [x0 for x0, _, _, _ in windows] == list(range(7))
+
+
+@pytest.mark.parametrize("overlap", [1.0, 1.5, -0.1])
+def test_overlap_of_a_whole_tile_or_more_is_rejected(overlap):
+    with pytest.raises(ValueError):
+        compute_tile_windows(1000, 1000, 256, overlap)
+
+
+def test_tile_size_must_be_positive():
+    with pytest.raises(ValueError):
+        compute_tile_windows(1000, 1000, 0, 0.2)
+
+
+def test_merge_maps_detections_to_image_coordinates():
+    windows = [(0, 0, 100, 100), (500, 300, 600, 400)]
+    merged = merge_tile_detections(
+        [_batch([[10, 10, 20, 20, 0.9, 0]]), _batch([[10, 10, 20, 20, 0.8, 0]])],
+        windows,
+        0.5,
+    )
+    assert merged.boxes.tolist() == [[10, 10, 20, 20], [510, 310, 520, 320]]
+    assert merged.names == NAMES
+
+
+def test_merge_removes_duplicates_from_overlapping_tiles():
+    # The same car seen by two tiles that overlap by 50 pixels
+    windows = [(0, 0, 100, 100), (50, 0, 150, 100)]
+    merged = merge_tile_detections(
+        [_batch([[60, 10, 90, 40, 0.7, 0]]), _batch([[11, 11, 41, 41, 0.9, 0]])],
+        windows,
+        0.5,
+    )
+    assert len(merged) == 1
+    assert merged.boxes.tolist() == [[61, 11, 91, 41]]
+    assert merged.confidences.tolist() == pytest.approx([0.9])
+
+
+def test_merge_keeps_overlapping_boxes_of_other_classes():
+    windows = [(0, 0, 100, 100), (50, 0, 150, 100)]
+    merged = merge_tile_detections(
+        [_batch([[60, 10, 90, 40, 0.7, 0]]), _batch([[10, 10, 40, 40, 0.9, 1]])],
+        windows,
+        0.5,
+    )
+    assert sorted(merged.class_ids.tolist()) == [0, 1]
+
+
+def test_merge_of_a_single_window_keeps_every_detection():
+    rows = [[10, 10, 50, 50, 0.9, 0], [12, 12, 52, 52, 0.8, 0]]
+    merged = merge_tile_detections([_batch(rows)], [(0, 0, 100, 100)], 0.5)
+    assert len(merged) == 2
+
+
+def test_merge_of_empty_tiles_is_empty():
+    windows = [(0, 0, 100, 100), (50, 0, 150, 100)]
+    merged = merge_tile_detections(
+        [DetectionBatch.empty(NAMES), DetectionBatch.empty(NAMES)], windows, 0.5
+    )
+    assert len(merged) == 0
+    assert merged.names == NAMES
+
+
+def _merge_fragments(rows, tiles, margin=2.0):
+    return merge_edge_fragments(_batch(rows), np.array(tiles), TILE, margin)
+
+
+def test_union_find_groups_linked_items():
+    labels = union_find_groups(6, np.array([[0, 3], [3, 5], [2, 4]]))
+    assert labels.tolist() == [0, 1, 2, 0, 2, 0]
+
+
+def test_union_find_groups_without_pairs():
+    assert union_find_groups(3, np.empty((0, 2))).tolist() == [0, 1, 2]
+
+
+def test_fragments_cut_by_a_vertical_tile_edge_are_joined():
+    merged = _merge_fragments(
+        [[230, 100, 256, 130, 0.6, 0], [256, 102, 280, 128, 0.8, 0]],
+        [(0, 0), (1, 0)],
+    )
+    assert merged.boxes.tolist() == [[230, 100, 280, 130]]
+    assert merged.confidences.tolist() == pytest.approx([0.8])
+    assert merged.class_ids.tolist() == [0]
+
+
+def test_fragments_cut_by_a_horizontal_tile_edge_are_joined():
+    merged = _merge_fragments(
+        [[300, 490, 340, 511, 0.7, 1], [301, 513, 339, 540, 0.5, 1]],
+        [(1, 1), (1, 2)],
+    )
+    assert merged.boxes.tolist() == [[300, 490, 340, 540]]
+    assert merged.class_ids.tolist() == [1]
+
+
+def test_object_spanning_three_tiles_is_joined_into_one():
+    merged = _merge_fragments(
+        [
+            [200, 10, 256, 40, 0.5, 1],
+            [256, 12, 512, 40, 0.9, 1],
+            [512, 10, 600, 38, 0.6, 1],
+        ],
+        [(0, 0), (1, 0), (2, 0)],
+    )
+    assert merged.boxes.tolist() == [[200, 10, 600, 40]]
+    assert merged.confidences.tolist() == pytest.approx([0.9])
+
+
+def test_object_on_a_tile_corner_is_joined_across_four_tiles():
+    merged = _merge_fragments(
+        [
+            [240, 240, 256, 256, 0.4, 0],
+            [256, 240, 270, 256, 0.5, 0],
+            [240, 256, 256, 272, 0.6, 0],
+            [256, 256, 270, 272, 0.7, 0],
+        ],
+        [(0, 0), (1, 0), (0, 1), (1, 1)],
+    )
+    assert merged.boxes.tolist() == [[240, 240, 270, 272]]
+
+
+def test_fragments_of_different_classes_are_not_joined():
+    merged = _merge_fragments(
+        [[230, 100, 256, 130, 0.6, 0], [256, 100, 280, 130, 0.8, 1]],
+        [(0, 0), (1, 0)],
+    )
+    assert len(merged) == 2
+
+
+def test_boxes_away_from_the_edge_are_not_joined():
+    merged = _merge_fragments(
+        [[220, 100, 250, 130, 0.6, 0], [256, 100, 280, 130, 0.8, 0]],
+        [(0, 0), (1, 0)],
+    )
+    assert len(merged) == 2
+
+
+def test_fragments_barely_overlapping_along_the_edge_are_not_joined():
+    # Only 5 of the shorter box's 30 pixels line up along the edge
+    merged = _merge_fragments(
+        [[230, 100, 256, 130, 0.6, 0], [256, 125, 280, 155, 0.8, 0]],
+        [(0, 0), (1, 0)],
+    )
+    assert len(merged) == 2
+
+
+def test_neighbouring_objects_on_one_edge_stay_apart():
+    merged = _merge_fragments(
+        [
+            [230, 10, 256, 40, 0.6, 0],
+            [256, 10, 280, 40, 0.6, 0],
+            [230, 100, 256, 130, 0.7, 0],
+            [256, 100, 280, 130, 0.7, 0],
+        ],
+        [(0, 0), (1, 0), (0, 0), (1, 0)],
+    )
+    assert sorted(merged.boxes.tolist()) == [[230, 10, 280, 40], [230, 100, 280, 130]]
+
+
+def test_fragments_in_tiles_that_are_not_adjacent_are_not_joined():
+    merged = _merge_fragments(
+        [[230, 100, 256, 130, 0.6, 0], [512, 100, 540, 130, 0.8, 0]],
+        [(0, 0), (2, 0)],
+    )
+    assert len(merged) == 2
+
+
+def test_single_detection_is_returned_unchanged():
+    batch = _batch([[230, 100, 256, 130, 0.6, 0]])
+    assert merge_edge_fragments(batch, np.array([(0, 0)]), TILE, 2.0) is batch
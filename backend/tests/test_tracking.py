@@ -0,0 +1,105 @@
+import numpy as np
+
+from app.services.djinn.inference.results import DetectionBatch
+from app.services.djinn.inference.tracking import IoUTracker
+
+NAMES = {0: "car", 1: "person"}
+
+
+def _frame(*rows) -> DetectionBatch:
+    """Detections from [x1, y1, x2, y2, confidence, class_id] rows."""
+    if not rows:
+        return DetectionBatch.empty(NAMES)
+    return DetectionBatch.from_array(np.array(rows, dtype=np.float32), NAMES)
+
+
+def _car(x, confidence=0.9):
+    return [x, 0, x + 40, 20, confidence, 0]
+
+
+def test_new_high_confidence_detections_start_tracks():
+    tracker = IoUTracker()
+    ids = tracker.update(_frame(_car(0), _car(100)), 0)
+    assert ids.tolist() == [1, 2]
+    assert len(tracker.tracks) == 2
+
+
+def test_moving_object_keeps_its_track():
+    tracker = IoUTracker(iou_threshold=0.3)
+    ids = [tracker.update(_frame(_car(5 * i)), i).tolist() for i in range(10)]
+    assert ids == [[1]] * 10
+    assert tracker.tracks[0].hits == 10
+
+
+def test_velocity_prediction_bridges_skipped_frames():
+    # 8 px per frame: after a 4-frame gap the last and the new box barely
+    # overlap, but the predicted box lands on the new detection
+    tracker = IoUTracker(iou_threshold=0.5)
+    for i in range(6):
+        tracker.update(_frame(_car(8 * i)), i)
+    assert tracker.update(_frame(_car(8 * 9)), 9).tolist() == [1]
+
+
+def test_each_track_takes_at_most_one_detection():
+    tracker = IoUTracker()
+    tracker.update(_frame(_car(0)), 0)
+    ids = tracker.update(_frame(_car(2), _car(4)), 1)
+    assert sorted(ids.tolist()) == [1, 2]
+
+
+def test_best_overlap_wins_the_track():
+    tracker = IoUTracker()
+    tracker.update(_frame(_car(0)), 0)
+    ids = tracker.update(_frame(_car(15), _car(1)), 1)
+    assert ids.tolist() == [2, 1]
+
+
+def test_detections_of_another_class_do_not_continue_a_track():
+    tracker = IoUTracker()
+    tracker.update(_frame(_car(0)), 0)
+    ids = tracker.update(_frame([0, 0, 40, 20, 0.9, 1]), 1)
+    assert ids.tolist() == [2]
+
+
+def test_low_confidence_detections_continue_but_never_start_tracks():
+    tracker = IoUTracker(high_confidence=0.5)
+    assert tracker.update(_frame(_car(0, 0.3)), 0).tolist() == [-1]
+    assert not tracker.tracks
+
+    tracker.update(_frame(_car(0)), 1)
+    # Partly occluded: the same car at low confidence stays on its track
+    assert tracker.update(_frame(_car(2, 0.2)), 2).tolist() == [1]
+
+
+def test_high_confidence_detections_are_matched_first():
+    tracker = IoUTracker(high_confidence=0.5)
+    tracker.update(_frame(_car(0)), 0)
+    # The low-confidence box overlaps more, but the confident one takes the
+    # track and the low one is left unmatched
+    ids = tracker.update(_frame(_car(0, 0.3), _car(8, 0.9)), 1)
+    assert ids.tolist() == [-1, 1]
+
+
+def test_tracks_end_after_max_age_and_only_confirmed_ones_are_kept():
+    tracker = IoUTracker(max_age=2, min_hits=3)
+    for i in range(3):
+        tracker.update(_frame(_car(0), _car(200) if i == 0 else _car(400)), i)
+    # Frame 0's car at 200 had one hit; the other two have three and two
+    tracker.update(_frame(), 5)
+    assert tracker.tracks == []
+    finished = tracker.pop_finished()
+    assert [track.track_id for track in finished] == [1]
+    assert tracker.pop_finished() == []
+
+
+def test_flush_returns_confirmed_tracks_with_their_best_observation():
+    tracker = IoUTracker(min_hits=2)
+    tracker.update(_frame(_car(0, 0.6)), 0)
+    tracker.update(_frame(_car(2, 0.95)), 1)
+    tracker.update(_frame(_car(4, 0.7)), 2)
+    tracker.update(_frame(_car(300)), 2)
+    (track,) = tracker.flush()
+    assert track.track_id == 1
+    assert (track.first_frame, track.last_frame, track.best_frame) == (0, 2, 1)
+    assert track.best_box.tolist() == [2, 0, 42, 20]
+    assert tracker.tracks == []